@@ -1,19 +1,76 @@
 from __future__ import annotations
 
-from flask import Flask, redirect, render_template, request, url_for
+import gc
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional
 
+import sqlalchemy as sa
+from flask import Flask, Response, abort, redirect, render_template, request, stream_template, url_for
+
+from app import instrument
+from app import issue_search
+from app import schema
 from app.config import Config
 from app.models import Issue, db
+from app.storage import archive as steps_archive
+from app.storage import cache as steps_cache
+from app.storage import db as steps_db
+from app.storage import rollup as steps_rollup
+from app.storage import writer as steps_writer
 from app.validators import validate_issue_form
 
 
-def create_app() -> Flask:
+def _int_arg(name: str, lo: int, hi: int) -> Optional[int]:  # R39-2: 範囲付きの整数クエリ（不正なら400）
+    raw = request.args.get(name)  # R39-2
+    if raw in (None, ""):  # R39-2: 未指定
+        return None  # R39-2
+    try:  # R39-2
+        value = int(raw)  # R39-2
+    except ValueError:  # R39-2
+        abort(400)  # R39-2
+    if not lo <= value <= hi:  # R39-2
+        abort(400)  # R39-2
+    return value  # R39-2
+
+
+def _issues_query(app: Flask) -> Dict[str, Any]:  # R39-2: /issues の絞り込みとページ
+    page_max = int(app.config.get("ISSUES_PAGE_MAX", 1000))  # R39-2
+    return dict(  # R39-2
+        limit=_int_arg("limit", 1, page_max) or int(app.config.get("ISSUES_PAGE_SIZE", 50)),  # R39-2
+        before_id=_int_arg("before_id", 1, 2**63 - 1),  # R39-1: 前ページの最後の id
+        tag=request.args.get("tag") or None,  # R38-5
+        min_intensity=_int_arg("min_intensity", 0, 10),  # R39-1: Issue.intensity と同じ範囲
+        max_intensity=_int_arg("max_intensity", 0, 10),  # R39-1
+    )
+
+
+def _buffered(chunks: Iterable[str], size: int = 8192) -> Iterator[str]:  # R39-2: テンプレの細かい断片をまとめて送る
+    buf: list = []  # R39-2
+    n = 0  # R39-2
+    for chunk in chunks:  # R39-2
+        buf.append(chunk)  # R39-2
+        n += len(chunk)  # R39-2
+        if n >= size:  # R39-2
+            yield "".join(buf)  # R39-2
+            buf, n = [], 0  # R39-2
+    if buf:  # R39-2
+        yield "".join(buf)  # R39-2
+
+
+def create_app(overrides: Optional[Mapping[str, Any]] = None) -> Flask:
     app = Flask(__name__)
     app.config.from_object(Config)
+    if overrides:
+        app.config.update(overrides)
+    app.config.setdefault("SQLALCHEMY_DATABASE_URI", app.config["DATABASE_URL"])
     db.init_app(app)
+    steps_db.init_app(app)  # after db.init_app: reuses its engine
+    steps_writer.init_app(app)
+    steps_cache.init_app(app)
+    steps_rollup.init_app(app)
+    steps_archive.init_app(app)  # R42-1: STEPS_ARCHIVE_DIR
+    instrument.init_app(app)
 
-    with app.app_context():
-        db.create_all()
+    schema.init_app(app)  # R41-1: SCHEMA_ON_STARTUP=False なら版を読むだけ（flask schema upgrade 済みの前提）
 
     @app.get("/")
     def home():
@@ -21,8 +78,18 @@ def create_app() -> Flask:
 
     @app.get("/issues")
     def issues_index():
-        issues = Issue.query.order_by(Issue.created_at.desc()).all()
-        return render_template("issues/index.html", issues=issues)
+        q = _issues_query(app)  # R39-2: 不正な値は400
+        issues = issue_search.list_issues(**q)  # R39-1: 描画しながら少しずつ読む
+        return Response(_buffered(stream_template("issues/index.html", issues=issues, **q)))  # R39-2: 全件を溜めずに流す
+
+    @app.get("/issues/search")  # R38-5: 全文検索（関連度順、ページ毎）
+    def issues_search():
+        q = request.args.get("q", "").strip()  # R38-5
+        tag = request.args.get("tag") or None  # R38-5
+        page = request.args.get("page", type=int) or 1  # R38-5: 不正な値は1ページ目
+        per_page = int(app.config.get("ISSUES_SEARCH_PAGE_SIZE", 20))  # R38-5
+        result = issue_search.search_issues(q, tag=tag, page=page, per_page=per_page) if (q or tag) else None  # R38-5
+        return render_template("issues/search.html", q=q, tag=tag, result=result)  # R38-5
 
     @app.route("/issues/new", methods=["GET", "POST"])
     def issues_new():
@@ -38,21 +105,56 @@ def create_app() -> Flask:
                     400,
                 )
 
-            issue = Issue(
-                title=data["title"],
-                tags=data["tags"],
-                intensity=data["intensity"],
-                note=data["note"],
-            )
-            db.session.add(issue)
-            db.session.commit()
+            def save_issue() -> None:
+                issue = Issue(
+                    title=data["title"],
+                    tags=data["tags"],
+                    intensity=data["intensity"],
+                    note=data["note"],
+                )
+                db.session.add(issue)
+                db.session.commit()
+
+            # another worker process holding the write lock past busy_timeout: roll back and retry with jitter
+            steps_db.retry_on_busy(save_issue, on_retry=db.session.rollback)
             return redirect(url_for("issues_index"))
 
         return render_template("issues/new.html", errors=[], form={})
 
-    from app.web.routes_boundary import bp_boundary  # R5-2: 境界Blueprintを読み込む
+    if app.config.get("ASYNC_VIEWS", False):  # R31-4: 非同期版の Blueprint（URL/エンドポイント名は同じ）
+        from app.storage import aio as steps_aio  # R31-1: 読み書きを逃がすスレッド数
+        from app.web.routes_async import bp_boundary_async as bp_boundary, bp_steps_async as bp_steps  # R31-4
+        steps_aio.init_app(app)  # R31-1
+    else:  # R31-4: 既定は同期版
+        from app.web.routes_boundary import bp_boundary  # R5-2: 境界Blueprintを読み込む
+        from app.web.routes_steps import bp_steps  # R7-3: 履歴Blueprintを読み込む
     app.register_blueprint(bp_boundary)  # R5-2: /boundary ルートを有効化する
-    from app.web.routes_steps import bp_steps  # R7-3: 履歴Blueprintを読み込む
     app.register_blueprint(bp_steps)  # R7-3: /steps を有効化する
+    from app.web.routes_templates import bp_templates  # R33-8: 登録済みテンプレ共通の画面
+    app.register_blueprint(bp_templates)  # R33-8: /t/<template_id> を有効化する
+    from app.web.routes_api import bp_api  # R40-3: JSON API（同期/非同期のどちらでも同じビュー）
+    app.register_blueprint(bp_api)  # R40-3: /api/simulate を有効化する
+    if instrument.enabled():  # R35-4: 計測が有効なときだけ /metrics を出す
+        from app.web.routes_metrics import bp_metrics  # R35-4
+        app.register_blueprint(bp_metrics)  # R35-4
+
+    from app.cli import schema_cli, steps_cli  # R27-4: flask steps ... コマンド（R41-1: flask schema ...）
+    app.cli.add_command(steps_cli)  # R27-4: CLIを登録する
+    app.cli.add_command(schema_cli)  # R41-1
+
+    warm_up(app, jinja=app.config.get("PRELOAD", False))  # R41-3: preload ならテンプレも前もってコンパイルする
+    if app.config.get("PRELOAD", False):  # R41-3: この後 fork するワーカーは温めた状態をページ共有で使う
+        gc.freeze()  # R41-3: 起動時に作ったオブジェクトを GC の対象から外す（子の GC が親のページに書き込まない）
+
+    return app
+
 
-    return app
\ No newline at end of file
+def warm_up(app: Flask, jinja: bool = True) -> None:  # R41-3: 最初のリクエストで作るものを先に作る
+    from app.core.policy_table import get_policy_table  # R22-4: 境界テンプレの方策表
+    from app.templates_def.registry import template_ids  # R33-5: 登録済みの全テンプレ
+    for template_id in template_ids():  # R33-5
+        get_policy_table(template_id)  # R22-4: 起動時に一度だけコンパイルする（定義変更時は次回参照で再構築）
+    sa.orm.configure_mappers()  # R41-3: Issue/IssueTag の関係の解決（最初の Issue.query で数ms）
+    if jinja:  # R41-3: Jinja のコンパイル（1テンプレ数ms）
+        for name in app.jinja_env.list_templates():  # R41-3
+            app.jinja_env.get_template(name)  # R41-3: jinja_env.cache に残る
@@ -0,0 +1,155 @@
+from __future__ import annotations  # R27-4: 前方参照を安定させる
+
+import signal  # R44-3: SIGTERM でも書き切ってから止める
+import sys  # R27-4: 標準出力へ書く
+from datetime import datetime, timedelta, timezone  # R42-1: --older-than の基準時刻
+
+import click  # R27-4: Flask CLI の引数定義
+from flask import current_app  # R41-1
+from flask.cli import AppGroup  # R27-4: `flask steps ...` のコマンド群
+
+from app.schema import SCHEMA_VERSION, current_version, upgrade  # R41-1
+from app.storage.archive import ArchiveReport, archive_status, archive_steps  # R42-1: 古い行を列ファイルへ
+from app.storage.compact import MigrationReport, migrate_steps  # R29-4: レイアウト移行
+from app.storage.db import STORAGE_FORMATS  # R29-4
+from app.storage.export import EXPORT_FORMATS, iter_export  # R27-4: エクスポート本体
+from app.storage.replay import REPLAY_MODES, ReplayReport, replay_steps  # R28-5: 再シミュレーション本体
+from app.storage.repository import normalize_created_at  # R27-4: 期間指定の正規化
+from app.storage.rollup import RollupReport, compact_rollups  # R37-2: /steps/stats の集計表
+from app.storage.writer import make_writer, parse_address, serve, writer_address, writer_authkey  # R44-3: 書き込み役のプロセス
+
+steps_cli = AppGroup("steps", help="Maintenance commands for the steps log.")  # R27-4: flask steps
+schema_cli = AppGroup("schema", help="Create or upgrade the database schema.")  # R41-1: flask schema
+
+
+def _time_option(ctx: click.Context, param: click.Parameter, value: str | None) -> str | None:  # R27-4: --since/--until の検証
+    if not value:  # R27-4: 未指定
+        return None  # R27-4
+    try:  # R27-4
+        return normalize_created_at(value)  # R27-4: /steps と同じ規則
+    except ValueError:  # R27-4
+        raise click.BadParameter("expected YYYY-MM-DD or an ISO datetime") from None  # R27-4
+
+
+@steps_cli.command("export")  # R27-4: flask steps export
+@click.option("--format", "fmt", type=click.Choice(EXPORT_FORMATS), default="ndjson", show_default=True)  # R27-4
+@click.option("--gzip", is_flag=True, help="gzip-compress the output.")  # R27-4
+@click.option("--template", default=None, help="Only this template_id.")  # R27-4
+@click.option("--pi-t", "pi_t", default=None, help="Only this policy.")  # R27-4
+@click.option("--since", default=None, callback=_time_option, help="created_at >= (date or ISO datetime).")  # R27-4
+@click.option("--until", default=None, callback=_time_option, help="created_at < (date or ISO datetime).")  # R27-4
+@click.option("--chunk-size", default=1000, show_default=True, help="Rows per fetchmany().")  # R27-4
+@click.option("-o", "--output", type=click.Path(allow_dash=True), default="-", help="File to write ('-' = stdout).")  # R27-4
+def export_command(fmt, gzip, template, pi_t, since, until, chunk_size, output):  # R27-4: steps をファイル/標準出力へ流す
+    chunks = iter_export(fmt, gzip=gzip, chunk_size=chunk_size, template=template, pi_t=pi_t, since=since, until=until)  # R27-4
+    out = sys.stdout.buffer if output == "-" else open(output, "wb")  # R27-4: バイナリで書く
+    try:  # R27-4
+        for chunk in chunks:  # R27-4: チャンク毎に書く（メモリ一定）
+            out.write(chunk)  # R27-4
+    finally:  # R27-4
+        if out is not sys.stdout.buffer:  # R27-4: 自分で開いたファイルだけ閉じる
+            out.close()  # R27-4
+
+
+@steps_cli.command("replay")  # R28-5: flask steps replay
+@click.option("--mode", type=click.Choice(REPLAY_MODES), default="update", show_default=True,
+              help="update: rewrite steps in place; side_table: write to steps_replay.")  # R28-5
+@click.option("--template", default="boundary", show_default=True, help="Only this template_id ('all': every registered template).")  # R28-5
+@click.option("--chunk-size", default=1000, show_default=True, help="Rows per chunk (one transaction each).")  # R28-5
+@click.option("--workers", default=0, show_default=True, help="Worker processes (0/1 = in-process).")  # R28-5
+@click.option("--name", default=None, help="Checkpoint name (default: replay-<mode>-<template>).")  # R28-5
+@click.option("--restart", is_flag=True, help="Ignore an interrupted run's checkpoint and start from the first row.")  # R28-5
+def replay_command(mode, template, chunk_size, workers, name, restart):  # R28-5: 保存済みの steps を現在のルールで再計算する
+    def progress(r: ReplayReport) -> None:  # R28-5: チャンク毎に1行
+        click.echo(f"{r.scanned}/{r.total} rows, {r.changed} changed, last id {r.last_id}", err=True)  # R28-5
+
+    report = replay_steps(  # R28-5
+        mode=mode, template=None if template == "all" else template, chunk_size=chunk_size, workers=workers,  # R33-7
+        name=name, resume=not restart, progress=progress,  # R28-5
+    )
+    click.echo(f"replayed {report.scanned} rows up to id {report.last_id}: {report.changed} policies changed (checkpoint {report.name!r} cleared)")  # R28-6
+    if mode == "update":  # R37-2: 書き換えた pi_t で集計表を作り直す（steps_epoch が進んでいれば）
+        rolled = compact_rollups()  # R37-2
+        if rolled.rebuilt:  # R37-2
+            click.echo(f"rollups rebuilt up to id {rolled.last_id}")  # R37-2
+
+
+@steps_cli.command("migrate")  # R29-4: flask steps migrate
+@click.option("--to", "to", type=click.Choice(STORAGE_FORMATS), default="compact", show_default=True,
+              help="Target layout (json = steps, compact = steps_compact).")  # R29-4
+@click.option("--chunk-size", default=5000, show_default=True, help="Rows per transaction.")  # R29-4
+@click.option("--drop-source", is_flag=True, help="Delete the copied rows from the source table and VACUUM.")  # R29-4
+def migrate_command(to, chunk_size, drop_source):  # R29-4: 既存の行を別レイアウトへ写す（再実行で続きから）
+    def progress(r: MigrationReport) -> None:  # R29-4: チャンク毎に1行
+        click.echo(f"{r.copied} rows copied, last id {r.last_id}", err=True)  # R29-4
+
+    report = migrate_steps(to=to, chunk_size=chunk_size, drop_source=drop_source, progress=progress)  # R29-4
+    click.echo(f"copied {report.copied} rows from {report.source} to {report.target}; set STEPS_STORAGE_FORMAT = {to!r}")  # R29-4
+    click.echo("then run `flask steps rollup` to rebuild the /steps/stats rollups from the new layout")  # R37-2: 集計表は現在のレイアウトから作る
+
+
+@steps_cli.command("rollup")  # R37-2: flask steps rollup
+@click.option("--rebuild", is_flag=True, help="Empty the rollups and recount every row.")  # R37-2
+@click.option("--chunk-size", default=100_000, show_default=True, help="Rows per transaction.")  # R37-2
+def rollup_command(rebuild, chunk_size):  # R37-2: 集計表を steps に追いつかせる（cron 等で定期的に流してもよい）
+    def progress(r: RollupReport) -> None:  # R37-2: チャンク毎に1行
+        click.echo(f"{r.rows} rows rolled up, last id {r.last_id}", err=True)  # R37-2
+
+    report = compact_rollups(chunk_size=chunk_size, rebuild=rebuild, progress=progress)  # R37-2
+    click.echo(f"{'rebuilt' if report.rebuilt else 'updated'} rollups: {report.rows} rows, up to id {report.last_id}")  # R37-2
+
+
+@steps_cli.command("archive")  # R42-1: flask steps archive（cron 等で定期的に流す）
+@click.option("--older-than", "days", type=int, default=None, help="Age in days (default: STEPS_ARCHIVE_AFTER_DAYS).")  # R42-1
+@click.option("--before", default=None, callback=_time_option, help="Archive rows with created_at < this (overrides --older-than).")  # R42-1
+@click.option("--segment-rows", type=int, default=None, help="Rows per segment (default: STEPS_ARCHIVE_SEGMENT_ROWS).")  # R42-1
+@click.option("--vacuum", is_flag=True, help="VACUUM afterwards to shrink the database file.")  # R42-1
+@click.option("--status", is_flag=True, help="Only show what is archived.")  # R42-1
+def archive_command(days, before, segment_rows, vacuum, status):  # R42-1: 古い steps をセグメントへ移して SQLite から消す（再実行で続きから）
+    if not status:  # R42-1
+        cfg = current_app.config  # R42-1
+        if before is None:  # R42-1: 今から days 日前
+            age = days if days is not None else int(cfg.get("STEPS_ARCHIVE_AFTER_DAYS", 90))  # R42-1
+            before = (datetime.now(timezone.utc) - timedelta(days=age)).isoformat()  # R24-3: 保存形式（UTCのISO）
+
+        def progress(r: ArchiveReport) -> None:  # R42-1: セグメント毎に1行
+            click.echo(f"{r.rows} rows archived in {r.segments} segments, last id {r.last_id}", err=True)  # R42-1
+
+        report = archive_steps(  # R42-1
+            before, segment_rows=segment_rows or int(cfg.get("STEPS_ARCHIVE_SEGMENT_ROWS", 200_000)), vacuum=vacuum, progress=progress,  # R42-1
+        )
+        click.echo(f"archived {report.rows} rows created before {report.before} ({report.bytes} bytes in {report.segments} segments)")  # R42-1
+    s = archive_status()  # R42-1
+    click.echo(f"{s['dir']}: {s['rows']} rows in {s['segments']} segments" + (f", {s['oldest']} .. {s['newest']}" if s["segments"] else ""))  # R42-1
+
+
+@steps_cli.command("writer")  # R44-3: flask steps writer（ワーカーとは別に1つだけ起動する）
+@click.option("--address", default=None, help="host:port or socket path (default: STEPS_WRITER_ADDRESS).")  # R44-3
+def writer_command(address):  # R44-3: steps の書き込みを1プロセスで受ける。ワーカーは STEPS_WRITER_ADDRESS で送ってくる
+    app = current_app._get_current_object()  # R44-3
+    target = parse_address(address, app.instance_path) if address else writer_address(app)  # R30-1: 相対パスは instance/ 基準
+    if target is None:  # R44-3
+        raise click.UsageError("set STEPS_WRITER_ADDRESS or pass --address")  # R44-3
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))  # R25-4: finally で積まれた分を書き切る
+    try:  # R44-3
+        serve(  # R44-3
+            target, writer_authkey(app), make_writer(app),  # R44-6: STEPS_WRITER_AUTHKEY が無ければ起動しない
+            ready=lambda a: click.echo(f"steps writer listening on {a}", err=True),  # R44-3
+            allow_remote=app.config.get("STEPS_WRITER_ALLOW_REMOTE", False),  # R44-6
+        )
+    except KeyboardInterrupt:  # R44-3: Ctrl-C
+        pass  # R44-3
+    except RuntimeError as e:  # R44-6: 鍵が無い/外向きのアドレス/既に起動している
+        raise click.ClickException(str(e)) from None  # R44-6
+
+
+@schema_cli.command("upgrade")  # R41-1: flask schema upgrade（デプロイ時にワーカー起動前に1回）
+def schema_upgrade_command():  # R41-1: AppGroup のコマンドはアプリコンテキスト内で動く。Issue/steps の表・索引・検索トリガを確保して版を記録する
+    version = upgrade(current_app._get_current_object())  # R41-1
+    click.echo(f"schema at version {version}")  # R41-1
+
+
+@schema_cli.command("status")  # R41-1: flask schema status
+def schema_status_command():  # R41-1: DBの版とコードの版
+    version = current_version()  # R41-1
+    click.echo(f"database {version}, code {SCHEMA_VERSION}" + ("" if version >= SCHEMA_VERSION else " (run `flask schema upgrade`)"))  # R41-1
@@ -1,4 +1,79 @@
+import os
+
+
 class Config:
     SECRET_KEY = "dev"
-    SQLALCHEMY_DATABASE_URI = "sqlite:///app.db"
+    # one database for Issues and the steps log; relative SQLite paths live in instance/
+    DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///app.db")
+    SQLALCHEMY_ENGINE_OPTIONS = {"pool_size": 10, "max_overflow": 20}
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # startup (app.schema, app.warm_up)
+    SCHEMA_ON_STARTUP = os.environ.get("SCHEMA_ON_STARTUP", "1") != "0"  # False -> no DDL, only a PRAGMA user_version check (`flask schema upgrade` on deploy)
+    PRELOAD = os.environ.get("PRELOAD", "0") == "1"  # also compile Jinja templates and gc.freeze(), for servers that fork workers after loading the app
+
+    ISSUES_PAGE_SIZE = 50  # /issues rows per page (newest first, ?before_id= for older)
+    ISSUES_PAGE_MAX = 1000  # upper bound for /issues?limit=; pages are streamed while they render
+    ISSUES_SEARCH_PAGE_SIZE = 20  # /issues/search results per page
+
+    # steps log (app.storage.db); shares the Issue engine, pool and request transaction
+    STEPS_DATABASE_URL = None  # None -> DATABASE_URL; must be SQLite (set this when DATABASE_URL is not)
+    STEPS_DB_POOL = True  # False -> own engine, one connection per call
+    STEPS_DB_PRAGMAS = None  # None -> app.storage.db.DEFAULT_PRAGMAS
+    STEPS_STORAGE_FORMAT = "json"  # "compact" -> steps_compact (see `flask steps migrate`)
+    STEPS_PAGE_MAX = 500  # upper bound for /steps?limit=
+    STEPS_EXPORT_CHUNK_SIZE = 1000  # rows per fetchmany() in /steps/export
+
+    # archive of old steps as memory-mapped column files (app.storage.archive; needs `poetry install -E analysis`)
+    STEPS_ARCHIVE_DIR = None  # None -> next to the steps DB file (app.db -> app.archive/); relative paths live in instance/
+    STEPS_ARCHIVE_AFTER_DAYS = 90  # default age for `flask steps archive` (run it from cron)
+    STEPS_ARCHIVE_SEGMENT_ROWS = 200_000  # rows per segment
+
+    # cache of stored steps and their rendered pages (app.storage.cache)
+    STEPS_CACHE_SIZE = 1024  # entries; 0 disables
+    STEPS_CACHE_TTL = 300.0  # seconds
+    STEPS_CACHE_EPOCH_CHECK = 1.0  # seconds between checks for replay/migrate rewrites (0 = every hit)
+
+    # write-behind step logging (app.storage.writer); off = one commit per request
+    STEPS_WRITE_BEHIND = False
+    STEPS_WRITE_QUEUE_MAX = 1000
+    STEPS_WRITE_BATCH_SIZE = 100
+    STEPS_WRITE_FLUSH_INTERVAL = 0.01  # seconds to gather a batch
+    STEPS_WRITE_PUT_TIMEOUT = 1.0  # seconds a request waits on a full queue before 503
+    STEPS_WRITE_RESULT_TIMEOUT = 10.0  # seconds a request waits for its batch commit before 503 (the row may still be written)
+
+    # several worker processes on one SQLite file (app.storage.db): writes take the lock up front
+    # (BEGIN IMMEDIATE), wait up to busy_timeout for it, and are retried with jittered backoff
+    DB_WRITE_RETRIES = 5  # attempts per write when the database stays locked (1 = no retry)
+    DB_WRITE_RETRY_BACKOFF = 0.01  # seconds; first backoff, doubled per attempt
+    DB_WRITE_RETRY_MAX_BACKOFF = 0.5  # seconds; upper bound of one backoff
+    # single-writer mode: workers send step writes to one `flask steps writer` process
+    STEPS_WRITER_ADDRESS = os.environ.get("STEPS_WRITER_ADDRESS") or None  # "host:port" or a socket path (relative -> instance/)
+    # required with STEPS_WRITER_ADDRESS: messages from an authenticated peer are unpickled, so
+    # anyone with the key can run code in the writer. Use a long random secret, not SECRET_KEY
+    STEPS_WRITER_AUTHKEY = os.environ.get("STEPS_WRITER_AUTHKEY") or None
+    STEPS_WRITER_ALLOW_REMOTE = False  # allow a writer on a non-loopback host:port (trusted network only)
+    STEPS_WRITER_TIMEOUT = 10.0  # seconds a request waits for the writer before 503
+
+    # rollups behind /steps/stats (app.storage.rollup); `flask steps rollup` catches up or rebuilds
+    STEPS_ROLLUP_ON_INSERT = True  # add new rows in the same transaction as the insert
+    STEPS_ROLLUP_MAX_PENDING = 1000  # larger backlogs are left to the compactor
+    STEPS_ROLLUP_INTERVAL = 0.0  # seconds between in-process compactions (0 = off)
+
+    # async views for /boundary and /steps (app.web.routes_async; needs `poetry install -E async`)
+    ASYNC_VIEWS = False  # True -> async blueprints, storage calls awaited via app.storage.aio
+    STEPS_ASYNC_THREADS = 8  # threads running SQLite calls for the async views
+    ASGI_THREADS = 32  # threads running the Flask app under asgi.py
+
+    # per-stage/repository/SQL timings and /metrics (app.instrument); off = no hooks, no wrapping
+    INSTRUMENT = False
+    INSTRUMENT_PROFILE_PARAM = "_profile"  # ?_profile=1 samples that one request (None disables)
+    INSTRUMENT_PROFILE_INTERVAL = 0.001  # seconds between stack samples
+
+    # /boundary intervention search (app.core.interventions.search_interventions)
+    BOUNDARY_SEARCH_RADIUS = 1  # 1 = the precomputed ±1 neighbours
+    BOUNDARY_SEARCH_MAX_EVALS = 2000
+    BOUNDARY_SEARCH_TIME_BUDGET = 0.05  # seconds
+
+    # POST /api/simulate (app.web.routes_api); steps are saved only when the request sets "persist": true
+    SIMULATE_API_MAX_CASES = 1000  # observations per request (larger bodies get 413)
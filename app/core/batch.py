@@ -0,0 +1,95 @@
+from __future__ import annotations  # R21-0: 前方参照を安定させる
+
+from dataclasses import dataclass  # R21-2: バッチ出力を構造体として固定する
+from typing import Any, Iterable, Mapping, Tuple, Union  # R21-0: 最小型を明示する
+
+try:  # R21-0: numpy はオフライン分析用の任意依存
+    import numpy as np  # R21-0: 列指向の配列演算に使う
+except ImportError as e:  # pragma: no cover - R21-0: 未インストール時は分かりやすく失敗させる
+    raise ImportError("app.core.batch requires numpy (poetry install -E analysis)") from e
+
+from app.core.contracts import StepOutput  # R21-2: 1件分をStepOutputに戻せるようにする
+from app.core.simulator import POLICY_NOTES, _get_int  # R21-1: 単発版と同じ文言・同じ整数化規則を使う
+
+
+FIELD_ORDER: Tuple[str, ...] = ("threat", "body_alarm", "need_clarity", "energy")  # R21-1: 列の並び（simulate_stepが読むキー）
+POLICY_IDS: Tuple[str, ...] = ("withdraw", "assert", "comply")  # R21-1: 方策コード→方策ID（コード=添字）
+WITHDRAW, ASSERT, COMPLY = 0, 1, 2  # R21-1: 方策コード
+
+_INT64_MIN, _INT64_MAX = -(2**63) + 1, 2**63 - 1  # R21-5: int64 に入らない整数は端に寄せる（下端は1つ内側: threat - 1 が桁あふれしない）
+
+_POLICY_ARRAY = np.array(POLICY_IDS, dtype=object)  # R21-2: コード配列→方策ID配列の変換表
+
+BatchLike = Union["np.ndarray", Mapping[str, Any]]  # R21-1: (N,4)配列 または 列名→配列
+
+
+@dataclass(frozen=True)  # R21-2: バッチ結果は不変にする
+class BatchOutput:  # R21-2: simulate_steps の列指向の出力
+    policy_code: "np.ndarray"  # R21-2: uint8、POLICY_IDS の添字
+    predicted_threat: "np.ndarray"  # R21-2: int64、o_t1_pred["predicted_threat"]
+    predicted_body_alarm: "np.ndarray"  # R21-2: int64、o_t1_pred["predicted_body_alarm"]
+
+    def __len__(self) -> int:  # R21-2: 件数
+        return int(self.policy_code.shape[0])  # R21-2: 行数を返す
+
+    @property
+    def pi_t(self) -> "np.ndarray":  # R21-2: 方策ID（文字列）の配列
+        return _POLICY_ARRAY[self.policy_code]  # R21-2: コードを文字列に引く
+
+    def step_output(self, i: int) -> StepOutput:  # R21-2: i件目を単発版と同じ形に戻す
+        pi_t = POLICY_IDS[int(self.policy_code[i])]  # R21-2: 方策ID
+        return StepOutput(  # R21-2: 契約どおり StepOutput を返す
+            pi_t=pi_t,  # R21-2: 方策ID
+            o_t1_pred={  # R21-2: simulate_step と同じキー順
+                "predicted_policy": pi_t,  # R21-2: 選んだ方策
+                "predicted_threat": int(self.predicted_threat[i]),  # R21-2: 予測脅威
+                "predicted_body_alarm": int(self.predicted_body_alarm[i]),  # R21-2: 予測警報
+            },
+            notes=list(POLICY_NOTES[pi_t]),  # R21-2: 方策ごとの固定文
+        )
+
+
+def columns_from_observations(observations: Iterable[Mapping[str, Any]]) -> "np.ndarray":  # R21-3: o_t辞書の列→(N,4)配列
+    rows = [[_get_int(o, key, 0) for key in FIELD_ORDER] for o in observations]  # R21-3: 単発版と同じ規則で整数化する
+    try:  # R21-5
+        return np.array(rows, dtype=np.int64).reshape(-1, len(FIELD_ORDER))  # R21-3: 0件でも(0,4)にする
+    except OverflowError:  # R21-5: simulate_step は大きな整数も受け付ける。端に寄せても閾値（0〜2）との大小は変わらない
+        rows = [[min(max(v, _INT64_MIN), _INT64_MAX) for v in row] for row in rows]  # R21-5: validators._int_column と同じ
+        return np.array(rows, dtype=np.int64).reshape(-1, len(FIELD_ORDER))  # R21-5
+
+
+def _as_columns(batch: BatchLike) -> Tuple["np.ndarray", ...]:  # R21-1: 入力を4本のint64列に揃える
+    if isinstance(batch, Mapping):  # R21-1: 列名→配列の場合
+        n = next((len(np.asarray(v)) for v in batch.values()), 0)  # R21-1: 行数は最初の列から決める
+        cols = []  # R21-1: FIELD_ORDER順の列
+        for key in FIELD_ORDER:  # R21-1: キーが無い列は simulate_step と同じく0
+            col = np.asarray(batch[key], dtype=np.int64) if key in batch else np.zeros(n, dtype=np.int64)  # R21-1
+            if col.shape != (n,):  # R21-1: 列長が揃っていない
+                raise ValueError(f"column {key!r} has shape {col.shape}, expected ({n},)")  # R21-1: 黙って放送しない
+            cols.append(col)  # R21-1: 列を追加する
+        return tuple(cols)  # R21-1: 4列を返す
+
+    arr = np.asarray(batch, dtype=np.int64)  # R21-1: (N,4)配列の場合
+    if arr.ndim != 2 or arr.shape[1] != len(FIELD_ORDER):  # R21-1: 形が違う
+        raise ValueError(f"batch must have shape (N, {len(FIELD_ORDER)}), got {arr.shape}")  # R21-1: 明示的に失敗させる
+    return tuple(arr[:, j] for j in range(len(FIELD_ORDER)))  # R21-1: 列ビューに分ける（コピーしない）
+
+
+def simulate_steps(batch: BatchLike) -> BatchOutput:  # R21-1: simulate_step のベクトル化版
+    threat, body_alarm, need_clarity, energy = _as_columns(batch)  # R21-1: 列を取り出す
+
+    is_withdraw = (threat >= 2) | (body_alarm >= 2)  # R3-2: 高脅威/高警報なら withdraw
+    is_assert = ~is_withdraw & (need_clarity >= 2) & (energy >= 1)  # R3-2: withdraw でなく、明確＋余力なら assert
+
+    code = np.full(threat.shape, COMPLY, dtype=np.uint8)  # R3-2: それ以外は comply
+    code[is_assert] = ASSERT  # R21-1: assert を書き込む
+    code[is_withdraw] = WITHDRAW  # R21-1: withdraw を書き込む
+
+    pred_threat = np.maximum(threat - is_withdraw, 0)  # R3-3: withdraw なら脅威が1下がる
+    pred_body_alarm = np.maximum(body_alarm - (is_withdraw | is_assert), 0)  # R3-3: withdraw/assert で警報が1下がる
+
+    return BatchOutput(  # R21-2: 列指向の結果を返す
+        policy_code=code,  # R21-2: 方策コード
+        predicted_threat=pred_threat.astype(np.int64, copy=False),  # R21-2: 予測脅威
+        predicted_body_alarm=pred_body_alarm.astype(np.int64, copy=False),  # R21-2: 予測警報
+    )
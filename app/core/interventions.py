@@ -0,0 +1,127 @@
+from __future__ import annotations  # R22-0: 前方参照を安定させる
+
+import time  # R23-3: 時間予算を測る
+from dataclasses import dataclass  # R23-2: 探索結果を構造体にする
+from functools import lru_cache  # R23-1: シミュレーション結果をメモする
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Set, Tuple  # R22-0: 最小型を明示する
+
+from app.core.contracts import StepInput, StepOutput  # R22-1: 契約型で入力を組み立てる
+from app.core.rules import get_compiled, on_invalidate  # R33-4: テンプレ定義から入力を組み立てる（R33-9: 規則の置き換えでメモを捨てる）
+from app.core.simulator import simulate_step  # R22-1: 近傍評価に使う
+from app.templates_def.boundary import BOUNDARY_FIELDS, FieldDef  # R22-1: 範囲情報を使う
+
+
+def boundary_step_input(values: Mapping[str, Any]) -> StepInput:  # R22-1: 検証済みの値から境界テンプレのStepInputを作る
+    return get_compiled("boundary").step_input(values)  # R33-4: s_t={"energy"}, o_t=4項目（BOUNDARY_TEMPLATE の定義どおり）
+
+
+@lru_cache(maxsize=65536)  # R23-1: 入力ベクトル→方策のメモ（全リクエストで共有）
+def _cached_policy(items: Tuple[Tuple[str, int], ...]) -> str:  # R23-1: 既定シミュレータの方策だけを覚える
+    return simulate_step(boundary_step_input(dict(items))).pi_t  # R23-1: 初回だけ1-stepを回す
+
+
+on_invalidate(_cached_policy.cache_clear)  # R33-9: boundary を登録し直したら古い方策を返さない
+
+
+@dataclass(frozen=True)  # R23-2: 探索結果を構造体として返す
+class SearchResult:
+    proposals: List[Dict[str, Any]]  # R23-2: 方策が変わる最小の変更（変更数の少ない順）
+    evals: int  # R23-2: 評価した近傍の数
+    truncated: bool  # R23-2: 予算切れで打ち切ったか
+
+
+def search_interventions(  # R23-1: 半径radius以内で方策が変わる最小変更を幅優先で探す
+    base_cleaned: Mapping[str, Any],  # R23-1: 検証済みの現在値
+    base_pi_t: str,  # R23-1: 現在の方策
+    radius: int = 1,  # R23-1: 変更量の合計（各項目の|差|の和）の上限
+    fields: Optional[Sequence[FieldDef]] = None,  # R23-1: 入力定義（既定は BOUNDARY_FIELDS）
+    simulate: Optional[Callable[[StepInput], StepOutput]] = None,  # R23-1: 評価関数（None なら共有メモ付きの simulate_step）
+    step_input: Optional[Callable[[Mapping[str, Any]], StepInput]] = None,  # R33-4: 入力→StepInput（既定は boundary_step_input）
+    max_evals: Optional[int] = None,  # R23-3: 評価回数の上限
+    time_budget: Optional[float] = None,  # R23-3: 探索時間の上限（秒）
+) -> SearchResult:
+    fields = tuple(BOUNDARY_FIELDS if fields is None else fields)  # R23-1: 定義を固定する
+    base = tuple(int(base_cleaned[f.key]) for f in fields)  # R23-1: 現在値のベクトル
+    deadline = None if time_budget is None else time.perf_counter() + time_budget  # R23-3: 打ち切り時刻
+    memo: Dict[Tuple[int, ...], str] = {}  # R23-1: 差し替えシミュレータ用の探索内メモ
+
+    def policy_of(vec: Tuple[int, ...]) -> str:  # R23-1: ベクトル→方策（メモ付き）
+        if simulate is None:  # R23-1: 既定シミュレータなら
+            return _cached_policy(tuple(zip((f.key for f in fields), vec)))  # R23-1: プロセス共有のメモを使う
+        if vec not in memo:  # R23-1: 未評価なら
+            alt = dict(base_cleaned)  # R23-1: 定義外のキーも残す
+            alt.update(zip((f.key for f in fields), vec))  # R23-1: 変更を反映する
+            memo[vec] = simulate((step_input or boundary_step_input)(alt)).pi_t  # R23-1: 1回だけ評価する
+        return memo[vec]  # R23-1: 方策を返す
+
+    proposals: List[Dict[str, Any]] = []  # R23-2: 見つかった最小変更
+    flipped: Set[Tuple[int, ...]] = set()  # R23-4: 方策が変わった点（ここから先は最小でないので展開しない）
+    seen: Set[Tuple[int, ...]] = {base}  # R23-4: 展開済み/予約済みの点
+    frontier: List[Tuple[int, ...]] = [base]  # R23-1: 距離dの点（幅優先）
+    evals = 0  # R23-3: 評価回数
+
+    for _distance in range(max(int(radius), 0)):  # R23-1: 距離を1ずつ広げる
+        next_frontier: List[Tuple[int, ...]] = []  # R23-1: 距離d+1の点
+        for vec in frontier:  # R23-1: 距離dの各点から
+            for i, f in enumerate(fields):  # R16-2: 各入力を1つずつ動かす
+                d0 = vec[i] - base[i]  # R23-4: この項目の現在のずれ
+                for delta in (-1, 1):  # R16-2: ±1だけ試す
+                    if d0 * delta < 0:  # R23-4: 現在値へ戻る向きは距離が縮むので試さない
+                        continue  # R23-4: 外向きだけ展開する
+                    v1 = vec[i] + delta  # R16-2: 近傍値
+                    if v1 < f.min or v1 > f.max:  # R16-5: 範囲外はスキップ
+                        continue  # R16-5: 無効候補は出さない
+                    alt = vec[:i] + (v1,) + vec[i + 1:]  # R23-1: 1項目だけ変更する
+                    if alt in seen:  # R23-4: 別経路で到達済み
+                        continue  # R23-4: 二重評価しない
+                    seen.add(alt)  # R23-4: 予約する
+                    if _dominates_flipped(alt, base, flipped):  # R23-4: より小さい変更で既に方策が変わる
+                        continue  # R23-4: 最小でないので候補にも展開にも使わない
+                    if (max_evals is not None and evals >= max_evals) or (  # R23-3: 評価回数の予算
+                        deadline is not None and time.perf_counter() > deadline  # R23-3: 時間の予算
+                    ):
+                        return SearchResult(proposals=proposals, evals=evals, truncated=True)  # R23-3: 見つかった分で打ち切る
+                    evals += 1  # R23-3: 評価回数を数える
+                    pi_t = policy_of(alt)  # R16-3: 近傍ケースを評価する
+                    if pi_t != base_pi_t:  # R16-3: 方策が変わったものだけ採用
+                        flipped.add(alt)  # R23-4: ここから先は展開しない
+                        proposals.append(_proposal(fields, base, alt, pi_t))  # R16-4: 表示用の情報をまとめる
+                    else:  # R23-1: 変わらなかった点は
+                        next_frontier.append(alt)  # R23-1: 次の距離で展開する
+        frontier = next_frontier  # R23-1: 次の距離へ
+        if not frontier:  # R23-4: 展開する点が無ければ
+            break  # R23-4: 早期終了
+
+    return SearchResult(proposals=proposals, evals=evals, truncated=False)  # R23-2: 半径内を探索し切った結果を返す
+
+
+def _dominates_flipped(vec: Tuple[int, ...], base: Tuple[int, ...], flipped: Set[Tuple[int, ...]]) -> bool:  # R23-4: 方策が変わった点のどれかを含む変更か
+    for f in flipped:  # R23-4: 1歩内側だけでなく全て見る（展開しなかった点の先も最小でない）
+        if all(  # R23-4: 各項目で f の変更が vec の変更に含まれる
+            fv == b or ((fv - b) * (v - b) > 0 and abs(fv - b) <= abs(v - b))  # R23-4: 動かしていない/同じ向きに同じか少ない量
+            for v, fv, b in zip(vec, f, base)  # R23-4
+        ):
+            return True  # R23-4: vec は最小でない
+    return False  # R23-4: 最小候補
+
+
+def _proposal(fields: Sequence[FieldDef], base: Tuple[int, ...], vec: Tuple[int, ...], pi_t: str) -> Dict[str, Any]:  # R16-4: 表示用の候補
+    changes = [  # R23-2: 変更した項目の一覧
+        {"key": f.key, "label": f.label, "from": b, "to": v}  # R16-4: 変更項目/表示名/変更前/変更後
+        for f, b, v in zip(fields, base, vec)  # R23-2: 全項目から
+        if v != b  # R23-2: 変わった項目だけ
+    ]
+    proposal: Dict[str, Any] = {"changes": changes, "distance": sum(abs(v - b) for b, v in zip(base, vec)), "pi_t": pi_t}  # R23-2: 変更一覧/変更量/新しい方策
+    if len(changes) == 1:  # R23-2: 1項目だけの変更は
+        proposal.update(changes[0])  # R16-4: 従来どおり key/label/from/to も平たく持つ
+    return proposal  # R23-2: 候補を返す
+
+
+def propose_interventions(  # R16-1: 介入候補を作る（routes_boundary から移設: R22-1）
+    base_cleaned: Mapping[str, Any],  # R16-1: 検証済みの現在値
+    base_pi_t: str,  # R16-1: 現在の方策
+    fields: Optional[Sequence[FieldDef]] = None,  # R22-1: 入力定義（既定は BOUNDARY_FIELDS）
+    simulate: Optional[Callable[[StepInput], StepOutput]] = None,  # R22-1: 評価関数（既定は simulate_step）
+    step_input: Optional[Callable[[Mapping[str, Any]], StepInput]] = None,  # R33-4: 入力→StepInput（既定は boundary_step_input）
+) -> List[Dict[str, Any]]:
+    return search_interventions(base_cleaned, base_pi_t, radius=1, fields=fields, simulate=simulate, step_input=step_input).proposals  # R23-1: ±1近傍＝半径1の探索
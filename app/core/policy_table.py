@@ -0,0 +1,123 @@
+from __future__ import annotations  # R22-0: 前方参照を安定させる
+
+import threading  # R22-4: 再構築を直列化する
+from dataclasses import dataclass  # R22-2: 表の要素を構造体として固定する
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple  # R22-0: 最小型を明示する
+
+from app.core.contracts import StepInput, StepOutput  # R22-2: 表に入れる入出力
+from app.core.interventions import propose_interventions  # R22-2: 近傍候補
+from app.core.rules import CompiledTemplate, get_compiled, on_invalidate  # R33-5: テンプレ毎のコンパイル済み規則（R33-9: 置き換えで表を捨てる）
+from app.templates_def.boundary import FieldDef  # R22-2: 入力空間の定義
+
+MAX_TABLE_SIZE = 1 << 16  # R22-3: これを超える入力空間は表にしない（都度計算に戻す）
+
+
+@dataclass(frozen=True)  # R22-2: 表の1要素（共有されるので書き換えない）
+class PolicyEntry:
+    x: StepInput  # R22-2: 入力（s_t/o_t は保存・表示にそのまま使う）
+    output: StepOutput  # R22-2: simulate_step の結果
+    proposals: Tuple[Dict[str, Any], ...]  # R22-2: propose_interventions の結果
+
+    def copy(self) -> "PolicyEntry":  # R22-5: 呼び出し側が書き換えてよい写し（表の中身は全リクエストで共有）
+        x, y = self.x, self.output  # R22-5
+        return PolicyEntry(  # R22-5: 辞書/リストだけ写す（prefs/precision はテンプレ定義のもの）
+            x=StepInput(s_t=dict(x.s_t), o_t=dict(x.o_t), prefs=x.prefs, precision=x.precision),  # R22-5
+            output=StepOutput(pi_t=y.pi_t, o_t1_pred=dict(y.o_t1_pred), notes=list(y.notes)),  # R22-5
+            proposals=tuple({**p, "changes": [dict(c) for c in p["changes"]]} for p in self.proposals),  # R22-5: changes の中まで
+        )
+
+
+@dataclass(frozen=True)  # R22-2: コンパイル済みの表
+class PolicyTable:
+    fields: Tuple[FieldDef, ...]  # R22-2: 表を作ったときの入力定義
+    strides: Tuple[int, ...]  # R22-2: 混合基数の桁重み
+    entries: Tuple[PolicyEntry, ...]  # R22-2: 添字→要素
+
+    def index_of(self, values: Mapping[str, Any]) -> int:  # R22-3: 入力ベクトル→添字
+        idx = 0  # R22-3: 添字を積み上げる
+        for f, stride in zip(self.fields, self.strides):  # R22-3: 各項目の桁
+            idx += (int(values[f.key]) - f.min) * stride  # R22-3: 最小値からのずれ×桁重み
+        return idx  # R22-3: 添字を返す
+
+    def lookup(self, values: Mapping[str, Any]) -> PolicyEntry:  # R22-3: 検証済みの値で1回引く
+        return self.entries[self.index_of(values)]  # R22-3: 添字アクセスのみ
+
+
+def compile_policy_table(fields: Sequence[FieldDef], template_id: str = "boundary") -> PolicyTable:  # R22-2: 全入力を列挙して表を作る
+    fields = tuple(fields)  # R22-2: 定義を固定する
+    compiled = get_compiled(template_id)  # R33-5: テンプレの規則（コンパイル済み）
+    radices = [f.max - f.min + 1 for f in fields]  # R22-2: 各項目の取り得る値の数（検証と同じく min..max の整数）
+    size = 1  # R22-3: 入力空間の大きさ
+    for r in radices:  # R22-3: 積を取る
+        size *= r  # R22-3: 掛ける
+    if size > MAX_TABLE_SIZE:  # R22-3: 大きすぎる場合
+        raise ValueError(f"input space too large for a policy table: {size} > {MAX_TABLE_SIZE}")  # R22-3: 作らない
+
+    strides: List[int] = []  # R22-3: 桁重み（最後の項目が1）
+    acc = 1  # R22-3: 累積
+    for r in reversed(radices):  # R22-3: 下位桁から
+        strides.append(acc)  # R22-3: 現在の桁重み
+        acc *= r  # R22-3: 次の桁へ
+    strides.reverse()  # R22-3: 項目順に戻す
+
+    entries: List[PolicyEntry] = []  # R22-2: 添字順に並べる
+    for idx in range(size):  # R22-2: 全入力を列挙する
+        values = {f.key: f.min + (idx // s) % r for f, s, r in zip(fields, strides, radices)}  # R22-2: 添字→入力ベクトル
+        x = compiled.step_input(values)  # R22-2: 通常経路と同じ入力を作る
+        y = compiled.simulate(x)  # R22-2: 1回だけ回す
+        proposals = _proposals(compiled, values, y.pi_t, fields)  # R22-2: 近傍候補も前計算する
+        entries.append(PolicyEntry(x=x, output=y, proposals=tuple(proposals)))  # R22-2: 要素を追加する
+
+    return PolicyTable(fields=fields, strides=tuple(strides), entries=tuple(entries))  # R22-2: 表を返す
+
+
+def _proposals(compiled: CompiledTemplate, values: Mapping[str, Any], pi_t: str, fields: Sequence[FieldDef]) -> List[Dict[str, Any]]:  # R33-5: ±1近傍の候補
+    if compiled.template.id == "boundary":  # R23-1: 境界テンプレはプロセス共有のメモを使う
+        return propose_interventions(values, pi_t, fields=fields)  # R22-2
+    return propose_interventions(values, pi_t, fields=fields, simulate=compiled.simulate, step_input=compiled.step_input)  # R33-5
+
+
+_tables: Dict[str, Tuple[CompiledTemplate, Optional[PolicyTable]]] = {}  # R22-4: テンプレID→(表を作ったときのコンパイル結果, 表)（R33-9: 規則の置き換えも検知する）
+_lock = threading.Lock()  # R22-4: 同時再構築を防ぐ
+
+
+def get_policy_table(template_id: str = "boundary") -> Optional[PolicyTable]:  # R22-4: 現在の定義に対応する表を返す
+    compiled = get_compiled(template_id)  # R33-9: 現在の定義のコンパイル結果（定義が置き換わると別物になる。未登録なら KeyError）
+    cached = _tables.get(template_id)  # R33-5
+    if cached is not None and cached[0] is compiled:  # R33-9: 入力定義も規則も変わっていなければ
+        return cached[1]  # R22-4: そのまま使う
+    with _lock:  # R22-4: 再構築は1スレッドだけ
+        cached = _tables.get(template_id)  # R22-4: ロック取得後に再確認する
+        if cached is None or cached[0] is not compiled:  # R33-9
+            try:  # R22-3: 大きすぎる定義では表を作らない
+                table: Optional[PolicyTable] = compile_policy_table(compiled.fields, template_id)  # R22-4: 定義から作り直す
+            except ValueError:  # R22-3: 表にできない場合
+                table = None  # R22-3: 呼び出し側は都度計算に戻る
+            cached = _tables[template_id] = (compiled, table)  # R33-9: 作ったときのコンパイル結果を記録する
+    return cached[1]  # R22-4: 表を返す
+
+
+def invalidate_policy_table() -> None:  # R22-4: 次回 get_policy_table で作り直させる
+    with _lock:  # R22-4: 再構築と競合させない
+        _tables.clear()  # R22-4: 未構築に戻す（R33-5: 全テンプレ）
+
+
+on_invalidate(invalidate_policy_table)  # R33-9: register_template/invalidate_compiled で表も捨てる
+
+
+def lookup_policy(values: Mapping[str, Any], template_id: str = "boundary") -> PolicyEntry:  # R22-3: リクエスト経路の入口
+    table = get_policy_table(template_id)  # R22-3: 表を取得する（通常は構築済み）
+    if table is not None:  # R22-3: 表がある場合
+        return table.lookup(values).copy()  # R22-3: 1回の添字アクセス（R22-5: 書き換えても表は壊れない）
+    compiled = get_compiled(template_id)  # R33-5: 表が無い場合はコンパイル済みの規則で計算する
+    x = compiled.step_input(values)  # R22-3
+    y = compiled.simulate(x)  # R22-3: 1-step回す
+    return PolicyEntry(x=x, output=y, proposals=tuple(_proposals(compiled, values, y.pi_t, compiled.fields)))  # R22-3: 同じ形で返す
+
+
+def lookup_policies(rows: Sequence[Mapping[str, Any]], template_id: str = "boundary") -> List[PolicyEntry]:  # R40-1: 検証済みの複数件（表の取得は1回だけ）
+    table = get_policy_table(template_id)  # R22-4
+    if table is None:  # R22-3: 表が無ければ1件ずつ計算する
+        return [lookup_policy(values, template_id) for values in rows]  # R22-3
+    entries, index_of = table.entries, table.index_of  # R40-1: ループ内の属性参照を減らす
+    return [entries[index_of(values)].copy() for values in rows]  # R22-3: 1件につき添字アクセス1回（R22-5: 写しを返す）
@@ -0,0 +1,221 @@
+from __future__ import annotations  # R34-0: 前方参照を安定させる
+
+import itertools  # R34-2: 入力範囲の全組み合わせ
+import random  # R34-4: 方策列のサンプリング
+from concurrent.futures import ProcessPoolExecutor  # R34-5: 開始状態ごとに複数プロセスへ分ける
+from dataclasses import dataclass, field  # R34-3: 結果を構造体で返す
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple  # R34-0: 最小型を明示する
+
+from app.core.rules import CompiledTemplate, get_compiled  # R34-1: コンパイル済みの規則と予測
+
+ROLLOUT_MODES: Tuple[str, ...] = ("greedy", "enumerate", "sample")  # R34-3: 規則どおり / 全方策列 / 無作為な方策列
+
+State = Tuple[int, ...]  # R34-2: 入力定義順の値（メモのキー）
+
+
+class _Model:  # R34-2: 1テンプレ分の遷移を状態タプルで引く（訪れた状態をメモする）
+    def __init__(self, compiled: CompiledTemplate) -> None:
+        self.compiled = compiled  # R34-2
+        self.keys = tuple(f.key for f in compiled.fields)  # R34-2: 状態タプルの並び
+        self.policies = compiled.template.policies  # R34-2: 取り得る方策（規則順＋既定）
+        self._decide: Dict[State, str] = {}  # R34-2: 状態→規則が選ぶ方策
+        self._next: Dict[Tuple[State, str], State] = {}  # R34-2: (状態, 取った方策)→次の状態
+
+    def state(self, values: Mapping[str, Any]) -> State:  # R34-2
+        return tuple(int(values[k]) for k in self.keys)  # R34-2
+
+    def values(self, s: State) -> Dict[str, int]:  # R34-2
+        return dict(zip(self.keys, s))  # R34-2
+
+    def decide(self, s: State) -> str:  # R34-2
+        pi = self._decide.get(s)  # R34-2
+        if pi is None:  # R34-2: 初めての状態だけ規則を評価する
+            pi = self._decide[s] = self.compiled.decide(self.values(s))  # R34-2
+        return pi  # R34-2
+
+    def step(self, s: State, pi: str) -> State:  # R34-2: o_t1_pred を次の o_t に戻す
+        key = (s, pi)  # R34-2
+        nxt = self._next.get(key)  # R34-2
+        if nxt is None:  # R34-2
+            nxt = self._next[key] = self.state(self.compiled.next_observation(self.values(s), pi))  # R34-1
+        return nxt  # R34-2
+
+
+@dataclass
+class RolloutStats:  # R34-3: 1つの開始状態から horizon 手先までの集計
+    start: Dict[str, int]  # R34-3: 開始時の o_t
+    horizon: int  # R34-3
+    mode: str  # R34-3
+    sequences: int = 0  # R34-3: 数えた方策列の数（enumerate は |方策|^horizon）
+    final_policy: Dict[str, int] = field(default_factory=dict)  # R34-3: 最終状態で規則が選ぶ方策の内訳
+    final_mean: Dict[str, float] = field(default_factory=dict)  # R34-3: 最終状態の各入力の平均
+    trajectory: List[Dict[str, Any]] = field(default_factory=list)  # R34-3: greedy のときの経路（o_t, pi_t, o_t1_pred）
+
+    def to_dict(self) -> Dict[str, Any]:  # R34-3: JSON化用
+        return {
+            "start": self.start,
+            "horizon": self.horizon,
+            "mode": self.mode,
+            "sequences": self.sequences,
+            "final_policy": self.final_policy,
+            "final_mean": self.final_mean,
+            "trajectory": self.trajectory,
+        }
+
+
+@dataclass
+class TreeNode:  # R34-3: 軌道木の1節点（同じ (状態, 残り手数) の部分木は共有する）
+    o_t: Dict[str, int]  # R34-3
+    pi_t: str  # R34-3: この状態で規則が選ぶ方策
+    children: Dict[str, "TreeNode"] = field(default_factory=dict)  # R34-3: 取った方策→次の節点
+
+    def to_dict(self) -> Dict[str, Any]:  # R34-3: 展開する（共有部分木も複製されるので大きな horizon では使わない）
+        return {"o_t": self.o_t, "pi_t": self.pi_t, "children": {p: c.to_dict() for p, c in self.children.items()}}
+
+
+def state_space(template_id: str = "boundary") -> List[Dict[str, int]]:  # R34-2: 入力定義の min..max の全組み合わせ（boundary は 4^4=256）
+    fields = get_compiled(template_id).fields  # R34-2
+    ranges = [range(f.min, f.max + 1, f.step or 1) for f in fields]  # R34-2
+    return [{f.key: v for f, v in zip(fields, combo)} for combo in itertools.product(*ranges)]  # R34-2
+
+
+def _greedy(model: _Model, values: Mapping[str, Any], horizon: int) -> RolloutStats:  # R34-3: 規則が選んだ方策の予測を次の StepInput にする
+    c = model.compiled  # R34-3
+    stats = RolloutStats(start=dict(values), horizon=horizon, mode="greedy", sequences=1)  # R34-3
+    o_t: Dict[str, Any] = dict(values)  # R34-3
+    for _ in range(horizon):  # R34-3
+        y = c.simulate(c.step_input(o_t))  # R34-3: 1-step と同じ契約で回す
+        stats.trajectory.append({"o_t": dict(o_t), "pi_t": y.pi_t, "o_t1_pred": dict(y.o_t1_pred)})  # R34-3
+        o_t = c.next_observation(o_t, y.pi_t)  # R34-1
+    final = model.state(o_t)  # R34-3
+    stats.final_policy = {model.decide(final): 1}  # R34-3
+    stats.final_mean = {k: float(v) for k, v in zip(model.keys, final)}  # R34-3
+    return stats  # R34-3
+
+
+def _enumerate(model: _Model, values: Mapping[str, Any], horizon: int, memo: Dict[Tuple[State, int], Tuple[Tuple[int, ...], Tuple[int, ...]]]) -> RolloutStats:  # R34-3: 全方策列を (状態, 残り手数) のメモで数える
+    policies = model.policies  # R34-3
+
+    def agg(s: State, r: int) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:  # R34-3: (最終方策の件数, 最終値の合計)
+        hit = memo.get((s, r))  # R34-3
+        if hit is not None:  # R34-3: 同じ部分木は一度だけ数える
+            return hit  # R34-3
+        if r == 0:  # R34-3: 葉
+            pi = model.decide(s)  # R34-3
+            out = (tuple(1 if p == pi else 0 for p in policies), s)  # R34-3
+        else:  # R34-3: 各方策の部分木を足し合わせる
+            counts = [0] * len(policies)  # R34-3
+            sums = [0] * len(s)  # R34-3
+            for pi in policies:  # R34-3
+                cs, ss = agg(model.step(s, pi), r - 1)  # R34-3
+                counts = [a + b for a, b in zip(counts, cs)]  # R34-3
+                sums = [a + b for a, b in zip(sums, ss)]  # R34-3
+            out = (tuple(counts), tuple(sums))  # R34-3
+        memo[(s, r)] = out  # R34-3
+        return out  # R34-3
+
+    counts, sums = agg(model.state(values), horizon)  # R34-3
+    total = len(policies) ** horizon  # R34-3
+    return RolloutStats(  # R34-3
+        start=dict(values), horizon=horizon, mode="enumerate", sequences=total,
+        final_policy={p: n for p, n in zip(policies, counts) if n},  # R34-3
+        final_mean={k: v / total for k, v in zip(model.keys, sums)},  # R34-3
+    )
+
+
+def _sample(model: _Model, values: Mapping[str, Any], horizon: int, samples: int, seed: int) -> RolloutStats:  # R34-4: 方策を一様に選んだ列を samples 本回す
+    start = model.state(values)  # R34-4
+    rng = random.Random(f"{seed}:{start}")  # R34-4: 開始状態ごとに固定（ワーカー数によらず同じ結果）
+    policies = model.policies  # R34-4
+    final_policy: Dict[str, int] = {}  # R34-4
+    sums = [0] * len(start)  # R34-4
+    for _ in range(samples):  # R34-4
+        s = start  # R34-4
+        for pi in rng.choices(policies, k=horizon):  # R34-4: 1本分をまとめて引く
+            s = model.step(s, pi)  # R34-2: 遷移はメモ済み
+        pi = model.decide(s)  # R34-4
+        final_policy[pi] = final_policy.get(pi, 0) + 1  # R34-4
+        sums = [a + b for a, b in zip(sums, s)]  # R34-4
+    return RolloutStats(  # R34-4
+        start=dict(values), horizon=horizon, mode="sample", sequences=samples,
+        final_policy=final_policy,  # R34-4
+        final_mean={k: v / samples for k, v in zip(model.keys, sums)} if samples else {},  # R34-4
+    )
+
+
+def _rollout_chunk(  # R34-5: ワーカープロセスで開始状態のまとまりを回す（pickle可能なトップレベル関数）
+    template_id: str,
+    starts: Sequence[Mapping[str, Any]],
+    horizon: int,
+    mode: str,
+    samples: int,
+    seed: int,
+) -> List[RolloutStats]:
+    model = _Model(get_compiled(template_id))  # R34-2: メモはチャンク内の開始状態で共有する
+    memo: Dict[Tuple[State, int], Any] = {}  # R34-3: enumerate の部分木メモ
+    if mode == "greedy":  # R34-3
+        return [_greedy(model, v, horizon) for v in starts]  # R34-3
+    if mode == "enumerate":  # R34-3
+        return [_enumerate(model, v, horizon, memo) for v in starts]  # R34-3
+    return [_sample(model, v, horizon, samples, seed) for v in starts]  # R34-4
+
+
+def rollout(  # R34-3: 1つの開始状態から horizon 手先まで回す
+    values: Mapping[str, Any],
+    horizon: int,
+    mode: str = "enumerate",  # R34-3: ROLLOUT_MODES のどれか
+    template_id: str = "boundary",  # R34-3
+    samples: int = 1000,  # R34-4: mode="sample" の本数
+    seed: int = 0,  # R34-4
+) -> RolloutStats:
+    return rollout_many([values], horizon, mode, template_id, samples, seed)[0]  # R34-3
+
+
+def rollout_many(  # R34-5: 複数の開始状態（既定は状態空間全体）をまとめて回す
+    starts: Optional[Sequence[Mapping[str, Any]]],
+    horizon: int,
+    mode: str = "enumerate",  # R34-3
+    template_id: str = "boundary",  # R34-3
+    samples: int = 1000,  # R34-4
+    seed: int = 0,  # R34-4
+    workers: int = 0,  # R34-5: 0/1 ならこのプロセスで、2以上なら ProcessPoolExecutor
+) -> List[RolloutStats]:
+    if mode not in ROLLOUT_MODES:  # R34-3
+        raise ValueError(f"unknown rollout mode: {mode!r}")  # R34-3
+    if horizon < 0:  # R34-3
+        raise ValueError("horizon must be >= 0")  # R34-3
+    starts = list(state_space(template_id) if starts is None else starts)  # R34-2
+    if workers <= 1 or len(starts) <= 1:  # R34-5: 単一プロセス
+        return _rollout_chunk(template_id, starts, horizon, mode, samples, seed)  # R34-5
+    size = -(-len(starts) // (workers * 4))  # R34-5: ワーカーあたり4チャンク程度（偏りを均す）
+    chunks = [starts[i:i + size] for i in range(0, len(starts), size)]  # R34-5
+    with ProcessPoolExecutor(max_workers=workers) as pool:  # R34-5: 開始状態ごとに独立なので順に集めるだけ
+        futures = [pool.submit(_rollout_chunk, template_id, c, horizon, mode, samples, seed) for c in chunks]  # R34-5
+        return [s for f in futures for s in f.result()]  # R34-5: 入力順を保つ
+
+
+def rollout_tree(values: Mapping[str, Any], horizon: int, template_id: str = "boundary") -> TreeNode:  # R34-3: 全方策列の軌道木（節点数は高々 状態数×(horizon+1)）
+    model = _Model(get_compiled(template_id))  # R34-2
+    nodes: Dict[Tuple[State, int], TreeNode] = {}  # R34-3: (状態, 残り手数)→節点
+
+    def build(s: State, r: int) -> TreeNode:  # R34-3
+        node = nodes.get((s, r))  # R34-3
+        if node is None:  # R34-3
+            node = nodes[(s, r)] = TreeNode(o_t=model.values(s), pi_t=model.decide(s))  # R34-3
+            if r > 0:  # R34-3
+                node.children = {pi: build(model.step(s, pi), r - 1) for pi in model.policies}  # R34-3
+        return node  # R34-3
+
+    return build(model.state(values), horizon)  # R34-3
+
+
+def summarize(stats: Sequence[RolloutStats]) -> Dict[str, Any]:  # R34-3: 開始状態をまたいだ集計
+    final_policy: Dict[str, int] = {}  # R34-3
+    for s in stats:  # R34-3
+        for p, n in s.final_policy.items():  # R34-3
+            final_policy[p] = final_policy.get(p, 0) + n  # R34-3
+    return {  # R34-3
+        "starts": len(stats),  # R34-3
+        "sequences": sum(s.sequences for s in stats),  # R34-3
+        "final_policy": final_policy,  # R34-3
+    }
@@ -0,0 +1,126 @@
+from __future__ import annotations  # R33-0: 前方参照を安定させる
+
+import threading  # R33-3: 同時コンパイルを防ぐ
+from dataclasses import dataclass  # R33-3: コンパイル結果を構造体にする
+from typing import Any, Callable, Dict, List, Mapping, Tuple  # R33-0: 最小型を明示する
+
+from app.core.contracts import StepInput, StepOutput  # R33-3: 契約どおりの入出力
+from app.templates_def.registry import get_template, on_register  # R33-3: テンプレ定義（R33-9: 置き換えの通知）
+from app.templates_def.spec import FieldDef, TemplateDef  # R33-3
+
+
+def _get_int(o: Mapping[str, Any], key: str, default: int = 0) -> int:  # R3-3: 観測から整数を安全に取り出す（R33-3: simulator から移設）
+    v = o.get(key, default)  # R3-3: キーが無い場合は default を使う
+    try:  # R3-3: 入力が文字列でも整数化できるなら整数化する
+        return int(v)  # R3-3: 整数化して返す
+    except (TypeError, ValueError):  # R3-3: 整数化できない場合
+        return default  # R3-3: default を返す
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:  # R33-3: 規則を一度だけPython関数にしたもの（呼び出し毎に規則を解釈しない）
+    template: TemplateDef  # R33-3: 元の定義
+    fields: Tuple[FieldDef, ...]  # R33-3: コンパイルしたときの入力定義（変更検知用）
+    decide: Callable[[Mapping[str, Any]], str]  # R33-3: o_t → 方策ID
+    simulate: Callable[[StepInput], StepOutput]  # R33-3: simulate_step と同じ契約
+    predict: Callable[[Mapping[str, Any], str], Dict[str, Any]]  # R34-1: (o_t, 取った方策) → o_t1_pred
+    source: str  # R33-3: 生成したコード（デバッグ用）
+
+    def step_input(self, values: Mapping[str, Any]) -> StepInput:  # R33-3: 検証済みの値から StepInput を作る
+        t = self.template  # R33-3
+        return StepInput(  # R8-4: 契約どおりにStepInputを作る
+            s_t={k: values[k] for k in t.state_keys},  # R5-7: 隠れ状態
+            o_t={f.key: values[f.key] for f in self.fields},  # R5-7: 観測（定義順）
+            prefs=t.prefs,  # R8-4
+            precision=t.precision,  # R8-4
+        )
+
+    def next_observation(self, o_t: Mapping[str, Any], pi_t: str) -> Dict[str, Any]:  # R34-1: 予測を次の o_t に戻す（予測の無い項目はそのまま）
+        pred = self.predict(o_t, pi_t)  # R34-1
+        nxt = dict(o_t)  # R34-1
+        for p in self.template.predictions:  # R34-1: predicted_threat → threat など
+            if p.source is not None:  # R34-1
+                nxt[p.source] = pred[p.key]  # R34-1
+        return nxt  # R34-1
+
+
+def _generate(t: TemplateDef) -> str:  # R33-3: 規則→Pythonソース（キー/比較/値は登録時に検査済み）
+    used: List[str] = []  # R33-3: 規則と予測で読む入力（初出順）
+    for rule in t.rules:  # R33-3
+        for group in rule.any_of:  # R33-3
+            used.extend(key for key, _, _ in group)  # R33-3
+    used.extend(p.source for p in t.predictions if p.source)  # R33-3
+    var = {key: f"v{i}" for i, key in enumerate(dict.fromkeys(used))}  # R33-3: 入力キー→ローカル変数
+    reads = [f"    {v} = _int(o, {key!r}, 0)" for key, v in var.items()]  # R3-3: 無い/壊れた値は0（simulate_step と同じ）
+    conds = [  # R33-3: (条件式, 方策ID) を規則順に
+        (
+            " or ".join(  # R33-3: 組どうしは OR
+                "(" + " and ".join(f"{var[key]} {op} {value!r}" for key, op, value in group) + ")"  # R33-3: 組の中は AND
+                for group in rule.any_of
+            ) or "False",  # R33-3: 条件の無い規則は当たらない
+            rule.policy,  # R33-3
+        )
+        for rule in t.rules
+    ]
+    decide = reads + [f"    if {c}:\n        return {p!r}" for c, p in conds] + [f"    return {t.default_policy!r}"]  # R33-3: 最初に当たった規則
+    simulate = ["    o = x.o_t"] + reads + [  # R33-3: simulate は o_t から1回だけ読み、同じ判定で方策を決める
+        f"    {'if' if i == 0 else 'elif'} {c}:\n        pi = {p!r}" for i, (c, p) in enumerate(conds)
+    ] + ([f"    else:\n        pi = {t.default_policy!r}"] if conds else [f"    pi = {t.default_policy!r}"])  # R33-3
+    preds = ", ".join(  # R33-3: o_t1_pred（定義順）
+        f"{p.key!r}: pi" if p.source is None  # R3-3: 方策そのもの
+        else f"{p.key!r}: max({var[p.source]} - (1 if pi in {tuple(p.lowered_by)!r} else 0), 0)"  # R3-3: 指定の方策なら1下げる
+        for p in t.predictions
+    )
+    simulate.append(f"    return StepOutput(pi_t=pi, o_t1_pred={{{preds}}}, notes=list(NOTES[pi]))")  # R3-1: 契約どおり StepOutput を返す
+    sources = [f"    {var[k]} = _int(o, {k!r}, 0)" for k in dict.fromkeys(p.source for p in t.predictions if p.source)]  # R34-1: 予測に要る入力だけ
+    predict = sources + [f"    return {{{preds}}}"]  # R34-1: 任意の方策 pi を取ったときの o_t1_pred（ロールアウト用）
+    return (  # R33-3
+        "def decide(o):\n" + "\n".join(decide) + "\n\n\n"
+        "def simulate(x):\n" + "\n".join(simulate) + "\n\n\n"
+        "def predict(o, pi):\n" + "\n".join(predict) + "\n"  # R34-1
+    )
+
+
+def compile_template(t: TemplateDef) -> CompiledTemplate:  # R33-3: 定義を関数にする
+    source = _generate(t)  # R33-3
+    namespace: Dict[str, Any] = {"_int": _get_int, "StepOutput": StepOutput, "NOTES": {k: tuple(v) for k, v in t.notes.items()}}  # R33-3
+    exec(compile(source, f"<template {t.id}>", "exec"), namespace)  # R33-3: 信頼できる定義（コード内の登録）だけを扱う
+    return CompiledTemplate(  # R33-3
+        template=t,  # R33-3
+        fields=tuple(t.fields),  # R33-3
+        decide=namespace["decide"],  # R33-3
+        simulate=namespace["simulate"],  # R33-3
+        predict=namespace["predict"],  # R34-1
+        source=source,  # R33-3
+    )
+
+
+_compiled: Dict[str, CompiledTemplate] = {}  # R33-3: テンプレID→コンパイル結果
+_lock = threading.Lock()  # R33-3
+_invalidators: List[Callable[[], None]] = []  # R33-9: invalidate_compiled と一緒に捨てるキャッシュ（方策表、方策メモ）
+
+
+def get_compiled(template_id: str) -> CompiledTemplate:  # R33-3: 現在の定義に対応するコンパイル結果（無ければ KeyError）
+    t = get_template(template_id)  # R33-3
+    c = _compiled.get(template_id)  # R33-3
+    if c is not None and c.template is t and c.fields == tuple(t.fields):  # R22-4: 定義が変わっていなければそのまま使う
+        return c  # R33-3
+    with _lock:  # R33-3: 再コンパイルは1スレッドだけ
+        c = _compiled.get(template_id)  # R33-3: ロック取得後に再確認する
+        if c is None or c.template is not t or c.fields != tuple(t.fields):  # R33-3
+            c = _compiled[template_id] = compile_template(t)  # R33-3
+    return c  # R33-3
+
+
+def invalidate_compiled() -> None:  # R33-3: 次回 get_compiled で作り直させる
+    with _lock:  # R33-3
+        _compiled.clear()  # R33-3
+    for invalidate in list(_invalidators):  # R33-9: 規則から作ったキャッシュも捨てる
+        invalidate()  # R33-9
+
+
+def on_invalidate(invalidate: Callable[[], None]) -> None:  # R33-9: invalidate_compiled で呼ぶ関数を加える
+    _invalidators.append(invalidate)  # R33-9
+
+
+on_register(lambda t: invalidate_compiled())  # R33-9: テンプレを置き換えたら作り直させる
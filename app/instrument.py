@@ -0,0 +1,371 @@
+from __future__ import annotations  # R35-0: 前方参照を安定させる
+
+# R35-0: リクエスト処理の段階/リポジトリ呼び出し/SQL の計測（INSTRUMENT=True のときだけ）。
+# R35-0: 無効時は stage() が共有の nullcontext を返し、repo_call はフラグを1回見るだけ、接続も包まない。
+# R35-0: 集計はプロセス毎（複数ワーカーなら各ワーカーの /metrics を集める）。
+
+import sys  # R35-5: 他スレッドのフレームを覗く
+import threading  # R35-1: 集計のロック / R35-5: サンプリングスレッド
+import time  # R35-1: 経過時間を測る
+from collections import Counter, deque  # R35-5: スタック毎の件数 / 直近のプロファイル
+from contextlib import contextmanager, nullcontext  # R35-2: 段階の計測
+from contextvars import ContextVar  # R35-3: SQL がどのリポジトリ呼び出しから来たか
+from functools import wraps  # R35-3
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar  # R35-0: 最小型を明示する
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)  # R35-1: 秒
+ROW_BUCKETS: Tuple[float, ...] = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)  # R35-3: 返した行数
+SQL_LABEL_MAX = 200  # R35-3: SQL ラベルの長さ上限（動的な WHERE の組み合わせは有限）
+
+_enabled = False  # R35-0: init_app が INSTRUMENT から設定する
+_NOOP = nullcontext()  # R35-2: 無効時に返す共有の文脈
+_call: ContextVar[str] = ContextVar("uraha_repo_call", default="-")  # R35-3: 実行中のリポジトリ呼び出し名
+_profiling: ContextVar[Optional["SamplingProfiler"]] = ContextVar("uraha_profiler", default=None)  # R35-7: このリクエストのプロファイラ（aio.run_in_context も引き継ぐ）
+
+F = TypeVar("F", bound=Callable[..., Any])  # R35-3
+
+
+class Histogram:  # R35-1: Prometheus 形式の累積バケツ（ラベル1組分）
+    __slots__ = ("buckets", "counts", "total", "count", "_lock")  # R35-1
+
+    def __init__(self, buckets: Sequence[float]) -> None:  # R35-1
+        self.buckets = tuple(buckets)  # R35-1: 上限（昇順、+Inf は暗黙）
+        self.counts = [0] * (len(self.buckets) + 1)  # R35-1: 最後は +Inf
+        self.total = 0.0  # R35-1: _sum
+        self.count = 0  # R35-1: _count
+        self._lock = threading.Lock()  # R35-1
+
+    def observe(self, value: float) -> None:  # R35-1
+        i = 0  # R35-1
+        for i, upper in enumerate(self.buckets):  # R35-1: バケツは十数個なので線形で十分
+            if value <= upper:  # R35-1
+                break  # R35-1
+        else:  # R35-1
+            i = len(self.buckets)  # R35-1: +Inf
+        with self._lock:  # R35-1
+            self.counts[i] += 1  # R35-1
+            self.total += value  # R35-1
+            self.count += 1  # R35-1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:  # R35-4: (累積件数, 合計, 件数)
+        with self._lock:  # R35-4
+            counts, total, count = list(self.counts), self.total, self.count  # R35-4
+        cumulative, acc = [], 0  # R35-4
+        for c in counts:  # R35-4
+            acc += c  # R35-4
+            cumulative.append(acc)  # R35-4
+        return cumulative, total, count  # R35-4
+
+
+Labels = Tuple[Tuple[str, str], ...]  # R35-1: (名前, 値) の組
+
+_METRICS: Dict[str, Tuple[str, Tuple[float, ...]]] = {  # R35-1: メトリクス名→(説明, バケツ)
+    "uraha_request_seconds": ("Request latency by endpoint.", LATENCY_BUCKETS),  # R35-2
+    "uraha_stage_seconds": ("Time per request stage (validate, simulate, save, propose, render).", LATENCY_BUCKETS),  # R35-2
+    "uraha_repo_call_seconds": ("Time per steps repository call.", LATENCY_BUCKETS),  # R35-3
+    "uraha_repo_call_rows": ("Rows returned per steps repository call.", ROW_BUCKETS),  # R35-3
+    "uraha_sql_seconds": ("Time per SQL statement, by repository call.", LATENCY_BUCKETS),  # R35-3
+}
+_series: Dict[Tuple[str, Labels], Histogram] = {}  # R35-1: (名前, ラベル)→ヒストグラム
+_series_lock = threading.Lock()  # R35-1
+
+
+def observe(name: str, value: float, **labels: str) -> None:  # R35-1: 1件記録する
+    key = (name, tuple(sorted(labels.items())))  # R35-1
+    h = _series.get(key)  # R35-1
+    if h is None:  # R35-1: 初めてのラベル
+        with _series_lock:  # R35-1
+            h = _series.get(key)  # R35-1
+            if h is None:  # R35-1
+                h = _series[key] = Histogram(_METRICS[name][1])  # R35-1
+    h.observe(value)  # R35-1
+
+
+def enabled() -> bool:  # R35-0
+    return _enabled  # R35-0
+
+
+def reset() -> None:  # R35-1: 集計を捨てる（ベンチ/検証用）
+    with _series_lock:  # R35-1
+        _series.clear()  # R35-1
+    with _profiles_lock:  # R35-5
+        _profiles.clear()  # R35-5
+
+
+@contextmanager
+def _timed_stage(name: str) -> Iterator[None]:  # R35-2
+    t0 = time.perf_counter()  # R35-2
+    try:  # R35-2
+        yield  # R35-2
+    finally:  # R35-2: 例外で抜けても記録する
+        observe("uraha_stage_seconds", time.perf_counter() - t0, stage=name)  # R35-2
+
+
+def stage(name: str) -> Any:  # R35-2: with stage("validate"): ...（無効時は何もしない共有の文脈）
+    return _timed_stage(name) if _enabled else _NOOP  # R35-2
+
+
+def _rows_of(result: Any) -> int:  # R35-3: 返り値の行数（リスト→件数、None→0、それ以外→1）
+    if result is None:  # R35-3
+        return 0  # R35-3
+    if isinstance(result, list):  # R35-3
+        return len(result)  # R35-3
+    return 1  # R35-3
+
+
+def repo_call(name: str) -> Callable[[F], F]:  # R35-3: リポジトリ関数の時間・返した行数・中で流したSQLを記録する
+    def deco(fn: F) -> F:  # R35-3
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:  # R35-3
+            if not _enabled:  # R35-3: 無効時はそのまま呼ぶ
+                return fn(*args, **kwargs)  # R35-3
+            token = _call.set(name)  # R35-3: この間に流れたSQLに呼び出し名を付ける
+            t0 = time.perf_counter()  # R35-3
+            try:  # R35-3
+                result = fn(*args, **kwargs)  # R35-3
+            finally:  # R35-3
+                observe("uraha_repo_call_seconds", time.perf_counter() - t0, call=name)  # R35-3
+                _call.reset(token)  # R35-3
+            observe("uraha_repo_call_rows", _rows_of(result), call=name)  # R35-3
+            return result  # R35-3
+        return wrapper  # type: ignore[return-value]  # R35-3
+    return deco  # R35-3
+
+
+def _sql_label(sql: str) -> str:  # R35-3: 空白を詰めたSQL（値はバインドなので入らない）
+    return " ".join(sql.split())[:SQL_LABEL_MAX]  # R35-3
+
+
+class _TimedConnection:  # R35-3: execute/executemany の時間を記録する接続の薄い包み（それ以外は素通し）
+    __slots__ = ("_conn",)  # R35-3
+
+    def __init__(self, conn: Any) -> None:  # R35-3
+        self._conn = conn  # R35-3
+
+    def execute(self, sql: str, *args: Any) -> Any:  # R35-3
+        t0 = time.perf_counter()  # R35-3
+        try:  # R35-3
+            return self._conn.execute(sql, *args)  # R35-3
+        finally:  # R35-3
+            observe("uraha_sql_seconds", time.perf_counter() - t0, call=_call.get(), sql=_sql_label(sql))  # R35-3
+
+    def executemany(self, sql: str, *args: Any) -> Any:  # R35-3
+        t0 = time.perf_counter()  # R35-3
+        try:  # R35-3
+            return self._conn.executemany(sql, *args)  # R35-3
+        finally:  # R35-3
+            observe("uraha_sql_seconds", time.perf_counter() - t0, call=_call.get(), sql=_sql_label(sql))  # R35-3
+
+    def __getattr__(self, name: str) -> Any:  # R35-3: commit/rollback/in_transaction/cursor など
+        return getattr(self._conn, name)  # R35-3
+
+
+def wrap_connection(conn: Any) -> Any:  # R35-3: 有効時だけ包む（app.storage.db.session から呼ぶ）
+    return _TimedConnection(conn) if _enabled else conn  # R35-3
+
+
+def _escape(value: str) -> str:  # R35-4: ラベル値のエスケープ（\\, ", 改行）
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")  # R35-4
+
+
+def _fmt_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:  # R35-4
+    pairs = labels + extra  # R35-4
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}" if pairs else ""  # R35-4
+
+
+def _fmt_le(upper: float) -> str:  # R35-4
+    return repr(float(upper))  # R35-4: 0.001 / 1.0 のように小数で出す
+
+
+def render_prometheus() -> str:  # R35-4: Prometheus テキスト形式（version 0.0.4）
+    with _series_lock:  # R35-4
+        items = sorted(_series.items())  # R35-4: 名前→ラベル順
+    lines: List[str] = []  # R35-4
+    for name, (help_text, buckets) in _METRICS.items():  # R35-4
+        lines.append(f"# HELP {name} {help_text}")  # R35-4
+        lines.append(f"# TYPE {name} histogram")  # R35-4
+        for (series_name, labels), h in items:  # R35-4
+            if series_name != name:  # R35-4
+                continue  # R35-4
+            cumulative, total, count = h.snapshot()  # R35-4
+            for upper, c in zip(buckets, cumulative):  # R35-4
+                lines.append(f"{name}_bucket{_fmt_labels(labels, (('le', _fmt_le(upper)),))} {c}")  # R35-4
+            lines.append(f"{name}_bucket{_fmt_labels(labels, (('le', '+Inf'),))} {cumulative[-1]}")  # R35-4
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {total!r}")  # R35-4
+            lines.append(f"{name}_count{_fmt_labels(labels)} {count}")  # R35-4
+    return "\n".join(lines) + "\n"  # R35-4
+
+
+_switch_lock = threading.Lock()  # R35-5: 切り替え間隔の変更を数える
+_switch_users = 0  # R35-5: 動いているプロファイラの数
+_switch_saved = 0.0  # R35-5: 元の sys.getswitchinterval()
+
+
+def _shorten_switch_interval(interval: float) -> None:  # R35-5: GIL の受け渡し（既定5ms）より細かく採るため、動いている間だけ縮める
+    global _switch_users, _switch_saved  # R35-5
+    with _switch_lock:  # R35-5
+        if _switch_users == 0:  # R35-5: 最初の1つが元の値を覚える
+            _switch_saved = sys.getswitchinterval()  # R35-5
+        _switch_users += 1  # R35-5
+        sys.setswitchinterval(min(sys.getswitchinterval(), interval / 2))  # R35-5
+
+
+def _restore_switch_interval() -> None:  # R35-5: 最後の1つが止まったら戻す
+    global _switch_users  # R35-5
+    with _switch_lock:  # R35-5
+        _switch_users -= 1  # R35-5
+        if _switch_users == 0:  # R35-5
+            sys.setswitchinterval(_switch_saved)  # R35-5
+
+
+class SamplingProfiler:  # R35-5: リクエストを処理しているスレッドのスタックを一定間隔で採る（結果は collapsed stack 形式）
+    def __init__(self, thread_id: int, interval: float = 0.001) -> None:  # R35-5
+        self.thread_id = thread_id  # R35-5: 対象スレッド（リクエストを受けたスレッド）
+        self.interval = interval  # R35-5: 秒
+        self._threads: Dict[int, int] = {thread_id: 1}  # R35-7: 採るスレッド→入れ子の数（aio.run_in_context の実行役が出入りする）
+        self._names: Dict[int, str] = {}  # R35-7: スレッド名（スタックの根に付ける）
+        self.stacks: Counter = Counter()  # R35-5: "mod:func;mod:func" → サンプル数
+        self.samples = 0  # R35-5
+        self.started = self.elapsed = 0.0  # R35-5
+        self._stop = threading.Event()  # R35-5
+        self._thread: Optional[threading.Thread] = None  # R35-5
+
+    def start(self) -> "SamplingProfiler":  # R35-5
+        self.started = time.perf_counter()  # R35-5
+        _shorten_switch_interval(self.interval)  # R35-5
+        self._thread = threading.Thread(target=self._run, name="uraha-profiler", daemon=True)  # R35-5
+        self._thread.start()  # R35-5
+        return self  # R35-5
+
+    def stop(self) -> "SamplingProfiler":  # R35-5
+        self._stop.set()  # R35-5
+        if self._thread is not None:  # R35-5
+            self._thread.join()  # R35-5
+            self._thread = None  # R35-5: 2回目の stop では戻さない
+            _restore_switch_interval()  # R35-5
+        self.elapsed = time.perf_counter() - self.started  # R35-5
+        return self  # R35-5
+
+    def attach(self, thread_id: int) -> None:  # R35-7: このスレッドも採る（リクエストの仕事を始めた）
+        with _profiles_lock:  # R35-7
+            self._threads[thread_id] = self._threads.get(thread_id, 0) + 1  # R35-7
+
+    def detach(self, thread_id: int) -> None:  # R35-7: 仕事を終えた（プールのスレッドは他のリクエストに戻る）
+        with _profiles_lock:  # R35-7
+            n = self._threads.get(thread_id, 0) - 1  # R35-7
+            if n > 0:  # R35-7
+                self._threads[thread_id] = n  # R35-7
+            else:  # R35-7
+                self._threads.pop(thread_id, None)  # R35-7
+
+    def _thread_name(self, thread_id: int) -> str:  # R35-7
+        name = self._names.get(thread_id)  # R35-7
+        if name is None:  # R35-7: 初めて見たスレッドだけ探す
+            name = next((t.name for t in threading.enumerate() if t.ident == thread_id), str(thread_id))  # R35-7
+            self._names[thread_id] = name  # R35-7
+        return name  # R35-7
+
+    def _run(self) -> None:  # R35-5
+        while not self._stop.wait(self.interval):  # R35-5
+            frames = sys._current_frames()  # R35-5: 全スレッドの今のフレーム
+            with _profiles_lock:  # R35-7
+                targets = list(self._threads)  # R35-7
+            for thread_id in targets:  # R35-7: リクエストの仕事をしているスレッド毎
+                frame = frames.get(thread_id)  # R35-5
+                if frame is None:  # R35-5
+                    continue  # R35-5
+                stack: List[str] = []  # R35-5
+                while frame is not None:  # R35-5: 内側→外側
+                    code = frame.f_code  # R35-5
+                    stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}:{frame.f_lineno}")  # R35-5
+                    frame = frame.f_back  # R35-5
+                stack.append(f"thread:{self._thread_name(thread_id)}")  # R35-7: 根はスレッド名（flamegraph でスレッド毎に分かれる）
+                self.stacks[";".join(reversed(stack))] += 1  # R35-5: 外側→内側（flamegraph.pl の入力形式）
+                self.samples += 1  # R35-5
+
+    def collapsed(self) -> str:  # R35-5: "stack count" の行（多い順）
+        return "".join(f"{s} {n}\n" for s, n in self.stacks.most_common())  # R35-5
+
+
+@contextmanager
+def profile_thread() -> Iterator[None]:  # R35-7: このリクエストをプロファイル中なら、今のスレッドも採らせる（aio.run_in_context が包む）
+    profiler = _profiling.get()  # R35-7: 無効時/プロファイル無しなら None を見るだけ
+    if profiler is None:  # R35-7
+        yield  # R35-7
+        return  # R35-7
+    thread_id = threading.get_ident()  # R35-7
+    profiler.attach(thread_id)  # R35-7
+    try:  # R35-7
+        yield  # R35-7
+    finally:  # R35-7
+        profiler.detach(thread_id)  # R35-7
+
+
+PROFILES_KEPT = 16  # R35-5: 直近のプロファイルだけ持つ
+_profiles: Deque[Tuple[int, str, SamplingProfiler]] = deque(maxlen=PROFILES_KEPT)  # R35-5: (id, 対象, 結果)
+_profiles_lock = threading.Lock()  # R35-5
+_profile_seq = 0  # R35-5
+
+
+def keep_profile(target: str, profiler: SamplingProfiler) -> int:  # R35-5: 結果を保存して id を返す
+    global _profile_seq  # R35-5
+    with _profiles_lock:  # R35-5
+        _profile_seq += 1  # R35-5
+        _profiles.append((_profile_seq, target, profiler))  # R35-5
+        return _profile_seq  # R35-5
+
+
+def get_profile(profile_id: int) -> Optional[Tuple[str, SamplingProfiler]]:  # R35-5
+    with _profiles_lock:  # R35-5
+        for pid, target, profiler in _profiles:  # R35-5
+            if pid == profile_id:  # R35-5
+                return target, profiler  # R35-5
+    return None  # R35-5
+
+
+def list_profiles() -> List[Dict[str, Any]]:  # R35-5: 新しい順
+    with _profiles_lock:  # R35-5
+        return [  # R35-5
+            {"id": pid, "target": target, "samples": p.samples, "seconds": round(p.elapsed, 6)}
+            for pid, target, p in reversed(_profiles)
+        ]
+
+
+def init_app(app: Any) -> None:  # R35-0: INSTRUMENT が有効ならリクエスト計測とプロファイラのフックを付ける
+    global _enabled  # R35-0
+    _enabled = bool(app.config.get("INSTRUMENT", False))  # R35-0
+    if not _enabled:  # R35-0: 無効時はフックも付けない
+        return  # R35-0
+    from flask import g, request  # R35-2
+
+    profile_param = app.config.get("INSTRUMENT_PROFILE_PARAM")  # R35-5: None ならプロファイラ無し
+    interval = float(app.config.get("INSTRUMENT_PROFILE_INTERVAL", 0.001))  # R35-5
+
+    @app.before_request
+    def _instrument_start() -> None:  # R35-2
+        g._instrument_t0 = time.perf_counter()  # R35-2
+        if profile_param and request.args.get(profile_param) == "1":  # R35-5: このリクエストだけプロファイルする
+            g._instrument_profiler = SamplingProfiler(threading.get_ident(), interval).start()  # R35-5
+            _profiling.set(g._instrument_profiler)  # R35-7: async ビューが aio.run_in_context で逃がした仕事も採る
+
+    @app.after_request
+    def _instrument_finish(response: Any) -> Any:  # R35-2
+        t0 = g.pop("_instrument_t0", None)  # R35-2
+        if t0 is not None:  # R35-2
+            observe("uraha_request_seconds", time.perf_counter() - t0, endpoint=request.endpoint or "-", method=request.method)  # R35-2
+        profiler = g.pop("_instrument_profiler", None)  # R35-5
+        if profiler is not None:  # R35-5: 応答ヘッダで結果の場所を返す
+            if response.is_streamed:  # R35-7: 本文はこの後で作られる（/issues、/steps/export）。送り終えて閉じたときに止める
+                response.call_on_close(profiler.stop)  # R35-7
+            else:  # R35-7: 本文は描画済み
+                profiler.stop()  # R35-5
+            profile_id = keep_profile(f"{request.method} {request.full_path.rstrip('?')}", profiler)  # R35-5
+            response.headers["X-Profile-Id"] = str(profile_id)  # R35-5
+        return response  # R35-2
+
+    @app.teardown_request
+    def _instrument_teardown(exc: Optional[BaseException]) -> None:  # R35-7: after_request まで来なかったときも止める
+        _profiling.set(None)  # R35-7: WSGI のスレッドは次のリクエストでも同じ文脈を使う
+        profiler = g.pop("_instrument_profiler", None)  # R35-7
+        if profiler is not None:  # R35-7
+            profiler.stop()  # R35-7
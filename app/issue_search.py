@@ -0,0 +1,160 @@
+from __future__ import annotations  # R38-0: 前方参照を安定させる
+
+# R38-5: Issue の全文検索（title/tags/note）。SQLite では FTS5（trigram）の issues_fts をトリガで同期し、bm25 で並べる。
+# R38-5: 3文字以上の語が無い検索と、Issue を SQLite 以外（DATABASE_URL）に置いた場合は ILIKE で絞り、新しい順に返す。
+# R38-5: tags は issue_tags 表（IssueTag）に1タグ1行で持つ。旧 issues.tags 列は起動時に移して消す。
+# R39-1: /issues の一覧（新しい順、(created_at, id) のキーセットでページ送り、強度/タグで絞る）もここで組み立てる。
+
+from dataclasses import dataclass, field  # R38-5: 検索結果の1ページ
+from typing import Any, Dict, Iterator, List, Optional  # R38-0: 最小型を明示する
+
+import sqlalchemy as sa  # R38-5: 列の確認/生SQL
+from markupsafe import Markup, escape  # R38-5: snippet の強調だけを HTML にする
+
+from app.models import Issue, IssueTag, db  # R38-5
+from app.storage.search import SNIPPET_CLOSE, SNIPPET_OPEN, short_term_sql, split_query  # R38-1: steps の notes 検索と同じ規則
+from app.validators import parse_tags  # R38-5: 旧 tags 列の分解
+
+FTS_WEIGHTS = (10.0, 5.0, 1.0)  # R38-5: bm25 の列の重み（title, tags, note）
+
+
+@dataclass
+class IssuePage:  # R38-5: 検索結果の1ページ（関連度順）
+    issues: List[Issue]  # R38-5
+    page: int  # R38-5: 1始まり
+    per_page: int  # R38-5
+    has_next: bool  # R38-5
+    snippets: Dict[int, Markup] = field(default_factory=dict)  # R38-5: issue id→一致箇所（FTS のときだけ）
+
+
+def _is_sqlite() -> bool:  # R38-5
+    return db.engine.dialect.name == "sqlite"  # R38-5
+
+
+def highlight(snippet: Optional[str]) -> Markup:  # R38-5: 本文はエスケープし、一致箇所だけ <mark> にする
+    text = str(escape(snippet or ""))  # R38-5
+    return Markup(text.replace(SNIPPET_OPEN, "<mark>").replace(SNIPPET_CLOSE, "</mark>"))  # R38-5
+
+
+def migrate_legacy_tags() -> int:  # R38-5: 旧 issues.tags（カンマ区切り）を issue_tags へ移して列を消す。移した行数を返す
+    if "tags" not in {c["name"] for c in sa.inspect(db.engine).get_columns("issues")}:  # R38-5: 移行済み/新しいDB
+        return 0  # R38-5
+    rows = db.session.execute(sa.text("SELECT id, tags FROM issues WHERE tags <> ''")).all()  # R38-5
+    values = [{"issue_id": issue_id, "tag": t} for issue_id, raw in rows for t in parse_tags(raw)]  # R38-5
+    if values:  # R38-5
+        db.session.execute(sa.insert(IssueTag).prefix_with("OR IGNORE", dialect="sqlite"), values)  # R38-5
+    db.session.execute(sa.text("ALTER TABLE issues DROP COLUMN tags"))  # R38-5: SQLite 3.35+ / PostgreSQL
+    db.session.commit()  # R38-5
+    return len(values)  # R38-5
+
+
+def _init_fts() -> None:  # R38-5: issues_fts と同期トリガ（SQLite のみ）
+    conn = db.session.connection()  # R38-5
+    fresh = conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'issues_fts'").first() is None  # R38-5
+    tags_of = "(SELECT COALESCE(group_concat(tag, ' '), '') FROM issue_tags WHERE issue_id = {0})"  # R38-5: 空白区切りのタグ
+    for ddl in (  # R38-5
+        "CREATE VIRTUAL TABLE IF NOT EXISTS issues_fts USING fts5(title, tags, note, tokenize = 'trigram')",
+        "CREATE TRIGGER IF NOT EXISTS issues_fts_ai AFTER INSERT ON issues BEGIN "
+        f"INSERT INTO issues_fts (rowid, title, tags, note) VALUES (new.id, new.title, {tags_of.format('new.id')}, new.note); END",
+        "CREATE TRIGGER IF NOT EXISTS issues_fts_au AFTER UPDATE OF title, note ON issues BEGIN "
+        "UPDATE issues_fts SET title = new.title, note = new.note WHERE rowid = new.id; END",
+        "CREATE TRIGGER IF NOT EXISTS issues_fts_ad AFTER DELETE ON issues BEGIN "
+        "DELETE FROM issues_fts WHERE rowid = old.id; END",
+        "CREATE TRIGGER IF NOT EXISTS issue_tags_fts_ai AFTER INSERT ON issue_tags BEGIN "
+        f"UPDATE issues_fts SET tags = {tags_of.format('new.issue_id')} WHERE rowid = new.issue_id; END",
+        "CREATE TRIGGER IF NOT EXISTS issue_tags_fts_ad AFTER DELETE ON issue_tags BEGIN "
+        f"UPDATE issues_fts SET tags = {tags_of.format('old.issue_id')} WHERE rowid = old.issue_id; END",
+    ):
+        conn.exec_driver_sql(ddl)  # R38-5
+    if fresh:  # R38-5: 既存の Issue を一度だけ流し込む
+        conn.exec_driver_sql(  # R38-5
+            f"INSERT INTO issues_fts (rowid, title, tags, note) SELECT i.id, i.title, {tags_of.format('i.id')}, i.note FROM issues AS i"
+        )
+    db.session.commit()  # R38-5
+
+
+def init_app(app: Any) -> None:  # R38-5: db.create_all() の後に呼ぶ
+    with app.app_context():  # R38-5
+        migrate_legacy_tags()  # R38-5
+        if _is_sqlite():  # R38-5: FTS5 は SQLite だけ
+            _init_fts()  # R38-5
+
+
+def _fts_page(q: str, tag: Optional[str], page: int, per_page: int) -> Optional[IssuePage]:  # R38-5: SQLite（検索語があるとき）
+    match, short = split_query(q)  # R38-1
+    if match is None:  # R38-5: 索引で引ける語が無い（空/短い語だけ）→ ILIKE の新しい順
+        return None  # R38-5
+    where: List[str] = ["issues_fts MATCH ?"]  # R38-5
+    params: List[Any] = [match]  # R38-5
+    if short:  # R38-1: trigram で引けない短い語（MATCH で絞った行だけ比べる）
+        sql, p = short_term_sql(["title", "tags", "note"], short)  # R38-1
+        where.append(sql)  # R38-1
+        params.extend(p)  # R38-1
+    if tag:  # R38-5: 一致した行毎に主キー (issue_id, tag) を引く（IN にすると行毎に MATCH をやり直す）
+        where.append("EXISTS (SELECT 1 FROM issue_tags WHERE issue_id = issues_fts.rowid AND tag = ?)")  # R38-5
+        params.append(tag)  # R38-5
+    order = f"bm25(issues_fts, {', '.join(map(str, FTS_WEIGHTS))})"  # R38-5
+    rows = db.session.connection().exec_driver_sql(  # R38-5: 1件多く取って続きがあるか判定する
+        f"SELECT rowid, snippet(issues_fts, -1, '{SNIPPET_OPEN}', '{SNIPPET_CLOSE}', '…', 12) FROM issues_fts "
+        f"WHERE {' AND '.join(where)} ORDER BY {order} LIMIT ? OFFSET ?",
+        tuple(params + [per_page + 1, (page - 1) * per_page]),  # R38-5
+    ).all()
+    ids = [r[0] for r in rows[:per_page]]  # R38-5
+    by_id = {i.id: i for i in Issue.query.filter(Issue.id.in_(ids)).all()} if ids else {}  # R38-5: 1クエリ（タグは selectin）
+    return IssuePage(  # R38-5
+        issues=[by_id[i] for i in ids if i in by_id],  # R38-5: 関連度順のまま
+        page=page,  # R38-5
+        per_page=per_page,  # R38-5
+        has_next=len(rows) > per_page,  # R38-5
+        snippets={r[0]: highlight(r[1]) for r in rows[:per_page]},  # R38-5
+    )
+
+
+def _like(term: str) -> str:  # R38-5: ILIKE のワイルドカードを無効にする
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"  # R38-5
+
+
+def search_issues(q: str, tag: Optional[str] = None, page: int = 1, per_page: int = 20) -> IssuePage:  # R38-5: 検索語（空白区切りで AND）とタグで絞る
+    page = max(1, page)  # R38-5
+    if _is_sqlite():  # R38-5
+        found = _fts_page(q, tag, page, per_page)  # R38-5
+        if found is not None:  # R38-5
+            return found  # R38-5
+    query = Issue.query  # R38-5: 検索語無し / SQLite 以外
+    for term in (q or "").split():  # R38-5
+        pattern = _like(term)  # R38-5
+        query = query.filter(sa.or_(  # R38-5
+            Issue.title.ilike(pattern, escape="\\"),  # R38-5
+            Issue.note.ilike(pattern, escape="\\"),  # R38-5
+            Issue.tag_rows.any(IssueTag.tag.ilike(pattern, escape="\\")),  # R38-5
+        ))
+    if tag:  # R38-5
+        query = query.filter(Issue.id.in_(sa.select(IssueTag.issue_id).where(IssueTag.tag == tag)))  # R38-5
+    rows = query.order_by(Issue.created_at.desc(), Issue.id.desc()).offset((page - 1) * per_page).limit(per_page + 1).all()  # R38-5
+    return IssuePage(issues=rows[:per_page], page=page, per_page=per_page, has_next=len(rows) > per_page)  # R38-5
+
+
+def list_issues(  # R39-1: 新しい順の1ページ（yield_per で少しずつ読み、描画しながら流せるようにする）
+    limit: int = 50,  # R39-1
+    before_id: Optional[int] = None,  # R39-1: 前ページの最後の id（その Issue より古いもの）
+    tag: Optional[str] = None,  # R38-5
+    min_intensity: Optional[int] = None,  # R39-1: 以上
+    max_intensity: Optional[int] = None,  # R39-1: 以下
+    chunk: int = 200,  # R39-1: 1回に読む行数（タグは chunk 毎に selectin で読む）
+) -> Iterator[Issue]:
+    query = Issue.query  # R39-1
+    if before_id is not None:  # R39-1: (created_at, id) が前ページの最後より小さい
+        anchor = db.session.get(Issue, before_id)  # R39-1: 主キーで1回
+        if anchor is None:  # R39-1: 消えた Issue なら id だけで近似する
+            query = query.filter(Issue.id < before_id)  # R39-1
+        else:  # R39-1
+            key = sa.tuple_(Issue.created_at, Issue.id)  # R39-1: 行値で比べると ix_issues_created_at_id を範囲で辿れる（OR だと先頭から走査）
+            query = query.filter(key < sa.tuple_(sa.literal(anchor.created_at, Issue.created_at.type), sa.literal(anchor.id)))  # R39-1
+    if min_intensity is not None:  # R39-1
+        query = query.filter(Issue.intensity >= min_intensity)  # R39-1
+    if max_intensity is not None:  # R39-1
+        query = query.filter(Issue.intensity <= max_intensity)  # R39-1
+    if tag:  # R39-1: 行毎に主キー (issue_id, tag) を引く（新しい順の索引を使ったまま絞る）
+        query = query.filter(Issue.tag_rows.any(IssueTag.tag == tag))  # R39-1
+    query = query.order_by(Issue.created_at.desc(), Issue.id.desc()).limit(limit)  # R39-1
+    return iter(query.yield_per(chunk))  # R39-1
@@ -4,19 +4,64 @@ from datetime import datetime
 
 from flask_sqlalchemy import SQLAlchemy
 
+from app.storage.db import make_engine
+from app.validators import parse_tags
 
-db = SQLAlchemy()
+
+class _SharedEngineSQLAlchemy(SQLAlchemy):
+    # Build engines through app.storage.db so Issue connections get the same
+    # pragmas as the steps log, which then reuses this engine (see steps_db.init_app).
+    def _make_engine(self, bind_key, options, app):
+        return make_engine(options)
+
+
+db = _SharedEngineSQLAlchemy()
+
+
+class IssueTag(db.Model):
+    # One row per (issue, tag); the (tag, issue_id) index answers tag filters without LIKE.
+    __tablename__ = "issue_tags"
+    __table_args__ = (db.Index("ix_issue_tags_tag_issue", "tag", "issue_id"),)
+
+    issue_id = db.Column(db.Integer, db.ForeignKey("issues.id", ondelete="CASCADE"), primary_key=True)
+    tag = db.Column(db.String(50), primary_key=True)
+
+    def __repr__(self) -> str:
+        return f"<IssueTag {self.issue_id} {self.tag}>"
 
 
 class Issue(db.Model):
     __tablename__ = "issues"
+    # newest-first listing and its keyset pages walk this index
+    __table_args__ = (db.Index("ix_issues_created_at_id", "created_at", "id"),)
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
-    tags = db.Column(db.String(200), nullable=False, default="")
     intensity = db.Column(db.Integer, nullable=False, default=0)
     note = db.Column(db.Text, nullable=False, default="")
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # selectin: a page of issues loads all its tags in one extra query
+    tag_rows = db.relationship(IssueTag, cascade="all, delete-orphan", lazy="selectin", order_by=IssueTag.tag)
+
+    @property
+    def tag_list(self) -> list[str]:
+        return [t.tag for t in self.tag_rows]
+
+    @property
+    def tags(self) -> str:
+        # the old comma-joined column, kept as a view for templates and forms
+        return ", ".join(self.tag_list)
+
+    @tags.setter
+    def tags(self, value: str) -> None:
+        self.tag_rows = [IssueTag(tag=t) for t in parse_tags(value)]
 
     def __repr__(self) -> str:
         return f"<Issue {self.id} {self.title}>"
+
+
+def ensure_indexes() -> None:
+    # create_all() only indexes the tables it creates; add indexes introduced later to existing DBs
+    for model in (Issue, IssueTag):
+        for index in model.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
@@ -0,0 +1,43 @@
+from __future__ import annotations  # R41-0: 前方参照を安定させる
+
+# R41-1: Issue 側（create_all/索引/issue_tags への移行/issues_fts）と steps 側（init_schema）のスキーマをまとめて確保する。
+# R41-1: 確保した版は steps のDBの PRAGMA user_version に残す。SCHEMA_ON_STARTUP=False の起動はその1回の読み取りだけで DDL を流さない。
+# R41-1: 表/索引/トリガを足したら SCHEMA_VERSION を上げる（古いDBは次の flask schema upgrade か起動時に追いつく）。
+
+import logging  # R41-1: 古いDBで起動したときの警告
+from typing import Any  # R41-0: 最小型を明示する
+
+from app import issue_search  # R38-5: issue_tags への移行と issues_fts
+from app.models import db, ensure_indexes  # R39-1
+from app.storage import db as steps_db  # R20-2: steps のスキーマ
+
+SCHEMA_VERSION = 3  # R41-1: init_schema/ensure_indexes/_init_fts の中身を変えたら上げる（R42-1: 2 = steps_archive、R38-7: 3 = idx_steps_notes_json_id）
+
+log = logging.getLogger(__name__)  # R41-1
+
+
+def current_version() -> int:  # R41-1: DBに記録された版（未記録なら0）
+    return steps_db.read_user_version()  # R41-1
+
+
+def upgrade(app: Any) -> int:  # R41-1: 全スキーマを確保して版を記録する（冪等、flask schema upgrade の本体）
+    with app.app_context():  # R41-1
+        db.create_all()  # R41-1
+        ensure_indexes()  # R39-1: 既存DBにも ix_issues_created_at_id を足す
+    issue_search.init_app(app)  # R38-5: issue_tags への移行と issues_fts
+    with steps_db.session() as conn:  # R20-5: steps 側（初回だけDDLを流す）
+        steps_db.ensure_schema(conn)  # R20-5
+        steps_db.write_user_version(conn, SCHEMA_VERSION)  # R41-1: コミットも兼ねる
+    return SCHEMA_VERSION  # R41-1
+
+
+def init_app(app: Any) -> None:  # R41-1: create_app から呼ぶ（他の init_app の後）
+    if app.config.get("SCHEMA_ON_STARTUP", True):  # R41-1: 既定は従来どおり起動毎に確保する
+        upgrade(app)  # R41-1
+        return  # R41-1
+    version = current_version()  # R41-1: DDL は流さない
+    if version < SCHEMA_VERSION:  # R41-1: 移行していないDB（初回/古い版）は止めずに確保する
+        log.warning("database schema is at version %s, expected %s; upgrading now (run `flask schema upgrade` before starting workers)", version, SCHEMA_VERSION)  # R41-1
+        upgrade(app)  # R41-1
+        return  # R41-1
+    steps_db.mark_schema_ready()  # R41-1: 最初の steps の読み書きでも init_schema を流さない
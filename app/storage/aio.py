@@ -0,0 +1,95 @@
+from __future__ import annotations  # R31-0: 前方参照を安定させる
+
+import asyncio  # R31-1: イベントループから待てる形にする
+import contextvars  # R31-7: Flask の app/request 文脈ごとスレッドへ渡す
+import threading  # R31-1: 実行役の作成を直列化する
+from concurrent.futures import ThreadPoolExecutor  # R31-1: SQLite 呼び出しを専用スレッドに逃がす
+from functools import partial  # R31-1: 引数ごと実行役へ渡す
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, TypeVar  # R31-0: 最小型を明示する
+
+from app import instrument  # R35-7: プロファイラにスレッドを知らせる
+from app.storage import cache  # R32-2: 保存済み step のキャッシュ
+from app.storage import repository  # R31-2: 同期版の読み取り（中身はそのまま使う）
+from app.storage import rollup  # R37-5: 集計表の読み取り
+from app.storage import search  # R38-3: notes の全文検索
+from app.storage import writer  # R31-3: 保存（同期 or まとめ書き）
+
+T = TypeVar("T")  # R31-1
+
+DEFAULT_THREADS = 8  # R31-1: プール接続数（pool_size）と同程度
+
+_executor: Optional[ThreadPoolExecutor] = None  # R31-1: SQLite 専用の実行役（最初の呼び出しで作る）
+_threads = DEFAULT_THREADS  # R31-1
+_lock = threading.Lock()  # R31-1
+
+
+def init_app(app: Any) -> None:  # R31-1: STEPS_ASYNC_THREADS を反映する
+    configure(threads=app.config.get("STEPS_ASYNC_THREADS", DEFAULT_THREADS))  # R31-1
+
+
+def configure(threads: int = DEFAULT_THREADS) -> None:  # R31-1: スレッド数を変える（実行役は作り直す）
+    global _executor, _threads  # R31-1
+    with _lock:  # R31-1
+        old, _executor = _executor, None  # R31-1
+        _threads = max(1, int(threads))  # R31-1
+    if old is not None:  # R31-1: 実行中の呼び出しは終わらせる
+        old.shutdown(wait=False)  # R31-1
+
+
+def get_executor() -> ThreadPoolExecutor:  # R31-1: 上限付きの実行役（ループの既定 executor とは分ける）
+    global _executor  # R31-1
+    with _lock:  # R31-1
+        if _executor is None:  # R31-1
+            _executor = ThreadPoolExecutor(max_workers=_threads, thread_name_prefix="steps-aio")  # R31-1
+        return _executor  # R31-1
+
+
+async def run_sync(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:  # R31-1: 同期関数を実行役で走らせて待つ
+    loop = asyncio.get_running_loop()  # R31-1
+    return await loop.run_in_executor(get_executor(), partial(fn, *args, **kwargs))  # R31-1: ループはその間ほかの要求を進める
+
+
+async def run_in_context(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:  # R31-7: run_sync と同じだが、呼び出し元の contextvars（request/g/stage）を引き継ぐ
+    loop = asyncio.get_running_loop()  # R31-7
+    ctx = contextvars.copy_context()  # R31-7: 検証/描画は request と current_app を読む
+
+    def call() -> T:  # R35-7: プロファイル中のリクエストなら、実行役のスレッドも採らせる
+        with instrument.profile_thread():  # R35-7
+            return fn(*args, **kwargs)  # R31-7
+
+    return await loop.run_in_executor(get_executor(), partial(ctx.run, call))  # R31-7: CPU 仕事の間もループは空く
+
+
+async def read_step(step_id: int, columns: Optional[Sequence[str]] = None) -> Any:  # R31-2: repository.read_step の非同期版
+    return await run_sync(repository.read_step, step_id, columns=columns)  # R31-2
+
+
+async def read_step_cached(step_id: int) -> Any:  # R32-2: cache.read_step_cached の非同期版
+    return await run_sync(cache.read_step_cached, step_id)  # R32-2
+
+
+async def list_steps_filtered(**filters: Any) -> List[Any]:  # R31-2: repository.list_steps_filtered の非同期版（引数は同じ）
+    return await run_sync(repository.list_steps_filtered, **filters)  # R31-2
+
+
+async def submit_step(  # R31-3: 保存してコミット後の行IDを返す
+    template_id: str,  # R4-2
+    s_t: Mapping[str, Any],  # R4-2
+    o_t: Mapping[str, Any],  # R4-2
+    pi_t: str,  # R4-2
+    o_t1_pred: Mapping[str, Any],  # R4-2
+    notes: List[str],  # R4-2
+) -> int:
+    fut = await run_sync(writer.submit_step, template_id, s_t, o_t, pi_t, o_t1_pred, notes)  # R31-3: 同期保存/満杯時の待ち（WriteQueueFull）はスレッド側で
+    try:  # R25-7: 同期版（wait_step_id）と同じ上限
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(fut)), writer.result_timeout())  # R31-3: まとめ書きのコミット待ちはスレッドを占有しない（shield: 時間切れでも Future は取り消さない）
+    except asyncio.TimeoutError:  # R25-7
+        raise writer.WriteTimeout(f"step write not committed within {writer.result_timeout()}s") from None  # R25-7
+
+
+async def step_stats(**filters: Any) -> Dict[str, Any]:  # R37-5: rollup.step_stats の非同期版（引数は同じ）
+    return await run_sync(rollup.step_stats, **filters)  # R37-5
+
+
+async def search_steps(**query: Any) -> Dict[str, Any]:  # R38-3: search.search_steps の非同期版（引数は同じ）
+    return await run_sync(search.search_steps, **query)  # R38-3
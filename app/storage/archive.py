@@ -0,0 +1,419 @@
+from __future__ import annotations  # R42-0: 前方参照を安定させる
+
+# R42-0: 古い steps を列毎の .npy ファイル（セグメント）へ移し、SQLite 側からは消す（flask steps archive）。
+# R42-0: 列は steps_compact と同じ（JSON_ROW_SELECT）。整数は NULL 用の番兵付きの最小幅、文字列は辞書符号、created_at は固定長バイト列。
+# R42-0: .npz（zip）は mmap で開けないので列毎の .npy にする。読み出しは np.load(mmap_mode="r") で必要なページだけ触る。
+# R42-0: セグメントは steps_archive 表に登録した時点で有効になり、同じトランザクションで元の行を消す（途中で落ちても二重にも欠けもしない）。
+# R42-0: 移した行は変わらない（replay/search/一覧は SQLite 側の行だけ）。read_step とエクスポートは両方を id で読む。
+
+import heapq  # R42-3: 範囲の重なるセグメントを id 順に混ぜる
+import json  # R42-1: セグメントのメタ情報
+import os  # R42-1: fsync / rename
+import shutil  # R42-1: 書きかけのセグメントを消す
+import threading  # R42-2: 登録簿の読み直しを直列化する
+from dataclasses import dataclass  # R42-1: 移動結果を構造体で返す
+from datetime import datetime, timezone  # R42-1: 登録時刻
+from itertools import chain, islice  # R42-3
+from operator import itemgetter  # R42-3
+from pathlib import Path  # R42-1: 保存先
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple  # R42-0: 最小型を明示する
+
+np: Any = None  # R42-0: numpy は任意依存（R42-6: 列ファイルを初めて読み書きするときに _require_numpy が読み込む。import app/create_app では読まない）
+
+from app.storage.compact import JSON_ROW_SELECT, O_T_COLUMN, _loads, compact_values  # R29-1: 列の並びと JSON→数値列の変換
+from app.storage.db import db_key, get_db_path, session, steps_table  # R20-2
+
+ARCHIVE_FORMAT = 1  # R42-1: meta.json の版（列の持ち方を変えたら上げる）
+TEXT_COLUMNS: Tuple[str, ...] = ("created_at",)  # R42-1: 固定長バイト列（ISO文字列の辞書順＝時刻順のまま比べられる）
+CODED_COLUMNS: Tuple[str, ...] = ("template_id", "pi_t", "p_policy")  # R42-1: 値の種類が少ない → 辞書＋符号
+BLOB_COLUMNS: Tuple[str, ...] = ("extras_in", "extras_out")  # R42-1: 稀 → 値のある行だけ（行番号/区切り/本体）
+INT_COLUMNS: Tuple[str, ...] = tuple(  # R42-1: 残り（先頭の id と整数列、notes_id）
+    c for c in JSON_ROW_SELECT if c not in TEXT_COLUMNS + CODED_COLUMNS + BLOB_COLUMNS
+)
+DEFAULT_SEGMENT_ROWS = 200_000  # R42-1: 1セグメントの行数（書き出し中はこの行数分をメモリに持つ）
+
+_dir: Optional[Path] = None  # R42-1: None なら steps のDBファイルの隣（app.db → app.archive/）
+_lock = threading.Lock()  # R42-2
+_registries: Dict[str, Tuple[int, Tuple["Segment", ...]]] = {}  # R42-2: DBパス→(登録簿の最大id, セグメント)
+
+
+def _require_numpy() -> None:  # R42-0（R42-6: 初回だけ import する）
+    global np  # R42-6
+    if np is not None:  # R42-6: 読み込み済み
+        return  # R42-6
+    try:  # R42-6
+        import numpy  # R42-1
+    except ImportError:  # pragma: no cover - R42-0: 未インストールでもアプリは動く（セグメントが無ければ読み書きしない）
+        raise RuntimeError("archived steps need numpy (poetry install -E analysis)") from None
+    np = numpy  # R42-6
+
+
+def configure(directory: Optional[str | Path] = None) -> None:  # R42-1: 保存先を変える
+    global _dir  # R42-1
+    _dir = Path(directory) if directory else None  # R42-1
+
+
+def init_app(app: Any) -> None:  # R42-1: STEPS_ARCHIVE_DIR を反映する（相対パスは instance/ 基準）
+    directory = app.config.get("STEPS_ARCHIVE_DIR")  # R42-1
+    if directory and not Path(directory).is_absolute():  # R42-1
+        directory = Path(app.instance_path) / directory  # R42-1
+    configure(directory)  # R42-1
+
+
+def archive_dir() -> Path:  # R42-1: セグメントを置くディレクトリ
+    return _dir if _dir is not None else get_db_path().with_suffix(".archive")  # R42-1: DBを差し替えれば保存先も変わる
+
+
+def _int_dtype(values: Sequence[Optional[int]]) -> Tuple[Any, int]:  # R42-1: 値が収まる最小の符号付き整数型と NULL の番兵（型の最小値）
+    present = [v for v in values if v is not None]  # R42-1
+    lo, hi = (min(present), max(present)) if present else (0, 0)  # R42-1
+    for dtype in (np.int8, np.int16, np.int32, np.int64):  # R42-1
+        info = np.iinfo(dtype)  # R42-1
+        if info.min < lo and hi <= info.max:  # R42-1: 最小値は番兵に取っておく
+            return dtype, int(info.min)  # R42-1
+    raise ValueError(f"integer out of range for the archive: {lo}..{hi}")  # R42-1
+
+
+def _code_dtype(n: int) -> Any:  # R42-1: 辞書の大きさ→符号の型
+    return np.uint8 if n <= 0xFF else np.uint16 if n <= 0xFFFF else np.uint32  # R42-1
+
+
+class Segment:  # R42-2: 1セグメント（列は初めて触ったときに mmap で開く）
+    __slots__ = ("name", "path", "first_id", "last_id", "rows", "min_created_at", "max_created_at", "_meta", "_cols")  # R42-2
+
+    def __init__(self, name: str, path: Path, first_id: int, last_id: int, rows: int, min_created_at: str, max_created_at: str) -> None:  # R42-2
+        self.name = name  # R42-2
+        self.path = path  # R42-2
+        self.first_id = first_id  # R42-2
+        self.last_id = last_id  # R42-2
+        self.rows = rows  # R42-2
+        self.min_created_at = min_created_at  # R42-2
+        self.max_created_at = max_created_at  # R42-2
+        self._meta: Optional[Dict[str, Any]] = None  # R42-2
+        self._cols: Dict[str, Any] = {}  # R42-2: ファイル名→配列（mmap）
+
+    @property
+    def meta(self) -> Dict[str, Any]:  # R42-2: 辞書/番兵
+        meta = self._meta  # R42-2
+        if meta is None:  # R42-2
+            _require_numpy()  # R42-2
+            meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))  # R42-2
+            if meta.get("format") != ARCHIVE_FORMAT:  # R42-2: 新しいコードで書いたセグメント
+                raise RuntimeError(f"unsupported archive segment format in {self.path}: {meta.get('format')!r}")  # R42-2
+            self._meta = meta  # R42-2
+        return meta  # R42-2
+
+    def _array(self, file: str) -> Any:  # R42-2: .npy を mmap で開く（ページキャッシュに載るまでディスクは読まない）
+        arr = self._cols.get(file)  # R42-2
+        if arr is None:  # R42-2
+            _require_numpy()  # R42-6: 列に触るのはここから（以降の np は読み込み済み）
+            arr = self._cols[file] = np.asarray(np.load(self.path / f"{file}.npy", mmap_mode="r"))  # R42-2: np.memmap の添字は遅いので同じページを指す ndarray にする
+        return arr  # R42-2
+
+    def column(self, name: str) -> Any:  # R42-2: 符号/番兵のままの列
+        return self._array(name)  # R42-2
+
+    def code_of(self, name: str, value: Any) -> Optional[int]:  # R42-2: 辞書符号（無ければ None）
+        try:  # R42-2
+            return self.meta["dicts"][name].index(value)  # R42-2: 数種類
+        except ValueError:  # R42-2
+            return None  # R42-2
+
+    def find(self, step_id: int) -> Optional[int]:  # R42-2: id の行番号（id 列は昇順）
+        ids = self._array("id")  # R42-2
+        i = int(np.searchsorted(ids, step_id))  # R42-2: 二分探索で数ページだけ触る
+        return i if i < self.rows and int(ids[i]) == step_id else None  # R42-2
+
+    def values(self, name: str, idx: Any) -> List[Any]:  # R42-2: 行番号の並び→Python の値（NULL は None）
+        if name in TEXT_COLUMNS:  # R42-1
+            return [b.decode("utf-8") for b in self._array(name)[idx].tolist()]  # R42-1
+        if name in CODED_COLUMNS:  # R42-1
+            table = self.meta["dicts"][name]  # R42-1
+            return [table[k] for k in self._array(name)[idx].tolist()]  # R42-1
+        if name in BLOB_COLUMNS:  # R42-1: 値のある行だけ持っている
+            out: List[Any] = [None] * len(idx)  # R42-1
+            if not self.meta["blobs"].get(name):  # R42-1: このセグメントには1つも無い
+                return out  # R42-1
+            rows, offsets, data = self._array(f"{name}.rows"), self._array(f"{name}.offsets"), self._array(f"{name}.data")  # R42-1
+            pos = np.minimum(np.searchsorted(rows, idx), len(rows) - 1)  # R42-1
+            for j in np.flatnonzero(rows[pos] == idx).tolist():  # R42-1: 値のある行だけ
+                p = int(pos[j])  # R42-1
+                out[j] = bytes(data[offsets[p]:offsets[p + 1]])  # R42-1
+            return out  # R42-1
+        arr = self._array(name)[idx]  # R42-1: 整数列
+        vals = arr.tolist()  # R42-1
+        null = self.meta["nulls"].get(name)  # R42-1
+        if null is not None and (arr == null).any():  # R42-1
+            vals = [None if v == null else v for v in vals]  # R42-1
+        return vals  # R42-1
+
+    def value(self, name: str, i: int) -> Any:  # R42-2: 1つの値（values の1行版。配列を作らない）
+        if name in TEXT_COLUMNS:  # R42-1
+            return self._array(name)[i].decode("utf-8")  # R42-1
+        if name in CODED_COLUMNS:  # R42-1
+            return self.meta["dicts"][name][int(self._array(name)[i])]  # R42-1
+        if name in BLOB_COLUMNS:  # R42-1
+            if not self.meta["blobs"].get(name):  # R42-1
+                return None  # R42-1
+            rows = self._array(f"{name}.rows")  # R42-1
+            p = int(np.searchsorted(rows, i))  # R42-1
+            if p == len(rows) or int(rows[p]) != i:  # R42-1
+                return None  # R42-1
+            offsets = self._array(f"{name}.offsets")  # R42-1
+            return bytes(self._array(f"{name}.data")[offsets[p]:offsets[p + 1]])  # R42-1
+        v = int(self._array(name)[i])  # R42-1
+        return None if v == self.meta["nulls"].get(name) else v  # R42-1
+
+    def row(self, i: int, columns: Sequence[str]) -> Tuple[Any, ...]:  # R42-2: 1行（columns の順）
+        return tuple(self.value(c, i) for c in columns)  # R42-2
+
+    def rows_at(self, idx: Any) -> List[Tuple[Any, ...]]:  # R42-3: JSON_ROW_SELECT の順の行（json_row_converter にそのまま渡せる）
+        return list(zip(*(self.values(c, idx) for c in JSON_ROW_SELECT)))  # R42-3
+
+    def select(  # R42-3: 絞り込みに合う行番号（昇順＝id 順）
+        self,
+        template: Optional[str] = None,  # R14-2
+        pi_t: Optional[str] = None,  # R14-3
+        after_id: Optional[int] = None,  # R24-1
+        before_id: Optional[int] = None,  # R24-1
+        since: Optional[str] = None,  # R24-3
+        until: Optional[str] = None,  # R24-3
+    ) -> Any:
+        ids = self._array("id")  # R42-3
+        lo = int(np.searchsorted(ids, after_id, side="right")) if after_id is not None else 0  # R24-1: 主キー範囲
+        hi = int(np.searchsorted(ids, before_id, side="left")) if before_id is not None else self.rows  # R24-1
+        if lo >= hi:  # R42-3
+            return np.arange(0)  # R42-3
+        mask = np.ones(hi - lo, dtype=bool)  # R42-3
+        for name, value in (("template_id", template), ("pi_t", pi_t)):  # R42-3
+            if value:  # R42-3
+                code = self.code_of(name, value)  # R42-3
+                if code is None:  # R42-3: このセグメントには無い
+                    return np.arange(0)  # R42-3
+                mask &= self._array(name)[lo:hi] == code  # R42-3
+        if since:  # R24-3
+            mask &= self._array("created_at")[lo:hi] >= since.encode("utf-8")  # R24-3: バイト列の辞書順
+        if until:  # R24-3
+            mask &= self._array("created_at")[lo:hi] < until.encode("utf-8")  # R24-3
+        return np.flatnonzero(mask) + lo  # R42-3
+
+    def rollup_counts(self) -> Tuple[List[Tuple[Any, ...]], List[Tuple[Any, ...]]]:  # R42-4: 集計表の作り直し用（steps_rollup_policy / steps_rollup_input の行）
+        _require_numpy()  # R42-6: 最初の式で np を引くので _array より先に
+        day, day_code = np.unique(np.asarray(self._array("created_at")).astype("S10"), return_inverse=True)  # R37-1: UTC の日
+        days = [d.decode("utf-8") for d in day.tolist()]  # R42-4
+        tpl, pol = self.meta["dicts"]["template_id"], self.meta["dicts"]["pi_t"]  # R42-4
+        t = np.asarray(self._array("template_id"), dtype=np.int64)  # R42-4
+        p = np.asarray(self._array("pi_t"), dtype=np.int64)  # R42-4
+        keys, counts = np.unique(np.stack([day_code, t, p], axis=1), axis=0, return_counts=True)  # R42-4
+        policy = [(days[d], tpl[ti], pol[pi], int(n)) for (d, ti, pi), n in zip(keys.tolist(), counts.tolist())]  # R42-4
+        inputs: List[Tuple[Any, ...]] = []  # R42-4
+        for key, col in O_T_COLUMN.items():  # R37-1: compact レイアウトと同じく既知の入力だけ
+            v = np.asarray(self._array(col), dtype=np.int64)  # R42-4
+            m = v != self.meta["nulls"][col]  # R42-4
+            if not m.any():  # R42-4
+                continue  # R42-4
+            keys, counts = np.unique(np.stack([day_code[m], t[m], v[m], p[m]], axis=1), axis=0, return_counts=True)  # R42-4
+            inputs.extend((days[d], tpl[ti], key, val, pol[pi], int(n)) for (d, ti, val, pi), n in zip(keys.tolist(), counts.tolist()))  # R42-4
+        return policy, inputs  # R42-4
+
+
+def segments(conn: Any) -> Tuple[Segment, ...]:  # R42-2: 登録済みのセグメント（first_id 順。登録が増えていれば読み直す）
+    key = db_key()  # R30-1
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM steps_archive").fetchone()[0]  # R42-2: 追記のみなので最大idで判定できる
+    cached = _registries.get(key)  # R42-2
+    if cached is not None and cached[0] == max_id:  # R42-2: 変化なし（大半の呼び出し）
+        return cached[1]  # R42-2
+    with _lock:  # R42-2
+        old = {s.name: s for s in (cached[1] if cached else ())}  # R42-2: 開いた mmap は使い回す
+        root = archive_dir()  # R42-1
+        fresh = tuple(  # R42-2
+            old.get(name) or Segment(name, root / name, first_id, last_id, rows, lo, hi)  # R42-2
+            for name, first_id, last_id, rows, lo, hi in conn.execute(  # R42-2
+                "SELECT name, first_id, last_id, rows, min_created_at, max_created_at FROM steps_archive ORDER BY first_id"
+            )
+        )
+        _registries[key] = (max_id, fresh)  # R42-2
+    return fresh  # R42-2
+
+
+def read_row(conn: Any, step_id: int, columns: Sequence[str]) -> Optional[Tuple[Any, ...]]:  # R42-3: 移した行を1件（columns の順、無ければ None）
+    for seg in segments(conn):  # R42-3: 数十個まで
+        if seg.first_id <= step_id <= seg.last_id:  # R42-3
+            i = seg.find(step_id)  # R42-3
+            if i is not None:  # R42-3: 範囲が重なるセグメント（後から移した穴の行）もあり得るので続けて探す
+                return seg.row(i, columns)  # R42-3
+    return None  # R42-3
+
+
+def iter_archived_rows(  # R42-3: 条件に合う移した行を id 昇順に chunk_size 行ずつ（JSON_ROW_SELECT の順）
+    conn: Any,  # R42-3: 登録簿を読む接続（エクスポートと同じスナップショット）
+    template: Optional[str] = None,  # R14-2
+    pi_t: Optional[str] = None,  # R14-3
+    since: Optional[str] = None,  # R24-3
+    until: Optional[str] = None,  # R24-3
+    after_id: Optional[int] = None,  # R27-1
+    before_id: Optional[int] = None,  # R24-1
+    chunk_size: int = 1000,  # R27-1
+) -> Iterator[List[Tuple[Any, ...]]]:
+    picked = [  # R42-3: first_id 順
+        seg for seg in segments(conn)
+        if not ((since and seg.max_created_at < since) or (until and seg.min_created_at >= until))  # R42-3: 期間外のセグメントは開かない
+        and not ((after_id is not None and seg.last_id <= after_id) or (before_id is not None and seg.first_id >= before_id))  # R24-1
+    ]
+    filters = (template, pi_t, after_id, before_id, since, until)  # R42-3
+    chunks = [_segment_chunks(seg, filters, chunk_size) for seg in picked]  # R42-3: 開くのは読み始めたとき
+    if all(a.last_id < b.first_id for a, b in zip(picked, picked[1:])):  # R42-3: 範囲が重ならない（1回の archive_steps の続き）→ 順に読むだけ
+        for it in chunks:  # R42-3
+            yield from it  # R42-3
+        return  # R42-3
+    merged = heapq.merge(*(chain.from_iterable(it) for it in chunks), key=itemgetter(0))  # R42-3: 後の実行が古い時刻の穴の行を移した → id で混ぜる
+    while True:  # R42-3
+        rows = list(islice(merged, chunk_size))  # R42-3
+        if not rows:  # R42-3
+            return  # R42-3
+        yield rows  # R42-3
+
+
+def _segment_chunks(seg: Segment, filters: Tuple[Any, ...], chunk_size: int) -> Iterator[List[Tuple[Any, ...]]]:  # R42-3: 1セグメントの該当行
+    idx = seg.select(*filters)  # R42-3
+    for i in range(0, len(idx), chunk_size):  # R42-3
+        yield seg.rows_at(idx[i:i + chunk_size])  # R42-3
+
+
+@dataclass
+class ArchiveReport:  # R42-1: 移動の進捗/結果
+    before: str  # R42-1: この created_at より古い行を移した
+    segments: int = 0  # R42-1
+    rows: int = 0  # R42-1
+    bytes: int = 0  # R42-1: 書いたセグメントの大きさ
+    last_id: int = 0  # R42-1
+
+
+def _fetch(conn: Any, table: str, before: str, limit: int) -> List[Tuple[Any, ...]]:  # R42-1: 古い順に limit 行（JSON_ROW_SELECT の順）
+    if table == "steps_compact":  # R29-1: そのまま
+        return conn.execute(  # R42-1
+            f"SELECT {', '.join(JSON_ROW_SELECT)} FROM steps_compact WHERE created_at < ? ORDER BY id LIMIT ?", (before, limit)
+        ).fetchall()
+    rows = conn.execute(  # R42-1: json レイアウトは数値列に直す（migrate_steps と同じ変換）
+        "SELECT id, created_at, template_id, s_t_json, o_t_json, pi_t, o_t1_pred_json, notes_json FROM steps "
+        "WHERE created_at < ? ORDER BY id LIMIT ?",
+        (before, limit),  # R42-1
+    ).fetchall()
+    return [  # R29-4
+        (r[0], *compact_values(conn, r[1], r[2], _loads(r[3], {}), _loads(r[4], {}), r[5], _loads(r[6], {}), _loads(r[7], [])))
+        for r in rows  # R29-4
+    ]
+
+
+def _save(path: Path, arr: Any) -> int:  # R42-1: .npy を書いて fsync する（元の行を消す前にディスクへ）
+    with open(path, "wb") as f:  # R42-1
+        np.save(f, arr, allow_pickle=False)  # R42-1: object 配列は書かない（mmap で開けない）
+        f.flush()  # R42-1
+        os.fsync(f.fileno())  # R42-1
+    return path.stat().st_size  # R42-1
+
+
+def _fsync_dir(path: Path) -> None:  # R42-1: rename を確定させる
+    fd = os.open(path, os.O_RDONLY)  # R42-1
+    try:  # R42-1
+        os.fsync(fd)  # R42-1
+    finally:  # R42-1
+        os.close(fd)  # R42-1
+
+
+def _write_segment(root: Path, rows: Sequence[Tuple[Any, ...]]) -> Tuple[Segment, int]:  # R42-1: 行→列ファイル（一時ディレクトリに書いて rename）
+    cols = dict(zip(JSON_ROW_SELECT, zip(*rows)))  # R42-1: 列名→値の並び
+    name = f"{rows[0][0]:012d}-{rows[-1][0]:012d}"  # R42-1: id の範囲（ls で並ぶ）
+    tmp = root / f".tmp-{name}"  # R42-1
+    shutil.rmtree(tmp, ignore_errors=True)  # R42-1: 前回の書きかけ
+    tmp.mkdir(parents=True)  # R42-1
+    meta: Dict[str, Any] = {"format": ARCHIVE_FORMAT, "rows": len(rows), "nulls": {}, "dicts": {}, "blobs": {}}  # R42-1
+    size = 0  # R42-1
+    size += _save(tmp / "id.npy", np.array(cols["id"], dtype=np.int64))  # R42-1: 主キーは int64 のまま（狭い型だと searchsorted が毎回配列全体を変換する）
+    for c in INT_COLUMNS[1:]:  # R42-1
+        dtype, null = _int_dtype(cols[c])  # R42-1
+        meta["nulls"][c] = null  # R42-1
+        size += _save(tmp / f"{c}.npy", np.array([null if v is None else v for v in cols[c]], dtype=dtype))  # R42-1
+    for c in TEXT_COLUMNS:  # R42-1
+        encoded = [v.encode("utf-8") for v in cols[c]]  # R42-1
+        size += _save(tmp / f"{c}.npy", np.array(encoded, dtype=f"S{max(map(len, encoded))}"))  # R42-1
+    for c in CODED_COLUMNS:  # R42-1
+        table: Dict[Any, int] = {}  # R42-1: 値→符号（初出順）
+        codes = [table.setdefault(v, len(table)) for v in cols[c]]  # R42-1
+        meta["dicts"][c] = list(table)  # R42-1: None（p_policy）は JSON の null
+        size += _save(tmp / f"{c}.npy", np.array(codes, dtype=_code_dtype(len(table))))  # R42-1
+    for c in BLOB_COLUMNS:  # R42-1
+        present = [(i, bytes(v)) for i, v in enumerate(cols[c]) if v]  # R42-1
+        meta["blobs"][c] = len(present)  # R42-1
+        if present:  # R42-1
+            offsets = np.cumsum([0] + [len(b) for _, b in present], dtype=np.int64)  # R42-1
+            size += _save(tmp / f"{c}.rows.npy", np.array([i for i, _ in present], dtype=np.int64))  # R42-1
+            size += _save(tmp / f"{c}.offsets.npy", offsets)  # R42-1
+            size += _save(tmp / f"{c}.data.npy", np.frombuffer(b"".join(b for _, b in present), dtype=np.uint8))  # R42-1
+    (tmp / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")  # R42-1
+    _fsync_dir(tmp)  # R42-1
+    final = root / name  # R42-1
+    shutil.rmtree(final, ignore_errors=True)  # R42-1: 登録されずに残った同名のセグメント
+    os.rename(tmp, final)  # R42-1
+    _fsync_dir(root)  # R42-1
+    created = cols["created_at"]  # R42-1
+    return Segment(name, final, rows[0][0], rows[-1][0], len(rows), min(created), max(created)), size  # R42-1
+
+
+def _remove_orphans(conn: Any, root: Path) -> None:  # R42-1: 登録前に落ちた書き出しを消す
+    known = {name for (name,) in conn.execute("SELECT name FROM steps_archive")}  # R42-1
+    for path in root.iterdir():  # R42-1
+        if path.is_dir() and path.name not in known:  # R42-1
+            shutil.rmtree(path)  # R42-1
+
+
+def archive_steps(  # R42-1: created_at が before より古い行をセグメントへ移して消す（各セグメントは1トランザクション。中断しても続きから）
+    before: str,  # R42-1: 正規化済みISO（normalize_created_at）
+    segment_rows: int = DEFAULT_SEGMENT_ROWS,  # R42-1
+    vacuum: bool = False,  # R42-1: 終わったら VACUUM してファイルを縮める
+    progress: Optional[Callable[[ArchiveReport], None]] = None,  # R42-1: セグメント毎に呼ぶ
+) -> ArchiveReport:
+    _require_numpy()  # R42-1
+    report = ArchiveReport(before=before)  # R42-1
+    root = archive_dir()  # R42-1
+    root.mkdir(parents=True, exist_ok=True)  # R42-1
+    with session() as conn:  # R20-2
+        _remove_orphans(conn, root)  # R42-1
+        table = steps_table()  # R29-1: 現在のレイアウトの行だけ移す
+        while True:  # R42-1
+            rows = _fetch(conn, table, before, max(1, segment_rows))  # R42-1
+            if not rows:  # R42-1
+                break  # R42-1
+            conn.commit()  # R29-2: json レイアウトで note_sets に足した分（ファイルを書く間は書き込みロックを持たない）
+            seg, size = _write_segment(root, rows)  # R42-1
+            conn.execute(  # R42-1: 登録と削除を同じトランザクションで
+                "INSERT INTO steps_archive (name, first_id, last_id, rows, min_created_at, max_created_at, archived_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (seg.name, seg.first_id, seg.last_id, seg.rows, seg.min_created_at, seg.max_created_at,
+                 datetime.now(timezone.utc).isoformat()),  # R42-1
+            )
+            deleted = conn.execute(  # R42-1: 読んだ行と同じ集合（新しい行は last_id より大きい）
+                f"DELETE FROM {table} WHERE id >= ? AND id <= ? AND created_at < ?", (seg.first_id, seg.last_id, before)
+            ).rowcount
+            if deleted != seg.rows:  # R42-1: 読んだ後に書き換えられた（replay/migrate と同時に流した）
+                conn.rollback()  # R42-1
+                shutil.rmtree(seg.path, ignore_errors=True)  # R42-1
+                raise RuntimeError(f"steps {seg.first_id}..{seg.last_id} changed while archiving ({deleted} rows deleted, {seg.rows} written); rerun")
+            conn.commit()  # R42-1: ここで読み手は SQLite 側の代わりにセグメントを見る（集計表と steps_epoch はそのまま）
+            report.segments += 1  # R42-1
+            report.rows += seg.rows  # R42-1
+            report.bytes += size  # R42-1
+            report.last_id = seg.last_id  # R42-1
+            if progress is not None:  # R42-1
+                progress(report)  # R42-1
+        if vacuum and report.rows:  # R42-1: 空いたページは次の INSERT で再利用されるので、縮めたいときだけ
+            conn.execute("VACUUM")  # R29-4: トランザクション外で実行する
+    return report  # R42-1
+
+
+def archive_status() -> Dict[str, Any]:  # R42-1: flask steps archive --status
+    with session() as conn:  # R20-2
+        row = conn.execute(  # R42-1
+            "SELECT COUNT(*), COALESCE(SUM(rows), 0), MIN(min_created_at), MAX(max_created_at), MAX(last_id) FROM steps_archive"
+        ).fetchone()
+    return {"dir": str(archive_dir()), "segments": row[0], "rows": row[1], "oldest": row[2], "newest": row[3], "last_id": row[4]}  # R42-1
@@ -0,0 +1,159 @@
+from __future__ import annotations  # R32-0: 前方参照を安定させる
+
+import hashlib  # R32-3: 描画結果から ETag を作る
+import threading  # R32-1: 複数スレッドから引く
+import time  # R32-1: TTL/世代確認の間隔
+from collections import OrderedDict  # R32-1: LRU
+from dataclasses import dataclass  # R32-3: 描画済みページ
+from datetime import datetime, timezone  # R32-3: Last-Modified
+from typing import Any, Dict, Hashable, Optional, Tuple  # R32-0: 最小型を明示する
+
+from app.storage.db import db_key, read_steps_epoch, session, steps_table  # R32-1: キーと世代
+from app.storage.repository import StepRow, read_step  # R32-2: キャッシュに無いときの読み取り
+
+# R32-1: 保存済みの step は save_step 後に変わらないので、行と描画済みページをプロセス内に持つ。
+# R32-1: 例外は replay（update）と migrate だけで、どちらも steps_epoch を1つ進める。
+# R32-1: キャッシュは epoch_check 秒毎に steps_epoch を読み、変わっていれば全て捨てる（別プロセスの書き換えも拾う）。
+
+
+@dataclass(frozen=True)
+class CachedPage:  # R32-3: 描画済みページと検証子
+    body: str  # R32-3
+    etag: str  # R32-3: 本文のハッシュ（replay で内容が変われば変わる）
+    last_modified: datetime  # R32-3: created_at と最後の書き換え時刻の新しい方
+
+
+class StepCache:  # R32-1: 上限付き LRU＋TTL（ヒット/ミスを数える）
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0, epoch_check: float = 1.0) -> None:
+        self.max_entries = max(0, int(max_entries))  # R32-1: 0 なら無効
+        self.ttl = float(ttl)  # R32-1: 0以下なら期限なし
+        self.epoch_check = float(epoch_check)  # R32-1: 0 なら毎回確認する
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()  # R32-1: キー→(期限, 値)
+        self._lock = threading.Lock()  # R32-1
+        self._epoch: Optional[Tuple[Hashable, Tuple[int, str]]] = None  # R32-1: (DB/表, 確認した世代)
+        self._epoch_checked = 0.0  # R32-1: 最後に確認した時刻
+        self.hits = 0  # R32-4
+        self.misses = 0  # R32-4
+        self.evictions = 0  # R32-4: 上限/TTL で捨てた数
+        self.invalidations = 0  # R32-4: 書き換えを検知して全消しした回数
+
+    @property
+    def enabled(self) -> bool:  # R32-1
+        return self.max_entries > 0  # R32-1
+
+    def get(self, key: Hashable, count_miss: bool = True) -> Optional[Any]:  # R32-1: 値を返す（無い/期限切れなら None。R32-6: count_miss=False ならミスは数えない）
+        if not self.enabled:  # R32-1
+            return None  # R32-1
+        self._sync_epoch()  # R32-1: 書き換えがあれば先に捨てる
+        now = time.monotonic()  # R32-1
+        with self._lock:  # R32-1
+            item = self._entries.get(key)  # R32-1
+            if item is not None and (self.ttl <= 0 or item[0] > now):  # R32-1: 有効
+                self._entries.move_to_end(key)  # R32-1: 最近使った側へ
+                self.hits += 1  # R32-4
+                return item[1]  # R32-1
+            if item is not None:  # R32-1: 期限切れ
+                del self._entries[key]  # R32-1
+                self.evictions += 1  # R32-4
+            if count_miss:  # R32-6: 続けて行を引く呼び出し側は、そちらのヒット/ミスだけ数える
+                self.misses += 1  # R32-4
+            return None  # R32-1
+
+    def put(self, key: Hashable, value: Any) -> Any:  # R32-1: 値を入れて返す（溢れたら古い順に捨てる）
+        if not self.enabled:  # R32-1
+            return value  # R32-1
+        with self._lock:  # R32-1
+            self._entries[key] = (time.monotonic() + self.ttl, value)  # R32-1
+            self._entries.move_to_end(key)  # R32-1
+            while len(self._entries) > self.max_entries:  # R32-1
+                self._entries.popitem(last=False)  # R32-1: 最も長く使っていないもの
+                self.evictions += 1  # R32-4
+        return value  # R32-1
+
+    def clear(self) -> None:  # R32-1: 全て捨てる
+        with self._lock:  # R32-1
+            self._entries.clear()  # R32-1
+
+    def stats(self) -> Dict[str, Any]:  # R32-4: 観測用
+        with self._lock:  # R32-4
+            size = len(self._entries)  # R32-4
+        total = self.hits + self.misses  # R32-4
+        return {  # R32-4
+            "size": size,  # R32-4
+            "max_entries": self.max_entries,  # R32-4
+            "hits": self.hits,  # R32-4
+            "misses": self.misses,  # R32-4
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,  # R32-4
+            "evictions": self.evictions,  # R32-4
+            "invalidations": self.invalidations,  # R32-4
+            "epoch": self._epoch[1][0] if self._epoch else None,  # R32-4
+        }
+
+    def epoch(self) -> Tuple[int, str]:  # R32-3: 今の世代（確認間隔内なら覚えている値）
+        self._sync_epoch()  # R32-3
+        current = self._epoch  # R32-3
+        return current[1] if current else (0, "")  # R32-3
+
+    def _sync_epoch(self) -> None:  # R32-1: steps_epoch が変わっていたら全て捨てる
+        now = time.monotonic()  # R32-1
+        where = (db_key(), steps_table())  # R32-1: 別DB/別レイアウトに切り替えた場合も捨てる
+        current = self._epoch  # R32-1
+        if current is not None and current[0] == where and now - self._epoch_checked < self.epoch_check:  # R32-1: 確認したばかり
+            return  # R32-1
+        with session() as conn:  # R32-1: 1行読むだけ
+            seen = (where, read_steps_epoch(conn))  # R32-1
+        with self._lock:  # R32-1
+            if self._epoch is not None and self._epoch != seen:  # R32-1: 書き換えられた
+                self._entries.clear()  # R32-1
+                self.invalidations += 1  # R32-4
+            self._epoch = seen  # R32-1
+            self._epoch_checked = now  # R32-1
+
+
+_cache = StepCache()  # R32-1: プロセス内で共有する（init_app で設定を反映）
+
+
+def init_app(app: Any) -> None:  # R32-1: STEPS_CACHE_* を反映する
+    global _cache  # R32-1
+    _cache = StepCache(  # R32-1: 作り直す（前のアプリの内容を持ち越さない）
+        max_entries=app.config.get("STEPS_CACHE_SIZE", 1024),  # R32-1
+        ttl=app.config.get("STEPS_CACHE_TTL", 300.0),  # R32-1
+        epoch_check=app.config.get("STEPS_CACHE_EPOCH_CHECK", 1.0),  # R32-1
+    )
+
+
+def get_step_cache() -> StepCache:  # R32-4: 統計を読む/テストで捨てる
+    return _cache  # R32-4
+
+
+def read_step_cached(step_id: int) -> Optional[StepRow]:  # R32-2: read_step（全列）のキャッシュ版
+    key = ("step", int(step_id))  # R32-2
+    step = _cache.get(key)  # R32-2
+    if step is None:  # R32-2: 無い id は覚えない（後から保存され得る）
+        step = read_step(step_id)  # R32-2
+        if step is not None:  # R32-2
+            _cache.put(key, step)  # R32-2
+    return step  # R32-2
+
+
+def get_page(kind: str, step_id: int) -> Optional[CachedPage]:  # R32-3: 描画済みページ（無ければ None）
+    return _cache.get(("page", kind, int(step_id)), count_miss=False)  # R32-6: ミスの後は read_step_cached が数える（1リクエストで1回）
+
+
+def put_page(kind: str, step: StepRow, body: str) -> CachedPage:  # R32-3: 描画結果を検証子と一緒に覚える
+    changed_at = _cache.epoch()[1]  # R32-3: 最後に replay/migrate した時刻
+    stamps = [_parse_time(step.get("created_at")), _parse_time(changed_at)]  # R32-3
+    page = CachedPage(  # R32-3
+        body=body,  # R32-3
+        etag=hashlib.sha1(body.encode("utf-8")).hexdigest()[:20],  # R32-3
+        last_modified=max(t for t in stamps if t is not None) if any(stamps) else datetime.now(timezone.utc),  # R32-3
+    )
+    return _cache.put(("page", kind, int(step["id"])), page)  # R32-3
+
+
+def _parse_time(raw: Any) -> Optional[datetime]:  # R32-3: 保存済みのISO時刻（壊れていれば None）
+    try:  # R32-3
+        t = datetime.fromisoformat(str(raw))  # R32-3
+    except ValueError:  # R32-3
+        return None  # R32-3
+    return (t if t.tzinfo else t.replace(tzinfo=timezone.utc)).replace(microsecond=0)  # R32-3: HTTP の日付は秒単位
@@ -0,0 +1,291 @@
+from __future__ import annotations  # R29-0: 前方参照を安定させる
+
+import json  # R29-2: notes 辞書のキー / JSONレイアウトとの変換
+from dataclasses import dataclass  # R29-4: 移行結果を構造体で返す
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple  # R29-0: 最小型を明示する
+
+try:  # R29-3: msgpack は任意依存（無ければ extras をJSONで持つ）
+    import msgpack  # R29-3: 自由形式の extras を小さく詰める
+except ImportError:  # pragma: no cover - R29-3: 未インストールでも compact レイアウトは使える
+    msgpack = None
+
+from app.storage.db import STORAGE_FORMATS, bump_steps_epoch, db_key, run_write, session  # R29-4: 移行はプール接続で行う（R28-6: チャンクは BEGIN IMMEDIATE＋再試行）
+
+# R29-1: (辞書名, キー, 列) — 境界テンプレの既知項目。int 以外の値や未知のキーは extras に入る
+INPUT_FIELDS: Tuple[Tuple[str, str, str], ...] = (
+    ("s_t", "energy", "s_energy"),  # R29-1
+    ("o_t", "threat", "o_threat"),  # R29-1
+    ("o_t", "body_alarm", "o_body_alarm"),  # R29-1
+    ("o_t", "need_clarity", "o_need_clarity"),  # R29-1
+    ("o_t", "energy", "o_energy"),  # R29-1
+)
+OUTPUT_FIELDS: Tuple[Tuple[str, str, str], ...] = (
+    ("o_t1_pred", "predicted_threat", "p_threat"),  # R29-1
+    ("o_t1_pred", "predicted_body_alarm", "p_body_alarm"),  # R29-1
+)
+
+COMPACT_COLUMNS: Tuple[str, ...] = (  # R29-1: INSERT する列（id 以外）
+    "created_at", "template_id", "pi_t",
+    *(c for _, _, c in INPUT_FIELDS), "extras_in",
+    "p_policy", *(c for _, _, c in OUTPUT_FIELDS), "notes_id", "extras_out",
+)
+COMPACT_INSERT_SQL = (  # R29-1
+    f"INSERT INTO steps_compact ({', '.join(COMPACT_COLUMNS)}) VALUES ({', '.join('?' * len(COMPACT_COLUMNS))})"
+)
+COMPACT_SOURCES: Dict[str, Tuple[str, ...]] = {  # R29-1: 論理列→読む必要のある列
+    "s_t": ("s_energy", "extras_in"),  # R29-1
+    "o_t": tuple(c for s, _, c in INPUT_FIELDS if s == "o_t") + ("extras_in",),  # R29-1
+    "o_t1_pred": ("pi_t", "p_policy") + tuple(c for _, _, c in OUTPUT_FIELDS) + ("extras_out",),  # R29-1
+    "notes": ("notes_id",),  # R29-2
+}
+O_T_COLUMN: Dict[str, str] = {k: c for s, k, c in INPUT_FIELDS if s == "o_t"}  # R29-1: o_t キー→列
+
+
+def pack_extras(extras: Mapping[str, Any]) -> Optional[bytes]:  # R29-3: 先頭1バイトで形式を示す（M=msgpack, J=JSON）
+    if not extras:  # R29-3: 大半の行は NULL
+        return None  # R29-3
+    if msgpack is not None:  # R29-3
+        return b"M" + msgpack.packb(dict(extras), use_bin_type=True)  # R29-3
+    return b"J" + json.dumps(dict(extras), ensure_ascii=False).encode("utf-8")  # R29-3
+
+
+def unpack_extras(blob: Optional[bytes]) -> Dict[str, Any]:  # R29-3: pack_extras の逆
+    if not blob:  # R29-3
+        return {}  # R29-3
+    if blob[:1] == b"M":  # R29-3
+        if msgpack is None:  # pragma: no cover - R29-3: msgpack で書いたDBを msgpack 無しで読んだ
+            raise RuntimeError("steps_compact extras were written with msgpack (poetry install -E compact)")
+        return msgpack.unpackb(blob[1:], raw=False)  # R29-3
+    return json.loads(bytes(blob[1:]).decode("utf-8"))  # R29-3
+
+
+def _split(sections: Mapping[str, Mapping[str, Any]], spec: Sequence[Tuple[str, str, str]]) -> Tuple[List[Optional[int]], Optional[bytes]]:  # R29-1: 既知の整数は列へ、残りは extras へ
+    values: List[Optional[int]] = []  # R29-1
+    taken = set()  # R29-1: 列に入れた (辞書名, キー)
+    for section, key, _ in spec:  # R29-1
+        v = sections[section].get(key)  # R29-1
+        if type(v) is int:  # R29-1: bool/float/文字列は型を保つため extras へ
+            values.append(v)  # R29-1
+            taken.add((section, key))  # R29-1
+        else:  # R29-1: 無い（NULL）か extras
+            values.append(None)  # R29-1
+    extras = {}  # R29-3
+    for section, d in sections.items():  # R29-3
+        rest = {k: v for k, v in d.items() if (section, k) not in taken}  # R29-3
+        if rest:  # R29-3
+            extras[section] = rest  # R29-3
+    return values, pack_extras(extras)  # R29-3
+
+
+class _NoteSets:  # R29-2: note_sets 表の写し（DBファイル毎）
+    __slots__ = ("by_id", "json_by_id", "by_notes", "max_id")  # R29-2
+
+    def __init__(self) -> None:  # R29-2
+        self.by_id: Dict[int, Tuple[str, ...]] = {}  # R29-2: id→notes
+        self.json_by_id: Dict[int, str] = {}  # R29-2: id→保存済みJSON（エクスポートで再JSON化しない）
+        self.by_notes: Dict[Tuple[str, ...], int] = {}  # R29-2: notes→id
+        self.max_id = 0  # R29-2: 読み込み済みの最大id
+
+
+_note_cache: Dict[str, _NoteSets] = {}  # R29-2: DBパス→写し
+
+
+def load_note_sets(conn: Any) -> _NoteSets:  # R29-2: 読み出し用（増えていれば読み直す）
+    key = db_key()  # R30-1: ensure_schema と同じキー
+    cache = _note_cache.get(key)  # R29-2
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM note_sets").fetchone()[0]  # R29-2: 追記のみなので最大idで判定できる
+    if cache is not None and cache.max_id == max_id:  # R29-2: 変化なし
+        return cache  # R29-2
+    fresh = _NoteSets()  # R29-2: 丸ごと作り直して差し替える（読み手は古い写しのまま安全に使える）
+    for note_id, text in conn.execute("SELECT id, notes_json FROM note_sets"):  # R29-2: 数十行
+        notes = tuple(json.loads(text))  # R29-2
+        fresh.by_id[note_id] = notes  # R29-2
+        fresh.json_by_id[note_id] = text  # R29-2
+        fresh.by_notes[notes] = note_id  # R29-2
+    fresh.max_id = max_id  # R29-2
+    _note_cache[key] = fresh  # R29-2
+    return fresh  # R29-2
+
+
+def note_set_id(conn: Any, notes: Sequence[str]) -> int:  # R29-2: notes の辞書ID（無ければ登録する。コミットは呼び出し側）
+    key = tuple(notes)  # R29-2
+    cache = _note_cache.get(db_key()) or load_note_sets(conn)  # R29-2: 初回だけ表を読む
+    if key in cache.by_notes:  # R29-2: 通常はここで終わる
+        return cache.by_notes[key]  # R29-2
+    text = json.dumps(list(key), ensure_ascii=False)  # R4-1: save_step と同じJSON化
+    conn.execute("INSERT OR IGNORE INTO note_sets (notes_json) VALUES (?)", (text,))  # R29-2: 並行登録でも1行
+    note_id = int(conn.execute("SELECT id FROM note_sets WHERE notes_json = ?", (text,)).fetchone()[0])  # R29-2
+    cache.by_notes[key] = note_id  # R29-2: 次回から引けるようにする（max_id は据え置き＝次の読み出しで読み直す）
+    return note_id  # R29-2
+
+
+def compact_values(  # R29-1: 1行分を COMPACT_COLUMNS の順の値にする
+    conn: Any,  # R29-2: notes 登録用
+    created_at: str,  # R4-1
+    template_id: str,  # R4-2
+    s_t: Mapping[str, Any],  # R4-2
+    o_t: Mapping[str, Any],  # R4-2
+    pi_t: str,  # R4-2
+    o_t1_pred: Mapping[str, Any],  # R4-2
+    notes: Sequence[str],  # R4-2
+) -> Tuple[Any, ...]:
+    inputs, extras_in = _split({"s_t": s_t, "o_t": o_t}, INPUT_FIELDS)  # R29-1
+    return (created_at, template_id, pi_t, *inputs, extras_in, *encode_outputs(conn, pi_t, o_t1_pred, notes))  # R29-1
+
+
+def encode_outputs(conn: Any, pi_t: str, o_t1_pred: Mapping[str, Any], notes: Sequence[str]) -> Tuple[Any, ...]:  # R29-1: (p_policy, p_*, notes_id, extras_out)
+    pred = dict(o_t1_pred)  # R29-1
+    policy = pred.get("predicted_policy")  # R29-1
+    if policy == pi_t:  # R29-1: simulate_step は常に pi_t と同じ → NULL
+        p_policy: Optional[str] = None  # R29-1
+        del pred["predicted_policy"]  # R29-1
+    elif isinstance(policy, str):  # R29-1: 別の方策
+        p_policy = policy  # R29-1
+        del pred["predicted_policy"]  # R29-1
+    else:  # R29-1: キー無し（値が文字列以外なら extras に残る）
+        p_policy = ""  # R29-1: 空文字＝predicted_policy を持たない
+    outputs, extras_out = _split({"o_t1_pred": pred}, OUTPUT_FIELDS)  # R29-1
+    return (p_policy, *outputs, note_set_id(conn, notes), extras_out)  # R29-2
+
+
+class CompactDecoder:  # R29-1: 選択した列の位置から辞書を組み立てる
+    def __init__(self, pos: Mapping[str, int], note_sets: Optional[_NoteSets], o_t_keys: Optional[Sequence[str]] = None) -> None:  # R29-1
+        self._pos = pos  # R29-1: 列名→位置
+        self._notes = note_sets  # R29-2
+        keys = None if o_t_keys is None else set(o_t_keys)  # R26-3: 一部キーだけ
+        self._o_t_keys = keys  # R26-3
+        self._s = tuple((k, pos[c]) for s, k, c in INPUT_FIELDS if s == "s_t" and c in pos)  # R29-1
+        self._o = tuple((k, pos[c]) for s, k, c in INPUT_FIELDS if s == "o_t" and c in pos and (keys is None or k in keys))  # R29-1
+        self._p = tuple((k, pos[c]) for _, k, c in OUTPUT_FIELDS if c in pos)  # R29-1
+
+    def _section(self, row: Any, pairs: Tuple[Tuple[str, int], ...], extras_col: str, section: str) -> Dict[str, Any]:  # R29-1
+        d = {k: row[i] for k, i in pairs if row[i] is not None}  # R29-1: NULL＝キー無し
+        blob = row[self._pos[extras_col]]  # R29-3
+        if blob:  # R29-3: 稀
+            d.update(unpack_extras(blob).get(section, {}))  # R29-3
+        return d  # R29-1
+
+    def s_t(self, row: Any) -> Dict[str, Any]:  # R29-1
+        return self._section(row, self._s, "extras_in", "s_t")  # R29-1
+
+    def o_t(self, row: Any) -> Dict[str, Any]:  # R29-1
+        d = self._section(row, self._o, "extras_in", "o_t")  # R29-1
+        if self._o_t_keys is not None:  # R26-3: extras 由来の余分なキーを落とす
+            d = {k: v for k, v in d.items() if k in self._o_t_keys}  # R26-3
+        return d  # R29-1
+
+    def o_t1_pred(self, row: Any) -> Dict[str, Any]:  # R29-1: simulate_step と同じキー順で返す
+        p_policy = row[self._pos["p_policy"]]  # R29-1
+        d: Dict[str, Any] = {}  # R29-1
+        if p_policy is None:  # R29-1: pi_t と同じ
+            d["predicted_policy"] = row[self._pos["pi_t"]]  # R29-1
+        elif p_policy:  # R29-1: 別の方策
+            d["predicted_policy"] = p_policy  # R29-1
+        d.update(self._section(row, self._p, "extras_out", "o_t1_pred"))  # R29-1
+        return d  # R29-1
+
+    def notes(self, row: Any) -> List[str]:  # R29-2
+        return list(self._notes.by_id.get(row[self._pos["notes_id"]], ()))  # R29-2: 呼び出し毎に新しいリスト
+
+    def notes_json(self, row: Any) -> str:  # R29-2: 保存済みJSONをそのまま返す
+        return self._notes.json_by_id.get(row[self._pos["notes_id"]], "[]")  # R29-2
+
+    def decoders(self) -> Dict[str, Callable[[Any], Any]]:  # R29-1: StepRow 用（論理列→復元関数）
+        return {"s_t": self.s_t, "o_t": self.o_t, "o_t1_pred": self.o_t1_pred, "notes": self.notes}  # R29-1
+
+
+JSON_ROW_SELECT: Tuple[str, ...] = ("id",) + COMPACT_COLUMNS  # R29-4: JSONレイアウトの行に戻すときに読む列
+
+
+def json_row_converter(conn: Any) -> Callable[[Any], Tuple[Any, ...]]:  # R29-4: JSON_ROW_SELECT の行→steps の列順（JSON文字列）
+    dec = CompactDecoder({c: i for i, c in enumerate(JSON_ROW_SELECT)}, load_note_sets(conn))  # R29-4
+    dumps = json.dumps  # R29-4
+    memo: Dict[Tuple[Any, ...], Tuple[str, str, str, str]] = {}  # R29-4: 値の組→JSON列（境界テンプレは数百通りしかない）
+
+    def convert(r: Any) -> Tuple[Any, ...]:  # R29-4: (id, created_at, template_id, s_t_json, o_t_json, pi_t, o_t1_pred_json, notes_json)
+        key = tuple(r[3:])  # R29-4: id/created_at/template_id 以外
+        cols = memo.get(key)  # R29-4
+        if cols is None:  # R29-4: 初出の組だけJSON化する
+            if len(memo) >= 4096:  # R29-4: extras の多いDBでも上限を保つ
+                memo.clear()  # R29-4
+            cols = memo[key] = (  # R29-4
+                dumps(dec.s_t(r), ensure_ascii=False), dumps(dec.o_t(r), ensure_ascii=False),  # R4-1
+                dumps(dec.o_t1_pred(r), ensure_ascii=False), dec.notes_json(r),  # R4-1
+            )
+        return (r[0], r[1], r[2], cols[0], cols[1], r[3], cols[2], cols[3])  # R29-4
+    return convert  # R29-4
+
+
+@dataclass
+class MigrationReport:  # R29-4: 移行の進捗/結果
+    source: str  # R29-4
+    target: str  # R29-4
+    copied: int = 0  # R29-4
+    last_id: int = 0  # R29-4
+
+
+def _loads(text: str, default: Any) -> Any:  # R6-3: 壊れたJSONは既定値
+    try:  # R6-3
+        return json.loads(text)  # R6-3
+    except ValueError:  # R6-3
+        return default  # R6-3
+
+
+def migrate_steps(  # R29-4: 既存の行を別レイアウトの表へ id を保ったまま写す（中断しても続きから）
+    to: str = "compact",  # R29-4: 移行先 "compact" / "json"
+    chunk_size: int = 5000,  # R29-4: 1トランザクションの行数
+    drop_source: bool = False,  # R29-4: 写し終えたら元の行を消して VACUUM する
+    progress: Optional[Callable[[MigrationReport], None]] = None,  # R29-4: チャンク毎に呼ぶ
+) -> MigrationReport:
+    if to not in STORAGE_FORMATS:  # R29-4
+        raise ValueError(f"unknown steps storage format: {to!r}")  # R29-4
+    src, dst = ("steps", "steps_compact") if to == "compact" else ("steps_compact", "steps")  # R29-4
+    report = MigrationReport(source=src, target=dst)  # R29-4
+    with session() as conn:  # R29-4
+        last = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {dst}").fetchone()[0]  # R29-4: 写し済みの続きから
+        if to == "compact":  # R29-4
+            select = f"SELECT id, created_at, template_id, s_t_json, o_t_json, pi_t, o_t1_pred_json, notes_json FROM {src}"  # R29-4
+            insert = f"INSERT OR IGNORE INTO steps_compact (id, {', '.join(COMPACT_COLUMNS)}) VALUES ({', '.join('?' * (len(COMPACT_COLUMNS) + 1))})"  # R29-4
+        else:  # R29-4
+            select = f"SELECT {', '.join(JSON_ROW_SELECT)} FROM {src}"  # R29-4
+            insert = (  # R29-4
+                "INSERT OR IGNORE INTO steps (id, created_at, template_id, s_t_json, o_t_json, pi_t, o_t1_pred_json, notes_json)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+            )
+
+    def copy(conn: Any) -> Tuple[int, int]:  # R28-6: 1チャンクを写して (行数, 最後のid) を返す（SQLITE_BUSY なら run_write がやり直す）
+        rows = conn.execute(f"{select} WHERE id > ? ORDER BY id LIMIT ?", (last, chunk_size)).fetchall()  # R29-4: 主キー範囲
+        if not rows:  # R29-4
+            conn.rollback()  # R28-6: 書き込みロックを返す
+            return 0, last  # R28-6
+        if to == "compact":  # R29-4: JSON→数値列
+            values = [  # R29-4
+                (r[0], *compact_values(conn, r[1], r[2], _loads(r[3], {}), _loads(r[4], {}), r[5], _loads(r[6], {}), _loads(r[7], [])))
+                for r in rows  # R29-4
+            ]
+        else:  # R29-4: 数値列→JSON
+            convert = json_row_converter(conn)  # R29-4
+            values = [convert(r) for r in rows]  # R29-4
+        conn.executemany(insert, values)  # R29-4
+        bump_steps_epoch(conn)  # R32-2: 移行先の行が変わる（キャッシュに知らせる）
+        conn.commit()  # R29-4: チャンク毎に確定（再実行は MAX(id) の続きから）
+        return len(rows), rows[-1][0]  # R28-6
+
+    def drop(conn: Any) -> None:  # R29-4: 元の表を空にする（R38-4: note_sets は json レイアウトの検索でも使うので残す）
+        conn.execute(f"DELETE FROM {src}")  # R29-4
+        bump_steps_epoch(conn)  # R32-2: 元の表の行が消える
+        conn.commit()  # R29-4
+
+    while True:  # R29-4
+        copied, last = run_write(copy)  # R28-6: 他のワーカーが書いていても busy_timeout 切れで失敗しない
+        if not copied:  # R29-4
+            break  # R29-4
+        report.copied += copied  # R29-4
+        report.last_id = last  # R29-4
+        if progress is not None:  # R29-4
+            progress(report)  # R29-4
+    if drop_source:  # R29-4: 元の表を空にしてファイルを縮める
+        run_write(drop)  # R28-6
+        with session() as conn:  # R29-4
+            conn.execute("VACUUM")  # R29-4: トランザクション外で実行する
+    return report  # R29-4
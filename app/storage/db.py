@@ -1,22 +1,351 @@
 from __future__ import annotations  # R4-3: 前方参照を安定させる
 
+import atexit  # R20-5: プロセス終了時にプール接続を閉じる
+import os  # R41-2: fork 後の子プロセスで親の接続を使わない
+import random  # R44-2: 再試行の待ちを散らす
 import sqlite3  # R4-4: SQLiteに接続する
+import threading  # R20-1: スキーマ初期化を直列化する
+import time  # R44-2: 再試行の待ち
+from contextlib import contextmanager  # R20-2: with文で接続を借りられるようにする
+from datetime import datetime, timezone  # R32-1: 書き換え時刻
 from pathlib import Path  # R4-4: instance/app.db のパスを安全に扱う
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Set, Tuple, TypeVar  # R20-0: 最小型を明示する
+from weakref import WeakSet  # R41-2: 作ったエンジン（Issue 側も含む）
+
+from flask import has_app_context  # R30-3: アプリコンテキスト外（書き込みスレッド等）ではプールから借りる
+import sqlalchemy as sa  # R30-1: Issue（Flask-SQLAlchemy）と steps で同じエンジン/プールを使う
+from sqlalchemy import event  # R30-2: 接続作成時にPRAGMAを流す
+from sqlalchemy.pool import NullPool  # R30-1: STEPS_DB_POOL=False（呼び出し毎に接続）
+
+from app import instrument  # R35-3: SQL の計測（無効時は接続をそのまま使う）
+
+
+DEFAULT_PRAGMAS: Dict[str, Any] = {  # R20-3: 長寿命接続に一度だけ適用するPRAGMA
+    "journal_mode": "WAL",  # R20-3: 読み書きを並行させる（ファイルに永続する）
+    "synchronous": "NORMAL",  # R20-3: WALではNORMALで十分（コミット毎のfsyncを減らす）
+    "cache_size": -16000,  # R20-3: ページキャッシュ約16MB（負値はKiB指定）
+    "mmap_size": 134217728,  # R20-3: 128MBまでmmapで読む
+    "temp_store": "MEMORY",  # R20-3: 一時テーブル/ソートをメモリで行う
+    "busy_timeout": 5000,  # R44-1: 他のプロセスが書いている間はSQLite側で最大5秒待つ（ミリ秒。0 なら即 SQLITE_BUSY）
+}
+
+_url: sa.URL = sa.make_url("sqlite:///instance/app.db")  # R30-1: 接続先（configure/init_appで差し替え可能）
+_pool_enabled: bool = True  # R20-4: Falseなら従来どおり呼び出し毎に接続する
+_pragmas: Dict[str, Any] = dict(DEFAULT_PRAGMAS)  # R20-3: 適用するPRAGMA
+_engine_options: Dict[str, Any] = {}  # R30-1: 自前でエンジンを作るときの create_engine 引数
+_engine: Optional[sa.Engine] = None  # R30-1: steps が使うエンジン（init_app では Flask-SQLAlchemy のもの）
+_orm_session: Any = None  # R30-3: エンジン共有時の Flask-SQLAlchemy のセッション（同じトランザクションを使う）
+
+STORAGE_FORMATS = ("json", "compact")  # R29-1: steps（JSON列）/ steps_compact（数値列＋notes辞書）
+_storage_format: str = "json"  # R29-1: 読み書きするレイアウト（既定は従来のJSON列）
+
+_engines: "WeakSet[sa.Engine]" = WeakSet()  # R41-2: make_engine で作ったエンジン（fork 後にプールを捨てる）
+
+_retries: int = 5  # R44-2: 書き込みトランザクションの試行回数（1 なら再試行しない）
+_retry_backoff: Tuple[float, float] = (0.01, 0.5)  # R44-2: 待ちの基準/上限（秒）。試行毎に倍にし、0〜その値で散らす
+_retry_stats: Dict[str, int] = {"retries": 0, "gave_up": 0}  # R44-2: このプロセスで再試行した回数/諦めた回数
+
+T = TypeVar("T")  # R44-2
+
+_db_key: Optional[str] = None  # R30-1: get_db_path().resolve() の結果（呼び出し毎に stat しない）
+_lock = threading.Lock()  # R20-1: スキーマ初期化用のロック
+_schema_ready: Set[str] = set()  # R20-2: スキーマ初期化済みのDBパス
 
 
 def get_db_path() -> Path:  # R4-4: DBファイルの場所を一箇所に固定する
-    return Path("instance") / "app.db"  # R4-4: 既存運用（instance/app.db）に合わせる
+    return Path(_url.database or "")  # R30-1: 接続先URLのファイル（既定は instance/app.db）
+
+
+def db_key() -> str:  # R30-1: 同じファイルは同じキー（スキーマ確保済み判定・notes 辞書の写しに使う）
+    global _db_key  # R30-1
+    key = _db_key  # R30-1
+    if key is None:  # R30-1: configure 後の初回だけ解決する
+        key = _db_key = str(get_db_path().resolve())  # R20-2
+    return key  # R30-1
+
+
+def get_storage_format() -> str:  # R29-1: 現在のレイアウト
+    return _storage_format  # R29-1
+
+
+def steps_table() -> str:  # R29-1: 現在のレイアウトの steps テーブル名
+    return "steps_compact" if _storage_format == "compact" else "steps"  # R29-1
+
+
+def _on_connect(dbapi_conn: sqlite3.Connection, _record: Any) -> None:  # R30-2: プールが新しい接続を作ったとき（Issue 側の接続も含む）
+    dbapi_conn.row_factory = sqlite3.Row  # R4-3: 取得結果を辞書風に扱えるようにする（SQLAlchemy は位置で読むので影響しない）
+    for name, value in _pragmas.items():  # R20-3: 設定順に適用する
+        dbapi_conn.execute(f"PRAGMA {name} = {value}")  # R20-3: PRAGMAはバインド不可なので直接埋め込む
+
+
+def _on_close(dbapi_conn: sqlite3.Connection, _record: Any) -> None:  # R30-2: プールが接続を閉じるとき
+    try:  # R20-5: 既に壊れていても落とさない
+        dbapi_conn.execute("PRAGMA optimize")  # R24-6: 使われたインデックスの統計を更新する（SQLite推奨の閉じ方）
+    except sqlite3.Error:  # R20-5
+        pass  # R20-5
+
+
+def make_engine(options: Mapping[str, Any]) -> sa.Engine:  # R30-1: エンジンを作る（Flask-SQLAlchemy の _make_engine からも呼ばれる）
+    opts = dict(options)  # R30-1: engine_from_config と同じ形（"url" とその他の引数）
+    url = sa.make_url(opts.pop("url"))  # R30-1
+    if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):  # R30-2: ファイルDB
+        Path(url.database).parent.mkdir(parents=True, exist_ok=True)  # R4-4: instance/ が無ければ作る
+        opts.setdefault("connect_args", {}).setdefault("check_same_thread", False)  # R20-1: プール接続はスレッドを渡り歩く
+        if "poolclass" not in opts:  # R30-2: QueuePool
+            opts.setdefault("pool_use_lifo", True)  # R30-2: 直近に返った接続（ページキャッシュが温かい）から使う
+    engine = sa.create_engine(url, **opts)  # R30-1
+    if url.get_backend_name() == "sqlite":  # R30-2: PRAGMA は SQLite だけ
+        event.listen(engine, "connect", _on_connect)  # R30-2
+        event.listen(engine, "close", _on_close)  # R30-2
+    _engines.add(engine)  # R41-2
+    return engine  # R30-1
+
+
+def _after_fork_in_child() -> None:  # R41-2: preload してから fork したワーカーは親のプール接続を引き継がない
+    for engine in list(_engines):  # R41-2
+        engine.dispose(close=False)  # R41-2: 親の接続は閉じずに手放す（閉じると親側の接続が壊れる）
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)  # R41-2
+
+
+def configure(  # R20-4: 接続先・プール有無・PRAGMAを設定する
+    db_path: Optional[str | Path] = None,  # R20-4: DBファイルのパス（url の代わり）
+    pool: Optional[bool] = None,  # R20-4: プールを使うか
+    pragmas: Optional[Mapping[str, Any]] = None,  # R20-3: 上書きするPRAGMA
+    storage_format: Optional[str] = None,  # R29-1: "json" / "compact"
+    url: Optional[str | sa.URL] = None,  # R30-1: 接続先URL（SQLite）
+    engine: Optional[sa.Engine] = None,  # R30-1: 既存のエンジンを使う（Flask-SQLAlchemy と共有）
+    orm_session: Any = None,  # R30-3: engine と組のセッション
+    engine_options: Optional[Mapping[str, Any]] = None,  # R30-1: 自前で作るときの引数
+    retries: Optional[int] = None,  # R44-2: 書き込みの試行回数
+    retry_backoff: Optional[Tuple[float, float]] = None,  # R44-2: (基準, 上限) 秒
+) -> None:
+    global _url, _db_key, _pool_enabled, _pragmas, _storage_format, _engine, _orm_session, _engine_options, _retries, _retry_backoff  # R20-4: モジュール設定を書き換える
+    if storage_format is not None and storage_format not in STORAGE_FORMATS:  # R29-1: 設定ミスは起動時に落とす
+        raise ValueError(f"unknown steps storage format: {storage_format!r}")  # R29-1
+    if engine is not None:  # R30-1
+        url = engine.url  # R30-1
+    elif db_path is not None:  # R20-4: パス指定がある場合
+        url = sa.URL.create("sqlite", database=str(db_path))  # R30-1
+    if url is not None and sa.make_url(url).get_backend_name() != "sqlite":  # R30-1: steps のSQLは SQLite 方言
+        raise ValueError(f"the steps log needs a SQLite database, got {sa.make_url(url).render_as_string(hide_password=True)!r}")  # R30-1
+    close_all()  # R20-4: 設定変更前の接続は捨てる
+    if storage_format is not None:  # R29-1
+        _storage_format = storage_format  # R29-1
+    if url is not None or engine is not None:  # R30-1: 接続先が変わる
+        _url, _db_key = sa.make_url(url), None  # R30-1
+        _engine, _orm_session = engine, orm_session  # R30-1: None なら次の利用時に作る
+    if pool is not None:  # R20-4: プール指定がある場合
+        _pool_enabled = bool(pool)  # R20-4: プール有無を差し替える
+    if pragmas is not None:  # R20-3: PRAGMA指定がある場合
+        _pragmas = {**DEFAULT_PRAGMAS, **dict(pragmas)}  # R20-3: 既定値に上書きする
+    if engine_options is not None:  # R30-1
+        _engine_options = dict(engine_options)  # R30-1
+    if retries is not None:  # R44-2
+        _retries = max(1, int(retries))  # R44-2
+    if retry_backoff is not None:  # R44-2
+        _retry_backoff = (float(retry_backoff[0]), float(retry_backoff[1]))  # R44-2
+
+
+def init_app(app: Any) -> None:  # R20-5: Flaskアプリのライフサイクルに接続プールを結び付ける（Flask-SQLAlchemy の init_app の後に呼ぶ）
+    steps_url = app.config.get("STEPS_DATABASE_URL")  # R30-1: None なら Issue と同じDB・同じエンジン
+    ext = app.extensions.get("sqlalchemy")  # R30-1: Flask-SQLAlchemy
+    engine = session_ = None  # R30-1
+    if steps_url is None and ext is not None and app.config.get("STEPS_DB_POOL", True):  # R30-1: 共有する
+        with app.app_context():  # R30-1: engine はアプリ毎
+            engine = ext.engine  # R30-1
+        session_ = ext.session  # R30-3
+    elif steps_url is None:  # R30-1: Flask-SQLAlchemy 無し / プール無し → 同じURLで自前のエンジン
+        steps_url = app.config["SQLALCHEMY_DATABASE_URI"]  # R30-1
+    if steps_url is not None:  # R30-1: 相対パスは Flask-SQLAlchemy と同じく instance/ 基準
+        u = sa.make_url(steps_url)  # R30-1
+        if u.get_backend_name() == "sqlite" and u.database and u.database != ":memory:" and not Path(u.database).is_absolute():  # R30-1
+            steps_url = u.set(database=str(Path(app.instance_path) / u.database))  # R30-1
+    configure(  # R20-5: app.config から設定を読む
+        url=steps_url,  # R30-1
+        engine=engine,  # R30-1
+        orm_session=session_,  # R30-3
+        pool=app.config.get("STEPS_DB_POOL", True),  # R20-5: プール有無
+        pragmas=app.config.get("STEPS_DB_PRAGMAS"),  # R20-5: PRAGMA（共有時は Issue 側の接続にも効く）
+        storage_format=app.config.get("STEPS_STORAGE_FORMAT", "json"),  # R29-1: レイアウト
+        engine_options=app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),  # R30-1: 自前で作る場合もプール設定を揃える
+        retries=app.config.get("DB_WRITE_RETRIES", 5),  # R44-2
+        retry_backoff=(app.config.get("DB_WRITE_RETRY_BACKOFF", 0.01), app.config.get("DB_WRITE_RETRY_MAX_BACKOFF", 0.5)),  # R44-2
+    )
+    # R41-1: スキーマの確保は app.schema.init_app（起動時 or flask schema upgrade）
+
+
+def get_engine() -> sa.Engine:  # R30-1: steps が使うエンジン（無ければ設定から作る）
+    global _engine  # R30-1
+    engine = _engine  # R30-1
+    if engine is None:  # R30-1: 初回
+        with _lock:  # R30-1
+            if _engine is None:  # R30-1
+                opts: Dict[str, Any] = {"url": _url, **_engine_options}  # R30-1
+                if not _pool_enabled:  # R20-4: 呼び出し毎に接続する
+                    opts = {"url": _url, "poolclass": NullPool}  # R20-4
+                _engine = make_engine(opts)  # R30-1
+            engine = _engine  # R30-1
+    return engine  # R30-1
+
+
+def connect() -> Any:  # R4-3: プールから接続を1本借りる（close() で返す。エクスポート等の長い読み出し用）
+    conn = get_engine().raw_connection()  # R30-1: sqlite3.Connection のプロキシ
+    ensure_schema(conn)  # R20-2: 初回だけDDLを流す
+    return conn  # R4-3
+
+
+def _shared_connection() -> Any:  # R30-3: Issue 側のトランザクションが開いていれば同じ接続を使う
+    if _orm_session is None or not has_app_context():  # R30-3: 共有していない / アプリコンテキスト外（書き込みスレッド等）
+        return None  # R30-3
+    if not _orm_session.registry.has():  # R30-3: このコンテキストでセッションが作られていない（steps だけのリクエスト）
+        return None  # R30-3: セッションを作らずプールから直接借りる
+    orm = _orm_session()  # R30-3
+    if not orm.in_transaction():  # R30-3: Issue 側が何もしていない
+        return None  # R30-3
+    conn = orm.connection().connection  # R30-3: Session→Connection→プール接続（コンテキスト終了時に Flask-SQLAlchemy が返す）
+    if not conn.in_transaction:  # R30-5: Issue 側は読んだだけ（ロックを持っていない）。steps は別の接続で自分でコミットする
+        return None  # R30-5: 共有すると、コミットしないリクエストでは teardown の巻き戻しで steps の書き込みまで消える
+    return conn  # R30-3
+
+
+class _SavepointConnection:  # R30-5: Issue 側と共有する接続。steps 側の commit/rollback は SAVEPOINT の確定/巻き戻しにする
+    # R30-5: 外側のトランザクションの COMMIT/ROLLBACK は ORM のセッションだけが行う（steps の書き込みも一緒に確定/破棄される）
+    __slots__ = ("_conn",)  # R30-5
+
+    def __init__(self, conn: Any) -> None:  # R30-5
+        self._conn = conn  # R30-5
+        conn.execute("SAVEPOINT steps")  # R30-5
+
+    def __getattr__(self, name: str) -> Any:  # R30-5: execute/executemany/cursor 等はそのまま
+        return getattr(self._conn, name)  # R30-5
+
+    @property
+    def in_transaction(self) -> bool:  # R30-5: 外側のトランザクションの中（write_session は BEGIN しない）
+        return True  # R30-5
+
+    def commit(self) -> None:  # R30-5: ここまでの steps の変更を外側のトランザクションへ渡し、次の SAVEPOINT を開く
+        self._conn.execute("RELEASE steps")  # R30-5
+        self._conn.execute("SAVEPOINT steps")  # R30-5
+
+    def rollback(self) -> None:  # R30-5: 直前の commit 以降の steps の変更だけ捨てる（Issue 側の未確定分は残る）
+        if self._conn.in_transaction:  # R30-5: 失敗で外側ごと巻き戻っていれば SAVEPOINT も無い
+            self._conn.execute("ROLLBACK TO steps")  # R30-5
+
+    def close(self) -> None:  # R30-5: SAVEPOINT を閉じる（接続は Flask-SQLAlchemy が返す）
+        if self._conn.in_transaction:  # R30-5
+            self._conn.execute("RELEASE steps")  # R30-5
+
+
+@contextmanager
+def session() -> Iterator[Any]:  # R20-2: リポジトリ関数が接続を借りる入口
+    shared = _shared_connection()  # R30-3: Issue と同じトランザクション
+    if shared is not None:  # R30-5: Issue 側の未確定の変更と一緒に ORM のセッションが COMMIT/ROLLBACK する
+        shared = _SavepointConnection(shared)  # R30-5
+        ensure_schema(shared)  # R20-2: init_schema の commit も SAVEPOINT の確定になる
+    conn = shared if shared is not None else connect()  # R30-1: 無ければプールから借りる
+    conn = instrument.wrap_connection(conn)  # R35-3: 計測が有効なら SQL の時間を記録する
+    try:  # R20-2: 失敗時に書きかけを残さない
+        yield conn  # R20-2: 接続を貸す
+    except BaseException:  # R20-2: 呼び出し側で例外が起きたら
+        if conn.in_transaction:  # R20-2: 未確定の変更があれば
+            conn.rollback()  # R20-2: 次の利用者へ持ち越さない
+        raise  # R20-2: 例外はそのまま伝える
+    finally:  # R30-1
+        conn.close()  # R30-1: プールへ返す（未確定分は巻き戻される）。共有時は SAVEPOINT を閉じるだけ（R30-5）
+
+
+def is_busy(exc: BaseException) -> bool:  # R44-2: 他の接続がロックを持っていて失敗したか（SQLAlchemy の例外は中身を見る）
+    exc = getattr(exc, "orig", None) or exc  # R44-2: sqlalchemy.exc.OperationalError → sqlite3.OperationalError
+    if not isinstance(exc, sqlite3.OperationalError):  # R44-2
+        return False  # R44-2
+    code = getattr(exc, "sqlite_errorcode", None)  # R44-2: Python 3.11+
+    if code is not None:  # R44-2: 拡張コードの下位8ビット（BUSY_SNAPSHOT なども BUSY）
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)  # R44-2
+    return str(exc).startswith(("database is locked", "database table is locked", "database is busy"))  # R44-2: 3.10 以前
+
+
+def retry_on_busy(fn: Callable[[], T], on_retry: Optional[Callable[[], Any]] = None) -> T:  # R44-2: fn を SQLITE_BUSY の間だけ上限付きで再試行する（fn は1トランザクション全体）
+    base, cap = _retry_backoff  # R44-2
+    for attempt in range(_retries):  # R44-2
+        try:  # R44-2
+            return fn()  # R44-2
+        except Exception as e:  # R44-2
+            if not is_busy(e) or attempt + 1 >= _retries:  # R44-2: ロック以外の失敗/回数切れはそのまま伝える
+                if is_busy(e):  # R44-2
+                    _retry_stats["gave_up"] += 1  # R44-2
+                raise  # R44-2
+        _retry_stats["retries"] += 1  # R44-2
+        if on_retry is not None:  # R44-2: ORM のセッションを巻き戻すなど
+            on_retry()  # R44-2
+        time.sleep(random.uniform(0, min(cap, base * 2 ** attempt)))  # R44-2: full jitter（同時に失敗したワーカーが揃って再突入しない）
+    raise AssertionError("unreachable")  # pragma: no cover - R44-2
+
+
+def retry_stats() -> Dict[str, int]:  # R44-2: このプロセスの再試行の累計
+    return dict(_retry_stats)  # R44-2
+
+
+@contextmanager
+def write_session() -> Iterator[Any]:  # R44-2: 書き込み用の session()。BEGIN IMMEDIATE で最初に書き込みロックを取る
+    with session() as conn:  # R44-2: Issue 側のトランザクションを共有していれば SAVEPOINT の中（再試行は外側の責任）
+        if not conn.in_transaction:  # R44-2: 読んでから書く途中で他の書き込みに追い越されると busy_timeout を待たずに失敗する（SQLITE_BUSY_SNAPSHOT）
+            conn.execute("BEGIN IMMEDIATE")  # R44-2: ロック待ちは busy_timeout の中で済む
+        yield conn  # R44-2
+
+
+def run_write(fn: Callable[[Any], T]) -> T:  # R44-2: fn(conn) を1つの書き込みトランザクションで実行し、SQLITE_BUSY なら巻き戻して再試行する（fn がコミットする）
+    if _shared_connection() is not None:  # R44-2: Issue 側のトランザクションの中（再試行すると Issue 側の変更まで失う）
+        with write_session() as conn:  # R30-5: fn の commit/rollback は SAVEPOINT に対して効く
+            return fn(conn)  # R44-2
+
+    def attempt() -> T:  # R44-2
+        with write_session() as conn:  # R44-2: 失敗時は session() が巻き戻す
+            return fn(conn)  # R44-2
+    return retry_on_busy(attempt)  # R44-2
+
+
+def ensure_schema(conn: Any) -> None:  # R20-2: DBパス毎に一度だけinit_schemaを流す
+    key = db_key()  # R20-2: 同じファイルは同じキーにする
+    if key in _schema_ready:  # R20-2: 初期化済みなら
+        return  # R20-2: DDLを流さない
+    with _lock:  # R20-2: 同時初期化を防ぐ
+        if key not in _schema_ready:  # R20-2: ロック取得後に再確認する
+            init_schema(conn)  # R20-2: テーブルを作る
+            _schema_ready.add(key)  # R20-2: 初期化済みにする
+
+
+def mark_schema_ready() -> None:  # R41-1: flask schema upgrade 済みのDB（この接続先では init_schema を流さない）
+    with _lock:  # R20-2
+        _schema_ready.add(db_key())  # R20-2
+
 
+def read_user_version() -> int:  # R41-1: PRAGMA user_version（DDL を流さずに読む）
+    conn = get_engine().raw_connection()  # R41-1: session()/connect() は ensure_schema を通るので使わない
+    try:  # R41-1
+        return int(conn.execute("PRAGMA user_version").fetchone()[0])  # R41-1
+    finally:  # R41-1
+        conn.close()  # R41-1
 
-def connect() -> sqlite3.Connection:  # R4-3: 使い回せる接続を返す
-    db_path = get_db_path()  # R4-4: DBパスを取得する
-    db_path.parent.mkdir(parents=True, exist_ok=True)  # R4-4: instance/ が無ければ作る
-    conn = sqlite3.connect(str(db_path))  # R4-4: SQLiteへ接続する
-    conn.row_factory = sqlite3.Row  # R4-3: 取得結果を辞書風に扱えるようにする
-    return conn  # R4-3: Connectionを返す
 
+def write_user_version(conn: Any, version: int) -> None:  # R41-1: スキーマを確保した版を記録する
+    conn.execute(f"PRAGMA user_version = {int(version)}")  # R41-1: PRAGMA はバインド不可
+    conn.commit()  # R41-1
 
-def init_schema(conn: sqlite3.Connection) -> None:  # R4-1: 必要テーブルを作成する
+
+def close_all() -> None:  # R20-5: プールの接続を閉じる
+    with _lock:  # R20-1
+        _schema_ready.clear()  # R20-2: 次回接続時にスキーマを再確認する
+        engine = _engine  # R30-1
+    if engine is not None:  # R30-1
+        engine.dispose()  # R30-1: 貸し出し中でない接続を閉じる（_on_close で PRAGMA optimize）
+
+
+atexit.register(close_all)  # R20-5: プロセス終了時に閉じる
+
+
+def init_schema(conn: Any) -> None:  # R4-1: 必要テーブルを作成する
     conn.execute(  # R4-1: stepsテーブルを作る
         """
         CREATE TABLE IF NOT EXISTS steps (
@@ -31,4 +360,160 @@ def init_schema(conn: sqlite3.Connection) -> None:  # R4-1: 必要テーブル
         )
         """
     )
-    conn.commit()  # R4-1: 変更を確定する
\ No newline at end of file
+    conn.execute(  # R24-0: template/pi_t 絞り込み＋id降順をインデックスだけで解く
+        "CREATE INDEX IF NOT EXISTS idx_steps_template_pi_id ON steps (template_id, pi_t, id)"
+    )
+    conn.execute(  # R24-0: 期間絞り込み用
+        "CREATE INDEX IF NOT EXISTS idx_steps_created_at ON steps (created_at)"
+    )
+    conn.execute(  # R29-2: notes の辞書（simulate_step の定型文は数種類しかない）
+        """
+        CREATE TABLE IF NOT EXISTS note_sets (
+            id INTEGER PRIMARY KEY,
+            notes_json TEXT NOT NULL UNIQUE
+        )
+        """
+    )
+    conn.execute(  # R29-1: 境界テンプレの既知項目を整数列で持つレイアウト（NULL＝キー無し）
+        """
+        CREATE TABLE IF NOT EXISTS steps_compact (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            template_id TEXT NOT NULL,
+            pi_t TEXT NOT NULL,
+            s_energy INTEGER,
+            o_threat INTEGER,
+            o_body_alarm INTEGER,
+            o_need_clarity INTEGER,
+            o_energy INTEGER,
+            p_policy TEXT,
+            p_threat INTEGER,
+            p_body_alarm INTEGER,
+            notes_id INTEGER,
+            extras_in BLOB,
+            extras_out BLOB
+        )
+        """
+    )
+    conn.execute(  # R29-1: steps と同じ絞り込みを同じ形のインデックスで解く
+        "CREATE INDEX IF NOT EXISTS idx_steps_compact_template_pi_id ON steps_compact (template_id, pi_t, id)"
+    )
+    conn.execute(  # R29-1
+        "CREATE INDEX IF NOT EXISTS idx_steps_compact_created_at ON steps_compact (created_at)"
+    )
+    conn.execute(  # R32-1: 保存済みの行を書き換えた回数（replay/migrate が増やし、キャッシュが見る）
+        """
+        CREATE TABLE IF NOT EXISTS steps_epoch (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            epoch INTEGER NOT NULL,
+            changed_at TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute("INSERT OR IGNORE INTO steps_epoch (id, epoch, changed_at) VALUES (1, 0, ?)", (_EPOCH_ZERO,))  # R32-1: 1行だけ持つ
+    conn.execute(  # R37-1: 日×テンプレ×方策の件数（app.storage.rollup が足し込む）
+        """
+        CREATE TABLE IF NOT EXISTS steps_rollup_policy (
+            day TEXT NOT NULL,
+            template_id TEXT NOT NULL,
+            pi_t TEXT NOT NULL,
+            n INTEGER NOT NULL,
+            PRIMARY KEY (day, template_id, pi_t)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(  # R37-1: 日×テンプレ×入力項目×値×方策の件数
+        """
+        CREATE TABLE IF NOT EXISTS steps_rollup_input (
+            day TEXT NOT NULL,
+            template_id TEXT NOT NULL,
+            field TEXT NOT NULL,
+            value INTEGER NOT NULL,
+            pi_t TEXT NOT NULL,
+            n INTEGER NOT NULL,
+            PRIMARY KEY (day, template_id, field, value, pi_t)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(  # R37-1: どの id まで集計したか／そのときの steps_epoch
+        """
+        CREATE TABLE IF NOT EXISTS steps_rollup_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_id INTEGER NOT NULL,
+            epoch INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(  # R37-1: 既に行がある DB に後から足したときは古い扱い（flask steps rollup で作る）
+        "INSERT OR IGNORE INTO steps_rollup_state (id, last_id, epoch, updated_at) "
+        "SELECT 1, 0, CASE WHEN EXISTS (SELECT 1 FROM steps) OR EXISTS (SELECT 1 FROM steps_compact) THEN -1 ELSE 0 END, ?",
+        (_EPOCH_ZERO,),  # R37-1
+    )
+    conn.execute(  # R42-1: 列ファイルへ移した steps のセグメント（app.storage.archive が登録し、同じトランザクションで元の行を消す）
+        """
+        CREATE TABLE IF NOT EXISTS steps_archive (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            first_id INTEGER NOT NULL,
+            last_id INTEGER NOT NULL,
+            rows INTEGER NOT NULL,
+            min_created_at TEXT NOT NULL,
+            max_created_at TEXT NOT NULL,
+            archived_at TEXT NOT NULL
+        )
+        """
+    )
+    _init_notes_search(conn)  # R38-4
+    conn.commit()  # R4-1: 変更を確定する
+
+
+def _init_notes_search(conn: Any) -> None:  # R38-4: notes の全文検索（note_sets を辞書に、note_sets_fts を索引に）
+    fresh = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'note_sets_fts'").fetchone() is None  # R38-4: 初回だけ既存分を流し込む
+    conn.execute(  # R38-4: 改行区切りの notes（trigram なので日本語も部分一致で引ける）
+        "CREATE VIRTUAL TABLE IF NOT EXISTS note_sets_fts USING fts5(notes, tokenize = 'trigram')"
+    )
+    conn.execute(  # R38-4: 辞書に増えた組を索引にも足す
+        """
+        CREATE TRIGGER IF NOT EXISTS note_sets_fts_ai AFTER INSERT ON note_sets BEGIN
+            INSERT INTO note_sets_fts (rowid, notes)
+            SELECT new.id, COALESCE(group_concat(value, char(10)), '') FROM json_each(new.notes_json);
+        END
+        """
+    )
+    conn.execute(  # R38-4
+        "CREATE TRIGGER IF NOT EXISTS note_sets_fts_ad AFTER DELETE ON note_sets BEGIN "
+        "DELETE FROM note_sets_fts WHERE rowid = old.id; END"
+    )
+    conn.execute(  # R38-4: json レイアウトの行も notes を辞書に載せる（compact は notes_id で登録済み）
+        "CREATE TRIGGER IF NOT EXISTS steps_note_sets_ai AFTER INSERT ON steps BEGIN "
+        "INSERT OR IGNORE INTO note_sets (notes_json) VALUES (new.notes_json); END"
+    )
+    conn.execute(  # R38-4: 一致した notes の step を新しい順に引く
+        "CREATE INDEX IF NOT EXISTS idx_steps_compact_notes_id ON steps_compact (notes_id, id)"
+    )
+    conn.execute(  # R38-7: json レイアウトも同じく（無いと稀な組/深いカーソルで steps を全件走査する）
+        "CREATE INDEX IF NOT EXISTS idx_steps_notes_json_id ON steps (notes_json, id)"
+    )
+    if fresh:  # R38-4: 既存DBに後から足したとき（steps は一度だけ全件を見る）
+        conn.execute("INSERT OR IGNORE INTO note_sets (notes_json) SELECT DISTINCT notes_json FROM steps")  # R38-4: トリガで索引にも入る
+        conn.execute(  # R38-4: トリガ作成前から辞書にあった組
+            "INSERT INTO note_sets_fts (rowid, notes) "
+            "SELECT n.id, (SELECT COALESCE(group_concat(value, char(10)), '') FROM json_each(n.notes_json)) FROM note_sets AS n "
+            "WHERE n.id NOT IN (SELECT rowid FROM note_sets_fts)"
+        )
+
+
+_EPOCH_ZERO = "1970-01-01T00:00:00+00:00"  # R32-1: まだ書き換えていない
+
+
+def read_steps_epoch(conn: Any) -> Tuple[int, str]:  # R32-1: (書き換え回数, 最後に書き換えたUTC時刻)
+    row = conn.execute("SELECT epoch, changed_at FROM steps_epoch WHERE id = 1").fetchone()  # R32-1
+    return (int(row[0]), row[1]) if row else (0, _EPOCH_ZERO)  # R32-1
+
+
+def bump_steps_epoch(conn: Any) -> None:  # R32-1: 保存済みの行を書き換えたことを記録する（コミットは呼び出し側の同じトランザクションで）
+    conn.execute(  # R32-1: 別プロセス（flask steps replay 等）の書き換えもキャッシュに伝わる
+        "UPDATE steps_epoch SET epoch = epoch + 1, changed_at = ? WHERE id = 1",
+        (datetime.now(timezone.utc).isoformat(),),  # R32-1
+    )
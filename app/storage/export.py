@@ -0,0 +1,120 @@
+from __future__ import annotations  # R27-0: 前方参照を安定させる
+
+import csv  # R27-1: CSV出力
+import heapq  # R42-3: SQLite 側と移した行を id 順に混ぜる
+import io  # R27-1: チャンク単位の書き出しバッファ
+import json  # R27-1: スカラー列のJSON化
+import zlib  # R27-2: gzipを逐次圧縮する
+from itertools import chain, islice  # R42-3
+from operator import itemgetter  # R42-3
+from typing import Any, Callable, Iterator, Optional, Tuple  # R27-0: 最小型を明示する
+
+from app.storage import archive  # R42-3: 列ファイルへ移した古い行
+from app.storage.compact import JSON_ROW_SELECT, json_row_converter  # R29-4: compact レイアウトは JSON 列に戻して出す
+from app.storage.db import connect, steps_table  # R27-1: 出力専用の接続（プール接続を長時間占有しない）
+from app.storage.repository import _step_filters  # R27-1: 一覧と同じ絞り込み条件
+
+EXPORT_FORMATS: Tuple[str, ...] = ("ndjson", "csv")  # R27-1: 対応形式
+EXPORT_COLUMNS: Tuple[str, ...] = ("id", "created_at", "template_id", "s_t", "o_t", "pi_t", "o_t1_pred", "notes")  # R27-1: 出力列（論理名）
+
+_SELECT = "SELECT id, created_at, template_id, s_t_json, o_t_json, pi_t, o_t1_pred_json, notes_json FROM steps"  # R27-1
+
+
+def iter_step_rows(  # R27-1: 条件に合う steps を id 昇順に chunk_size 行ずつ返す
+    template: Optional[str] = None,  # R14-2
+    pi_t: Optional[str] = None,  # R14-3
+    since: Optional[str] = None,  # R24-3
+    until: Optional[str] = None,  # R24-3
+    after_id: Optional[int] = None,  # R27-1: 続きから出す場合
+    chunk_size: int = 1000,  # R27-1: fetchmany の単位
+) -> Iterator[list]:
+    where_sql, params = _step_filters(template, pi_t, after_id=after_id, since=since, until=until)  # R24-2: 一覧と同じWHERE
+    conn = connect()  # R27-1: 1本のカーソルで最後まで読む
+    try:  # R27-1: 途中で止められても閉じる
+        conn.execute("BEGIN")  # R42-3: steps と steps_archive を同じスナップショットで読む（flask steps archive と並行しても二重/欠けにならない）
+        compact = steps_table() == "steps_compact"  # R29-4
+        select = f"SELECT {', '.join(JSON_ROW_SELECT)} FROM steps_compact" if compact else _SELECT  # R29-4
+        convert = json_row_converter(conn) if compact else None  # R29-4: 列の並びは _SELECT と同じになる
+        cur = conn.execute(f"{select}{where_sql} ORDER BY id ASC", tuple(params))  # R27-1: SQLite側で逐次評価される
+        hot = _fetch_chunks(cur, chunk_size, convert)  # R27-1
+        if not archive.segments(conn):  # R42-3: 移した行が無い（従来どおり）
+            yield from hot  # R27-1
+            return  # R42-3
+        to_json = convert or json_row_converter(conn)  # R42-3: セグメントの行は compact レイアウトと同じ列
+        cold = (  # R42-3
+            [to_json(r) for r in rows]  # R42-3
+            for rows in archive.iter_archived_rows(conn, template, pi_t, since, until, after_id, chunk_size=chunk_size)  # R42-3
+        )
+        merged = heapq.merge(chain.from_iterable(cold), chain.from_iterable(hot), key=itemgetter(0))  # R42-3: どちらも id 昇順（片方が尽きたら残りはそのまま流れる）
+        while True:  # R42-3
+            rows = list(islice(merged, chunk_size))  # R42-3
+            if not rows:  # R42-3
+                return  # R42-3
+            yield rows  # R42-3
+    finally:  # R27-1
+        conn.close()  # R27-1: 読み取りトランザクションもここで終わる
+
+
+def _fetch_chunks(cur: Any, chunk_size: int, convert: Optional[Callable[[Any], Any]]) -> Iterator[list]:  # R27-1
+    while True:  # R27-1
+        rows = cur.fetchmany(chunk_size)  # R27-1: 一定量ずつ読む
+        if not rows:  # R27-1: 読み終わり
+            return  # R27-1
+        yield rows if convert is None else [convert(r) for r in rows]  # R29-4
+
+
+def _ndjson_chunk(rows: list) -> str:  # R27-1: 1行1JSON（JSON列は保存済みの文字列をそのまま埋め込む）
+    out = []  # R27-1
+    for r in rows:  # R27-1
+        out.append(  # R27-1: save_step が書いたJSONは常に妥当なので復元→再JSON化しない
+            '{"id":%d,"created_at":%s,"template_id":%s,"s_t":%s,"o_t":%s,"pi_t":%s,"o_t1_pred":%s,"notes":%s}\n'
+            % (r[0], json.dumps(r[1]), json.dumps(r[2], ensure_ascii=False), r[3], r[4],  # R27-1
+               json.dumps(r[5], ensure_ascii=False), r[6], r[7])  # R27-1
+        )
+    return "".join(out)  # R27-1
+
+
+def _csv_chunk(rows: list, header: bool) -> str:  # R27-1: CSV（JSON列は文字列のまま1セルに入れる）
+    buf = io.StringIO()  # R27-1
+    w = csv.writer(buf, lineterminator="\n")  # R27-1
+    if header:  # R27-1: 先頭だけ
+        w.writerow(EXPORT_COLUMNS)  # R27-1
+    w.writerows(tuple(r) for r in rows)  # R27-1: 列順は EXPORT_COLUMNS と同じ
+    return buf.getvalue()  # R27-1
+
+
+def iter_export(  # R27-1: 出力バイト列を逐次返す（メモリ使用量は chunk_size 行分で一定）
+    fmt: str = "ndjson",  # R27-1: "ndjson" / "csv"
+    gzip: bool = False,  # R27-2: gzip圧縮
+    chunk_size: int = 1000,  # R27-1
+    **filters: Any,  # R27-1: template / pi_t / since / until / after_id
+) -> Iterator[bytes]:
+    if fmt not in EXPORT_FORMATS:  # R27-1: 未対応
+        raise ValueError(f"unknown export format: {fmt!r}")  # R27-1
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None  # R27-2: wbits=31 で gzip ヘッダ付き
+    first = True  # R27-1: CSVヘッダ用
+    if fmt == "csv":  # R27-1: 0件でもヘッダは出す
+        head = _csv_chunk([], header=True).encode("utf-8")  # R27-1
+        first = False  # R27-1
+        yield comp.compress(head) if comp else head  # R27-1
+    for rows in iter_step_rows(chunk_size=chunk_size, **filters):  # R27-1: チャンク毎に
+        text = _ndjson_chunk(rows) if fmt == "ndjson" else _csv_chunk(rows, header=first)  # R27-1
+        data = text.encode("utf-8")  # R27-1
+        if comp is None:  # R27-2: 非圧縮
+            yield data  # R27-1
+            continue  # R27-1
+        packed = comp.compress(data)  # R27-2: 溜まった分だけ出る
+        if packed:  # R27-2
+            yield packed  # R27-2
+    if comp is not None:  # R27-2: 残りとgzipフッタ
+        yield comp.flush()  # R27-2
+
+
+def export_mimetype(fmt: str, gzip: bool) -> str:  # R27-1: Content-Type
+    if gzip:  # R27-2
+        return "application/gzip"  # R27-2
+    return "application/x-ndjson" if fmt == "ndjson" else "text/csv"  # R27-1
+
+
+def export_filename(fmt: str, gzip: bool) -> str:  # R27-1: ダウンロード名
+    return f"steps.{fmt}" + (".gz" if gzip else "")  # R27-1
@@ -0,0 +1,209 @@
+from __future__ import annotations  # R28-0: 前方参照を安定させる
+
+import json  # R28-1: 保存済みJSONの復元と再保存
+from collections import deque  # R28-2: 先読みするチャンクの窓
+from concurrent.futures import Executor, Future  # R28-2: シミュレーションを複数プロセスに分ける
+from dataclasses import dataclass  # R28-3: 進捗/結果を構造体で返す
+from datetime import datetime, timezone  # R28-4: チェックポイント時刻
+from functools import partial  # R29-4: ワーカーに出力形式を渡す
+from typing import Any, Callable, Deque, Iterator, List, Optional, Tuple  # R28-0: 最小型を明示する
+
+from app.core.contracts import StepInput  # R28-1: 契約どおり入力を作る
+from app.core.rules import get_compiled  # R33-7: テンプレ毎のコンパイル済み規則で再計算する
+from app.templates_def.registry import template_ids  # R33-7: template=None は登録済みの全テンプレ
+from app.storage.compact import COMPACT_SOURCES, CompactDecoder, encode_outputs  # R29-4: compact レイアウトの読み書き
+from app.storage.db import bump_steps_epoch, run_write, session, steps_table  # R28-1: プール接続（R28-6: 書き込みは BEGIN IMMEDIATE＋再試行）
+
+REPLAY_MODES = ("update", "side_table")  # R28-3: steps を書き換える / steps_replay に書く
+
+Row = Tuple[int, Any, Any, str, str]  # R28-1: (id, s_t, o_t, pi_t, template_id) — s_t/o_t は JSON文字列（steps）か dict（steps_compact）
+Result = Tuple[int, str, Any, Any, bool]  # R28-1: (id, pi_t, o_t1_pred, notes, changed) — as_json なら JSON文字列
+
+
+@dataclass
+class ReplayReport:  # R28-3: 進捗と最終結果
+    name: str  # R28-4: チェックポイント名
+    total: int  # R28-3: 対象行数（開始時点、再開時は残り）
+    scanned: int = 0  # R28-3: 再計算した行数
+    changed: int = 0  # R28-3: 方策が変わった行数
+    last_id: int = 0  # R28-4: 書き終えた最後のid
+
+
+def init_replay_schema(conn: Any) -> None:  # R28-4: チェックポイント表とサイドテーブルを作る
+    conn.execute(  # R28-4: 名前ごとに「どこまで書いたか」を持つ
+        """
+        CREATE TABLE IF NOT EXISTS replay_checkpoints (
+            name TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(  # R28-3: side_table モードの書き先（steps は書き換えない）
+        """
+        CREATE TABLE IF NOT EXISTS steps_replay (
+            step_id INTEGER PRIMARY KEY,
+            pi_t TEXT NOT NULL,
+            o_t1_pred_json TEXT NOT NULL,
+            notes_json TEXT NOT NULL,
+            changed INTEGER NOT NULL,
+            replayed_at TEXT NOT NULL
+        )
+        """
+    )
+    conn.commit()  # R28-4
+
+
+def _simulate_chunk(rows: List[Row], as_json: bool = True) -> List[Result]:  # R28-1: ワーカープロセスで1チャンクを再計算する（pickle可能なトップレベル関数）
+    out: List[Result] = []  # R28-1
+    for step_id, s_t, o_t, old_pi_t, template_id in rows:  # R28-1
+        if isinstance(s_t, str):  # R29-4: JSONレイアウトはワーカー側で復元する
+            try:  # R28-1: 壊れたJSONは空の観測として扱う（_loads_json と同じ方針）
+                s_t, o_t = json.loads(s_t), json.loads(o_t)  # R28-1
+            except ValueError:  # R28-1
+                s_t, o_t = {}, {}  # R28-1
+        t = get_compiled(template_id)  # R33-7: 行のテンプレの規則（ワーカーでも初回だけコンパイル）
+        y = t.simulate(StepInput(s_t=s_t, o_t=o_t, prefs=t.template.prefs, precision=t.template.precision))  # R8-4: テンプレ定義の好み/精度
+        out.append((  # R28-1
+            step_id,  # R28-1
+            y.pi_t,  # R28-1
+            json.dumps(y.o_t1_pred, ensure_ascii=False) if as_json else y.o_t1_pred,  # R4-1: save_step と同じJSON化
+            json.dumps(y.notes, ensure_ascii=False) if as_json else y.notes,  # R4-1
+            y.pi_t != old_pi_t,  # R28-3: 方策が変わったか
+        ))
+    return out  # R28-1
+
+
+def _read_checkpoint(conn: Any, name: str) -> int:  # R28-4: 前回書き終えたid（無ければ0）
+    row = conn.execute("SELECT last_id FROM replay_checkpoints WHERE name = ?", (name,)).fetchone()  # R28-4
+    return int(row[0]) if row else 0  # R28-4
+
+
+def _template_filter(template: Optional[str]) -> Tuple[str, List[str]]:  # R33-7: 対象テンプレの WHERE 句（None は登録済みの全テンプレ）
+    ids = [template] if template else template_ids()  # R33-7: 規則の無いテンプレの行は再計算できない
+    return f" AND template_id IN ({', '.join('?' * len(ids))})", ids  # R33-7
+
+
+def _iter_chunks(template: Optional[str], start_id: int, chunk_size: int) -> Iterator[List[Row]]:  # R28-1: idキーセットでチャンクを読む
+    last = start_id  # R28-1
+    compact = steps_table() == "steps_compact"  # R29-4
+    cols = ("id", "pi_t", "template_id", *dict.fromkeys(COMPACT_SOURCES["s_t"] + COMPACT_SOURCES["o_t"])) if compact else ("id", "pi_t", "template_id", "s_t_json", "o_t_json")  # R29-4
+    where, params = _template_filter(template)  # R33-7
+    while True:  # R28-1
+        with session() as conn:  # R28-1: 書き込みと同じDB（WALなので読み書きが並行できる）
+            rows = conn.execute(  # R28-1: 主キー範囲で次のチャンク
+                f"SELECT {', '.join(cols)} FROM {steps_table()} WHERE id > ?{where} ORDER BY id LIMIT ?",
+                (last, *params, chunk_size),  # R28-1
+            ).fetchall()  # R28-1
+        if not rows:  # R28-1: 読み終わり
+            return  # R28-1
+        if compact:  # R29-4: 数値列から辞書にしてから渡す
+            dec = CompactDecoder({c: i for i, c in enumerate(cols)}, None)  # R29-4
+            chunk = [(int(r[0]), dec.s_t(r), dec.o_t(r), r[1], r[2]) for r in rows]  # R29-4
+        else:  # R28-1
+            chunk = [(int(r[0]), r[3], r[4], r[1], r[2]) for r in rows]  # R28-1: プロセス間で送れる形にする
+        last = chunk[-1][0]  # R28-1
+        yield chunk  # R28-1
+
+
+def _write_chunk(results: List[Result], mode: str, name: str) -> None:  # R28-3: 結果とチェックポイントを1トランザクションで書く
+    now = datetime.now(timezone.utc).isoformat()  # R28-4
+
+    def write(conn: Any) -> None:  # R28-6: SQLITE_BUSY なら run_write がチャンクごとやり直す（UPDATE/INSERT OR REPLACE なので同じ結果）
+        if mode == "update" and steps_table() == "steps_compact":  # R29-4: 出力側の列だけ書き換える
+            conn.executemany(  # R29-4
+                "UPDATE steps_compact SET pi_t = ?, p_policy = ?, p_threat = ?, p_body_alarm = ?, notes_id = ?, extras_out = ? WHERE id = ?",
+                [(pi_t, *encode_outputs(conn, pi_t, pred, notes), step_id) for step_id, pi_t, pred, notes, _ in results],  # R29-4
+            )
+        elif mode == "update":  # R28-3: steps を書き換える
+            conn.executemany(  # R28-3
+                "UPDATE steps SET pi_t = ?, o_t1_pred_json = ?, notes_json = ? WHERE id = ?",
+                [(pi_t, pred, notes, step_id) for step_id, pi_t, pred, notes, _ in results],  # R28-3
+            )
+        else:  # R28-3: サイドテーブルに書く
+            conn.executemany(  # R28-3: 再実行しても同じ行を上書きする
+                "INSERT OR REPLACE INTO steps_replay (step_id, pi_t, o_t1_pred_json, notes_json, changed, replayed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(step_id, pi_t, pred, notes, int(changed), now) for step_id, pi_t, pred, notes, changed in results],  # R28-3
+            )
+        if mode == "update":  # R32-2: 行を書き換えたのでキャッシュに知らせる
+            bump_steps_epoch(conn)  # R32-2: 同じトランザクション
+        conn.execute(  # R28-4: 同じトランザクションで進捗を記録する（中断しても二重・欠落が出ない）
+            "INSERT OR REPLACE INTO replay_checkpoints (name, last_id, updated_at) VALUES (?, ?, ?)",
+            (name, results[-1][0], now),  # R28-4
+        )
+        conn.commit()  # R28-3
+
+    run_write(write)  # R28-6: 他のワーカーが書いていても busy_timeout 切れで失敗しない
+
+
+def _clear_checkpoint(name: str) -> None:  # R28-6: 最後まで書けた実行のチェックポイントを消す（次の実行は最初から）
+    def clear(conn: Any) -> None:  # R28-6
+        conn.execute("DELETE FROM replay_checkpoints WHERE name = ?", (name,))  # R28-6
+        conn.commit()  # R28-6
+
+    run_write(clear)  # R28-6
+
+
+def checkpoint_name(mode: str, template: Optional[str]) -> str:  # R28-6: 既定のチェックポイント名（テンプレ毎に別の位置を持つ）
+    return f"replay-{mode}-{template or 'all'}"  # R28-6
+
+
+def replay_steps(  # R28-1: 保存済みの o_t を現在の simulate_step で再計算する
+    mode: str = "update",  # R28-3: "update" / "side_table"
+    template: Optional[str] = "boundary",  # R28-1: 対象テンプレ（R33-7: None なら登録済みの全テンプレ）
+    chunk_size: int = 1000,  # R28-1: 1チャンクの行数（＝1トランザクション）
+    workers: int = 0,  # R28-2: 0/1 ならこのプロセスで、2以上なら ProcessPoolExecutor
+    name: Optional[str] = None,  # R28-4: チェックポイント名（R28-6: 既定は checkpoint_name(mode, template)）
+    resume: bool = True,  # R28-4: Falseなら最初から（R28-6: 再開するのは前回が途中で止まった場合だけ。完了した実行は消える）
+    progress: Optional[Callable[[ReplayReport], None]] = None,  # R28-3: チャンク毎に呼ぶ
+) -> ReplayReport:
+    if mode not in REPLAY_MODES:  # R28-3
+        raise ValueError(f"unknown replay mode: {mode!r}")  # R28-3
+    name = name or checkpoint_name(mode, template)  # R28-6: --template a の位置で b の行を飛ばさない
+    with session() as conn:  # R28-4
+        init_replay_schema(conn)  # R28-4
+        start_id = _read_checkpoint(conn, name) if resume else 0  # R28-4: 再開位置
+        where, params = _template_filter(template)  # R33-7
+        total = conn.execute(  # R28-3: 残りの対象行数（進捗表示用）
+            f"SELECT COUNT(*) FROM {steps_table()} WHERE id > ?{where}", (start_id, *params)  # R28-3
+        ).fetchone()[0]  # R28-3
+
+    report = ReplayReport(name=name, total=int(total), last_id=start_id)  # R28-3
+    chunks = _iter_chunks(template, start_id, chunk_size)  # R28-1
+    simulate = partial(_simulate_chunk, as_json=not (mode == "update" and steps_table() == "steps_compact"))  # R29-4: compact へは dict のまま返す
+
+    def consume(results: List[Result]) -> None:  # R28-3: 書いて進捗を更新する
+        _write_chunk(results, mode, name)  # R28-3
+        report.scanned += len(results)  # R28-3
+        report.changed += sum(1 for r in results if r[4])  # R28-3
+        report.last_id = results[-1][0]  # R28-4
+        if progress is not None:  # R28-3
+            progress(report)  # R28-3
+
+    if workers <= 1:  # R28-2: 単一プロセス
+        for chunk in chunks:  # R28-1
+            consume(simulate(chunk))  # R28-1
+    else:  # R28-2
+        from concurrent.futures import ProcessPoolExecutor  # R41-4: multiprocessing は workers>=2 のときだけ読み込む（create_app が app.cli 経由で読むので）
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:  # R28-2: シミュレーションを並列化する
+            _run_pipelined(pool, simulate, chunks, workers * 2, consume)  # R28-2: 書き込みはこのプロセスで id 順に行う
+    _clear_checkpoint(name)  # R28-6: 最後まで書けた（例外で止まった場合だけ次回そこから再開する）
+    return report  # R28-3
+
+
+def _run_pipelined(  # R28-2: 最大 window 個のチャンクを先行投入し、投入順に書く
+    pool: Executor,  # R28-2
+    simulate: Callable[[List[Row]], List[Result]],  # R29-4: pickle 可能な関数
+    chunks: Iterator[List[Row]],  # R28-2
+    window: int,  # R28-2: 先読み数（メモリを一定に保つ）
+    consume: Callable[[List[Result]], None],  # R28-2
+) -> None:
+    pending: Deque[Future] = deque()  # R28-2: 投入順
+    for chunk in chunks:  # R28-2
+        pending.append(pool.submit(simulate, chunk))  # R28-2
+        if len(pending) >= window:  # R28-2: 窓が埋まったら先頭を待つ
+            consume(pending.popleft().result())  # R28-2: チェックポイントは常に連続した範囲になる
+    while pending:  # R28-2: 残り
+        consume(pending.popleft().result())  # R28-2
@@ -1,20 +1,69 @@
 from __future__ import annotations  # R4-3: 前方参照を安定させる
 
 import json  # R4-1: dict/listをJSON文字列にする
-from datetime import datetime, timezone  # R4-1: created_at をUTCで統一する
-from typing import Any, Dict, List, Mapping  # R4-2: 最小型を明示する
+from datetime import date, datetime, timezone  # R4-1: created_at をUTCで統一する
+from typing import Any, Dict, List, Mapping, Sequence, Tuple  # R4-2: 最小型を明示する
 
-from app.storage.db import connect, init_schema  # R4-1: DB接続とスキーマ初期化を使う
+from app.instrument import repo_call  # R35-3: 呼び出し毎の時間/行数/SQL
+from app.storage import archive  # R42-3: 列ファイルへ移した古い行
+from app.storage.compact import COMPACT_COLUMNS, COMPACT_INSERT_SQL, compact_values  # R29-1: compact レイアウトの書き込み
+from app.storage.db import ensure_schema, get_storage_format, run_write, session  # R20-2: プール接続とスキーマ確保を使う（R44-2: 書き込みは run_write）
+from app.storage.rollup import roll_up_inserted  # R37-3: 同じトランザクションで集計表に足す
 
 
+@repo_call("init_db")  # R35-3
 def init_db() -> None:  # R4-1: 外から呼べる初期化関数
-    conn = connect()  # R4-4: instance/app.db に接続する
-    try:  # R4-3: 例外が起きても接続を閉じる
-        init_schema(conn)  # R4-1: テーブルを作る
-    finally:  # R4-3: 必ず閉じる
-        conn.close()  # R4-3: 接続を閉じる
+    with session() as conn:  # R20-2: プール接続を借りる
+        ensure_schema(conn)  # R20-2: 初期化済みならDDLを流さない
 
 
+STEP_INSERT_COLUMNS: Tuple[str, ...] = (  # R40-2: json レイアウトで INSERT する列（id 以外）
+    "created_at", "template_id", "s_t_json", "o_t_json", "pi_t", "o_t1_pred_json", "notes_json",
+)
+MAX_SQL_VARIABLES = 32766  # R40-2: SQLite 3.32+ の既定（1文のバインド変数の上限）
+
+
+def _json_values(  # R40-2: 1行分を STEP_INSERT_COLUMNS の順の値にする
+    created_at: str,  # R4-1
+    template_id: str,  # R4-2
+    s_t: Mapping[str, Any],  # R4-2
+    o_t: Mapping[str, Any],  # R4-2
+    pi_t: str,  # R4-2
+    o_t1_pred: Mapping[str, Any],  # R4-2
+    notes: List[str],  # R4-2
+) -> Tuple[Any, ...]:
+    return (
+        created_at,  # R4-1: created_at
+        template_id,  # R4-2: template_id
+        json.dumps(dict(s_t), ensure_ascii=False),  # R4-1: s_t をJSON化
+        json.dumps(dict(o_t), ensure_ascii=False),  # R4-1: o_t をJSON化
+        pi_t,  # R4-2: pi_t
+        json.dumps(dict(o_t1_pred), ensure_ascii=False),  # R4-1: 予測をJSON化
+        json.dumps(list(notes), ensure_ascii=False),  # R4-1: notesをJSON化
+    )
+
+
+def _insert_step(  # R25-1: 1行INSERTする（コミットは呼び出し側: save_step / 書き込みスレッド）
+    conn: Any,  # R25-1: 借りている接続
+    created_at: str,  # R25-1: 受付時刻（UTCのISO）
+    template_id: str,  # R4-2: 例: "boundary"
+    s_t: Mapping[str, Any],  # R4-2: 隠れ状態（入力）
+    o_t: Mapping[str, Any],  # R4-2: 観測（入力）
+    pi_t: str,  # R4-2: 方策ID
+    o_t1_pred: Mapping[str, Any],  # R4-2: 予測観測（出力）
+    notes: List[str],  # R4-2: 介入案（出力）
+) -> int:
+    if get_storage_format() == "compact":  # R29-1: 数値列＋notes辞書で保存する
+        cur = conn.execute(COMPACT_INSERT_SQL, compact_values(conn, created_at, template_id, s_t, o_t, pi_t, o_t1_pred, notes))  # R29-1
+        return int(cur.lastrowid)  # R29-1
+    cur = conn.execute(  # R4-1: 1行挿入する
+        f"INSERT INTO steps ({', '.join(STEP_INSERT_COLUMNS)}) VALUES ({', '.join('?' * len(STEP_INSERT_COLUMNS))})",  # R40-2
+        _json_values(created_at, template_id, s_t, o_t, pi_t, o_t1_pred, notes),  # R40-2
+    )
+    return int(cur.lastrowid)  # R4-1: 保存した行IDを返す
+
+
+@repo_call("save_step")  # R35-3
 def save_step(  # R4-1: 1-stepログを保存する
     template_id: str,  # R4-2: 例: "boundary"
     s_t: Mapping[str, Any],  # R4-2: 隠れ状態（入力）
@@ -22,36 +71,57 @@ def save_step(  # R4-1: 1-stepログを保存する
     pi_t: str,  # R4-2: 方策ID
     o_t1_pred: Mapping[str, Any],  # R4-2: 予測観測（出力）
     notes: List[str],  # R4-2: 介入案（出力）
+    created_at: str | None = None,  # R25-1: 受付時刻（省略時は今）
 ) -> int:
-    created_at = datetime.now(timezone.utc).isoformat()  # R4-1: UTCのISO時刻を作る
-
-    conn = connect()  # R4-4: DBへ接続する
-    try:  # R4-3: 例外が起きても接続を閉じる
-        init_schema(conn)  # R4-1: 念のためスキーマを確保する（冪等）
-        cur = conn.execute(  # R4-1: 1行挿入する
-            """
-            INSERT INTO steps (created_at, template_id, s_t_json, o_t_json, pi_t, o_t1_pred_json, notes_json)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                created_at,  # R4-1: created_at
-                template_id,  # R4-2: template_id
-                json.dumps(dict(s_t), ensure_ascii=False),  # R4-1: s_t をJSON化
-                json.dumps(dict(o_t), ensure_ascii=False),  # R4-1: o_t をJSON化
-                pi_t,  # R4-2: pi_t
-                json.dumps(dict(o_t1_pred), ensure_ascii=False),  # R4-1: 予測をJSON化
-                json.dumps(list(notes), ensure_ascii=False),  # R4-1: notesをJSON化
-            ),
-        )
+    created_at = created_at or datetime.now(timezone.utc).isoformat()  # R4-1: UTCのISO時刻を作る
+
+    def write(conn: Any) -> int:  # R44-2: SQLITE_BUSY なら丸ごとやり直す
+        row_id = _insert_step(conn, created_at, template_id, s_t, o_t, pi_t, o_t1_pred, notes)  # R25-1: 1行挿入する
+        roll_up_inserted(conn)  # R37-3
         conn.commit()  # R4-1: 変更を確定する
-        return int(cur.lastrowid)  # R4-1: 保存した行IDを返す
-    finally:  # R4-3: 必ず閉じる
-        conn.close()  # R4-3: 接続を閉じる
+        return row_id  # R4-1: 保存した行IDを返す
+    return run_write(write)  # R44-2: BEGIN IMMEDIATE＋再試行（スキーマはプール側で確保済み）
+
+
+@repo_call("save_steps")  # R35-3
+def save_steps(  # R40-2: 同じテンプレの複数件を複数行 INSERT で保存し、行IDを入力順に返す
+    template_id: str,  # R4-2: 例: "boundary"
+    steps: Sequence[Mapping[str, Any]],  # R40-2: 1件＝save_step と同じキー（s_t, o_t, pi_t, o_t1_pred, notes）
+    created_at: str | None = None,  # R25-1: 受付時刻（全件共通、省略時は今）
+) -> List[int]:
+    if not steps:  # R40-2
+        return []  # R40-2
+    created_at = created_at or datetime.now(timezone.utc).isoformat()  # R4-1
+
+    def write(conn: Any) -> List[int]:  # R44-2: SQLITE_BUSY なら丸ごとやり直す
+        if get_storage_format() == "compact":  # R29-1: notes 辞書への登録も同じトランザクション
+            table, columns = "steps_compact", COMPACT_COLUMNS  # R29-1
+            rows = [compact_values(conn, created_at, template_id, s["s_t"], s["o_t"], s["pi_t"], s["o_t1_pred"], s["notes"]) for s in steps]  # R29-1
+        else:  # R40-2
+            table, columns = "steps", STEP_INSERT_COLUMNS  # R40-2
+            rows = [_json_values(created_at, template_id, s["s_t"], s["o_t"], s["pi_t"], s["o_t1_pred"], s["notes"]) for s in steps]  # R40-2
+        per_statement = max(1, MAX_SQL_VARIABLES // len(columns))  # R40-2: 既定の上限件数（1000件）なら1文に収まる
+        placeholder = f"({', '.join('?' * len(columns))})"  # R40-2
+        ids: List[int] = []  # R40-2
+        for i in range(0, len(rows), per_statement):  # R40-2
+            chunk = rows[i:i + per_statement]  # R40-2
+            cur = conn.execute(  # R40-2: RETURNING は SQLite 3.35+（DROP COLUMN と同じ）
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([placeholder] * len(chunk))} RETURNING id",
+                [v for row in chunk for v in row],  # R40-2
+            )
+            ids.extend(int(r[0]) for r in cur.fetchall())  # R40-2
+        roll_up_inserted(conn)  # R37-3: STEPS_ROLLUP_MAX_PENDING を超える分は compactor に任せる
+        conn.commit()  # R40-2: fsync は全件で1回
+        return sorted(ids)  # R40-2: RETURNING の順は保証されない（AUTOINCREMENT なので id 順＝入力順）
+    return run_write(write)  # R44-2
+
 
 import json  # R6-3: JSON文字列をdict/listに戻す
-from typing import Any, Dict, List, Optional  # R6-1: 返却型を明示する
+from collections.abc import Mapping as _MappingABC  # R26-1: StepRow を読み取り専用の辞書として振る舞わせる
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple  # R6-1: 返却型を明示する
 
-from app.storage.db import connect, init_schema  # R6-1: DB接続とスキーマ確保を再利用する
+from app.storage.compact import COMPACT_SOURCES, O_T_COLUMN, CompactDecoder, load_note_sets  # R29-1: compact レイアウトの読み出し
+from app.storage.db import session, steps_table  # R20-2: プール接続を再利用する
 
 
 def _loads_json(s: str, default: Any) -> Any:  # R6-3: JSON復元を安全に行う（壊れた値でも落とさない）
@@ -61,116 +131,265 @@ def _loads_json(s: str, default: Any) -> Any:  # R6-3: JSON復元を安全に行
         return default  # R6-3: デフォルトを返す
 
 
-def list_steps(limit: int = 50) -> List[Dict[str, Any]]:  # R6-1: 最新N件のstep履歴を返す
-    conn = connect()  # R6-1: instance/app.dbへ接続する
-    try:  # R6-1: 必ずcloseするためtry/finallyにする
-        init_schema(conn)  # R6-1: stepsテーブルが無い環境でも落ちないよう確保する（冪等）
-        cur = conn.execute(  # R6-1: 最新順にN件取得する
-            """
-            SELECT id, created_at, template_id, s_t_json, o_t_json, pi_t, o_t1_pred_json, notes_json
-            FROM steps
-            ORDER BY id DESC
-            LIMIT ?
-            """,
-            (int(limit),),  # R6-1: LIMITは整数にして渡す
-        )
-        rows = cur.fetchall()  # R6-1: 行を全件取得する
-        out: List[Dict[str, Any]] = []  # R6-1: 返却リストを用意する
-        for r in rows:  # R6-1: 各行を辞書に整形する
-            out.append(  # R6-1: 1行分の辞書を追加する
-                {
-                    "id": int(r["id"]),  # R6-1: id
-                    "created_at": r["created_at"],  # R6-1: created_at
-                    "template_id": r["template_id"],  # R6-1: template_id
-                    "s_t": _loads_json(r["s_t_json"], {}),  # R6-3: s_t_json → dict
-                    "o_t": _loads_json(r["o_t_json"], {}),  # R6-3: o_t_json → dict
-                    "pi_t": r["pi_t"],  # R6-1: pi_t
-                    "o_t1_pred": _loads_json(r["o_t1_pred_json"], {}),  # R6-3: o_t1_pred_json → dict
-                    "notes": _loads_json(r["notes_json"], []),  # R6-3: notes_json → list
-                }
-            )
-        return out  # R6-1: 整形済みリストを返す
-    finally:  # R6-1: 必ず閉じる
-        conn.close()  # R6-1: DB接続を閉じる
+STEP_COLUMNS: Tuple[str, ...] = ("id", "created_at", "template_id", "s_t", "o_t", "pi_t", "o_t1_pred", "notes")  # R26-2: 取得できる列（論理名）
+STEP_SUMMARY_COLUMNS: Tuple[str, ...] = ("id", "created_at", "template_id", "pi_t")  # R26-2: 一覧表示に要る列（JSON無し）
 
-def list_steps_filtered(  # R14-1: 条件付きでstep履歴を返す
-    limit: int = 50,  # R14-1: 取得上限
+_COLUMN_SQL: Dict[str, str] = {  # R26-2: 論理名→SQL列
+    "id": "id",  # R26-2
+    "created_at": "created_at",  # R26-2
+    "template_id": "template_id",  # R26-2
+    "s_t": "s_t_json",  # R26-2
+    "o_t": "o_t_json",  # R26-2
+    "pi_t": "pi_t",  # R26-2
+    "o_t1_pred": "o_t1_pred_json",  # R26-2
+    "notes": "notes_json",  # R26-2
+}
+_JSON_DEFAULTS: Dict[str, Any] = {"s_t": dict, "o_t": dict, "o_t1_pred": dict, "notes": list}  # R6-3: 壊れた値のときの既定値（型）
+
+
+class _RowShape:  # R26-1: 同じクエリの行で共有する列情報
+    __slots__ = ("index", "decoders", "names")  # R26-1
+
+    def __init__(self, index: Dict[str, int], decoders: Dict[str, Callable[[Any], Any]], names: Sequence[str]) -> None:  # R26-1
+        self.index = index  # R26-1: スカラー列の論理名→列位置
+        self.decoders = decoders  # R29-1: JSON系の論理名→復元関数（レイアウト毎に異なる）
+        self.names = tuple(names)  # R26-1: 見せる列名
+
+
+def _json_decoder(i: int, default: Callable[[], Any]) -> Callable[[Any], Any]:  # R29-1: JSON列を1つ復元する
+    return lambda row: _loads_json(row[i], default())  # R6-3: 壊れた値なら既定値
+
+
+def _partial_o_t_decoder(pairs: Tuple[Tuple[str, int], ...]) -> Callable[[Any], Any]:  # R26-3: json_extract で取り出したキーを o_t にする
+    return lambda row: {k: row[j] for k, j in pairs if row[j] is not None}  # R26-3: 無いキーは入れない
+
+
+class StepRow(_MappingABC):  # R26-1: 1行分（読み取り専用の辞書として使える）
+    __slots__ = ("_row", "_shape", "_cache")  # R26-1: 行ごとの __dict__ を持たない
+
+    def __init__(self, row: Any, shape: _RowShape) -> None:  # R26-1: sqlite3.Row と列情報をそのまま持つ
+        self._row = row  # R26-1: 生の行（JSONは文字列のまま）
+        self._shape = shape  # R26-1: 列情報（共有）
+        self._cache: Optional[Dict[str, Any]] = None  # R26-1: 復元済みJSON（初回アクセスまで作らない）
+
+    def __getitem__(self, key: str) -> Any:  # R26-1: 列を読む（JSON列は初回だけ復元する）
+        if key not in _JSON_DEFAULTS:  # R26-1: スカラー列
+            value = self._row[self._shape.index[key]]  # R26-2: 取得していなければ KeyError
+            return int(value) if key == "id" else value  # R6-1: id は int
+        cache = self._cache  # R26-1: JSON列
+        if cache is not None and key in cache:  # R26-1: 復元済み
+            return cache[key]  # R26-1
+        decode = self._shape.decoders.get(key)  # R29-1: 取得済みの列か
+        if decode is None:  # R26-2: 取得していない列
+            raise KeyError(key)  # R26-2
+        value = decode(self._row)  # R6-3: ここで初めて復元する
+        if cache is None:  # R26-1: 初回
+            cache = self._cache = {}  # R26-1
+        cache[key] = value  # R26-1: 次回以降は復元しない
+        return value  # R26-1
+
+    def __iter__(self) -> Iterator[str]:  # R26-1: 取得済みの論理列名
+        return iter(self._shape.names)  # R26-1
+
+    def __len__(self) -> int:  # R26-1
+        return len(self._shape.names)  # R26-1
+
+    def __repr__(self) -> str:  # R26-1: デバッグ表示（JSONは復元しない）
+        return f"<StepRow id={self.get('id')} pi_t={self.get('pi_t')}>"  # R26-1
+
+    def to_dict(self) -> Dict[str, Any]:  # R26-1: 全列を復元した辞書（従来の返却形式）
+        return {k: self[k] for k in self}  # R26-1
+
+
+def _select_list(  # R26-2: SELECT句・そのバインド値・列情報
+    conn: Any,  # R29-2: compact レイアウトの notes 辞書を読む
+    columns: Optional[Sequence[str]],  # R26-2
+    o_t_keys: Optional[Sequence[str]],  # R26-3
+) -> Tuple[str, List[Any], _RowShape]:
+    cols = list(STEP_COLUMNS if columns is None else columns)  # R26-2: 既定は全列
+    unknown = [c for c in cols if c not in _COLUMN_SQL]  # R26-2: 知らない列名
+    if unknown:  # R26-2: 呼び出し側の誤り
+        raise ValueError(f"unknown step columns: {unknown}")  # R26-2
+    names = list(cols)  # R26-1: 見せる列名
+    partial = bool(o_t_keys) and "o_t" not in cols  # R26-3: o_t 全体を取るなら一部キーは不要
+    if partial:  # R26-3: 取り出したキーは o_t として見せる
+        names.append("o_t")  # R26-3
+    if steps_table() == "steps_compact":  # R29-1: 数値列のレイアウト
+        return _select_list_compact(conn, cols, o_t_keys if partial else None, names)  # R29-1
+
+    exprs: List[str] = []  # R26-2: SQL列
+    index: Dict[str, int] = {}  # R26-2: スカラー列の論理名→位置
+    decoders: Dict[str, Callable[[Any], Any]] = {}  # R29-1
+    for c in cols:  # R26-2
+        if c in _JSON_DEFAULTS:  # R26-1: JSON列は読まれたときに復元する
+            decoders[c] = _json_decoder(len(exprs), _JSON_DEFAULTS[c])  # R26-1
+        else:  # R26-2
+            index[c] = len(exprs)  # R26-2
+        exprs.append(_COLUMN_SQL[c])  # R26-2
+    params: List[Any] = []  # R26-3: json_extract のパス
+    if partial:  # R26-3: o_t の一部キーだけ SQLite 側で取り出す
+        pairs = []  # R26-3
+        for key in o_t_keys:  # R26-3
+            pairs.append((key, len(exprs)))  # R26-3
+            exprs.append("json_extract(o_t_json, ?)")  # R26-3: Python 側では json.loads しない
+        decoders["o_t"] = _partial_o_t_decoder(tuple(pairs))  # R26-3
+        params = _json_paths(o_t_keys)  # R26-3
+    return ", ".join(exprs), params, _RowShape(index, decoders, names)  # R26-2
+
+
+def _select_list_compact(  # R29-1: steps_compact 用の SELECT句と列情報
+    conn: Any,  # R29-2
+    cols: Sequence[str],  # R26-2
+    o_t_keys: Optional[Sequence[str]],  # R26-3: 一部キーだけ（o_t 全体を取らない場合）
+    names: Sequence[str],  # R26-1
+) -> Tuple[str, List[Any], _RowShape]:
+    pos: Dict[str, int] = {}  # R29-1: SQL列→位置（同じ列は1回だけ読む）
+
+    def need(col: str) -> int:  # R29-1
+        if col not in pos:  # R29-1
+            pos[col] = len(pos)  # R29-1
+        return pos[col]  # R29-1
+
+    index: Dict[str, int] = {}  # R26-2
+    for c in cols:  # R26-2
+        if c in _JSON_DEFAULTS:  # R29-1: 辞書/リストは元の列の組から組み立てる
+            for col in COMPACT_SOURCES[c]:  # R29-1
+                need(col)  # R29-1
+        else:  # R26-2: スカラー列は同名
+            index[c] = need(c)  # R26-2
+    for key in o_t_keys or ():  # R26-3: 数値列なので json_extract は要らない
+        if key in O_T_COLUMN:  # R29-1
+            need(O_T_COLUMN[key])  # R29-1
+    if o_t_keys:  # R29-3: 未知のキーは extras にある
+        need("extras_in")  # R29-3
+    dec = CompactDecoder(pos, load_note_sets(conn) if "notes" in cols else None, o_t_keys)  # R29-1
+    decoders = {c: getattr(dec, c) for c in _JSON_DEFAULTS if c in cols}  # R29-1
+    if o_t_keys:  # R26-3
+        decoders["o_t"] = dec.o_t  # R26-3
+    return ", ".join(pos), [], _RowShape(index, decoders, names)  # R29-1: dict は挿入順＝位置順
+
+
+def _json_paths(o_t_keys: Optional[Sequence[str]]) -> List[str]:  # R26-3: json_extract のパス引数
+    return ["$." + json.dumps(k) for k in (o_t_keys or ())]  # R26-3: キーは引用して渡す
+
+
+def list_steps(  # R6-1: 最新N件のstep履歴を返す
+    limit: int = 50,  # R6-1: 取得上限
+    columns: Optional[Sequence[str]] = None,  # R26-2: 取得する列（既定は全列）
+) -> List[StepRow]:
+    return list_steps_filtered(limit=limit, columns=columns)  # R26-2: 絞り込み無しの一覧と同じ
+
+
+def normalize_created_at(raw: str) -> str:  # R27-3: 日付/日時の指定を created_at と比較できるISO文字列にする（不正なら ValueError）
+    if len(raw) == 10:  # R24-3: 日付だけならUTCのその日の0時
+        return date.fromisoformat(raw).isoformat()  # R24-3: "YYYY-MM-DD" は同日の時刻付き値より小さい
+    dt = datetime.fromisoformat(raw)  # R24-3: 日時
+    if dt.tzinfo is None:  # R24-3: タイムゾーン無しはUTCとみなす
+        dt = dt.replace(tzinfo=timezone.utc)  # R24-3: UTCを付ける
+    return dt.astimezone(timezone.utc).isoformat()  # R24-3: 保存形式（UTCのISO）に揃える
+
+
+def _step_filters(  # R24-2: stepsの絞り込み条件をWHERE句にする（一覧とエクスポートで共有する）
     template: str | None = None,  # R14-2: template_id条件（任意）
     pi_t: str | None = None,  # R14-3: pi_t条件（任意）
-) -> List[Dict[str, Any]]:
-    conn = connect()  # R14-1: DBへ接続する
-    try:  # R14-1: close保証
-        init_schema(conn)  # R14-1: スキーマ確保（冪等）
+    after_id: int | None = None,  # R24-1: このidより新しい行（id > after_id）
+    before_id: int | None = None,  # R24-1: このidより古い行（id < before_id）
+    since: str | None = None,  # R24-3: created_at の下限（以上、ISO文字列）
+    until: str | None = None,  # R24-3: created_at の上限（未満、ISO文字列）
+) -> Tuple[str, List[Any]]:
+    where: List[str] = []  # R14-2: WHERE条件を集める
+    params: List[Any] = []  # R14-2: バインド値を集める
+
+    if template:  # R14-2: template指定がある場合
+        where.append("template_id = ?")  # R14-2: 条件を追加する
+        params.append(template)  # R14-2: 値を追加する
+
+    if pi_t:  # R14-3: pi_t指定がある場合
+        where.append("pi_t = ?")  # R14-3: 条件を追加する
+        params.append(pi_t)  # R14-3: 値を追加する
+
+    if after_id is not None:  # R24-1: 新しい側のページ
+        where.append("id > ?")  # R24-1: 主キー範囲で読む（OFFSETを使わない）
+        params.append(int(after_id))  # R24-1: 値を追加する
 
-        where: List[str] = []  # R14-2: WHERE条件を集める
-        params: List[Any] = []  # R14-2: バインド値を集める
+    if before_id is not None:  # R24-1: 古い側のページ
+        where.append("id < ?")  # R24-1: 主キー範囲で読む（OFFSETを使わない）
+        params.append(int(before_id))  # R24-1: 値を追加する
 
-        if template:  # R14-2: template指定がある場合
-            where.append("template_id = ?")  # R14-2: 条件を追加する
-            params.append(template)  # R14-2: 値を追加する
+    if since:  # R24-3: 期間の下限
+        where.append("created_at >= ?")  # R24-3: ISO文字列は辞書順＝時刻順
+        params.append(since)  # R24-3: 値を追加する
 
-        if pi_t:  # R14-3: pi_t指定がある場合
-            where.append("pi_t = ?")  # R14-3: 条件を追加する
-            params.append(pi_t)  # R14-3: 値を追加する
+    if until:  # R24-3: 期間の上限
+        where.append("created_at < ?")  # R24-3: 上限は含まない
+        params.append(until)  # R24-3: 値を追加する
 
-        where_sql = (" WHERE " + " AND ".join(where)) if where else ""  # R14-4: AND結合してWHERE句を作る
+    where_sql = (" WHERE " + " AND ".join(where)) if where else ""  # R14-4: AND結合してWHERE句を作る
+    return where_sql, params  # R24-2: WHERE句とバインド値を返す
+
+
+@repo_call("list_steps_filtered")  # R35-3
+def list_steps_filtered(  # R14-1: 条件付きでstep履歴を返す
+    limit: int = 50,  # R14-1: 取得上限
+    template: str | None = None,  # R14-2: template_id条件（任意）
+    pi_t: str | None = None,  # R14-3: pi_t条件（任意）
+    after_id: int | None = None,  # R24-1: このidより新しいページ（キーセット）
+    before_id: int | None = None,  # R24-1: このidより古いページ（キーセット）
+    since: str | None = None,  # R24-3: created_at 下限（以上）
+    until: str | None = None,  # R24-3: created_at 上限（未満）
+    columns: Optional[Sequence[str]] = None,  # R26-2: 取得する列（既定は全列）
+    o_t_keys: Optional[Sequence[str]] = None,  # R26-3: o_t から取り出すキー（row["o_t"] で部分辞書になる）
+) -> List[StepRow]:
+    with session() as conn:  # R20-2: プール接続を借りる（スキーマはプール側で確保済み）
+        where_sql, params = _step_filters(template, pi_t, after_id, before_id, since, until)  # R24-2: 条件を組み立てる
+        select_sql, select_params, shape = _select_list(conn, columns, o_t_keys)  # R26-2: 必要な列だけ読む
+
+        # R24-1: after_id だけが指定されたら「直後の新しいページ」なので昇順で読んでから反転する
+        ascending = after_id is not None and before_id is None  # R24-1: 読む向き
+
+        direction = "ASC" if ascending else "DESC"  # R24-1: 並び順
+        # R24-3: 期間指定時は created_at インデックスを順に辿らせる（created_at は id と同じ順に増えるので表示順は変わらない）
+        order_sql = f"created_at {direction}, id {direction}" if (since or until) else f"id {direction}"  # R24-3
 
         sql = (  # R14-1: クエリ本体
-            "SELECT id, created_at, template_id, s_t_json, o_t_json, pi_t, o_t1_pred_json, notes_json "
-            "FROM steps"
+            f"SELECT {select_sql} "
+            f"FROM {steps_table()}"  # R29-1: 現在のレイアウトの表
             f"{where_sql} "
-            "ORDER BY id DESC "
+            f"ORDER BY {order_sql} "
             "LIMIT ?"
         )  # R14-1: 最新順にlimit件
 
+        params = select_params + params  # R26-3: SELECT句のバインドが先
         params.append(int(limit))  # R14-1: LIMITは最後に追加する
 
         cur = conn.execute(sql, tuple(params))  # R14-1: SQLを実行する
         rows = cur.fetchall()  # R14-1: 取得する
+        if ascending:  # R24-1: 昇順で読んだ場合
+            rows.reverse()  # R24-1: 表示は常に新しい順
 
-        out: List[Dict[str, Any]] = []  # R14-1: 返却リスト
-        for r in rows:  # R14-1: 各行を整形する
-            out.append(
-                {
-                    "id": int(r["id"]),  # R14-1: id
-                    "created_at": r["created_at"],  # R14-1: created_at
-                    "template_id": r["template_id"],  # R14-1: template_id
-                    "s_t": _loads_json(r["s_t_json"], {}),  # R14-1: s_t_json
-                    "o_t": _loads_json(r["o_t_json"], {}),  # R14-1: o_t_json
-                    "pi_t": r["pi_t"],  # R14-1: pi_t
-                    "o_t1_pred": _loads_json(r["o_t1_pred_json"], {}),  # R14-1: o_t1_pred_json
-                    "notes": _loads_json(r["notes_json"], []),  # R14-1: notes_json
-                }
-            )
-        return out  # R14-1: 整形済みを返す
-    finally:  # R14-1: close保証
-        conn.close()  # R14-1: DBを閉じる
+        return [StepRow(r, shape) for r in rows]  # R26-1: JSONは読まれたときに復元する
 
 
-def read_step(step_id: int) -> Optional[Dict[str, Any]]:  # R6-2: id指定で1件返す（無ければNone）
-    conn = connect()  # R6-2: instance/app.dbへ接続する
-    try:  # R6-2: 必ずcloseするためtry/finallyにする
-        init_schema(conn)  # R6-2: stepsテーブルが無い環境でも落ちないよう確保する（冪等）
+@repo_call("read_step")  # R35-3
+def read_step(  # R6-2: id指定で1件返す（無ければNone）
+    step_id: int,  # R6-2: 行ID
+    columns: Optional[Sequence[str]] = None,  # R26-2: 取得する列（既定は全列）
+) -> Optional[StepRow]:
+    with session() as conn:  # R20-2: プール接続を借りる（スキーマはプール側で確保済み）
+        select_sql, _, shape = _select_list(conn, columns, None)  # R26-2: 必要な列だけ読む
         cur = conn.execute(  # R6-2: idで1件取得する
-            """
-            SELECT id, created_at, template_id, s_t_json, o_t_json, pi_t, o_t1_pred_json, notes_json
-            FROM steps
-            WHERE id = ?
-            """,
+            f"SELECT {select_sql} FROM {steps_table()} WHERE id = ?",  # R29-1
             (int(step_id),),  # R6-2: idは整数にして渡す
         )
         r = cur.fetchone()  # R6-2: 1行取得する
         if r is None:  # R6-2: 見つからない場合
-            return None  # R6-2: Noneを返す
-        return {  # R6-2: 見つかった行を辞書に整形して返す
-            "id": int(r["id"]),  # R6-2: id
-            "created_at": r["created_at"],  # R6-2: created_at
-            "template_id": r["template_id"],  # R6-2: template_id
-            "s_t": _loads_json(r["s_t_json"], {}),  # R6-3: s_t_json → dict
-            "o_t": _loads_json(r["o_t_json"], {}),  # R6-3: o_t_json → dict
-            "pi_t": r["pi_t"],  # R6-2: pi_t
-            "o_t1_pred": _loads_json(r["o_t1_pred_json"], {}),  # R6-3: o_t1_pred_json → dict
-            "notes": _loads_json(r["notes_json"], []),  # R6-3: notes_json → list
-        }
-    finally:  # R6-2: 必ず閉じる
-        conn.close()  # R6-2: DB接続を閉じる
\ No newline at end of file
+            return _read_archived(conn, int(step_id), columns)  # R42-3: 移した行（そこにも無ければ None）
+        return StepRow(r, shape)  # R26-1: JSONは読まれたときに復元する
+
+
+def _read_archived(conn: Any, step_id: int, columns: Optional[Sequence[str]]) -> Optional[StepRow]:  # R42-3: セグメントの行を SQLite の行と同じ形で返す
+    cols = list(STEP_COLUMNS if columns is None else columns)  # R26-2
+    select_sql, _, shape = _select_list_compact(conn, cols, None, cols)  # R42-3: セグメントは steps_compact と同じ列を持つ
+    row = archive.read_row(conn, step_id, select_sql.split(", "))  # R42-3: 列の並びは shape の位置と同じ
+    return None if row is None else StepRow(row, shape)  # R26-1
+
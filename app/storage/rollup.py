@@ -0,0 +1,266 @@
+from __future__ import annotations  # R37-0: 前方参照を安定させる
+
+# R37-0: steps の集計表（日×テンプレ×方策 / 日×テンプレ×入力項目×値×方策）。
+# R37-0: 集計表の行数は 日数×テンプレ×方策（×項目×値）で決まり、steps の行数に依らないので /steps/stats は一定時間で答える。
+# R37-0: steps_rollup_state.last_id までの行が集計済み。保存と同じトランザクションで追いつくか（STEPS_ROLLUP_ON_INSERT）、
+# R37-0: compact_rollups（flask steps rollup / STEPS_ROLLUP_INTERVAL のスレッド）で追いつく。
+# R37-0: replay/migrate が steps_epoch を進めたら集計は古いとみなし、次の compact_rollups で作り直す。
+# R42-4: flask steps archive で列ファイルへ移した行は数えたまま残る。作り直すときはセグメントからも数える。
+
+import logging  # R37-4: 背景スレッドの失敗を記録する
+import os  # R37-4: fork後に作り直す
+import threading  # R37-4: 定期集計のスレッド
+from dataclasses import dataclass  # R37-2: 進捗/結果を構造体で返す
+from datetime import datetime, timezone  # R37-2: 更新時刻
+from typing import Any, Callable, Dict, List, Optional, Tuple  # R37-0: 最小型を明示する
+
+from app.storage import archive  # R42-4: 移した行の集計
+from app.storage.compact import O_T_COLUMN  # R37-1: compact レイアウトの入力列
+from app.storage.db import read_steps_epoch, run_write, session, steps_table  # R37-1（R37-7: 位置の読み取りから書き込みロックを持つ）
+
+log = logging.getLogger(__name__)  # R37-4
+
+_on_insert = True  # R37-3: 保存と同じトランザクションで追いつくか
+_max_pending = 1000  # R37-3: 保存時に追いつく上限（これより溜まっていたら compact_rollups に任せる）
+
+
+def _now() -> str:  # R37-2
+    return datetime.now(timezone.utc).isoformat()  # R37-2
+
+
+def _apply(conn: Any, lo: int, hi: int) -> None:  # R37-1: lo < id <= hi の行を集計表へ足す（コミットは呼び出し側）
+    table = steps_table()  # R29-1: 現在のレイアウト
+    conn.execute(  # R37-1: 日×テンプレ×方策
+        f"INSERT INTO steps_rollup_policy (day, template_id, pi_t, n) "
+        f"SELECT substr(created_at, 1, 10), template_id, pi_t, COUNT(*) FROM {table} "
+        "WHERE id > ? AND id <= ? GROUP BY 1, 2, 3 "
+        "ON CONFLICT (day, template_id, pi_t) DO UPDATE SET n = n + excluded.n",
+        (lo, hi),  # R37-1
+    )
+    if table == "steps_compact":  # R29-1: 既知の入力は整数列（extras の項目は数えない）
+        parts = [  # R37-1
+            f"SELECT substr(created_at, 1, 10) AS day, template_id, '{key}' AS field, {col} AS value, pi_t "
+            f"FROM steps_compact WHERE id > ? AND id <= ? AND {col} IS NOT NULL"
+            for key, col in O_T_COLUMN.items()  # R37-1: キー/列名はコード内の定数
+        ]
+        source = "(" + " UNION ALL ".join(parts) + ")"  # R37-1
+        params: Tuple[Any, ...] = (lo, hi) * len(parts)  # R37-1
+    else:  # R37-1: o_t_json の整数値を全キー分
+        source = (  # R37-1
+            "(SELECT substr(s.created_at, 1, 10) AS day, s.template_id, j.key AS field, j.value AS value, s.pi_t "
+            "FROM steps AS s, json_each(s.o_t_json) AS j WHERE s.id > ? AND s.id <= ? AND j.type = 'integer')"
+        )
+        params = (lo, hi)  # R37-1
+    conn.execute(  # R37-1: 日×テンプレ×入力項目×値×方策
+        "INSERT INTO steps_rollup_input (day, template_id, field, value, pi_t, n) "
+        f"SELECT day, template_id, field, value, pi_t, COUNT(*) FROM {source} WHERE true GROUP BY 1, 2, 3, 4, 5 "
+        "ON CONFLICT (day, template_id, field, value, pi_t) DO UPDATE SET n = n + excluded.n",
+        params,  # R37-1
+    )
+
+
+def _apply_archived(conn: Any) -> None:  # R42-4: 列ファイルへ移した行を集計表へ足す（作り直すとき。コミットは呼び出し側）
+    for seg in archive.segments(conn):  # R42-4
+        policy, inputs = seg.rollup_counts()  # R42-4: numpy で数える
+        conn.executemany(  # R42-4
+            "INSERT INTO steps_rollup_policy (day, template_id, pi_t, n) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (day, template_id, pi_t) DO UPDATE SET n = n + excluded.n",
+            policy,  # R42-4
+        )
+        conn.executemany(  # R42-4
+            "INSERT INTO steps_rollup_input (day, template_id, field, value, pi_t, n) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (day, template_id, field, value, pi_t) DO UPDATE SET n = n + excluded.n",
+            inputs,  # R42-4
+        )
+
+
+def _state(conn: Any) -> Tuple[int, int]:  # R37-1: (集計済みの最後のid, 集計したときの steps_epoch)
+    row = conn.execute("SELECT last_id, epoch FROM steps_rollup_state WHERE id = 1").fetchone()  # R37-1
+    return (int(row[0]), int(row[1])) if row else (0, -1)  # R37-1
+
+
+def _max_id(conn: Any) -> int:  # R37-1: 主キーの末尾（一定時間）
+    return int(conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {steps_table()}").fetchone()[0])  # R37-1
+
+
+def _set_state(conn: Any, last_id: int, epoch: int) -> None:  # R37-1
+    conn.execute("UPDATE steps_rollup_state SET last_id = ?, epoch = ?, updated_at = ? WHERE id = 1", (last_id, epoch, _now()))  # R37-1
+
+
+def roll_up_inserted(conn: Any) -> None:  # R37-3: 保存直後に同じトランザクションで追いつく（コミットは呼び出し側）
+    if not _on_insert:  # R37-3
+        return  # R37-3
+    row = conn.execute(  # R37-3: 位置と両方の epoch を1回で読む
+        "SELECT r.last_id, r.epoch, e.epoch FROM steps_rollup_state AS r, steps_epoch AS e WHERE r.id = 1 AND e.id = 1"
+    ).fetchone()  # R37-3
+    if row is None or row[1] != row[2]:  # R37-3: 古い集計は compact_rollups が作り直す
+        return  # R37-3
+    last_id, epoch = int(row[0]), int(row[1])  # R37-3
+    hi = _max_id(conn)  # R37-3: 書き込みロック中なので自分の行まで含む
+    if hi <= last_id or hi - last_id > _max_pending:  # R37-3: 大量に溜まっていたらリクエストでは追わない
+        return  # R37-3
+    _apply(conn, last_id, hi)  # R37-3
+    _set_state(conn, hi, epoch)  # R37-3
+
+
+@dataclass
+class RollupReport:  # R37-2: compact_rollups の進捗/結果
+    last_id: int = 0  # R37-2: 集計済みの最後のid
+    rows: int = 0  # R37-2: 今回集計した id の範囲（行数の上限）
+    rebuilt: bool = False  # R37-2: 作り直したか
+
+
+def compact_rollups(  # R37-2: 溜まった行を chunk_size ずつ集計する（各チャンクは1トランザクション。中断しても続きから）
+    chunk_size: int = 100_000,  # R37-2
+    rebuild: bool = False,  # R37-2: True なら集計表を空にして最初から
+    progress: Optional[Callable[[RollupReport], None]] = None,  # R37-2: チャンク毎に呼ぶ
+) -> RollupReport:
+    # R37-7: 位置/epoch/末尾は必ず BEGIN IMMEDIATE の中で読み直す。ロックの外で読むと、その間にコミットした保存が
+    # R37-7: roll_up_inserted で進めた範囲をもう一度足し、last_id を巻き戻してしまう。
+    report = RollupReport()  # R37-2
+
+    def reset(conn: Any) -> bool:  # R37-2: replay/migrate 後（または rebuild）なら集計表を空にして作り直す
+        _, epoch = _state(conn)  # R37-2
+        current = read_steps_epoch(conn)[0]  # R32-1
+        if not rebuild and epoch == current:  # R37-2: 作り直し不要
+            conn.rollback()  # R37-7: ロックをすぐ返す
+            return False  # R37-2
+        conn.execute("DELETE FROM steps_rollup_policy")  # R37-2
+        conn.execute("DELETE FROM steps_rollup_input")  # R37-2
+        _apply_archived(conn)  # R42-4: SQLite 側にはもう無い行
+        _set_state(conn, 0, current)  # R37-2
+        conn.commit()  # R37-2
+        return True  # R37-2
+
+    def chunk(conn: Any) -> Tuple[int, int]:  # R37-2: 1チャンク集計して (前の位置, 新しい位置) を返す（同じなら何もしていない）
+        last_id, epoch = _state(conn)  # R37-7: ロックを取ってから読む
+        hi = min(last_id + chunk_size, _max_id(conn))  # R37-2
+        if hi <= last_id or read_steps_epoch(conn)[0] != epoch:  # R37-2: 追いついた / 途中で書き換えられたら次回作り直す
+            conn.rollback()  # R37-7
+            return last_id, last_id  # R37-2
+        _apply(conn, last_id, hi)  # R37-2
+        _set_state(conn, hi, epoch)  # R37-2
+        conn.commit()  # R37-2: 集計と位置を同じトランザクションで
+        return last_id, hi  # R37-2
+
+    report.rebuilt = run_write(reset)  # R37-7
+    while True:  # R37-2
+        lo, hi = run_write(chunk)  # R37-7: SQLITE_BUSY ならチャンクごとやり直す
+        report.last_id = hi  # R37-2
+        if hi == lo:  # R37-2
+            return report  # R37-2
+        report.rows += hi - lo  # R37-2
+        if progress is not None:  # R37-2
+            progress(report)  # R37-2
+
+
+def rollup_status() -> Dict[str, Any]:  # R37-5: 集計がどこまで追いついているか
+    with session() as conn:  # R20-2
+        last_id, epoch = _state(conn)  # R37-5
+        current = read_steps_epoch(conn)[0]  # R37-5
+        max_id = _max_id(conn)  # R37-5
+    return {"last_id": last_id, "max_id": max_id, "pending": max(0, max_id - last_id), "stale": epoch != current}  # R37-5
+
+
+def _day_filters(template: Optional[str], since: Optional[str], until: Optional[str]) -> Tuple[str, List[Any]]:  # R37-5: 集計表の WHERE 句（日単位）
+    where: List[str] = []  # R37-5
+    params: List[Any] = []  # R37-5
+    if template:  # R14-2
+        where.append("template_id = ?")  # R14-2
+        params.append(template)  # R14-2
+    if since:  # R24-3: その日を含む
+        where.append("day >= ?")  # R37-5
+        params.append(since[:10])  # R37-5: 集計はUTCの日単位
+    if until:  # R24-3: 上限の日は含まない（時刻付きの until も日に切り詰める）
+        where.append("day < ?")  # R37-5
+        params.append(until[:10])  # R37-5
+    return (" WHERE " + " AND ".join(where)) if where else "", params  # R37-5
+
+
+def step_stats(  # R37-5: /steps/stats の中身（集計表だけを読む）
+    template: Optional[str] = None,  # R14-2
+    since: Optional[str] = None,  # R24-3: 正規化済みISO（日に切り詰める）
+    until: Optional[str] = None,  # R24-3
+    fields: Optional[List[str]] = None,  # R37-5: 入力ヒストグラムの項目（None なら全部）
+) -> Dict[str, Any]:
+    where, params = _day_filters(template, since, until)  # R37-5
+    policies: Dict[str, int] = {}  # R37-5: 方策→件数
+    days: Dict[str, Dict[str, int]] = {}  # R37-5: 日→方策→件数
+    templates: Dict[str, Dict[str, int]] = {}  # R37-5: テンプレ→方策→件数
+    inputs: Dict[str, Dict[int, Dict[str, int]]] = {}  # R37-5: 項目→値→方策→件数
+    with session() as conn:  # R20-2
+        for day, template_id, pi_t, n in conn.execute(  # R37-5
+            f"SELECT day, template_id, pi_t, n FROM steps_rollup_policy{where} ORDER BY day", params  # R37-5
+        ):
+            policies[pi_t] = policies.get(pi_t, 0) + n  # R37-5
+            by_day = days.setdefault(day, {})  # R37-5
+            by_day[pi_t] = by_day.get(pi_t, 0) + n  # R37-5
+            by_tpl = templates.setdefault(template_id, {})  # R37-5
+            by_tpl[pi_t] = by_tpl.get(pi_t, 0) + n  # R37-5
+        field_sql, field_params = "", []  # R37-5
+        if fields:  # R37-5
+            field_sql = (" AND " if where else " WHERE ") + f"field IN ({', '.join('?' * len(fields))})"  # R37-5
+            field_params = list(fields)  # R37-5
+        for field, value, pi_t, n in conn.execute(  # R37-5: 日/テンプレをまたいで足す
+            f"SELECT field, value, pi_t, SUM(n) FROM steps_rollup_input{where}{field_sql} GROUP BY 1, 2, 3 ORDER BY 1, 2",
+            params + field_params,  # R37-5
+        ):
+            inputs.setdefault(field, {}).setdefault(int(value), {})[pi_t] = int(n)  # R37-5
+    return {  # R37-5
+        "total": sum(policies.values()),  # R37-5
+        "policies": policies,  # R37-5
+        "days": days,  # R37-5
+        "templates": templates,  # R37-5
+        "inputs": inputs,  # R37-5
+        "rollup": rollup_status(),  # R37-5: 追いついていない行は数に入っていない
+    }
+
+
+class RollupCompactor:  # R37-4: compact_rollups を interval 秒毎に回すスレッド（プロセス毎）
+    def __init__(self, interval: float) -> None:  # R37-4
+        self.interval = float(interval)  # R37-4
+        self._stop = threading.Event()  # R37-4
+        self._thread: Optional[threading.Thread] = None  # R37-4
+        self._pid: Optional[int] = None  # R25-5: fork 後は作り直す
+        self._lock = threading.Lock()  # R37-4
+
+    def ensure_running(self) -> None:  # R37-4: 冪等（fork 後の子プロセスでも起動する）
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():  # R37-4
+            return  # R37-4
+        with self._lock:  # R37-4
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():  # R37-4
+                self._stop = threading.Event()  # R37-4
+                self._pid = os.getpid()  # R37-4
+                self._thread = threading.Thread(target=self._run, name="steps-rollup", daemon=True)  # R37-4
+                self._thread.start()  # R37-4
+
+    def stop(self) -> None:  # R37-4
+        self._stop.set()  # R37-4
+        if self._thread is not None and self._pid == os.getpid():  # R37-4
+            self._thread.join(timeout=5)  # R37-4
+
+    def _run(self) -> None:  # R37-4
+        while not self._stop.wait(self.interval):  # R37-4
+            try:  # R37-4: 失敗しても次の周期で再試行する
+                compact_rollups()  # R37-4
+            except Exception:  # R37-4
+                log.exception("steps rollup compaction failed")  # R37-4
+
+
+_compactor: Optional[RollupCompactor] = None  # R37-4
+
+
+def init_app(app: Any) -> None:  # R37-3: 設定を読み、定期集計を有効ならリクエスト時に起動する
+    global _on_insert, _max_pending, _compactor  # R37-3
+    _on_insert = bool(app.config.get("STEPS_ROLLUP_ON_INSERT", True))  # R37-3
+    _max_pending = int(app.config.get("STEPS_ROLLUP_MAX_PENDING", 1000))  # R37-3
+    if _compactor is not None:  # R37-4: 作り直す前に止める
+        _compactor.stop()  # R37-4
+        _compactor = None  # R37-4
+    interval = float(app.config.get("STEPS_ROLLUP_INTERVAL", 0) or 0)  # R37-4
+    if interval > 0:  # R37-4
+        compactor = _compactor = RollupCompactor(interval)  # R37-4
+
+        @app.before_request
+        def _start_rollup_compactor() -> None:  # R37-4: fork 済みのワーカーで起動する
+            compactor.ensure_running()  # R37-4
@@ -0,0 +1,89 @@
+from __future__ import annotations  # R38-0: 前方参照を安定させる
+
+# R38-0: FTS5（trigram）による全文検索の共通部分と、step の notes 検索。
+# R38-0: notes は note_sets の辞書（数種類の定型文の組）に集まるので、索引は note_sets_fts だけに張る。
+# R38-0: json レイアウトの行はトリガで note_sets に登録され、compact レイアウトは元から notes_id で参照する。
+# R38-0: trigram は3文字未満の語を索引で引けないので、短い語は instr() で絞る（対象は小さな表）。
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple  # R38-0: 最小型を明示する
+
+from app.storage.db import session, steps_table  # R20-2: プール接続を再利用する
+
+MIN_TERM = 3  # R38-1: trigram が索引で引ける最短の語
+SNIPPET_OPEN, SNIPPET_CLOSE = "\x02", "\x03"  # R38-1: snippet() の強調記号（描画側でエスケープ後に <mark> へ置き換える）
+
+
+def split_query(q: str) -> Tuple[Optional[str], List[str]]:  # R38-1: 検索語を (MATCH 式, 短い語) に分ける（語は全て AND）
+    terms = [t for t in (q or "").split() if t]  # R38-1: 空白区切り（全角空白も含む）
+    long_terms = [t for t in terms if len(t) >= MIN_TERM]  # R38-1
+    short = [t.lower() for t in terms if len(t) < MIN_TERM]  # R38-1: instr() で比べる
+    match = " ".join('"' + t.replace('"', '""') + '"' for t in long_terms) or None  # R38-1: 語はフレーズとして渡す（演算子を解釈させない）
+    return match, short  # R38-1
+
+
+def short_term_sql(columns: Sequence[str], short: Sequence[str]) -> Tuple[str, List[str]]:  # R38-1: 短い語毎に「どれかの列に含む」
+    parts: List[str] = []  # R38-1
+    params: List[str] = []  # R38-1
+    for term in short:  # R38-1
+        parts.append("(" + " OR ".join(f"instr(lower({c}), ?) > 0" for c in columns) + ")")  # R38-1
+        params.extend([term] * len(columns))  # R38-1
+    return " AND ".join(parts), params  # R38-1
+
+
+def search_note_sets(conn: Any, q: str) -> List[Dict[str, Any]]:  # R38-2: 一致した note_sets を関連度順に（表は小さいので全件）
+    match, short = split_query(q)  # R38-1
+    if match is None and not short:  # R38-2: 検索語無し
+        return []  # R38-2
+    where: List[str] = []  # R38-2
+    params: List[Any] = []  # R38-2
+    if match is not None:  # R38-2
+        where.append("note_sets_fts MATCH ?")  # R38-2
+        params.append(match)  # R38-2
+    if short:  # R38-1
+        sql, p = short_term_sql(["notes"], short)  # R38-1
+        where.append(sql)  # R38-1
+        params.extend(p)  # R38-1
+    order = "bm25(note_sets_fts)" if match is not None else "rowid"  # R38-2: bm25 は MATCH があるときだけ
+    rows = conn.execute(  # R38-2
+        f"SELECT rowid, notes, snippet(note_sets_fts, 0, '{SNIPPET_OPEN}', '{SNIPPET_CLOSE}', '…', 16) "
+        f"FROM note_sets_fts WHERE {' AND '.join(where)} ORDER BY {order}",
+        params,  # R38-2
+    ).fetchall()
+    return [{"id": int(r[0]), "notes": r[1].split("\n") if r[1] else [], "snippet": r[2]} for r in rows]  # R38-2
+
+
+def search_steps(  # R38-3: notes が一致した step を、一致した note set の関連度順・各 set 内は新しい順に返す
+    q: str,  # R38-1
+    limit: int = 50,  # R38-3: 1ページの行数
+    cursor: Optional[str] = None,  # R38-3: 前ページの next（"<set の順位>[:<その set で最後に返した id>]"）
+) -> Dict[str, Any]:
+    pos, before_id = 0, None  # R38-3
+    if cursor:  # R38-3
+        head, _, tail = cursor.partition(":")  # R38-3
+        pos, before_id = int(head), (int(tail) if tail else None)  # R38-3: 不正なら ValueError（ルートで400）
+    table = steps_table()  # R29-1: 現在のレイアウト
+    key_sql = "notes_id = ?" if table == "steps_compact" else "notes_json = ?"  # R38-3: compact は (notes_id, id) 索引で引く
+    with session() as conn:  # R20-2
+        sets = search_note_sets(conn, q)  # R38-2
+        keys: Dict[int, Any] = {s["id"]: s["id"] for s in sets}  # R38-3: compact は id で比べる
+        if table != "steps_compact" and sets:  # R38-3: json は保存済みJSONそのもので比べる
+            marks = ", ".join("?" * len(sets))  # R38-3
+            keys = dict(conn.execute(f"SELECT id, notes_json FROM note_sets WHERE id IN ({marks})", list(keys)).fetchall())  # R38-3
+        steps: List[Dict[str, Any]] = []  # R38-3
+        next_cursor = None  # R38-3
+        while pos < len(sets) and len(steps) <= limit:  # R38-3: 1件多く取って続きがあるか判定する
+            where = key_sql + (" AND id < ?" if before_id is not None else "")  # R38-3
+            params: List[Any] = [keys[sets[pos]["id"]]] + ([before_id] if before_id is not None else [])  # R38-3
+            rows = conn.execute(  # R38-3: json は id 降順に走査しながら比べる
+                f"SELECT id, created_at, template_id, pi_t FROM {table} WHERE {where} ORDER BY id DESC LIMIT ?",
+                params + [limit + 1 - len(steps)],  # R38-3
+            ).fetchall()
+            for r in rows:  # R38-3
+                steps.append({"id": int(r[0]), "created_at": r[1], "template_id": r[2], "pi_t": r[3], "note_set": sets[pos]["id"]})  # R38-3
+            if len(steps) > limit:  # R38-3: このページは満杯
+                steps.pop()  # R38-3
+                kept = len(rows) > 1  # R38-3: この set の行がページに残ったか
+                next_cursor = f"{pos}:{steps[-1]['id']}" if kept else str(pos)  # R38-3: 残っていなければ set の先頭から
+                break  # R38-3
+            pos, before_id = pos + 1, None  # R38-3: 次の set の先頭から
+    return {"note_sets": sets, "steps": steps, "next": next_cursor}  # R38-3
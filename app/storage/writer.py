@@ -0,0 +1,445 @@
+from __future__ import annotations  # R25-0: 前方参照を安定させる
+
+import atexit  # R25-4: プロセス終了時に残りを書き切る
+import ipaddress  # R44-6: 待ち受けアドレスがループバックか
+import logging  # R44-3: 書き込み役のプロセスの接続エラー
+import os  # R25-5: fork後の子プロセスで書き込みスレッドを作り直す
+import queue  # R25-2: 上限付きキュー
+import socket  # R44-3: 残っているソケットファイルの確認
+import threading  # R25-2: 書き込み専用スレッド
+import time  # R25-3: まとめ書きの時間窓
+from concurrent.futures import Future, TimeoutError as FutureTimeout  # R25-1: 行IDを後から受け取る（R25-7: 待つ上限付き）
+from dataclasses import dataclass  # R25-1: キューに積む1件
+from datetime import datetime, timezone  # R25-1: 受付時刻
+from multiprocessing.connection import AuthenticationError, Client, Connection, Listener  # R44-3: プロセス間の要求/応答（authkey で認証してから unpickle する）
+from pathlib import Path  # R44-3
+from typing import Any, Callable, List, Mapping, Optional, Sequence, Tuple, Union  # R25-0: 最小型を明示する
+
+from app.instrument import repo_call  # R35-3: まとめ書き1回分の時間/SQL
+from app.storage.db import run_write  # R25-3: 書き込みスレッドもプール接続を使う（R44-2: BEGIN IMMEDIATE＋再試行）
+from app.storage.repository import _insert_step, save_step, save_steps  # R25-1: 1行INSERTと同期保存（R44-3: 複数行）
+from app.storage.rollup import roll_up_inserted  # R37-3: バッチと同じトランザクションで集計表に足す
+
+
+class WriteQueueFull(RuntimeError):  # R25-2: 背圧（キュー満杯のまま put_timeout を過ぎた）
+    pass
+
+
+class WriteTimeout(WriteQueueFull):  # R25-7: コミットを STEPS_WRITE_RESULT_TIMEOUT 待っても行IDが返らない（書き込みスレッドの停止など。呼び出し側は満杯と同じく 503）
+    pass
+
+
+class WriterUnavailable(WriteQueueFull):  # R44-3: 書き込み役のプロセスに届かない/応答が無い（呼び出し側は満杯と同じく 503 で断る）
+    pass
+
+
+class RemoteWriteError(RuntimeError):  # R44-3: 書き込み役のプロセスで保存に失敗した
+    pass
+
+Address = Union[str, Tuple[str, int]]  # R44-3: Unix ソケットのパス または (host, port)
+
+log = logging.getLogger(__name__)  # R44-3
+
+
+@dataclass
+class _PendingStep:  # R25-1: キュー上の1件
+    created_at: str  # R25-1: 受付時刻（書き込み時刻ではない）
+    template_id: str  # R4-2
+    s_t: Mapping[str, Any]  # R4-2
+    o_t: Mapping[str, Any]  # R4-2
+    pi_t: str  # R4-2
+    o_t1_pred: Mapping[str, Any]  # R4-2
+    notes: List[str]  # R4-2
+    future: Future  # R25-1: 確定した行IDを返す先
+
+
+_STOP = object()  # R25-4: 停止の合図
+
+
+class StepWriter:  # R25-2: 上限付きキュー＋書き込みスレッドで steps をまとめ書きする
+    def __init__(  # R25-2: 設定を受け取る
+        self,
+        max_queue: int = 1000,  # R25-2: キューの上限（満杯なら背圧）
+        batch_size: int = 100,  # R25-3: 1トランザクションの最大行数
+        flush_interval: float = 0.01,  # R25-3: 先頭の1件からこの秒数だけ待って集める
+        put_timeout: float = 1.0,  # R25-2: 満杯時に呼び出し側を待たせる上限
+    ) -> None:
+        self.batch_size = max(1, int(batch_size))  # R25-3
+        self.flush_interval = float(flush_interval)  # R25-3
+        self.put_timeout = float(put_timeout)  # R25-2
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, int(max_queue)))  # R25-2: 上限付き
+        self._thread: Optional[threading.Thread] = None  # R25-2: 書き込みスレッド
+        self._pid: Optional[int] = None  # R25-5: スレッドを作ったプロセス
+        self._lock = threading.Lock()  # R25-2: 起動/停止を直列化する
+        self.batches = 0  # R25-3: コミット回数（観測用）
+        self.rows = 0  # R25-3: 書いた行数（観測用）
+
+    @property
+    def running(self) -> bool:  # R25-2: このプロセスで書き込みスレッドが動いているか
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()  # R25-5
+
+    def start(self) -> None:  # R25-2: 書き込みスレッドを起動する（冪等）
+        with self._lock:  # R25-2
+            if self.running:  # R25-2: 起動済み
+                return  # R25-2
+            if self._pid != os.getpid():  # R25-5: fork後は親のキュー/スレッドを引き継がない
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)  # R25-5: 新しいキュー
+            self._pid = os.getpid()  # R25-5
+            self._thread = threading.Thread(target=self._run, name="step-writer", daemon=True)  # R25-2
+            self._thread.start()  # R25-2
+
+    def submit(  # R25-1: 1件をキューに積み、行IDの Future を返す
+        self,
+        template_id: str,  # R4-2
+        s_t: Mapping[str, Any],  # R4-2
+        o_t: Mapping[str, Any],  # R4-2
+        pi_t: str,  # R4-2
+        o_t1_pred: Mapping[str, Any],  # R4-2
+        notes: List[str],  # R4-2
+    ) -> "Future[int]":
+        if not self.running:  # R25-5: 初回/ fork後
+            self.start()  # R25-5: このプロセスで起動する
+        fut: "Future[int]" = Future()  # R25-1: 結果の受け口
+        item = _PendingStep(  # R25-1: 受付時刻で固定する
+            created_at=datetime.now(timezone.utc).isoformat(),  # R4-1: UTCのISO時刻
+            template_id=template_id, s_t=dict(s_t), o_t=dict(o_t), pi_t=pi_t,  # R25-1: 呼び出し側の変更から切り離す
+            o_t1_pred=dict(o_t1_pred), notes=list(notes), future=fut,  # R25-1
+        )
+        try:  # R25-2: 満杯なら put_timeout まで待つ
+            self._queue.put(item, timeout=self.put_timeout)  # R25-2: 背圧
+        except queue.Full:  # R25-2: 待っても空かない
+            raise WriteQueueFull(f"step write queue full ({self._queue.maxsize})") from None  # R25-2
+        return fut  # R25-1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:  # R25-4: 積まれた分が書き終わるまで待つ
+        if not self.running:  # R25-4: 動いていなければ
+            return self._queue.unfinished_tasks == 0  # R25-4: 何もしない
+        deadline = None if timeout is None else time.monotonic() + timeout  # R25-4
+        with self._queue.all_tasks_done:  # R25-4: Queue.join のタイムアウト付き版
+            while self._queue.unfinished_tasks:  # R25-4
+                remaining = None if deadline is None else deadline - time.monotonic()  # R25-4
+                if remaining is not None and remaining <= 0:  # R25-4
+                    return False  # R25-4: 時間切れ
+                self._queue.all_tasks_done.wait(remaining)  # R25-4
+        return True  # R25-4: 書き切った
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:  # R25-4: 残りを書き切ってから止める
+        with self._lock:  # R25-4
+            thread = self._thread if self.running else None  # R25-4: このプロセスのスレッドだけ
+            self._thread = None  # R25-4
+        if thread is None:  # R25-4: 動いていない
+            return  # R25-4
+        self._queue.put(_STOP)  # R25-4: 既に積まれた分の後ろに停止を積む
+        thread.join(timeout)  # R25-4: 書き切るのを待つ
+
+    def _run(self) -> None:  # R25-3: 書き込みスレッド本体
+        while True:  # R25-3
+            first = self._queue.get()  # R25-3: 1件目は待つ
+            if first is _STOP:  # R25-4: 停止
+                self._queue.task_done()  # R25-4
+                return  # R25-4
+            batch = [first]  # R25-3: 今回まとめる分
+            stop = False  # R25-4
+            window_end = time.monotonic() + self.flush_interval  # R25-3: 時間窓
+            while len(batch) < self.batch_size:  # R25-3: 件数の上限まで
+                remaining = window_end - time.monotonic()  # R25-3: 窓の残り
+                try:  # R25-3: 窓が閉じた後は既に積まれている分だけ拾う
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()  # R25-3
+                except queue.Empty:  # R25-3: 窓が閉じた
+                    break  # R25-3
+                if item is _STOP:  # R25-4: 停止が来たら今の分を書いて終わる
+                    stop = True  # R25-4
+                    break  # R25-4
+                batch.append(item)  # R25-3
+            self._write(batch)  # R25-3: 1トランザクションで書く
+            for _ in batch:  # R25-3
+                self._queue.task_done()  # R25-4: flush の待ちを進める
+            if stop:  # R25-4
+                self._queue.task_done()  # R25-4: 停止の分
+                return  # R25-4
+
+    @repo_call("write_batch")  # R35-3
+    def _write(self, batch: List[_PendingStep]) -> None:  # R25-3: まとめて1回コミットする
+        def write(conn: Any) -> List[int]:  # R44-2: SQLITE_BUSY ならバッチ丸ごとやり直す
+            ids = [  # R25-3: 1件ずつ INSERT（lastrowid を取るため）
+                _insert_step(conn, p.created_at, p.template_id, p.s_t, p.o_t, p.pi_t, p.o_t1_pred, p.notes)  # R25-1
+                for p in batch  # R25-3
+            ]
+            roll_up_inserted(conn)  # R37-3
+            conn.commit()  # R25-3: fsync はバッチにつき1回
+            return ids  # R25-3
+
+        try:  # R25-3: 失敗したら全件の Future に例外を渡す
+            ids = run_write(write)  # R44-2: このスレッドのプール接続（BEGIN IMMEDIATE＋再試行）
+        except Exception as e:  # R25-3: 書けなかった
+            for p in batch:  # R25-3
+                p.future.set_exception(e)  # R25-3: 呼び出し側で例外になる
+            return  # R25-3
+        self.batches += 1  # R25-3
+        self.rows += len(batch)  # R25-3
+        for p, row_id in zip(batch, ids):  # R25-1: コミット後に行IDを返す
+            p.future.set_result(row_id)  # R25-1
+
+
+class RemoteStepWriter:  # R44-3: 別プロセスの書き込み役（flask steps writer）へ送る。submit は StepWriter と同じ形
+    def __init__(self, address: Address, authkey: bytes, timeout: float = 10.0) -> None:  # R44-3
+        self.address = address  # R44-3
+        self.authkey = authkey  # R44-3
+        self.timeout = float(timeout)  # R44-3: 応答を待つ上限（秒）
+        self._local = threading.local()  # R44-3: スレッド毎に1本（要求/応答を交互にするので共有しない）
+
+    def _connection(self) -> Connection:  # R44-3: このスレッドの接続（fork 後は作り直す）
+        conn = getattr(self._local, "conn", None)  # R44-3
+        if conn is not None and self._local.pid == os.getpid():  # R44-3
+            return conn  # R44-3
+        try:  # R44-3
+            conn = Client(self.address, authkey=self.authkey)  # R44-3
+        except (OSError, EOFError, AuthenticationError) as e:  # R44-3: 未起動/鍵違い
+            raise WriterUnavailable(f"steps writer at {self.address!r} is not reachable: {e}") from e  # R44-3
+        self._local.conn, self._local.pid = conn, os.getpid()  # R44-3
+        return conn  # R44-3
+
+    def _drop(self) -> None:  # R44-3: 壊れた接続を捨てる
+        conn = getattr(self._local, "conn", None)  # R44-3
+        self._local.conn = None  # R44-3
+        if conn is not None and self._local.pid == os.getpid():  # R41-2: 親の接続は閉じない
+            try:  # R44-3
+                conn.close()  # R44-3
+            except OSError:  # R44-3
+                pass  # R44-3
+
+    def _call(self, *msg: Any) -> Any:  # R44-3: 1要求→1応答
+        conn = self._connection()  # R44-3
+        try:  # R44-3
+            conn.send(msg)  # R44-3
+        except OSError:  # R44-3: 書き込み役の再起動などで切れていた（まだ届いていないので1回だけ繋ぎ直す）
+            self._drop()  # R44-3
+            conn = self._connection()  # R44-3
+            try:  # R44-3
+                conn.send(msg)  # R44-3
+            except OSError as e:  # R44-3
+                self._drop()  # R44-3
+                raise WriterUnavailable(f"steps writer at {self.address!r} closed the connection: {e}") from e  # R44-3
+        try:  # R44-3
+            if not conn.poll(self.timeout):  # R44-3
+                raise TimeoutError(f"no reply within {self.timeout}s")  # R44-3
+            status, value = conn.recv()  # R44-3
+        except (OSError, EOFError) as e:  # R44-3: 送った後に切れた（保存されたかは分からないので再送しない）
+            self._drop()  # R44-3: 遅れて届く応答を次の要求で読まない
+            raise WriterUnavailable(f"no reply from the steps writer at {self.address!r}: {e}") from e  # R44-3
+        if status == "full":  # R25-2: 書き込み役のキューが満杯
+            raise WriteQueueFull(value)  # R25-2
+        if status == "error":  # R44-3
+            raise RemoteWriteError(value)  # R44-3
+        return value  # R44-3
+
+    def submit(  # R44-3: StepWriter.submit と同じ引数。コミット済みの行IDを持つ Future を返す
+        self,
+        template_id: str,  # R4-2
+        s_t: Mapping[str, Any],  # R4-2
+        o_t: Mapping[str, Any],  # R4-2
+        pi_t: str,  # R4-2
+        o_t1_pred: Mapping[str, Any],  # R4-2
+        notes: List[str],  # R4-2
+    ) -> "Future[int]":
+        fut: "Future[int]" = Future()  # R44-3
+        fut.set_result(self._call("step", template_id, dict(s_t), dict(o_t), pi_t, dict(o_t1_pred), list(notes)))  # R44-3: 書き込み役のまとめ書きのコミットまで待つ
+        return fut  # R44-3
+
+    def save_steps(self, template_id: str, steps: Sequence[Mapping[str, Any]]) -> List[int]:  # R44-3: repository.save_steps を書き込み役のプロセスで
+        return self._call("steps", template_id, [dict(s) for s in steps])  # R44-3
+
+    def ping(self) -> int:  # R44-3: 書き込み役の pid（起動確認）
+        return self._call("ping")  # R44-3
+
+    def flush(self, timeout: Optional[float] = None) -> bool:  # R44-3: submit はコミットまで待つので積み残しは無い
+        return True  # R44-3
+
+    def close(self, timeout: Optional[float] = None) -> None:  # R44-3: このスレッドの接続を閉じる
+        self._drop()  # R44-3
+
+
+def parse_address(value: str, base: Optional[str | Path] = None) -> Address:  # R44-3: "host:port" か Unix ソケットのパス（相対パスは base 基準）
+    host, sep, port = value.rpartition(":")  # R44-3
+    if sep and host and port.isdigit() and "/" not in value:  # R44-3: 127.0.0.1:7000
+        return host, int(port)  # R44-3
+    path = Path(value)  # R44-3
+    if base is not None and not path.is_absolute():  # R44-3
+        path = Path(base) / path  # R44-3
+    return str(path)  # R44-3
+
+
+def writer_address(app: Any) -> Optional[Address]:  # R44-3: STEPS_WRITER_ADDRESS（未設定なら None）
+    value = app.config.get("STEPS_WRITER_ADDRESS")  # R44-3
+    return parse_address(value, app.instance_path) if value else None  # R30-1: 相対パスは instance/ 基準
+
+
+def writer_authkey(app: Any) -> bytes:  # R44-3: STEPS_WRITER_AUTHKEY（R44-6: 必須。SECRET_KEY には頼らない）
+    key = app.config.get("STEPS_WRITER_AUTHKEY")  # R44-6: 認証を通った相手のメッセージは unpickle される（＝コードを実行できる）
+    if not key:  # R44-6: 既定の SECRET_KEY（"dev"）で待ち受けない
+        raise RuntimeError("the steps writer needs STEPS_WRITER_AUTHKEY (a long random secret shared by the writer and the workers)")  # R44-6
+    return str(key).encode()  # R44-3
+
+
+def is_loopback(address: Address) -> bool:  # R44-6: Unix ソケットかループバックの TCP か
+    if isinstance(address, str):  # R44-6: Unix ソケット（同じホストのみ）
+        return True  # R44-6
+    host = address[0]  # R44-6
+    if host == "localhost":  # R44-6
+        return True  # R44-6
+    try:  # R44-6
+        return ipaddress.ip_address(host).is_loopback  # R44-6
+    except ValueError:  # R44-6: ホスト名（どこに解決されるか分からない）
+        return False  # R44-6
+
+
+def _handle(msg: Tuple[Any, ...], writer: StepWriter) -> Any:  # R44-3: 書き込み役のプロセスで1要求を処理する
+    op = msg[0]  # R44-3
+    if op == "step":  # R44-3: 同時に来た要求は StepWriter が1トランザクションにまとめる
+        return wait_step_id(writer.submit(*msg[1:]))  # R25-1（R25-7: 時間切れは "full" としてワーカーに返る）
+    if op == "steps":  # R40-2: 全件を1回でコミットする
+        return save_steps(*msg[1:])  # R40-2
+    if op == "ping":  # R44-3
+        return os.getpid()  # R44-3
+    raise ValueError(f"unknown request {op!r}")  # R44-3
+
+
+def _serve_connection(conn: Connection, writer: StepWriter) -> None:  # R44-3: 1ワーカースレッド分の接続（切れるまで）
+    with conn:  # R44-3
+        while True:  # R44-3
+            try:  # R44-3
+                msg = conn.recv()  # R44-3
+            except (EOFError, OSError):  # R44-3: ワーカーが終了した
+                return  # R44-3
+            try:  # R44-3
+                reply: Tuple[str, Any] = ("ok", _handle(msg, writer))  # R44-3
+            except WriteQueueFull as e:  # R25-2: 背圧はワーカーまで伝える
+                reply = ("full", str(e))  # R25-2
+            except Exception as e:  # R44-3: 例外オブジェクトは送らない（相手側で unpickle できるとは限らない）
+                log.exception("steps writer request failed")  # R44-3
+                reply = ("error", f"{type(e).__name__}: {e}")  # R44-3
+            try:  # R44-3
+                conn.send(reply)  # R44-3
+            except OSError:  # R44-3
+                return  # R44-3
+
+
+def _remove_stale_socket(address: Address) -> None:  # R44-3: 前回の書き込み役が残したソケットファイル
+    if not isinstance(address, str) or not os.path.exists(address):  # R44-3
+        return  # R44-3
+    probe = socket.socket(socket.AF_UNIX)  # R44-3
+    try:  # R44-3
+        probe.connect(address)  # R44-3
+    except OSError:  # R44-3: 誰も待ち受けていない
+        os.unlink(address)  # R44-3
+        return  # R44-3
+    finally:  # R44-3
+        probe.close()  # R44-3
+    raise RuntimeError(f"a steps writer is already listening on {address}")  # R44-3
+
+
+def serve(  # R44-3: 書き込み役のプロセス本体（flask steps writer）。止められるまで戻らない
+    address: Address,  # R44-3
+    authkey: bytes,  # R44-3
+    writer: StepWriter,  # R44-3
+    ready: Optional[Callable[[Address], None]] = None,  # R44-3
+    allow_remote: bool = False,  # R44-6: ループバック以外の TCP で待ち受けてよいか（STEPS_WRITER_ALLOW_REMOTE）
+) -> None:
+    if not authkey:  # R44-6
+        raise RuntimeError("the steps writer needs an authkey")  # R44-6
+    if not allow_remote and not is_loopback(address):  # R44-6: 鍵を知っていれば誰でも writer でコードを実行できる
+        raise RuntimeError(f"refusing to listen on non-loopback address {address!r} (set STEPS_WRITER_ALLOW_REMOTE = True to allow it)")  # R44-6
+    _remove_stale_socket(address)  # R44-3
+    writer.start()  # R25-2
+    try:  # R25-4: 止めるときは積まれた分を書き切る
+        with Listener(address, backlog=128, authkey=authkey) as listener:  # R44-3: 閉じるとソケットファイルも消える
+            if isinstance(address, str):  # R44-6: ソケットファイルは起動したユーザーだけが開ける
+                os.chmod(address, 0o600)  # R44-6
+            if ready is not None:  # R44-3
+                ready(listener.address)  # R44-3
+            while True:  # R44-3
+                try:  # R44-3
+                    conn = listener.accept()  # R44-3: 認証もここで済む
+                except (AuthenticationError, EOFError, ConnectionError) as e:  # R44-3: 鍵違い/途中で切れた接続
+                    log.warning("steps writer rejected a connection: %s", e)  # R44-3
+                    continue  # R44-3
+                threading.Thread(target=_serve_connection, args=(conn, writer), name="step-writer-conn", daemon=True).start()  # R44-3
+    finally:  # R25-4
+        writer.close()  # R25-4
+
+
+_result_timeout: float = 10.0  # R25-7: コミット後の行IDを待つ上限（秒）
+_writer: Optional[Union[StepWriter, RemoteStepWriter]] = None  # R25-5: プロセス内の書き込み役（無効なら None。R44-3: 別プロセスへ送るもの）
+
+
+def init_app(app: Any) -> None:  # R25-5: STEPS_WRITE_BEHIND が有効なら書き込み役を用意する
+    global _writer, _result_timeout  # R25-5
+    _result_timeout = float(app.config.get("STEPS_WRITE_RESULT_TIMEOUT", 10.0))  # R25-7
+    if _writer is not None:  # R25-5: 作り直す前に書き切る
+        _writer.close()  # R25-5
+        _writer = None  # R25-5
+    address = writer_address(app)  # R44-3
+    if address is not None:  # R44-3: 書き込みは1つのプロセス（flask steps writer）が受ける
+        _writer = RemoteStepWriter(address, writer_authkey(app), timeout=app.config.get("STEPS_WRITER_TIMEOUT", 10.0))  # R44-3
+        return  # R44-3
+    if not app.config.get("STEPS_WRITE_BEHIND", False):  # R25-5: 既定は無効（同期書き込み）
+        return  # R25-5
+    _writer = StepWriter(  # R25-5: 設定から作る（スレッドは最初の submit で起動）
+        max_queue=app.config.get("STEPS_WRITE_QUEUE_MAX", 1000),  # R25-2
+        batch_size=app.config.get("STEPS_WRITE_BATCH_SIZE", 100),  # R25-3
+        flush_interval=app.config.get("STEPS_WRITE_FLUSH_INTERVAL", 0.01),  # R25-3
+        put_timeout=app.config.get("STEPS_WRITE_PUT_TIMEOUT", 1.0),  # R25-2
+    )
+
+
+def get_writer() -> Optional[Union[StepWriter, RemoteStepWriter]]:  # R25-5: 書き込み役（無効なら None）
+    return _writer  # R25-5
+
+
+def make_writer(app: Any) -> StepWriter:  # R44-3: 設定どおりの StepWriter（flask steps writer が待ち受けに使う）
+    return StepWriter(  # R25-5
+        max_queue=app.config.get("STEPS_WRITE_QUEUE_MAX", 1000),  # R25-2
+        batch_size=app.config.get("STEPS_WRITE_BATCH_SIZE", 100),  # R25-3
+        flush_interval=app.config.get("STEPS_WRITE_FLUSH_INTERVAL", 0.01),  # R25-3
+        put_timeout=app.config.get("STEPS_WRITE_PUT_TIMEOUT", 1.0),  # R25-2
+    )
+
+
+def submit_step(  # R25-5: 書き込み役があれば積み、無ければ同期で保存して完了済み Future を返す
+    template_id: str,  # R4-2
+    s_t: Mapping[str, Any],  # R4-2
+    o_t: Mapping[str, Any],  # R4-2
+    pi_t: str,  # R4-2
+    o_t1_pred: Mapping[str, Any],  # R4-2
+    notes: List[str],  # R4-2
+) -> "Future[int]":
+    if _writer is not None:  # R25-5: 書き込み役が有効
+        return _writer.submit(template_id, s_t, o_t, pi_t, o_t1_pred, notes)  # R25-1
+    fut: "Future[int]" = Future()  # R25-5: 同期保存の結果を同じ形で返す
+    fut.set_result(save_step(template_id, s_t, o_t, pi_t, o_t1_pred, notes))  # R25-5
+    return fut  # R25-5
+
+
+def result_timeout() -> float:  # R25-7: STEPS_WRITE_RESULT_TIMEOUT
+    return _result_timeout  # R25-7
+
+
+def wait_step_id(fut: "Future[int]") -> int:  # R25-7: submit_step の行IDを上限付きで待つ（時間切れは WriteTimeout。保存はまだ済むかもしれない）
+    try:  # R25-7
+        return fut.result(timeout=_result_timeout)  # R25-1: コミット後の行ID
+    except FutureTimeout:  # R25-7: Future は取り消さない（書き込みスレッドが後で結果を入れる）
+        raise WriteTimeout(f"step write not committed within {_result_timeout}s") from None  # R25-7
+
+
+def submit_steps(template_id: str, steps: Sequence[Mapping[str, Any]]) -> List[int]:  # R44-3: 複数件を1トランザクションで保存して行IDを入力順に返す（まとめ書きのキューは通さない）
+    if isinstance(_writer, RemoteStepWriter):  # R44-3: 書き込み役のプロセスで保存する
+        return _writer.save_steps(template_id, steps)  # R44-3
+    return save_steps(template_id, steps)  # R40-2
+
+
+def _close_at_exit() -> None:  # R25-4: 終了時に残りを書き切る
+    if _writer is not None:  # R25-4
+        _writer.close()  # R25-4
+
+
+atexit.register(_close_at_exit)  # R25-4: db.close_all より後に登録するので先に走る
@@ -1,17 +1,8 @@
 from __future__ import annotations  # R15-0: 型注釈を安定させる
 
-from dataclasses import dataclass  # R15-1: 定義をデータとして持つ
-from typing import List, Dict  # R15-1: 返却型を明示する
+from typing import List, Dict, Tuple  # R15-1: 返却型を明示する
 
-
-@dataclass(frozen=True)  # R15-2: 定義は不変（書き換え事故防止）
-class FieldDef:
-    key: str  # R15-4: 入力キー（name属性）
-    label: str  # R15-4: 表示名
-    min: int  # R15-4: 最小値
-    max: int  # R15-4: 最大値
-    step: int  # R15-4: ステップ
-    default: int  # R15-4: 既定値
+from app.templates_def.spec import FieldDef, Prediction, Rule, TemplateDef  # R33-1: 定義の型（FieldDef はここからも import 可能にしておく）
 
 
 BOUNDARY_FIELDS: List[FieldDef] = [  # R15-3: boundaryテンプレの入力定義
@@ -22,5 +13,40 @@ BOUNDARY_FIELDS: List[FieldDef] = [  # R15-3: boundaryテンプレの入力定
 ]  # R15-3
 
 
+BOUNDARY_NOTES: Dict[str, Tuple[str, ...]] = {  # R21-1: 方策ごとの固定文（R33-1: simulator から移設）
+    "withdraw": (  # R3-2: 高脅威/高警報
+        "脅威/身体警報が高いので、まず距離を取る方策（withdraw）を推奨します。",  # R3-2: 介入案（説明可能な文）
+        "具体例：返答保留、退出、場所を変える、第三者同席など。",  # R3-2: 具体行動の候補
+    ),
+    "assert": (  # R3-2: ニーズ明確＋余力あり
+        "ニーズが明確で余力もあるため、主張（assert）を推奨します。",  # R3-2: 介入案
+        "テンプレ：Iメッセージ＋要望＋代替案＋期限（例：『今は難しい。明日なら可能』）。",  # R3-2: 境界文の雛形
+    ),
+    "comply": (  # R3-2: それ以外
+        "情報が不足しているため暫定で迎合（comply）を返します（後で改善します）。",  # R3-3: ダミーであることを明示する
+        "改善案：need_clarity を上げる（紙に書く/テンプレ入力）→ assert を選べるようにする。",  # R3-3: 次の介入の方向性
+    ),
+}
+
+
+BOUNDARY_TEMPLATE = TemplateDef(  # R33-1: simulate_step の if/elif をデータにしたもの
+    id="boundary",  # R33-1
+    title="境界テンプレ V0",  # R33-1
+    fields=BOUNDARY_FIELDS,  # R33-1: 同じリスト（定義変更は表/コンパイル結果の作り直しで拾う）
+    rules=(  # R3-2: 上から順に評価する
+        Rule("withdraw", any_of=((("threat", ">=", 2),), (("body_alarm", ">=", 2),))),  # R3-2: 高脅威/高警報なら撤退を優先する
+        Rule("assert", any_of=((("need_clarity", ">=", 2), ("energy", ">=", 1)),)),  # R3-2: ニーズが明確で余力があるなら主張
+    ),
+    default_policy="comply",  # R3-2: それ以外は迎合（※後で改善対象）
+    notes=BOUNDARY_NOTES,  # R21-1
+    predictions=(  # R3-3: 次の観測予測（ダミー）
+        Prediction("predicted_policy"),  # R3-3: 選んだ方策をそのまま予測に反映する
+        Prediction("predicted_threat", "threat", lowered_by=("withdraw",)),  # R3-3: withdraw なら脅威が少し下がる仮定
+        Prediction("predicted_body_alarm", "body_alarm", lowered_by=("withdraw", "assert")),  # R3-3: withdraw/assert で警報が少し下がる仮定
+    ),
+    state_keys=("energy",),  # R5-7: 隠れ状態（V0では最小）
+)
+
+
 def boundary_defaults() -> Dict[str, int]:  # R15-4: 既定値辞書を返す
-    return {f.key: f.default for f in BOUNDARY_FIELDS}  # R15-4: key→default
\ No newline at end of file
+    return {f.key: f.default for f in BOUNDARY_FIELDS}  # R15-4: key→default
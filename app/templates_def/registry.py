@@ -0,0 +1,56 @@
+from __future__ import annotations  # R33-0: 型注釈を安定させる
+
+import threading  # R33-2: 登録を直列化する
+from typing import Callable, Dict, List  # R33-0: 最小型を明示する
+
+from app.templates_def.boundary import BOUNDARY_TEMPLATE  # R33-2: 組み込みテンプレ
+from app.templates_def.spec import RULE_OPS, TemplateDef  # R33-2
+
+_templates: Dict[str, TemplateDef] = {}  # R33-2: テンプレID→定義（登録順）
+_lock = threading.Lock()  # R33-2
+_listeners: List[Callable[[TemplateDef], None]] = []  # R33-9: 登録/置き換えのたびに呼ぶ（コンパイル結果などのキャッシュを捨てる）
+
+
+def _check(t: TemplateDef) -> None:  # R33-2: 登録時に定義の誤りを見つける（コンパイル時に壊れない）
+    keys = {f.key for f in t.fields}  # R33-2
+    if not t.id or not all(k.isidentifier() for k in keys):  # R33-2: 生成コードで変数名の元にする
+        raise ValueError(f"template {t.id!r}: ids and field keys must be identifiers")  # R33-2
+    for rule in t.rules:  # R33-2
+        for group in rule.any_of:  # R33-2
+            for key, op, value in group:  # R33-2
+                if key not in keys:  # R33-2
+                    raise ValueError(f"template {t.id!r}: rule for {rule.policy!r} uses unknown field {key!r}")  # R33-2
+                if op not in RULE_OPS or not isinstance(value, int):  # R33-2
+                    raise ValueError(f"template {t.id!r}: bad condition {(key, op, value)!r}")  # R33-2
+    missing = [p for p in t.policies if p not in t.notes]  # R33-2: 方策毎の文言が揃っているか
+    if missing:  # R33-2
+        raise ValueError(f"template {t.id!r}: no notes for {missing}")  # R33-2
+    for p in t.predictions:  # R33-2
+        if p.source is not None and p.source not in keys:  # R33-2
+            raise ValueError(f"template {t.id!r}: prediction {p.key!r} uses unknown field {p.source!r}")  # R33-2
+    if any(k not in keys for k in t.state_keys):  # R33-2
+        raise ValueError(f"template {t.id!r}: state_keys must be field keys")  # R33-2
+
+
+def register_template(t: TemplateDef) -> TemplateDef:  # R33-2: テンプレを登録する（同じIDは置き換え）
+    _check(t)  # R33-2
+    with _lock:  # R33-2
+        _templates[t.id] = t  # R33-2
+    for listener in list(_listeners):  # R33-9: 古い規則で作ったキャッシュを捨てさせる
+        listener(t)  # R33-9
+    return t  # R33-2
+
+
+def on_register(listener: Callable[[TemplateDef], None]) -> None:  # R33-9: register_template の後に呼ぶ関数を加える（core 側が使う。registry は core を import しない）
+    _listeners.append(listener)  # R33-9
+
+
+def get_template(template_id: str) -> TemplateDef:  # R33-2: 登録済みの定義（無ければ KeyError）
+    return _templates[template_id]  # R33-2
+
+
+def template_ids() -> List[str]:  # R33-2: 登録順のID
+    return list(_templates)  # R33-2
+
+
+register_template(BOUNDARY_TEMPLATE)  # R33-2: 組み込み
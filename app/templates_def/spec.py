@@ -0,0 +1,50 @@
+from __future__ import annotations  # R33-0: 型注釈を安定させる
+
+from dataclasses import dataclass, field  # R33-1: テンプレ定義をデータとして持つ
+from typing import Mapping, Optional, Sequence, Tuple  # R33-0: 最小型を明示する
+
+
+@dataclass(frozen=True)  # R15-2: 定義は不変（書き換え事故防止）
+class FieldDef:
+    key: str  # R15-4: 入力キー（name属性）
+    label: str  # R15-4: 表示名
+    min: int  # R15-4: 最小値
+    max: int  # R15-4: 最大値
+    step: int  # R15-4: ステップ
+    default: int  # R15-4: 既定値
+
+
+RULE_OPS: Tuple[str, ...] = (">=", ">", "<=", "<", "==", "!=")  # R33-1: 条件に使える比較
+
+Cond = Tuple[str, str, int]  # R33-1: (入力キー, 比較, 整数) 例: ("threat", ">=", 2)
+
+
+@dataclass(frozen=True)  # R33-1: 1つの規則（上から順に見て最初に当たったものを採る）
+class Rule:
+    policy: str  # R33-1: 当たったときの方策ID
+    any_of: Tuple[Tuple[Cond, ...], ...]  # R33-1: 条件の組（組の中は AND、組どうしは OR）
+
+
+@dataclass(frozen=True)  # R33-1: 予測観測 o_{t+1} の1項目
+class Prediction:
+    key: str  # R33-1: o_t1_pred のキー
+    source: Optional[str] = None  # R33-1: 元にする入力キー（None なら選んだ方策IDそのもの）
+    lowered_by: Tuple[str, ...] = ()  # R33-1: この方策なら1下がる（0未満にはしない）
+
+
+@dataclass(frozen=True)  # R33-1: テンプレ1つ分の定義（入力・規則・出力文言）
+class TemplateDef:
+    id: str  # R33-1: steps.template_id に入る名前
+    title: str  # R33-1: 画面の見出し
+    fields: Sequence[FieldDef]  # R33-1: 入力定義（o_t のキー）
+    rules: Tuple[Rule, ...]  # R33-1: 方策を決める規則
+    default_policy: str  # R33-1: どの規則にも当たらないとき
+    notes: Mapping[str, Tuple[str, ...]]  # R33-1: 方策ごとの固定文
+    predictions: Tuple[Prediction, ...] = ()  # R33-1: o_t1_pred の項目
+    state_keys: Tuple[str, ...] = ()  # R33-1: s_t にも入れる入力キー
+    prefs: Mapping[str, float] = field(default_factory=lambda: {"safe": 0.7, "connect": 0.3})  # R8-4: 好み（V0固定）
+    precision: Mapping[str, float] = field(default_factory=lambda: {"policy": 1.0})  # R8-4: 精度（V0固定）
+
+    @property
+    def policies(self) -> Tuple[str, ...]:  # R33-1: 取り得る方策ID（規則順＋既定）
+        return tuple(dict.fromkeys([r.policy for r in self.rules] + [self.default_policy]))  # R33-1
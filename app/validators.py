@@ -1,27 +1,66 @@
 from __future__ import annotations
 
-from typing import Mapping, Tuple
+import threading  # R43-2: 同時コンパイルを防ぐ
+from dataclasses import dataclass  # R43-1: コンパイル結果を構造体にする
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+np: Any = None  # R43-4: 列指向の一括検証だけが使う任意依存（R43-7: columns() で初めて読み込む。import app では読まない）
+
+from app.templates_def.boundary import BOUNDARY_FIELDS, FieldDef  # R15-6: 定義からrangeを取得する
+
+MAX_TAG_LENGTH = 50  # matches IssueTag.tag
+MAX_TAGS = 20
+
+# the issue form's only integer field; unparsable input falls back to 0 without an error
+ISSUE_FIELDS = (FieldDef(key="intensity", label="Intensity", min=0, max=10, step=1, default=0),)
+ISSUE_RANGE_MESSAGE = "{label} must be between {min} and {max}."
+
+TYPE_MESSAGE = "{key} は整数で入力してください"  # R43-1: 既定の文言（R15-6 と同じ。{key}/{label}/{min}/{max} を埋める）
+RANGE_MESSAGE = "{key} は {min}〜{max} の範囲で入力してください"  # R43-1
+ROW_MESSAGE = "観測はオブジェクトで指定してください"  # R40-1
+OK, TYPE_ERROR, RANGE_ERROR = 0, 1, 2  # R43-4: ColumnarResult.codes の値
+MAX_TABLE_VALUES = 1024  # R43-1: 範囲がこれより狭い項目は正しい値の文字列→int の表を持つ
+_INT64_MIN, _INT64_MAX = -(2**63), 2**63 - 1  # R43-4: 列に入らない大きな整数は端に寄せる（範囲外になる）
+
+
+def _require_numpy() -> None:  # R43-4（R43-7: 初回だけ import する）
+    global np  # R43-7
+    if np is not None:  # R43-7: 読み込み済み
+        return  # R43-7
+    try:  # R43-7
+        import numpy  # R43-4
+    except ImportError:  # pragma: no cover - R43-4: フォーム/JSON の検証は numpy 無しで動く
+        raise RuntimeError("columnar validation needs numpy (poetry install -E analysis)") from None
+    np = numpy  # R43-7
+
+
+def parse_tags(raw: str) -> list[str]:
+    # "a, b、c" -> ["a", "b", "c"]: comma-separated (ASCII or Japanese comma), blanks and repeats dropped
+    tags: list[str] = []
+    for part in (raw or "").replace("、", ",").split(","):
+        tag = part.strip()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
 
-from app.templates_def.boundary import BOUNDARY_FIELDS  # R15-6: 定義からrangeを取得する
 
 def validate_issue_form(form: Mapping[str, str]) -> Tuple[dict, list[str]]:
     title = form.get("title", "").strip()
     tags = form.get("tags", "").strip()
     note = form.get("note", "").strip()
-    intensity_raw = form.get("intensity", "0").strip()
-    errors: list[str] = []
-
-    try:
-        intensity = int(intensity_raw)
-    except ValueError:
-        intensity = 0
-
-    if not 0 <= intensity <= 10:
-        errors.append("Intensity must be between 0 and 10.")
+    # intensity goes through the compiled validator: int() already ignores surrounding whitespace
+    values, errors = _issue_validator.every(form)
+    intensity = values["intensity"]
 
     if not title:
         errors.append("Title is required.")
 
+    tag_list = parse_tags(tags)
+    if len(tag_list) > MAX_TAGS:
+        errors.append(f"At most {MAX_TAGS} tags.")
+    if any(len(t) > MAX_TAG_LENGTH for t in tag_list):
+        errors.append(f"Each tag must be at most {MAX_TAG_LENGTH} characters.")
+
     data = {
         "title": title,
         "tags": tags,
@@ -31,15 +70,234 @@ def validate_issue_form(form: Mapping[str, str]) -> Tuple[dict, list[str]]:
 
     return data, errors
 
+def _json_int(raw: Any) -> int | None:  # R40-1: JSON の値→int（bool/小数/数字でない文字列は None）
+    if isinstance(raw, bool):  # R40-1: True/False は int の子クラスなので先に弾く
+        return None  # R40-1
+    if isinstance(raw, int):  # R40-1
+        return raw  # R40-1
+    if isinstance(raw, str):  # R40-1: フォームと同じく "2" も受ける
+        try:  # R40-1
+            return int(raw)  # R40-1
+        except ValueError:  # R40-1
+            return None  # R40-1
+    return None  # R40-1: 小数/null/配列など
+
+
+@dataclass(frozen=True)
+class ColumnarResult:  # R43-4: 列指向の一括検証の結果（各レコードの誤りを全部持つ）
+    fields: Tuple[FieldDef, ...]  # R43-4: 検証した定義（codes の列順）
+    values: Dict[str, "np.ndarray"]  # R43-4: キー→int64列（app.core.batch.simulate_steps にそのまま渡せる。誤りの位置の値は意味を持たない）
+    codes: "np.ndarray"  # R43-4: (件数, 項目数) の uint8、OK/TYPE_ERROR/RANGE_ERROR
+    messages: Tuple[Tuple[Optional[str], ...], Tuple[str, ...]]  # R43-4: (型の文言, 範囲の文言)、項目順
+
+    def __len__(self) -> int:  # R43-4: 件数
+        return int(self.codes.shape[0])  # R43-4
+
+    @property
+    def valid(self) -> "np.ndarray":  # R43-4: レコード毎に誤りが無いか（bool 配列）
+        return ~self.codes.any(axis=1)  # R43-4
+
+    @property
+    def ok(self) -> bool:  # R43-4: 全件が正しいか
+        return not self.codes.any()  # R43-4
+
+    def errors(self, limit: Optional[int] = None) -> List[dict]:  # R43-4: validate_observations と同じ {"index", "field", "error"}（レコード順→項目順）
+        rows, cols = np.nonzero(self.codes)  # R43-4: C順なのでレコード順に並ぶ
+        if limit is not None:  # R43-4: 数百万件の誤りを全部 dict にしない
+            rows, cols = rows[:limit], cols[:limit]  # R43-4
+        codes = self.codes[rows, cols].tolist()  # R43-4
+        return [  # R43-4
+            {"index": i, "field": self.fields[j].key, "error": self.messages[c - 1][j]}  # R43-4
+            for i, j, c in zip(rows.tolist(), cols.tolist(), codes)
+        ]
+
+    def record_errors(self, index: int) -> List[str]:  # R43-4: 1レコードの誤り（項目順）
+        return [self.messages[c - 1][j] for j, c in enumerate(self.codes[index].tolist()) if c]  # R43-4
+
+    def rows(self) -> List[dict]:  # R43-4: 正しいレコードだけを validate_observations と同じ dict の並びで返す（入力順）
+        mask = self.valid  # R43-4
+        keys = [f.key for f in self.fields]  # R43-4
+        cols = [self.values[k][mask].tolist() for k in keys]  # R43-4: Python の int に戻す
+        return [dict(zip(keys, r)) for r in zip(*cols)]  # R43-4
+
+
+def _int_column(raw: Any) -> Tuple["np.ndarray", "np.ndarray"]:  # R43-4: 1列→(int64 の値, 整数でない位置)。規則は _json_int と同じ
+    if isinstance(raw, np.ndarray):  # R43-4: 配列はそのまま使えるものを先に見る
+        if raw.ndim != 1:  # R43-4
+            raise ValueError(f"columns must be 1-D, got shape {raw.shape}")  # R43-4
+        kind = raw.dtype.kind  # R43-4
+        if kind == "i" or (kind == "u" and raw.dtype.itemsize < 8):  # R43-4: 整数列（コピーしない）
+            return raw.astype(np.int64, copy=False), np.zeros(raw.shape, dtype=bool)  # R43-4
+        if kind in "bfcmM":  # R43-4: bool/小数/日時は JSON の true/2.0 と同じく整数にしない
+            return np.zeros(raw.shape, dtype=np.int64), np.ones(raw.shape, dtype=bool)  # R43-4
+        seq: Sequence[Any] = raw.tolist()  # R43-4: 文字列/object/bytes/uint64（astype(int64) より下の表引きのほうが速い）
+    else:  # R43-4: list/tuple（JSON の配列）
+        seq = raw if isinstance(raw, (list, tuple)) else list(raw)  # R43-4
+    kinds = set(map(type, seq))  # R43-4: bool は int と別の型なので混ざれば int だけの経路には入らない
+    if kinds <= {int}:  # R43-4: 全部 int
+        try:  # R43-4
+            return np.array(seq, dtype=np.int64), np.zeros(len(seq), dtype=bool)  # R43-4
+        except OverflowError:  # R43-4: int64 に入らない整数がある
+            ints: List[Optional[int]] = list(seq)  # R43-4
+    elif kinds <= {str}:  # R43-4: 全部文字列（CSV など）。同じ値が繰り返すので異なる値だけ整数化する
+        parsed = {s: _json_int(s) for s in dict.fromkeys(seq)}  # R43-4: str どうしなので 1 と True のような衝突は無い
+        ints = [parsed[s] for s in seq]  # R43-4
+    else:  # R43-4: 混在した列は1件ずつ（単発と同じ規則）
+        ints = [v if type(v) is int else _json_int(v) for v in seq]  # R43-4
+    bad = np.array([v is None for v in ints], dtype=bool)  # R43-4
+    try:  # R43-4
+        vals = np.array([0 if v is None else v for v in ints], dtype=np.int64)  # R43-4
+    except OverflowError:  # R43-4: 大きな整数は端に寄せる（範囲外になる）
+        vals = np.array([0 if v is None else min(max(v, _INT64_MIN), _INT64_MAX) for v in ints], dtype=np.int64)  # R43-4
+    return vals, bad  # R43-4
+
+
+@dataclass(frozen=True)
+class CompiledValidator:  # R43-1: FieldDef の並びを一度だけPython関数にしたもの（呼び出し毎に定義を辿らない）
+    fields: Tuple[FieldDef, ...]  # R43-1: コンパイルしたときの定義（変更検知用）
+    type_messages: Tuple[Optional[str], ...]  # R43-1: 項目毎の型エラー文言（None なら既定値に戻して誤りにしない）
+    range_messages: Tuple[str, ...]  # R43-1: 項目毎の範囲エラー文言
+    first: Callable[[Mapping[str, Any]], Tuple[dict, Optional[str]]]  # R43-1: フォーム→(値, 最初の誤り)。誤りがあれば値は {}
+    every: Callable[[Mapping[str, Any]], Tuple[dict, List[str]]]  # R43-1: フォーム→(値, 全ての誤り)。整数にできない項目の値は None
+    json_row: Callable[[Mapping[str, Any], int, List[dict]], dict]  # R43-1: JSON の1件→値（誤りは第3引数に足す）
+    source: str  # R43-1: 生成したコード（デバッグ用）
+
+    def observations(self, rows: Sequence[Any]) -> tuple[list[dict], list[dict]]:  # R40-1: JSON の観測をまとめて検証する
+        cleaned: list[dict] = []  # R40-1: 入力順の正規化済みの値
+        errors: list[dict] = []  # R40-1: {"index", "field", "error"}（1件でもあれば全体を断る）
+        json_row = self.json_row  # R43-3
+        for i, row in enumerate(rows):  # R40-1
+            if not isinstance(row, Mapping):  # R40-1
+                errors.append({"index": i, "field": None, "error": ROW_MESSAGE})  # R40-1
+                continue  # R40-1
+            cleaned.append(json_row(row, i, errors))  # R43-3
+        return ([], errors) if errors else (cleaned, [])  # R40-1
+
+    def columns(self, columns: Mapping[str, Any], n: Optional[int] = None) -> ColumnarResult:  # R43-4: 列名→配列/リストを一括で検証する（全レコードの全誤りを返す）
+        _require_numpy()  # R43-4
+        if n is None:  # R43-4: 件数は最初にある列から決める
+            n = next((len(columns[f.key]) for f in self.fields if f.key in columns), 0)  # R43-4
+        codes = np.zeros((n, len(self.fields)), dtype=np.uint8)  # R43-4
+        values: Dict[str, Any] = {}  # R43-4
+        for j, (f, type_message) in enumerate(zip(self.fields, self.type_messages)):  # R43-4
+            if f.key not in columns:  # R43-4: 無い列は全件既定値（単発と同じ）
+                vals, bad = np.full(n, f.default, dtype=np.int64), None  # R43-4
+            else:  # R43-4
+                vals, bad = _int_column(columns[f.key])  # R43-4
+                if vals.shape != (n,):  # R43-4: 列長が揃っていない
+                    raise ValueError(f"column {f.key!r} has {vals.shape[0]} values, expected {n}")  # R21-1: 黙って放送しない
+                if not bad.any():  # R43-4
+                    bad = None  # R43-4
+                elif type_message is None:  # R43-4: 寛容な項目は既定値に戻す（入力の配列は書き換えない）
+                    vals, bad = np.where(bad, f.default, vals), None  # R43-4
+                else:  # R43-4
+                    codes[bad, j] = TYPE_ERROR  # R43-4
+            out = (vals < f.min) | (vals > f.max)  # R15-6: rangeエラー
+            if bad is not None:  # R43-4: 型エラーの位置は範囲を見ない
+                out &= ~bad  # R43-4
+            codes[out, j] = RANGE_ERROR  # R43-4
+            values[f.key] = vals  # R43-4
+        return ColumnarResult(fields=self.fields, values=values, codes=codes, messages=(self.type_messages, self.range_messages))  # R43-4
+
+
+def _has_table(f: FieldDef) -> bool:  # R43-1: 値の数が少ない項目だけ表を持つ
+    return f.max - f.min < MAX_TABLE_VALUES  # R43-1
+
+
+def _generate(fields: Sequence[FieldDef], type_messages: Sequence[Optional[str]], range_messages: Sequence[str]) -> str:  # R43-1: 定義→Pythonソース（キーと文言は repr で埋める）
+    first: List[str] = []  # R43-1: 最初の誤りで返す（R15-6 と同じ順序・同じ文言）
+    every: List[str] = []  # R43-1: 全項目を見る
+    json_row: List[str] = []  # R43-1: JSON の規則（_json_int）
+    for i, (f, tm, rm) in enumerate(zip(fields, type_messages, range_messages)):  # R43-1
+        v, out_of_range = f"v{i}", f"v{i} < {f.min!r} or v{i} > {f.max!r}"  # R43-1
+        head = [f"    raw = get({f.key!r}, {str(f.default)!r})"]  # R15-6: 無ければ既定値（フォームは文字列）
+        pad = ""  # R43-1
+        if _has_table(f):  # R43-1: 正しい値の正規形（"0".."3"）は表で引き、それ以外だけ int() に回す
+            head += [f"    {v} = T{i}.get(raw)", f"    if {v} is None:"]  # R43-1
+            pad = "    "  # R43-1
+        parse = [f"{pad}    try:", f"{pad}        {v} = int(raw)", f"{pad}    except ValueError:"]  # R15-6
+        first += head + parse + [  # R43-1
+            f"{pad}        return {{}}, {tm!r}" if tm is not None else f"{pad}        {v} = {f.default!r}",  # R15-6: 型エラー
+            f"{pad}    if {out_of_range}:", f"{pad}        return {{}}, {rm!r}",  # R15-6: rangeエラー
+        ]
+        every += head + parse + [  # R43-1
+            f"{pad}        {v} = None\n{pad}        errors.append({tm!r})" if tm is not None else f"{pad}        {v} = {f.default!r}",  # R43-1
+            f"{pad}    else:", f"{pad}        if {out_of_range}:", f"{pad}            errors.append({rm!r})",  # R43-1
+        ]
+        json_row += [  # R43-1
+            f"    raw = get({f.key!r}, {f.default!r})",  # R15-6: 無ければ既定値
+            f"    {v} = raw if type(raw) is int else _json_int(raw)",  # R43-1: 多くは素の int（bool は type が違うので _json_int で弾く）
+            f"    if {v} is None:",
+            f"        errors.append({{'index': i, 'field': {f.key!r}, 'error': {tm!r}}})" if tm is not None else f"        {v} = {f.default!r}",  # R40-1
+            f"    elif {out_of_range}:", f"        errors.append({{'index': i, 'field': {f.key!r}, 'error': {rm!r}}})",  # R40-1
+        ]
+    values = "{" + ", ".join(f"{f.key!r}: v{i}" for i, f in enumerate(fields)) + "}"  # R43-1: 定義順
+    return (  # R43-1
+        "def first(f):\n    get = f.get\n" + "\n".join(first) + f"\n    return {values}, None\n\n\n"
+        "def every(f):\n    get = f.get\n    errors = []\n" + "\n".join(every) + f"\n    return {values}, errors\n\n\n"
+        "def json_row(o, i, errors):\n    get = o.get\n" + "\n".join(json_row) + f"\n    return {values}\n"
+    )
+
+
+def compile_fields(fields: Sequence[FieldDef], type_message: Optional[str] = TYPE_MESSAGE, range_message: str = RANGE_MESSAGE) -> CompiledValidator:  # R43-1: 定義を関数にする
+    fields = tuple(fields)  # R43-1
+    type_messages = tuple(None if type_message is None else type_message.format(key=f.key, label=f.label, min=f.min, max=f.max) for f in fields)  # R43-1
+    range_messages = tuple(range_message.format(key=f.key, label=f.label, min=f.min, max=f.max) for f in fields)  # R43-1
+    source = _generate(fields, type_messages, range_messages)  # R43-1
+    namespace: Dict[str, Any] = {"_json_int": _json_int}  # R43-1
+    for i, f in enumerate(fields):  # R43-1: "2"→2 の表（int(str(v)) == v なので int() と同じ結果）
+        if _has_table(f):  # R43-1
+            namespace[f"T{i}"] = {str(v): v for v in range(f.min, f.max + 1)}  # R43-1
+    exec(compile(source, f"<validator {','.join(f.key for f in fields)}>", "exec"), namespace)  # R43-1: 信頼できる定義（コード内の登録）だけを扱う
+    return CompiledValidator(  # R43-1
+        fields=fields,  # R43-1
+        type_messages=type_messages,  # R43-1
+        range_messages=range_messages,  # R43-1
+        first=namespace["first"],  # R43-1
+        every=namespace["every"],  # R43-1
+        json_row=namespace["json_row"],  # R43-1
+        source=source,  # R43-1
+    )
+
+
+_validators: Dict[Any, Tuple[Sequence[FieldDef], CompiledValidator]] = {}  # R43-2: 定義の id（文言を変えたものは (id, 文言)）→(定義の写し, コンパイル結果)
+_lock = threading.Lock()  # R43-2
+
+
+def get_validator(fields: Sequence[FieldDef], type_message: Optional[str] = TYPE_MESSAGE, range_message: str = RANGE_MESSAGE) -> CompiledValidator:  # R43-2: 現在の定義に対応するコンパイル結果
+    # R43-2: FieldDef の hash は毎回全項目を辿るので、並びの id で引いて写しと比べる（同じ FieldDef なら比較は同一性で済む）
+    key: Any = id(fields) if type_message is TYPE_MESSAGE and range_message is RANGE_MESSAGE else (id(fields), type_message, range_message)  # R43-2
+    cached = _validators.get(key)  # R43-2
+    if cached is not None and cached[0] == fields:  # R22-4: 定義が変わっていなければそのまま使う
+        return cached[1]  # R43-2
+    with _lock:  # R43-2: 再コンパイルは1スレッドだけ
+        cached = _validators.get(key)  # R43-2: ロック取得後に再確認する
+        if cached is None or cached[0] != fields:  # R43-2
+            snapshot = list(fields) if isinstance(fields, list) else tuple(fields)  # R43-2: 呼び出し側と同じ型で写す（list と tuple は等しくならない）
+            cached = _validators[key] = (snapshot, compile_fields(fields, type_message, range_message))  # R43-2
+    return cached[1]  # R43-2
+
+
+def invalidate_validators() -> None:  # R43-2: 次回 get_validator で作り直させる
+    with _lock:  # R43-2
+        _validators.clear()  # R43-2
+
+
+# ISSUE_FIELDS is a tuple of frozen FieldDefs, so it can be compiled once here instead of looked up per request
+_issue_validator = compile_fields(ISSUE_FIELDS, type_message=None, range_message=ISSUE_RANGE_MESSAGE)
+
+
+def validate_template_form(form: Mapping[str, str], fields: Sequence[FieldDef]) -> tuple[dict, str | None]:  # R33-6: テンプレの入力定義で検証する
+    return get_validator(fields).first(form)  # R43-3: 最初の誤りで止める（文言/順序は R15-6 のまま）
+
+
 def validate_boundary_form(form: dict) -> tuple[dict, str | None]:  # R15-6: 境界フォームを検証する
-    cleaned: dict = {}  # R15-6: 正常化した値を入れる
-    for f in BOUNDARY_FIELDS:  # R15-6: 定義に従って各項目を処理する
-        raw = form.get(f.key, str(f.default))  # R15-6: 無ければ既定値
-        try:
-            v = int(raw)  # R15-6: int化する
-        except ValueError:
-            return {}, f"{f.key} は整数で入力してください"  # R15-6: 型エラー
-        if v < f.min or v > f.max:
-            return {}, f"{f.key} は {f.min}〜{f.max} の範囲で入力してください"  # R15-6: rangeエラー
-        cleaned[f.key] = v  # R15-6: 正常値を格納する
-    return cleaned, None  # R15-6: 正常
\ No newline at end of file
+    return get_validator(BOUNDARY_FIELDS).first(form)  # R43-3
+
+
+def validate_observations(rows: Sequence[Any], fields: Sequence[FieldDef]) -> tuple[list[dict], list[dict]]:  # R40-1: JSON の観測をまとめて検証する
+    return get_validator(fields).observations(rows)  # R43-3
+
+
+def validate_columns(columns: Mapping[str, Any], fields: Sequence[FieldDef], n: Optional[int] = None) -> ColumnarResult:  # R43-4: 列指向の入力（キー→配列/リスト）を一括で検証する（要 numpy）
+    return get_validator(fields).columns(columns, n)  # R43-4
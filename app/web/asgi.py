@@ -0,0 +1,87 @@
+from __future__ import annotations  # R31-0: 前方参照を安定させる
+
+from concurrent.futures import ThreadPoolExecutor  # R31-5: WSGI 側を回すスレッド（上限付き）
+from tempfile import SpooledTemporaryFile  # R31-7: 受け取った本文（大きければディスクへ）
+from typing import Any  # R31-0
+
+from asgiref.sync import AsyncToSync, SyncToAsync  # R31-5: poetry install -E async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance  # R31-5
+
+# R31-5: asgiref の WsgiToAsgi は WSGI アプリを thread_sensitive な1本のスレッドで順に回すので、
+# R31-5: そのままだと同時リクエストが直列になる。ここでは上限付きのスレッドプールで並行に回す。
+# R31-5: async ビュー（routes_async）は、そのスレッドからサーバのイベントループ上で実行される。
+# R31-7: ループ上で走るのは待ち合わせだけ。検証/描画は routes_async が aio.run_in_context でスレッドへ逃がす。
+# R31-7: asgiref から使うのは公開の SyncToAsync/AsyncToSync と WsgiToAsgiInstance.build_environ/start_response だけ。
+
+BODY_SPOOL_BYTES = 65536  # R31-7: これを超える本文は一時ファイルへ（asgiref と同じ）
+
+
+class _PooledInstance(WsgiToAsgiInstance):  # R31-5: 1リクエスト分（WSGI アプリを実行役のスレッドで回す）
+    def __init__(self, wsgi_application: Any, duplicate_header_limit: int, executor: ThreadPoolExecutor) -> None:
+        super().__init__(wsgi_application, duplicate_header_limit)  # R31-5
+        self.executor = executor  # R31-5
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:  # R31-7: 本文を受け取り切ってから WSGI アプリへ渡す
+        if scope["type"] != "http":  # R31-7
+            raise ValueError("WSGI wrapper received a non-HTTP scope")  # R31-7
+        self.scope = scope  # R31-7: build_environ が読む
+        with SpooledTemporaryFile(max_size=BODY_SPOOL_BYTES) as body:  # R31-7
+            while True:  # R31-7
+                message = await receive()  # R31-7
+                if message["type"] != "http.request":  # R31-7: 途中で切断された
+                    return  # R31-7: 応答する相手がいない
+                body.write(message.get("body", b""))  # R31-7
+                if not message.get("more_body"):  # R31-7
+                    break  # R31-7
+            body.seek(0)  # R31-7
+            self.sync_send = AsyncToSync(send)  # R31-7: スレッドからループ上の send を呼ぶ
+            await SyncToAsync(self._run, thread_sensitive=False, executor=self.executor)(body)  # R31-5: 上限付きプールで並行に回す
+
+    def _run(self, body: Any) -> None:  # R31-7: WSGI アプリを回して応答を送る（start_response と同じスレッド）
+        try:  # R31-7
+            environ = self.build_environ(self.scope, body)  # R31-7
+        except ValueError:  # R31-7: 同じヘッダが duplicate_header_limit を超えた
+            self.sync_send({"type": "http.response.start", "status": 400, "headers": [(b"content-type", b"text/plain")]})  # R31-7
+            self.sync_send({"type": "http.response.body", "body": b"Bad Request: Too many duplicate headers"})  # R31-7
+            return  # R31-7
+        result = self.wsgi_application(environ, self.start_response)  # R31-7
+        sent = 0  # R31-7
+        try:  # R31-7
+            for output in result:  # R31-7
+                if not self.response_started:  # R31-7: 最初の本文の前にヘッダを送る
+                    self.response_started = True  # R31-7
+                    self.sync_send(self.response_start)  # R31-7
+                if self.response_content_length is not None:  # R31-7: Content-Length を超えては送らない
+                    output = output[:self.response_content_length - sent]  # R31-7
+                self.sync_send({"type": "http.response.body", "body": output, "more_body": True})  # R31-7
+                sent += len(output)  # R31-7
+                if sent == self.response_content_length:  # R31-7
+                    break  # R31-7
+        finally:  # R31-7: PEP 3333 どおり close を呼ぶ（ストリーミング応答の後始末）
+            close = getattr(result, "close", None)  # R31-7
+            if close is not None:  # R31-7
+                close()  # R31-7
+        if not self.response_started:  # R31-7: 本文が空
+            self.response_started = True  # R31-7
+            self.sync_send(self.response_start)  # R31-7
+        self.sync_send({"type": "http.response.body"})  # R31-7
+
+
+class PooledWsgiToAsgi(WsgiToAsgi):  # R31-5: WSGI アプリ（Flask）を ASGI サーバ（uvicorn 等）に載せる
+    def __init__(self, wsgi_application: Any, threads: int = 32, duplicate_header_limit: int = 100) -> None:
+        super().__init__(wsgi_application, duplicate_header_limit)  # R31-5
+        self.executor = ThreadPoolExecutor(max_workers=max(1, int(threads)), thread_name_prefix="asgi-wsgi")  # R31-5
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:  # R31-5
+        if scope["type"] == "lifespan":  # R31-5: 起動/終了の通知には応答だけ返す
+            while True:  # R31-5
+                message = await receive()  # R31-5
+                await send({"type": message["type"] + ".complete"})  # R31-5
+                if message["type"] == "lifespan.shutdown":  # R31-5
+                    self.executor.shutdown(wait=True)  # R31-5
+                    return  # R31-5
+        await _PooledInstance(self.wsgi_application, self.duplicate_header_limit, self.executor)(scope, receive, send)  # R31-5
+
+
+def to_asgi(app: Any) -> PooledWsgiToAsgi:  # R31-5: ASGI_THREADS 本のスレッドで Flask アプリを回す
+    return PooledWsgiToAsgi(app, threads=app.config.get("ASGI_THREADS", 32))  # R31-5
@@ -0,0 +1,77 @@
+from __future__ import annotations  # R40-0: 前方参照を安定させる
+
+from typing import Any, Dict, List  # R40-0: 最小型を明示する
+
+from flask import Blueprint, current_app, jsonify, request  # R40-3: JSON の入出力
+
+from app.core.policy_table import lookup_policies  # R40-1: 前計算した方策表をまとめて引く
+from app.instrument import stage  # R35-2: /boundary と同じ段階名
+from app.storage.writer import WriteQueueFull, submit_steps  # R40-2: 複数行 INSERT（1トランザクション。R44-3: 書き込み役のプロセスがあればそこで）
+from app.templates_def.boundary import BOUNDARY_FIELDS  # R15-3: 境界テンプレの入力定義
+from app.validators import validate_columns, validate_observations  # R40-1: 全件の誤りを返す検証（R43-5: 列指向）
+
+bp_api = Blueprint("api", __name__)  # R40-3: JSON API（HTML フォームの /boundary とは別）
+
+
+def _flag(body: Dict[str, Any], name: str) -> bool:  # R40-3: 真偽値の指定（true のときだけ有効）
+    return body.get(name) is True  # R40-3: "false" などの文字列で有効にしない
+
+
+@bp_api.post("/api/simulate")  # R40-3: 観測の配列を1回で評価する
+def simulate():
+    body = request.get_json(silent=True)  # R40-3: 不正な JSON は None
+    if isinstance(body, list):  # R40-3: 配列だけ送られた場合は既定の指定で評価する
+        body = {"observations": body}  # R40-3
+    columns = body.get("columns") if isinstance(body, dict) else None  # R43-5: {"columns": {"threat": [...], ...}}（キー→同じ長さの配列）
+    if isinstance(columns, dict):  # R43-5
+        if not all(isinstance(v, list) for v in columns.values()):  # R43-5
+            return jsonify(error="columns の値は配列で指定してください"), 400  # R43-5
+        if len({len(v) for v in columns.values()}) > 1:  # R43-5: 黙って揃えない
+            return jsonify(error="columns の配列は同じ長さにしてください"), 400  # R43-5
+        count = len(next(iter(columns.values()), []))  # R43-5
+    elif not isinstance(body, dict) or not isinstance(body.get("observations"), list):  # R40-3
+        return jsonify(error="observations の配列か columns のオブジェクトを JSON で送ってください"), 400  # R40-3
+    else:  # R43-5
+        count = len(body["observations"])  # R40-3
+    max_cases = int(current_app.config.get("SIMULATE_API_MAX_CASES", 1000))  # R40-3: 1リクエストの上限
+    if count > max_cases:  # R40-3
+        return jsonify(error=f"1回に送れる観測は {max_cases} 件までです"), 413  # R40-3
+
+    with stage("validate"):  # R35-2
+        if isinstance(columns, dict):  # R43-5: 一括で検証する（numpy が無い環境では使えない）
+            try:  # R43-5
+                checked = validate_columns(columns, BOUNDARY_FIELDS, n=count)  # R43-4
+            except RuntimeError:  # R43-4: numpy 未インストール
+                return jsonify(error="このサーバでは columns を受け付けていません。observations で送ってください"), 501  # R43-5
+            errors = checked.errors()  # R43-4: 全レコードの全誤り
+            cleaned = [] if errors else checked.rows()  # R43-4: 以降は observations と同じ
+        else:  # R43-5
+            cleaned, errors = validate_observations(body["observations"], BOUNDARY_FIELDS)  # R40-1: 1件でも不正なら全体を断る
+    if errors:  # R40-3
+        return jsonify(errors=errors), 400  # R40-3: 何件目のどの項目か
+
+    with stage("simulate"):  # R35-2
+        entries = lookup_policies(cleaned)  # R40-1: 1件につき表を1回引く
+
+    ids: List[int] = []  # R40-2
+    if _flag(body, "persist"):  # R40-2: 既定は保存しない
+        try:  # R44-3
+            with stage("save"):  # R35-2
+                ids = submit_steps("boundary", [  # R40-2: まとめ書きのキューは通さず、全件を1回でコミットする
+                    {"s_t": e.x.s_t, "o_t": e.x.o_t, "pi_t": e.output.pi_t, "o_t1_pred": e.output.o_t1_pred, "notes": e.output.notes}  # R8-6
+                    for e in entries  # R40-2
+                ])
+        except WriteQueueFull:  # R44-3: 書き込み役に届かない/満杯（保存されていないか分からない）
+            return jsonify(error="保存が混み合っています。しばらくしてから送り直してください"), 503  # R44-3
+
+    propose = _flag(body, "proposals")  # R40-3: propose_interventions の結果（表に前計算済みの ±1近傍）
+    with stage("render"):  # R35-2
+        results = []  # R40-3: 入力順
+        for i, e in enumerate(entries):  # R40-3
+            item: Dict[str, Any] = {"pi_t": e.output.pi_t, "o_t1_pred": e.output.o_t1_pred, "notes": e.output.notes}  # R8-5
+            if propose:  # R40-3
+                item["proposals"] = list(e.proposals)  # R16-1
+            if ids:  # R40-2
+                item["id"] = ids[i]  # R40-2: /steps/<id> で読める
+            results.append(item)  # R40-3
+        return jsonify(count=len(results), results=results)  # R40-3
@@ -0,0 +1,95 @@
+from __future__ import annotations  # R31-0: 前方参照を安定させる
+
+# R31-4: /boundary と /steps の非同期版（ASYNC_VIEWS=True で同期版の代わりに登録する）。
+# R31-4: 入力の解釈と描画は同期版と共有し、SQLite の読み書きだけ app.storage.aio で待つ。
+# R31-7: 検証と描画（Jinja）も aio.run_in_context でスレッドへ逃がし、ループ上では待つだけにする。
+# R31-4: Flask の async ビューには asgiref が要る（poetry install -E async）。ASGI で動かすなら asgi.py を使う。
+
+from flask import Blueprint, abort, jsonify, render_template, request  # R31-4
+
+from app.core.policy_table import lookup_policy  # R22-3: 前計算した方策表を引く
+from app.instrument import stage  # R35-2: 同期版と同じ段階名
+from app.storage import aio  # R31-4: スレッドに逃がした読み書き
+from app.storage.cache import get_page, get_step_cache, put_page  # R32-3: 保存済み step の描画済みページ
+from app.storage.writer import WriteQueueFull  # R25-2: 背圧
+from app.validators import validate_boundary_form  # R15-6: 定義準拠の検証を使う
+from app.web.routes_boundary import _form_from_query, _form_from_step, _render_result, _render_step_form, _to_int  # R31-4: 同期版と同じ解釈/描画
+from app.web.routes_steps import _index_query, _page_response, _render_index, _search_query, _stats_query, steps_export  # R31-4
+
+bp_boundary_async = Blueprint("boundary", __name__)  # R31-4: 同じ名前にして url_for("boundary.…") をそのまま使う
+bp_steps_async = Blueprint("steps", __name__)  # R31-4
+
+
+@bp_boundary_async.get("/boundary")  # R10-0: 入力フォームを表示する
+async def boundary_form():
+    form = _form_from_query()  # R10-1: クエリのフォーム値
+    if form is not None:  # R10-3
+        return await aio.run_in_context(render_template, "boundary_form.html", form=form, error=None)  # R31-7
+    step_id = request.args.get("step_id")  # R10-4: 再実行元ログID（任意）
+    if not step_id:  # R10-2
+        return await aio.run_in_context(render_template, "boundary_form.html", form=_form_from_step(None), error=None)  # R31-7
+    page = get_page("boundary_form", _to_int(step_id, 0))  # R32-3: 描画済み
+    if page is not None:  # R32-3
+        return page.body  # R32-3
+    step = await aio.read_step_cached(_to_int(step_id, 0))  # R31-4: 読み取りを待つ間ループは空く
+    return await aio.run_in_context(_render_step_form, step)  # R31-7
+
+
+@bp_boundary_async.post("/boundary")  # R5-2: フォーム送信を処理する
+async def boundary_submit():
+    with stage("validate"):  # R35-2
+        cleaned, err = await aio.run_in_context(lambda: validate_boundary_form(request.form))  # R15-6: 検証+正規化（R31-7: request.form の解釈ごとスレッドで）
+    if err:  # R15-err-1
+        return await aio.run_in_context(render_template, "boundary_form.html", error=err, form=dict(request.form)), 400  # R15-err-1
+    with stage("simulate"):  # R35-2
+        entry = lookup_policy(cleaned)  # R22-3: 表を1回引くだけ（CPUは数µs、スレッドに逃がさない）
+    y = entry.output  # R8-5
+    try:  # R25-5: まとめ書きのキューが満杯なら背圧で断る
+        with stage("save"):  # R35-2: 待っている間も含む
+            row_id = await aio.submit_step(  # R31-3: コミット後の行IDを待つ
+                template_id="boundary",
+                s_t=entry.x.s_t,
+                o_t=entry.x.o_t,
+                pi_t=y.pi_t,
+                o_t1_pred=y.o_t1_pred,
+                notes=y.notes,
+            )
+    except WriteQueueFull:  # R25-2
+        abort(503)  # R25-2
+    return await aio.run_in_context(_render_result, cleaned, entry, row_id)  # R31-4: 同期版と同じ結果ページ（R31-7: 探索と描画はスレッドで）
+
+
+@bp_steps_async.get("/steps")  # R14-0: 履歴一覧を表示する
+async def steps_index():
+    q = _index_query()  # R31-4: 絞り込み条件（不正なら400）
+    steps = await aio.list_steps_filtered(**q)  # R31-4
+    return await aio.run_in_context(_render_index, steps, q)  # R31-7
+
+
+bp_steps_async.add_url_rule("/steps/export", view_func=steps_export)  # R31-4: ストリーミング出力は同期のまま（生成器をWSGIが回す）
+
+
+@bp_steps_async.get("/steps/cache-stats")  # R32-4
+async def steps_cache_stats():
+    return jsonify(get_step_cache().stats())  # R32-4
+
+
+@bp_steps_async.get("/steps/stats")  # R37-5
+async def steps_stats():
+    return jsonify(await aio.step_stats(**_stats_query()))  # R37-5
+
+
+@bp_steps_async.get("/steps/search")  # R38-3
+async def steps_search():
+    return jsonify(await aio.search_steps(**_search_query()))  # R38-3
+
+
+@bp_steps_async.get("/steps/<int:step_id>")  # R7-2: 履歴詳細を表示する
+async def steps_show(step_id: int):
+    page = get_page("steps_show", step_id)  # R32-3: ヒットならスレッドに逃がさない
+    if page is None:  # R32-3
+        step = await aio.read_step_cached(step_id)  # R31-4
+        if step is None:  # R7-2
+            abort(404)  # R7-2
+        page = put_page("steps_show", step, await aio.run_in_context(render_template, "steps/show.html", step=step))  # R32-3（R31-7: 描画はスレッドで）
+    return _page_response(page)  # R32-3
@@ -1,15 +1,15 @@
 from __future__ import annotations  # R8-0: 前方参照を安定させる
 
-from flask import Blueprint, render_template, request  # R8-1: ルート/テンプレ/入力を扱う
+from flask import Blueprint, abort, current_app, render_template, request  # R8-1: ルート/テンプレ/入力を扱う
 
-from app.core.contracts import StepInput  # R8-2: 契約型で入力を組み立てる
-from app.core.simulator import simulate_step  # R8-3: 1-stepを回す
-from app.storage.repository import init_db, save_step, read_step  # R8-4: 保存と「過去ログ読み取り」に使う
+from app.core.interventions import propose_interventions, search_interventions  # R22-1: 介入候補（core へ移設、ここからも import 可能にしておく）
+from app.core.policy_table import lookup_policy  # R22-3: 前計算した方策表を引く
+from app.instrument import stage  # R35-2: 段階毎の時間（INSTRUMENT=False なら何もしない）
+from app.storage.cache import get_page, put_page, read_step_cached  # R32-2: 「過去ログ読み取り」はキャッシュ経由
+from app.storage.writer import WriteQueueFull, submit_step, wait_step_id  # R25-5: 保存（同期 or まとめ書き。R25-7: 待つ上限付き）
 
 from app.validators import validate_boundary_form  # R15-6: 定義準拠の検証を使う
 
-from app.templates_def.boundary import BOUNDARY_FIELDS  # R16-5: 範囲情報を使う
-
 bp_boundary = Blueprint("boundary", __name__)  # R8-1: 境界テンプレ用Blueprint
 
 
@@ -29,131 +29,111 @@ def _build_form_from_ot(o_t: dict) -> dict:  # R8-2: 過去ログのo_tからフ
     }  # R8-2: 必須項目を揃える
 
 
-@bp_boundary.get("/boundary")  # R10-0: 入力フォームを表示する
-def boundary_form():
+def _form_from_query() -> dict | None:  # R31-4: クエリのフォーム値（来ていなければ None）— 同期/非同期の両ビューで使う
     # R10-1: クエリから直接フォーム値を受け取れるようにする（結果→再実行用）
     q_threat = request.args.get("threat")  # R10-1: threatをクエリから受け取る
     q_body_alarm = request.args.get("body_alarm")  # R10-1: body_alarmをクエリから受け取る
     q_need_clarity = request.args.get("need_clarity")  # R10-1: need_clarityをクエリから受け取る
     q_energy = request.args.get("energy")  # R10-1: energyをクエリから受け取る
 
-    form = {"threat": "0", "body_alarm": "0", "need_clarity": "0", "energy": "0"}  # R10-2: デフォルト初期値
-
     # R10-3: クエリ値が揃っているなら、それを優先してフォームを作る
     if any(v is not None for v in (q_threat, q_body_alarm, q_need_clarity, q_energy)):  # R10-3: どれかが来ていれば
-        form = {  # R10-3: クエリ値を文字列のままフォームに入れる（入力保持と同じ方針）
+        return {  # R10-3: クエリ値を文字列のままフォームに入れる（入力保持と同じ方針）
             "threat": q_threat or "0",  # R10-3: threat
             "body_alarm": q_body_alarm or "0",  # R10-3: body_alarm
             "need_clarity": q_need_clarity or "0",  # R10-3: need_clarity
             "energy": q_energy or "0",  # R10-3: energy
         }
-        return render_template("boundary_form.html", form=form, error=None)  # R10-3: クエリフォームで描画する
+    return None  # R31-4
+
+
+def _form_from_step(step: dict | None) -> dict:  # R31-4: 再実行元ログからフォームを作る（無ければデフォルト）
+    if step and isinstance(step.get("o_t"), dict):  # R10-4: o_tが辞書なら
+        return _build_form_from_ot(step["o_t"])  # R10-4: o_tからフォームを作る
+    return {"threat": "0", "body_alarm": "0", "need_clarity": "0", "energy": "0"}  # R10-2: デフォルト初期値
+
+
+@bp_boundary.get("/boundary")  # R10-0: 入力フォームを表示する
+def boundary_form():
+    form = _form_from_query()  # R10-1: クエリのフォーム値
+    if form is not None:  # R10-3: クエリフォームで描画する
+        return render_template("boundary_form.html", form=form, error=None)  # R10-3
 
     # R10-4: クエリが無い場合は step_id を見る（従来の再実行）
     step_id = request.args.get("step_id")  # R10-4: 再実行元ログID（任意）
-    if step_id:  # R10-4: step_idが指定されている場合
-        step = read_step(_to_int(step_id, 0))  # R10-4: DBからログを読む
-        if step and isinstance(step.get("o_t"), dict):  # R10-4: o_tが辞書なら
-            form = _build_form_from_ot(step["o_t"])  # R10-4: o_tからフォームを作る
-
-    return render_template("boundary_form.html", form=form, error=None)  # R10-2: デフォルト/step_idで描画する
-
-def propose_interventions(base_cleaned: dict, base_pi_t: str) -> list[dict]:  # R16-1: 介入候補を作る
-    proposals: list[dict] = []  # R16-1: 候補を貯める
-
-    for f in BOUNDARY_FIELDS:  # R16-2: 各入力を1つずつ動かす
-        for delta in (-1, 1):  # R16-2: ±1だけ試す
-            v0 = int(base_cleaned[f.key])  # R16-2: 現在値
-            v1 = v0 + delta  # R16-2: 近傍値
-            if v1 < f.min or v1 > f.max:  # R16-5: 範囲外はスキップ
-                continue  # R16-5: 無効候補は出さない
-
-            alt = dict(base_cleaned)  # R16-2: 入力をコピーする
-            alt[f.key] = v1  # R16-2: 1項目だけ変更する
-
-            # --- alt でsimulate_stepを回す（既存ロジックを最小で再利用） ---
-            s_t = {"energy": alt["energy"]}  # R16-3: 隠れ状態（現状どおり）
-            o_t = {  # R16-3: 観測（現状どおり）
-                "threat": alt["threat"],
-                "body_alarm": alt["body_alarm"],
-                "need_clarity": alt["need_clarity"],
-                "energy": alt["energy"],
-            }
-
-            x = StepInput(  # R16-3: 契約どおり入力を作る
-                s_t=s_t,  # R16-3
-                o_t=o_t,  # R16-3
-                prefs={"safe": 0.7, "connect": 0.3},  # R16-3: V0固定
-                precision={"policy": 1.0},  # R16-3: V0固定
-            )
-            y = simulate_step(x)  # R16-3: 近傍ケースを評価する
-
-            if y.pi_t != base_pi_t:  # R16-3: 方策が変わったものだけ採用
-                proposals.append({  # R16-4: 表示用の情報をまとめる
-                    "key": f.key,  # R16-4: 変更項目
-                    "label": f.label,  # R16-4: 表示名
-                    "from": v0,  # R16-4: 変更前
-                    "to": v1,  # R16-4: 変更後
-                    "pi_t": y.pi_t,  # R16-4: 新しい方策
-                })
-
-    return proposals  # R16-1: 候補一覧を返す
+    if not step_id:  # R10-2: デフォルトで描画する
+        return render_template("boundary_form.html", form=_form_from_step(None), error=None)  # R10-2
+    page = get_page("boundary_form", _to_int(step_id, 0))  # R32-3: 同じ step からのフォームは描画済みを返す
+    if page is not None:  # R32-3
+        return page.body  # R32-3
+    return _render_step_form(read_step_cached(_to_int(step_id, 0)))  # R10-4: DBからログを読む（R32-2: /steps/<id> と同じキャッシュ）
+
+
+def _render_step_form(step) -> str:  # R32-3: step_id のフォームを描画して覚える（同期/非同期で共有）
+    body = render_template("boundary_form.html", form=_form_from_step(step), error=None)  # R10-4
+    if step is not None:  # R32-3: 無い id は覚えない
+        put_page("boundary_form", step, body)  # R32-3
+    return body  # R32-3
 
 @bp_boundary.post("/boundary")  # R5-2: フォーム送信を処理する
 def boundary_submit():
     # --- 1) 入力検証（ここはあなたの現行実装に合わせてOK） ---
     # 例: threat/body_alarm/... を作る or validate_boundary_form を使う
 
-    cleaned, err = validate_boundary_form(request.form)  # R15-6: 検証+正規化
+    with stage("validate"):  # R35-2
+        cleaned, err = validate_boundary_form(request.form)  # R15-6: 検証+正規化
     if err:
             return render_template("boundary_form.html", error=err, form=dict(request.form)), 400  # R15-err-1: テンプレで安定参照
 
-    threat = cleaned["threat"]  # R15-6
-    body_alarm = cleaned["body_alarm"]  # R15-6
-    need_clarity = cleaned["need_clarity"]  # R15-6
-    energy = cleaned["energy"]  # R15-6
-
-    # --- 2) s_t / o_t を構成（あなたの現行そのままでOK） ---
-    s_t = {"energy": energy}  # R5-7: 隠れ状態（V0では最小）
-    o_t = {  # R5-7: 観測
-        "threat": threat,
-        "body_alarm": body_alarm,
-        "need_clarity": need_clarity,
-        "energy": energy,
-    }
-
-    # --- 3) StepInputを作る（ここが 94行目付近のはず） ---
-    x = StepInput(  # R8-4: 契約どおりにStepInputを作る
-        s_t=s_t,  # R8-4
-        o_t=o_t,  # R8-4
-        prefs={"safe": 0.7, "connect": 0.3},  # R8-4: 好み（V0固定）
-        precision={"policy": 1.0},  # R8-4: 精度（V0固定）
-    )
-
-    # --- 4) 1-stepシミュレート ---
-    y = simulate_step(x)  # R8-5: 1-step回す
+    # --- 2)〜4) s_t / o_t の構成と1-stepシミュレートは前計算済みの表を1回引くだけ ---
+    with stage("simulate"):  # R35-2
+        entry = lookup_policy(cleaned)  # R22-3: 入力ベクトル→StepInput/StepOutput/介入候補
+    s_t = entry.x.s_t  # R5-7: 隠れ状態（V0では最小）
+    o_t = entry.x.o_t  # R5-7: 観測
+    y = entry.output  # R8-5: 1-stepの結果
 
     # --- 5) 保存 ---
-    init_db()  # R8-6: スキーマ初期化（冪等）
-    row_id = save_step(  # R8-6: 1行保存
-        template_id="boundary",
-        s_t=s_t,
-        o_t=o_t,
-        pi_t=y.pi_t,
-        o_t1_pred=y.o_t1_pred,
-        notes=y.notes,
-    )
-
-    proposals = propose_interventions(cleaned, y.pi_t)  # R16-1: 介入候補を計算する
+    try:  # R25-5: まとめ書きのキューが満杯なら背圧で断る
+        with stage("save"):  # R35-2: まとめ書きならコミット待ちを含む
+            row_id = wait_step_id(submit_step(  # R8-6: 1行保存（スキーマは起動時に確保済み: R20-5）
+                template_id="boundary",
+                s_t=s_t,
+                o_t=o_t,
+                pi_t=y.pi_t,
+                o_t1_pred=y.o_t1_pred,
+                notes=y.notes,
+            ))  # R25-1: コミット後の行IDを待つ（同時リクエストは1トランザクションにまとまる。R25-7: STEPS_WRITE_RESULT_TIMEOUT で 503）
+    except WriteQueueFull:  # R25-2: 書き込みが追いついていない
+        abort(503)  # R25-2: 後で再送してもらう
+
+    return _render_result(cleaned, entry, row_id)  # R31-4: 介入候補と結果ページ
+
+
+def _render_result(cleaned: dict, entry, row_id: int):  # R31-4: 介入候補を揃えて結果ページを返す（同期/非同期で共有）
+    y = entry.output  # R8-5: 1-stepの結果
+    radius = int(current_app.config.get("BOUNDARY_SEARCH_RADIUS", 1))  # R23-5: 探索半径（設定）
+    with stage("propose"):  # R35-2
+        if radius <= 1:  # R23-5: ±1近傍なら
+            proposals = list(entry.proposals)  # R22-3: 介入候補も表から取る（propose_interventions と同じ内容）
+        else:  # R23-5: 半径2以上は複数項目の変更も探索する
+            proposals = search_interventions(  # R23-5: メモ付き幅優先探索
+                cleaned,  # R23-5: 現在値
+                y.pi_t,  # R23-5: 現在の方策
+                radius=radius,  # R23-5: 探索半径
+                max_evals=current_app.config.get("BOUNDARY_SEARCH_MAX_EVALS"),  # R23-5: 評価回数の予算
+                time_budget=current_app.config.get("BOUNDARY_SEARCH_TIME_BUDGET"),  # R23-5: 時間の予算
+            ).proposals  # R23-5: 変更数の少ない順
 
     # --- 6) 結果ページ ---
-    return render_template(  # R5-2: 結果ページを返す
-        "boundary_result.html",
-        row_id=row_id,
-        s_t=s_t,
-        o_t=o_t,
-        pi_t=y.pi_t,
-        o_t1_pred=y.o_t1_pred,
-        notes=y.notes,
-        proposals=proposals,  # R16-1: 介入候補をテンプレへ渡す
-    )
\ No newline at end of file
+    with stage("render"):  # R35-2
+        return render_template(  # R5-2: 結果ページを返す
+            "boundary_result.html",
+            row_id=row_id,
+            s_t=entry.x.s_t,
+            o_t=entry.x.o_t,
+            pi_t=y.pi_t,
+            o_t1_pred=y.o_t1_pred,
+            notes=y.notes,
+            proposals=proposals,  # R16-1: 介入候補をテンプレへ渡す
+            radius=radius,  # R23-5: 探索半径（0件時の説明用）
+        )
@@ -0,0 +1,27 @@
+from __future__ import annotations  # R35-4: 前方参照を安定させる
+
+from flask import Blueprint, Response, abort, jsonify  # R35-4
+
+from app import instrument  # R35-4: 集計とプロファイル
+
+bp_metrics = Blueprint("metrics", __name__)  # R35-4: INSTRUMENT=True のときだけ登録する
+
+
+@bp_metrics.get("/metrics")  # R35-4: Prometheus のスクレイプ先
+def metrics():
+    return Response(instrument.render_prometheus(), mimetype="text/plain; version=0.0.4")  # R35-4
+
+
+@bp_metrics.get("/metrics/profiles")  # R35-5: 直近のプロファイル一覧
+def profiles_index():
+    return jsonify(instrument.list_profiles())  # R35-5
+
+
+@bp_metrics.get("/metrics/profiles/<int:profile_id>")  # R35-5: collapsed stack（flamegraph.pl / speedscope にそのまま渡せる）
+def profiles_show(profile_id: int):
+    found = instrument.get_profile(profile_id)  # R35-5
+    if found is None:  # R35-5: 古くて捨てた / 無い id
+        abort(404)  # R35-5
+    target, profiler = found  # R35-5
+    header = f"# {target}: {profiler.samples} samples in {profiler.elapsed:.6f}s\n"  # R35-5
+    return Response(header + profiler.collapsed(), mimetype="text/plain")  # R35-5
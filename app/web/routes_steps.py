@@ -1,34 +1,162 @@
 from __future__ import annotations  # R7-0: 型注釈の前方参照を安定させる
 
-from flask import Blueprint, abort, render_template, request  # R7-1: ルート定義とテンプレ表示を行う
+import re  # R38-3: カーソルの形式
 
-from app.storage.repository import list_steps_filtered, read_step  # R14-0: フィルタ版一覧と詳細取得
+from flask import Blueprint, Response, abort, current_app, jsonify, make_response, render_template, request, url_for  # R7-1: ルート定義とテンプレ表示を行う
+
+from app.storage.cache import CachedPage, get_page, get_step_cache, put_page, read_step_cached  # R32-2: 保存済み step と描画済みページ
+from app.storage.export import EXPORT_FORMATS, export_filename, export_mimetype, iter_export  # R27-1: ストリーミング出力
+from app.storage.repository import STEP_SUMMARY_COLUMNS, list_steps_filtered, normalize_created_at  # R14-0: フィルタ版一覧と詳細取得
+from app.storage.rollup import step_stats  # R37-5: 集計表から件数/ヒストグラム
+from app.storage.search import search_steps  # R38-3: notes の全文検索
+from app.templates_def.boundary import BOUNDARY_FIELDS  # R26-3: 一覧に出す o_t のキー
 
 
 bp_steps = Blueprint("steps", __name__)  # R7-1: 履歴画面専用のBlueprint
 
-@bp_steps.get("/steps")  # R14-0: 履歴一覧を表示する
-def steps_index():
-    limit = int(request.args.get("limit", "50"))  # R14-1: 取得上限
-    template = request.args.get("template")  # R14-2: template絞り込み
-    pi_t = request.args.get("pi_t")  # R14-3: pi_t絞り込み
 
-    steps = list_steps_filtered(limit=limit, template=template, pi_t=pi_t)  # R14-4: DB側で絞り込む
+def _arg_int(name: str) -> int | None:  # R24-1: 整数クエリを読む（不正なら400）
+    raw = request.args.get(name)  # R24-1: 生の値
+    if raw in (None, ""):  # R24-1: 未指定
+        return None  # R24-1: 条件なし
+    try:  # R24-1: 整数化を試す
+        return int(raw)  # R24-1: 整数を返す
+    except ValueError:  # R24-1: 整数でない
+        abort(400)  # R24-1: 不正なクエリ
+
+
+def _arg_time(name: str) -> str | None:  # R24-3: 日付/日時クエリを created_at と比較できるISO文字列にする
+    raw = request.args.get(name)  # R24-3: 生の値（例: 2026-01-31 / 2026-01-31T09:00:00+09:00）
+    if not raw:  # R24-3: 未指定
+        return None  # R24-3: 条件なし
+    try:  # R24-3: 解釈を試す
+        return normalize_created_at(raw)  # R27-3: CLI と同じ規則で正規化する
+    except ValueError:  # R24-3: 解釈できない
+        abort(400)  # R24-3: 不正なクエリ
+
+
+def _index_query() -> dict:  # R31-4: 一覧の読み取り条件（同期/非同期の両ビューで使う）
+    limit_max = int(current_app.config.get("STEPS_PAGE_MAX", 500))  # R24-4: 1ページの上限
+    limit = _arg_int("limit") or 50  # R14-1: 取得上限
+    return dict(  # R14-4: DB側で絞り込む
+        limit=max(1, min(limit, limit_max)),  # R24-4: 無制限に読ませない
+        template=request.args.get("template"),  # R14-2: template絞り込み
+        pi_t=request.args.get("pi_t"),  # R14-3: pi_t絞り込み
+        after_id=_arg_int("after_id"),  # R24-1: 新しい側のページ
+        before_id=_arg_int("before_id"),  # R24-1: 古い側のページ
+        since=_arg_time("since"),  # R24-3: 期間の下限（以上）
+        until=_arg_time("until"),  # R24-3: 期間の上限（未満）
+        columns=STEP_SUMMARY_COLUMNS,  # R26-2: JSON列は読まない
+        o_t_keys=[f.key for f in BOUNDARY_FIELDS],  # R26-3: o_t の要約だけ SQLite 側で取り出す
+    )
+
+
+def _render_index(steps: list, q: dict):  # R31-4: 一覧ページを描画する
+    limit, template, pi_t = q["limit"], q["template"], q["pi_t"]  # R14-6
     count = len(steps)  # R14-5: フィルタ後の実件数（必ず代入する）
 
+    filters = {  # R24-1: ページ移動でも絞り込みを引き継ぐ
+        k: v  # R24-1
+        for k, v in (("limit", limit), ("template", template), ("pi_t", pi_t),  # R24-1
+                     ("since", request.args.get("since")), ("until", request.args.get("until")))  # R24-3
+        if v  # R24-1: 指定されたものだけ
+    }
+    newer_url = url_for("steps.steps_index", after_id=steps[0]["id"], **filters) if steps else None  # R24-1: 新しい側へ
+    older_url = url_for("steps.steps_index", before_id=steps[-1]["id"], **filters) if count == limit else None  # R24-1: 古い側へ（満杯なら続きがあり得る）
+
     return render_template(  # R14-6: テンプレに渡す
         "steps/index.html",  # R14-6: 一覧テンプレ
         steps=steps,  # R14-6: 表示データ
         limit=limit,  # R14-6: 取得上限
         template=template,  # R14-6: template表示用
         pi_t=pi_t,  # R14-6: pi_t表示用
+        since=q["since"],  # R24-3: 期間表示用
+        until=q["until"],  # R24-3: 期間表示用
         count=count,  # R14-6: 実件数
+        newer_url=newer_url,  # R24-1: 新しい側のページ
+        older_url=older_url,  # R24-1: 古い側のページ
     )  # R14-6: 描画
 
 
+@bp_steps.get("/steps")  # R14-0: 履歴一覧を表示する
+def steps_index():
+    q = _index_query()  # R31-4: 絞り込み条件
+    return _render_index(list_steps_filtered(**q), q)  # R14-4: DB側で絞り込んで描画する
+
+
+@bp_steps.get("/steps/export")  # R27-1: steps をNDJSON/CSVでストリーミング出力する
+def steps_export():
+    fmt = request.args.get("format", "ndjson")  # R27-1: 出力形式
+    if fmt not in EXPORT_FORMATS:  # R27-1: 未対応の形式
+        abort(400)  # R27-1
+    gzip = request.args.get("gzip") in ("1", "true", "yes")  # R27-2: gzip圧縮（任意）
+    chunks = iter_export(  # R27-1: 一覧と同じ絞り込み条件
+        fmt,  # R27-1
+        gzip=gzip,  # R27-2
+        template=request.args.get("template"),  # R14-2
+        pi_t=request.args.get("pi_t"),  # R14-3
+        since=_arg_time("since"),  # R24-3
+        until=_arg_time("until"),  # R24-3
+        chunk_size=int(current_app.config.get("STEPS_EXPORT_CHUNK_SIZE", 1000)),  # R27-1: fetchmany の単位
+    )
+    return Response(  # R27-1: 生成しながら送る（全件をメモリに載せない）
+        chunks,  # R27-1
+        mimetype=export_mimetype(fmt, gzip),  # R27-1
+        headers={"Content-Disposition": f"attachment; filename={export_filename(fmt, gzip)}"},  # R27-1: ダウンロード
+    )
+
+
+def _page_response(page: CachedPage) -> Response:  # R32-3: ETag/Last-Modified 付きで返す（一致すれば 304）
+    resp = make_response(page.body)  # R32-3
+    resp.set_etag(page.etag)  # R32-3
+    resp.last_modified = page.last_modified  # R32-3
+    resp.cache_control.no_cache = True  # R32-3: 毎回確認させる（replay 後に古い版を出さない）
+    return resp.make_conditional(request)  # R32-3: If-None-Match / If-Modified-Since なら 304
+
+
+@bp_steps.get("/steps/cache-stats")  # R32-4: キャッシュのヒット/ミス
+def steps_cache_stats():
+    return jsonify(get_step_cache().stats())  # R32-4
+
+
+def _stats_query() -> dict:  # R37-5: /steps/stats の条件（同期/非同期の両ビューで使う）
+    fields = [f for f in request.args.get("field", "").split(",") if f]  # R37-5: 例: field=threat,energy
+    return dict(  # R37-5
+        template=request.args.get("template"),  # R14-2
+        since=_arg_time("since"),  # R24-3: 日単位（その日を含む）
+        until=_arg_time("until"),  # R24-3: 日単位（その日を含まない）
+        fields=fields or None,  # R37-5: 未指定なら全項目
+    )
+
+
+@bp_steps.get("/steps/stats")  # R37-5: 方策の分布（全体/日/テンプレ）と入力値毎の方策ヒストグラム
+def steps_stats():
+    return jsonify(step_stats(**_stats_query()))  # R37-5: steps の行数に依らず集計表だけを読む
+
+
+def _search_query() -> dict:  # R38-3: /steps/search の条件（同期/非同期の両ビューで使う）
+    limit_max = int(current_app.config.get("STEPS_PAGE_MAX", 500))  # R24-4
+    cursor = request.args.get("cursor") or None  # R38-3: 前ページの next
+    if cursor is not None and not re.fullmatch(r"\d+(:\d+)?", cursor):  # R38-3: 形式だけ確かめる
+        abort(400)  # R38-3
+    return dict(  # R38-3
+        q=request.args.get("q", ""),  # R38-3: 空白区切りで AND
+        limit=max(1, min(_arg_int("limit") or 50, limit_max)),  # R24-4
+        cursor=cursor,  # R38-3
+    )
+
+
+@bp_steps.get("/steps/search")  # R38-3: notes の一致した note set（関連度順）と該当 step のページ
+def steps_search():
+    return jsonify(search_steps(**_search_query()))  # R38-3
+
+
 @bp_steps.get("/steps/<int:step_id>")  # R7-2: 履歴詳細を表示する
 def steps_show(step_id: int):
-    step = read_step(step_id)  # R7-2: id指定で1件取得する
-    if step is None:  # R7-2: 無ければ
-        abort(404)  # R7-2: 404にする
-    return render_template("steps/show.html", step=step)  # R7-2: 詳細テンプレを返す
\ No newline at end of file
+    page = get_page("steps_show", step_id)  # R32-3: 描画済みならDBもテンプレも使わない
+    if page is None:  # R32-3
+        step = read_step_cached(step_id)  # R7-2: id指定で1件取得する（R32-2: 行もキャッシュ）
+        if step is None:  # R7-2: 無ければ
+            abort(404)  # R7-2: 404にする
+        page = put_page("steps_show", step, render_template("steps/show.html", step=step))  # R7-2: 詳細テンプレを描画して覚える
+    return _page_response(page)  # R32-3
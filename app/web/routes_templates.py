@@ -0,0 +1,71 @@
+from __future__ import annotations  # R33-8: 前方参照を安定させる
+
+from flask import Blueprint, abort, render_template, request  # R33-8: ルート/テンプレ/入力を扱う
+
+from app.core.policy_table import lookup_policy  # R33-8: テンプレ毎の方策表（無ければコンパイル済み規則）
+from app.storage.cache import read_step_cached  # R32-2: 再実行元ログ
+from app.storage.writer import WriteQueueFull, submit_step, wait_step_id  # R25-5: 保存（同期 or まとめ書き。R25-7: 待つ上限付き）
+from app.templates_def.registry import get_template, template_ids  # R33-2: 登録済みテンプレ
+from app.templates_def.spec import TemplateDef  # R33-1
+from app.validators import validate_template_form  # R33-6: 定義準拠の検証
+
+bp_templates = Blueprint("tpl", __name__)  # R33-8: 登録済みテンプレを共通の画面で扱う
+
+
+def _template_or_404(template_id: str) -> TemplateDef:  # R33-8
+    try:  # R33-8
+        return get_template(template_id)  # R33-8
+    except KeyError:  # R33-8: 未登録
+        abort(404)  # R33-8
+
+
+def _form_defaults(t: TemplateDef) -> dict:  # R33-8: 既定値（クエリ/step_id で上書き）
+    form = {f.key: str(f.default) for f in t.fields}  # R15-4: key→default
+    step_id = request.args.get("step_id", "")  # R10-4: 再実行元ログID（任意）
+    step = read_step_cached(int(step_id)) if step_id.isdigit() else None  # R32-2
+    if step is not None and step["template_id"] == t.id and isinstance(step.get("o_t"), dict):  # R10-4: 同じテンプレのログだけ
+        form.update({k: str(v) for k, v in step["o_t"].items() if k in form})  # R10-4
+    form.update({f.key: request.args[f.key] for f in t.fields if f.key in request.args})  # R10-3: クエリ値を優先する
+    return form  # R33-8
+
+
+@bp_templates.get("/t")  # R33-8: 登録済みテンプレの一覧
+def templates_index():
+    return render_template("tpl/index.html", templates=[get_template(i) for i in template_ids()])  # R33-8
+
+
+@bp_templates.get("/t/<template_id>")  # R33-8: 入力フォーム
+def template_form(template_id: str):
+    t = _template_or_404(template_id)  # R33-8
+    return render_template("tpl/form.html", t=t, form=_form_defaults(t), error=None)  # R33-8
+
+
+@bp_templates.post("/t/<template_id>")  # R33-8: 1-step を回して保存する
+def template_submit(template_id: str):
+    t = _template_or_404(template_id)  # R33-8
+    cleaned, err = validate_template_form(request.form, t.fields)  # R33-6: 検証+正規化
+    if err:  # R15-err-1
+        return render_template("tpl/form.html", t=t, form=dict(request.form), error=err), 400  # R15-err-1
+    entry = lookup_policy(cleaned, template_id)  # R33-8: 表引き（規則はコンパイル済み、リクエスト毎に解釈しない）
+    y = entry.output  # R8-5
+    try:  # R25-5
+        row_id = wait_step_id(submit_step(  # R8-6: steps に template_id 付きで保存する
+            template_id=t.id,
+            s_t=entry.x.s_t,
+            o_t=entry.x.o_t,
+            pi_t=y.pi_t,
+            o_t1_pred=y.o_t1_pred,
+            notes=y.notes,
+        ))  # R25-1（R25-7: STEPS_WRITE_RESULT_TIMEOUT で 503）
+    except WriteQueueFull:  # R25-2
+        abort(503)  # R25-2
+    return render_template(  # R33-8
+        "tpl/result.html",
+        t=t,
+        row_id=row_id,
+        o_t=entry.x.o_t,
+        pi_t=y.pi_t,
+        o_t1_pred=y.o_t1_pred,
+        notes=y.notes,
+        proposals=list(entry.proposals),  # R16-1: ±1近傍の介入候補
+    )
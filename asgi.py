@@ -0,0 +1,11 @@
+from __future__ import annotations  # R31-0: 型注釈の前方参照を安定させる
+
+from app import create_app  # R31-5: wsgi.py と同じアプリファクトリ
+from app.web.asgi import to_asgi  # R31-5: Flask を ASGI サーバに載せるアダプタ
+
+app = to_asgi(create_app({"ASYNC_VIEWS": True}))  # R31-5: /boundary と /steps は async ビュー
+
+if __name__ == "__main__":  # R31-5: 直叩き実行時だけサーバを起動する
+    import uvicorn  # R31-5: poetry install -E async
+
+    uvicorn.run("asgi:app", host="0.0.0.0", port=5001, log_level="info")  # R31-5: wsgi.py と同じポート
@@ -0,0 +1 @@
+"""Local benchmarks for uraha-m1 (run with ``python -m bench.<name>``)."""
@@ -0,0 +1,141 @@
+from __future__ import annotations  # R20-6: 前方参照を安定させる
+
+import json  # R20-6: 結果をJSONで書き出す
+import os  # R36-1: CPU数
+import platform  # R36-1: 実行環境を結果に残す
+import statistics  # R36-2: 中央値
+import subprocess  # R36-1: git のリビジョン
+import tempfile  # R20-6: ベンチ毎に使い捨てDBを作る
+import time  # R20-6: 経過時間を測る
+from contextlib import contextmanager  # R20-6: with文で一時アプリを作る
+from pathlib import Path  # R20-6: 一時DBのパスを扱う
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional  # R20-6: 最小型を明示する
+
+
+@contextmanager
+def temp_app(overrides: Optional[Mapping[str, Any]] = None, db_file: Optional[str] = None) -> Iterator[Any]:  # R20-6: 一時ディレクトリのDBでアプリを作る（R36-3: db_file を渡せば既存のDB）
+    from app import create_app  # R20-6: ベンチ対象のアプリファクトリ
+    from app.storage import db as steps_db  # R20-6: 終了時にプールを閉じる
+    from app.storage.writer import get_writer  # R25-6: まとめ書きを有効にしたベンチの後始末
+
+    with tempfile.TemporaryDirectory(prefix="uraha-bench-") as tmp:  # R20-6: 実行後に消える
+        db_file = str(Path(db_file).resolve()) if db_file else str(Path(tmp) / "app.db")  # R20-6: Issue と steps で同じファイルを使う（R36-3: seed 済みのDBも可）
+        config: Dict[str, Any] = {  # R20-6: 本番と同じ構成で一時パスだけ差し替える
+            "TESTING": True,  # R20-6: 例外をそのまま上げる
+            "DATABASE_URL": f"sqlite:///{db_file}",  # R30-1: Issue と steps で共有
+        }
+        config.update(overrides or {})  # R20-6: ベンチ固有の設定
+        app = create_app(config)  # R20-6: アプリを作る
+        try:  # R20-6: 後始末を保証する
+            yield app  # R20-6: アプリを貸す
+        finally:  # R20-6: 一時ディレクトリを消す前に
+            writer = get_writer()  # R25-6: 書き込み役が動いていれば
+            if writer is not None:  # R25-6
+                writer.close()  # R25-6: 残りを書き切る
+            steps_db.close_all()  # R20-6: プール接続を閉じる
+
+
+def rate(fn: Callable[[], Any], n: int) -> Dict[str, float]:  # R20-6: fnをn回回して毎秒回数を返す
+    t0 = time.perf_counter()  # R20-6: 開始
+    for _ in range(n):  # R20-6: n回
+        fn()  # R20-6: 計測対象
+    elapsed = time.perf_counter() - t0  # R20-6: 経過秒
+    return {"n": n, "seconds": round(elapsed, 4), "per_sec": round(n / elapsed, 1) if elapsed else 0.0}  # R20-6: 集計
+
+
+def median_ns(fn: Callable[[], Any], n: int, repeat: int = 5) -> float:  # R36-2: n回ループを repeat 回測った1回あたりの中央値（ナノ秒）
+    samples = []  # R36-2
+    for _ in range(repeat):  # R36-2
+        t0 = time.perf_counter()  # R36-2
+        for _ in range(n):  # R36-2
+            fn()  # R36-2
+        samples.append((time.perf_counter() - t0) / n * 1e9)  # R36-2
+    return round(statistics.median(samples), 1)  # R36-2
+
+
+def run_meta() -> Dict[str, Any]:  # R36-1: 比較のために実行環境を記録する
+    try:  # R36-1: git が無い/リポジトリ外でも落とさない
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip() or None  # R36-1
+    except (OSError, subprocess.SubprocessError):  # R36-1
+        rev = None  # R36-1
+    return {  # R36-1
+        "git": rev,  # R36-1
+        "python": platform.python_version(),  # R36-1
+        "platform": platform.platform(),  # R36-1
+        "cpus": os.cpu_count(),  # R36-1
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),  # R36-1
+    }
+
+
+def emit(name: str, results: Mapping[str, Any], json_path: Optional[str] = None) -> None:  # R20-6: 結果を表示/保存する
+    payload = {"benchmark": name, "meta": run_meta(), "results": dict(results)}  # R20-6: 比較しやすい形にまとめる（R36-1: 実行環境付き）
+    text = json.dumps(payload, ensure_ascii=False, indent=2)  # R20-6: 人にも読める整形
+    print(text)  # R20-6: 標準出力へ
+    if json_path:  # R20-6: 保存先がある場合
+        Path(json_path).write_text(text + "\n", encoding="utf-8")  # R20-6: JSONファイルに書く
+
+
+def fill_steps(conn: Any, n: int, seed: int = 0, batch: int = 50_000) -> None:  # R24-5: stepsに再現可能なn行を流し込む
+    import random  # R24-5: 乱数で入力ベクトルを作る
+    from datetime import datetime, timedelta, timezone  # R24-5: created_at を1年に散らす
+
+    from app.core.policy_table import lookup_policy  # R24-5: 実際の出力と同じ内容を保存する
+
+    rng = random.Random(seed)  # R24-5: 再現可能な乱数
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)  # R24-5: 期間の始まり
+    span = 365 * 24 * 3600  # R24-5: 1年（秒）
+    keys = ("threat", "body_alarm", "need_clarity", "energy")  # R24-5: 境界テンプレの入力
+    payload: Dict[Any, Any] = {}  # R24-5: 入力ベクトル→JSON列のメモ（256通り）
+    sql = (  # R24-5: save_step と同じ列
+        "INSERT INTO steps (created_at, template_id, s_t_json, o_t_json, pi_t, o_t1_pred_json, notes_json) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)"
+    )
+    for lo in range(0, n, batch):  # R24-5: batch行ずつコミットする
+        rows = []  # R24-5: 今回の行
+        for i in range(lo, min(n, lo + batch)):  # R24-5: 1行ずつ作る
+            vec = tuple(rng.randrange(4) for _ in keys)  # R24-5: 0-3の入力
+            if vec not in payload:  # R24-5: 初出のベクトルなら
+                e = lookup_policy(dict(zip(keys, vec)))  # R24-5: 表から出力を引く
+                payload[vec] = (  # R24-5: JSON化して覚える
+                    json.dumps(dict(e.x.s_t), ensure_ascii=False),  # R24-5: s_t
+                    json.dumps(dict(e.x.o_t), ensure_ascii=False),  # R24-5: o_t
+                    e.output.pi_t,  # R24-5: pi_t
+                    json.dumps(e.output.o_t1_pred, ensure_ascii=False),  # R24-5: o_t1_pred
+                    json.dumps(e.output.notes, ensure_ascii=False),  # R24-5: notes
+                )
+            s_t, o_t, pi_t, pred, notes = payload[vec]  # R24-5: 列値
+            created_at = (start + timedelta(seconds=span * i // max(n, 1))).isoformat()  # R24-5: idと同じ順に増える時刻
+            template_id = "boundary" if rng.random() < 0.9 else "boundary_v2"  # R24-5: 1割は別テンプレ
+            rows.append((created_at, template_id, s_t, o_t, pi_t, pred, notes))  # R24-5: 行を追加する
+        conn.executemany(sql, rows)  # R24-5: まとめて挿入する
+        conn.commit()  # R24-5: 確定する
+
+
+def fill_issues(conn: Any, n: int, seed: int = 0, batch: int = 50_000) -> None:  # R36-3: issues に再現可能なn行を流し込む
+    import random  # R36-3
+    from datetime import datetime, timedelta  # R36-3: created_at を1年に散らす
+
+    rng = random.Random(seed)  # R36-3
+    start = datetime(2025, 1, 1)  # R36-3: Issue.created_at はタイムゾーン無し（utcnow）
+    span = 365 * 24 * 3600  # R36-3
+    tags = ("work", "family", "health", "money", "friends", "self")  # R36-3
+    notes = ("", "", "締め切りが近い", "眠れない", "話し合いが必要", "体調が気になる", "予定を見直す")  # R38-6: 検索ベンチ用の本文（空が多め）
+    first = conn.execute("SELECT COALESCE(MAX(id), 0) FROM issues").fetchone()[0] + 1  # R38-6: issue_tags に渡す id
+    sql = "INSERT INTO issues (id, title, intensity, note, created_at) VALUES (?, ?, ?, ?, ?)"  # R36-3: Issue の列
+    tag_sql = "INSERT INTO issue_tags (issue_id, tag) VALUES (?, ?)"  # R38-6: 1タグ1行
+    for lo in range(0, n, batch):  # R36-3
+        rows = []  # R36-3
+        tag_rows = []  # R38-6
+        for i in range(lo, min(n, lo + batch)):  # R36-3
+            created_at = start + timedelta(seconds=span * i // max(n, 1))  # R36-3: id と同じ順に増える
+            rows.append((  # R36-3
+                first + i,  # R38-6
+                f"issue {seed}-{i}",  # R36-3
+                rng.randrange(11),  # R36-3: 0-10
+                rng.choice(notes),  # R38-6
+                created_at.strftime("%Y-%m-%d %H:%M:%S.%f"),  # R36-3: SQLAlchemy の SQLite DateTime と同じ書式
+            ))
+            tag_rows.extend((first + i, t) for t in rng.sample(tags, rng.randrange(3)))  # R36-3: 0-2個
+        conn.executemany(sql, rows)  # R36-3
+        conn.executemany(tag_sql, tag_rows)  # R38-6: トリガが issues_fts の tags も埋める
+        conn.commit()  # R36-3
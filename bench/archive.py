@@ -0,0 +1,125 @@
+"""Archiving old steps to memory-mapped column files: file sizes and read costs before/after.
+
+    python -m bench.archive [-n 1000000] [--keep-days 90] [--json out.json]
+
+Fills a fresh steps log with n rows spread over 2025 (JSON layout, as bench.seed does) and measures
+/steps/<id>-style reads (read_step, all columns), a /steps summary page and a full export. Then it runs
+`archive_steps` for everything older than --keep-days before the last row, with VACUUM, and measures
+again. Reads of archived ids are also timed on the first touch after the registry is dropped (meta.json
+parse and np.load(mmap_mode="r") of the columns). Sizes are after a WAL checkpoint.
+"""
+from __future__ import annotations  # R42-5: 前方参照を安定させる
+
+import argparse  # R42-5: 引数
+import random  # R42-5: 読む id
+import statistics  # R42-5: 中央値
+import tempfile  # R42-5: 使い捨てDB
+import time  # R42-5: 経過時間
+from datetime import datetime, timedelta, timezone  # R42-5: 境界の日時
+from pathlib import Path  # R42-5
+from typing import Any, Callable, Dict, List  # R42-5: 最小型を明示する
+
+from app.storage import archive  # R42-5: 計測対象
+from app.storage import db as steps_db  # R42-5: 接続先を差し替える
+from app.storage.export import iter_export  # R42-5: 全件の読み出し
+from app.storage.repository import STEP_SUMMARY_COLUMNS, list_steps_filtered, read_step  # R42-5
+from app.templates_def.boundary import BOUNDARY_FIELDS  # R26-4: /steps の要約キー
+from bench._common import emit, fill_steps, median_ns  # R42-5: 共通ヘルパ
+
+O_T_KEYS = [f.key for f in BOUNDARY_FIELDS]  # R26-4
+
+
+def _file_bytes(db_file: Path) -> int:  # R42-5: WAL を本体に戻した大きさ
+    with steps_db.session() as conn:  # R42-5
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")  # R29-5
+    return db_file.stat().st_size  # R42-5
+
+
+def _dir_bytes(path: Path) -> int:  # R42-5
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file()) if path.exists() else 0  # R42-5
+
+
+def _read_us(ids: List[int]) -> float:  # R42-5: read_step（全列を復元）1回の中央値（マイクロ秒）
+    it = iter(ids * 50)  # R42-5: 同じ id を続けて読まない
+
+    def one() -> None:  # R42-5
+        read_step(next(it)).to_dict()  # R42-5
+    return round(median_ns(one, len(ids) // 5, repeat=5) / 1000, 1)  # R42-5
+
+
+def _median_ms(fn: Callable[[], Any], repeat: int = 5) -> float:  # R29-5
+    samples = []  # R29-5
+    for _ in range(repeat):  # R29-5
+        t0 = time.perf_counter()  # R29-5
+        fn()  # R29-5
+        samples.append((time.perf_counter() - t0) * 1000)  # R29-5
+    return round(statistics.median(samples), 2)  # R29-5
+
+
+def _reads(n: int, hot: List[int], cold: List[int]) -> Dict[str, Any]:  # R42-5: 今の状態で測る
+    out: Dict[str, Any] = {"read_step_hot_us": _read_us(hot)}  # R42-5
+    if cold:  # R42-5: 移した行
+        out["read_step_archived_us"] = _read_us(cold)  # R42-5
+        firsts = []  # R42-5
+        for step_id in cold[:20]:  # R42-5: 登録簿を捨てた直後の1回（meta.json と mmap を開く）
+            archive._registries.clear()  # R42-5
+            t0 = time.perf_counter()  # R42-5
+            read_step(step_id).to_dict()  # R42-5
+            firsts.append((time.perf_counter() - t0) * 1000)  # R42-5
+        out["read_step_archived_first_ms"] = round(statistics.median(firsts), 3)  # R42-5
+    out["page_summary_ms"] = _median_ms(  # R26-4: /steps の読み方（新しい順の50件）
+        lambda: [r["o_t"] for r in list_steps_filtered(limit=50, columns=STEP_SUMMARY_COLUMNS, o_t_keys=O_T_KEYS)]
+    )
+    t0 = time.perf_counter()  # R29-5
+    for _ in iter_export(chunk_size=5000):  # R29-5
+        pass  # R29-5
+    out["export_rows_per_sec"] = round(n / (time.perf_counter() - t0))  # R29-5
+    return out  # R42-5
+
+
+def run(n: int, keep_days: int, samples: int) -> Dict[str, Any]:  # R42-5
+    results: Dict[str, Any] = {"rows": n, "keep_days": keep_days}  # R42-5
+    rng = random.Random(0)  # R42-5
+    with tempfile.TemporaryDirectory(prefix="uraha-bench-") as tmp:  # R42-5
+        db_file = Path(tmp) / "app.db"  # R42-5
+        steps_db.configure(db_path=db_file, pool=True, storage_format="json")  # R29-5
+        with steps_db.session() as conn:  # R29-5
+            fill_steps(conn, n)  # R24-5: 2025年に id 順に並ぶ
+            last = conn.execute("SELECT created_at FROM steps ORDER BY id DESC LIMIT 1").fetchone()[0]  # R42-5
+            conn.execute("VACUUM")  # R29-5
+        before = (datetime.fromisoformat(last) - timedelta(days=keep_days)).astimezone(timezone.utc).isoformat()  # R42-5
+        with steps_db.session() as conn:  # R42-5
+            split = conn.execute("SELECT MAX(id) FROM steps WHERE created_at < ?", (before,)).fetchone()[0] or 0  # R42-5: ここまでが移る
+        hot = [rng.randint(split + 1, n) for _ in range(samples)]  # R42-5: 残る行
+        cold = [rng.randint(1, split) for _ in range(samples)] if split else []  # R42-5: 移る行
+        results["before"] = {"file_bytes": _file_bytes(db_file), **_reads(n, hot + cold, [])}  # R42-5: 全部 SQLite
+        results["before"]["bytes_per_row"] = round(results["before"]["file_bytes"] / n, 1)  # R42-5
+        t0 = time.perf_counter()  # R42-5
+        report = archive.archive_steps(before, vacuum=True)  # R42-5
+        elapsed = time.perf_counter() - t0  # R42-5
+        results["archive"] = {  # R42-5
+            "rows": report.rows,  # R42-5
+            "segments": report.segments,  # R42-5
+            "seconds": round(elapsed, 2),  # R42-5: VACUUM 込み
+            "rows_per_sec": round(report.rows / elapsed) if elapsed else 0,  # R42-5
+            "archive_bytes": _dir_bytes(archive.archive_dir()),  # R42-5
+            "archive_bytes_per_row": round(_dir_bytes(archive.archive_dir()) / max(1, report.rows), 1),  # R42-5
+        }
+        results["after"] = {"file_bytes": _file_bytes(db_file), **_reads(n, hot, cold)}  # R42-5
+        results["after"]["bytes_per_hot_row"] = round(results["after"]["file_bytes"] / max(1, n - report.rows), 1)  # R42-5
+        steps_db.close_all()  # R42-5
+    return results  # R42-5
+
+
+def main() -> None:  # R42-5: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)  # R42-5
+    ap.add_argument("-n", type=int, default=1_000_000, help="rows in the steps log")  # R42-5
+    ap.add_argument("--keep-days", type=int, default=90, help="rows newer than this stay in SQLite")  # R42-5
+    ap.add_argument("--samples", type=int, default=2000, help="ids read per measurement")  # R42-5
+    ap.add_argument("--json", default=None, help="write results to this file")  # R42-5
+    args = ap.parse_args()  # R42-5
+    emit("archive", run(args.n, args.keep_days, args.samples), args.json)  # R42-5
+
+
+if __name__ == "__main__":  # R42-5: python -m bench.archive
+    main()  # R42-5
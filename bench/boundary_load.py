@@ -0,0 +1,160 @@
+"""Concurrent load on /boundary and /steps/<id>: threaded WSGI server (wsgi.py) vs ASGI + async views (asgi.py).
+
+    python -m bench.boundary_load [-c 64] [--seconds 10] [--write-behind] [--json out.json]
+
+Each server runs in its own process on a fresh SQLite file; the client keeps -c
+keep-alive connections busy (3 POST /boundary : 1 GET /steps/<id>) and reports
+throughput and p50/p99 latency. The ASGI run needs `poetry install -E async`.
+"""
+from __future__ import annotations  # R31-6: 前方参照を安定させる
+
+import argparse  # R31-6: 並列数/時間を引数で受け取る
+import http.client  # R31-6: keep-alive の HTTP クライアント
+import logging  # R31-6: サーバのアクセスログを止める
+import socket  # R31-6: 空きポートを探す
+import subprocess  # R31-6: サーバを別プロセスで動かす
+import sys  # R31-6
+import tempfile  # R31-6: 使い捨てDB
+import threading  # R31-6: クライアントの並列接続
+import time  # R31-6: 経過時間/レイテンシ
+from pathlib import Path  # R31-6
+from typing import Any, Dict, List  # R31-6: 最小型を明示する
+from urllib.parse import urlencode  # R31-6: フォーム本文
+
+from bench._common import emit  # R31-6: 共通ヘルパ
+
+FORM = urlencode({"threat": "1", "body_alarm": "0", "need_clarity": "2", "energy": "2"})  # R20-6: /boundary の入力
+SERVERS = ("wsgi", "asgi")  # R31-6
+
+
+def _free_port() -> int:  # R31-6
+    with socket.socket() as s:  # R31-6
+        s.bind(("127.0.0.1", 0))  # R31-6
+        return s.getsockname()[1]  # R31-6
+
+
+def serve(kind: str, port: int, db_file: str, write_behind: bool) -> None:  # R31-6: サーバ側（子プロセスで呼ばれる）
+    from app import create_app  # R31-6
+
+    config = {"DATABASE_URL": f"sqlite:///{db_file}", "STEPS_WRITE_BEHIND": write_behind, "ASYNC_VIEWS": kind == "asgi"}  # R31-6
+    app = create_app(config)  # R31-6
+    if kind == "wsgi":  # R31-6: wsgi.py の app.run と同じ threaded サーバ（debug/reloader なし）
+        from werkzeug.serving import make_server  # R31-6
+
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)  # R31-6
+        make_server("127.0.0.1", port, app, threaded=True).serve_forever()  # R31-6
+    else:  # R31-6: asgi.py と同じ構成
+        import uvicorn  # R31-6
+
+        from app.web.asgi import to_asgi  # R31-6
+
+        uvicorn.run(to_asgi(app), host="127.0.0.1", port=port, log_level="warning", backlog=4096)  # R31-6
+
+
+def _wait_ready(port: int, timeout: float = 30.0) -> None:  # R31-6: 起動を待つ
+    deadline = time.monotonic() + timeout  # R31-6
+    while time.monotonic() < deadline:  # R31-6
+        try:  # R31-6
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)  # R31-6
+            conn.request("GET", "/boundary")  # R31-6
+            conn.getresponse().read()  # R31-6
+            conn.close()  # R31-6
+            return  # R31-6
+        except OSError:  # R31-6: まだ listen していない
+            time.sleep(0.1)  # R31-6
+    raise RuntimeError(f"server on port {port} did not start")  # R31-6
+
+
+def _client(port: int, stop_at: float, latencies: List[float], errors: List[int]) -> None:  # R31-6: 1接続分の負荷
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)  # R31-6: keep-alive
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}  # R31-6
+    i = 0  # R31-6
+    while time.monotonic() < stop_at:  # R31-6
+        t0 = time.perf_counter()  # R31-6
+        try:  # R31-6
+            if i % 4 == 3:  # R31-6: 4回に1回は詳細の読み取り
+                conn.request("GET", f"/steps/{1 + i % 50}")  # R31-6
+            else:  # R31-6
+                conn.request("POST", "/boundary", FORM, headers)  # R31-6
+            resp = conn.getresponse()  # R31-6
+            resp.read()  # R31-6
+            ok = resp.status == 200  # R31-6
+        except (OSError, http.client.HTTPException):  # R31-6: 切れたら張り直す
+            conn.close()  # R31-6
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)  # R31-6
+            ok = False  # R31-6
+        if ok:  # R31-6
+            latencies.append(time.perf_counter() - t0)  # R31-6: list.append はスレッド間で安全
+        else:  # R31-6
+            errors.append(1)  # R31-6
+        i += 1  # R31-6
+    conn.close()  # R31-6
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:  # R31-6
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))] if sorted_values else 0.0  # R31-6
+
+
+def run_one(kind: str, concurrency: int, seconds: float, write_behind: bool) -> Dict[str, Any]:  # R31-6: 1構成を測る
+    with tempfile.TemporaryDirectory(prefix="uraha-bench-") as tmp:  # R31-6
+        port = _free_port()  # R31-6
+        args = ["--serve", kind, "--port", str(port), "--db", str(Path(tmp) / "app.db")] + (["--write-behind"] if write_behind else [])  # R31-6
+        proc = subprocess.Popen([sys.executable, "-m", "bench.boundary_load", *args])  # R31-6
+        try:  # R31-6
+            _wait_ready(port)  # R31-6
+            warm: List[float] = []  # R31-6: /steps/1..50 を用意して接続を温める
+            _client(port, time.monotonic() + 1.0, warm, [])  # R31-6
+            latencies: List[float] = []  # R31-6
+            errors: List[int] = []  # R31-6
+            stop_at = time.monotonic() + seconds  # R31-6
+            threads = [threading.Thread(target=_client, args=(port, stop_at, latencies, errors)) for _ in range(concurrency)]  # R31-6
+            t0 = time.perf_counter()  # R31-6
+            for t in threads:  # R31-6
+                t.start()  # R31-6
+            for t in threads:  # R31-6
+                t.join()  # R31-6
+            elapsed = time.perf_counter() - t0  # R31-6
+        finally:  # R31-6
+            proc.terminate()  # R31-6
+            proc.wait(10)  # R31-6
+    lat = sorted(latencies)  # R31-6
+    return {  # R31-6
+        "requests": len(lat),  # R31-6
+        "errors": len(errors),  # R31-6
+        "per_sec": round(len(lat) / elapsed, 1),  # R31-6
+        "p50_ms": round(_percentile(lat, 0.50) * 1000, 2),  # R31-6
+        "p99_ms": round(_percentile(lat, 0.99) * 1000, 2),  # R31-6
+    }
+
+
+def run(concurrency: int, seconds: float, write_behind: bool) -> Dict[str, Any]:  # R31-6
+    results: Dict[str, Any] = {"concurrency": concurrency, "seconds": seconds, "write_behind": write_behind}  # R31-6
+    for kind in SERVERS:  # R31-6
+        try:  # R31-6: asgiref/uvicorn が無ければ記録して続ける
+            if kind == "asgi":  # R31-6
+                import asgiref  # noqa: F401  # R31-6
+                import uvicorn  # noqa: F401  # R31-6
+            results[kind] = run_one(kind, concurrency, seconds, write_behind)  # R31-6
+        except ImportError as e:  # R31-6
+            results[kind] = {"skipped": f"{type(e).__name__}: {e}"}  # R31-6
+    return results  # R31-6
+
+
+def main() -> None:  # R31-6: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)  # R31-6
+    ap.add_argument("-c", "--concurrency", type=int, default=64, help="concurrent keep-alive connections")  # R31-6
+    ap.add_argument("--seconds", type=float, default=10.0, help="measured duration per server")  # R31-6
+    ap.add_argument("--write-behind", action="store_true", help="STEPS_WRITE_BEHIND=True on both servers")  # R31-6
+    ap.add_argument("--json", default=None, help="write results to this file")  # R31-6
+    ap.add_argument("--serve", choices=SERVERS, help=argparse.SUPPRESS)  # R31-6: 子プロセス用
+    ap.add_argument("--port", type=int, help=argparse.SUPPRESS)  # R31-6
+    ap.add_argument("--db", help=argparse.SUPPRESS)  # R31-6
+    args = ap.parse_args()  # R31-6
+    if args.serve:  # R31-6: サーバとして動く
+        serve(args.serve, args.port, args.db, args.write_behind)  # R31-6
+        return  # R31-6
+    emit("boundary_load", run(args.concurrency, args.seconds, args.write_behind), args.json)  # R31-6
+
+
+if __name__ == "__main__":  # R31-6: python -m bench.boundary_load
+    main()  # R31-6
@@ -0,0 +1,79 @@
+"""Compare two benchmark result files written with --json (same benchmark, e.g. before/after a change).
+
+    python -m bench.compare old.json new.json [--threshold 10]
+
+Only timing metrics are compared. For per_sec and speedup, higher is better. For *_ms,
+*seconds and the ns/op values of bench.micro, lower is better. The exit status is 1 when any
+metric got worse by more than --threshold percent.
+"""
+from __future__ import annotations  # R36-5: 前方参照を安定させる
+
+import argparse  # R36-5: 引数
+import json  # R36-5: 結果ファイル
+import sys  # R36-5: 終了コード
+from pathlib import Path  # R36-5
+from typing import Any, Dict, Iterator, List, Optional, Tuple  # R36-5: 最小型を明示する
+
+HIGHER_IS_BETTER = ("per_sec", "speedup")  # R36-5: 末尾がこれなら大きいほど良い
+LOWER_IS_BETTER = ("_ms", "seconds")  # R36-5: 末尾がこれなら小さいほど良い
+
+
+def _leaves(node: Any, path: str = "") -> Iterator[Tuple[str, float]]:  # R36-5: 数値の葉を "a.b.c" で列挙する
+    if isinstance(node, dict):  # R36-5
+        for k, v in node.items():  # R36-5
+            yield from _leaves(v, f"{path}.{k}" if path else str(k))  # R36-5
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):  # R36-5
+        yield path, float(node)  # R36-5
+
+
+def _direction(path: str, ns_per_op: bool) -> Optional[int]:  # R36-5: +1 大きいほど良い / -1 小さいほど良い / None 比べない
+    leaf = path.rsplit(".", 1)[-1]  # R36-5
+    if leaf.endswith(HIGHER_IS_BETTER):  # R36-5
+        return 1  # R36-5
+    if leaf.endswith(LOWER_IS_BETTER):  # R36-5
+        return -1  # R36-5
+    if ns_per_op and "." not in path and leaf != "steps_rows":  # R36-5: bench.micro の各ケース
+        return -1  # R36-5
+    return None  # R36-5: 件数などは比べない
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> Tuple[List[Dict[str, Any]], int]:  # R36-5: (行, 悪化数)
+    if old.get("benchmark") != new.get("benchmark"):  # R36-5
+        raise ValueError(f"different benchmarks: {old.get('benchmark')!r} vs {new.get('benchmark')!r}")  # R36-5
+    ns = str(new.get("results", {}).get("unit", "")).startswith("ns/op")  # R36-5
+    before = dict(_leaves(old.get("results", {})))  # R36-5
+    rows: List[Dict[str, Any]] = []  # R36-5
+    worse = 0  # R36-5
+    for path, value in _leaves(new.get("results", {})):  # R36-5
+        d = _direction(path, ns)  # R36-5
+        if d is None or path not in before or before[path] == 0:  # R36-5: 比べられない
+            continue  # R36-5
+        change = (value - before[path]) / before[path] * 100  # R36-5: %
+        regressed = change * d < -threshold  # R36-5: 悪い向きに閾値超え
+        worse += regressed  # R36-5
+        rows.append({"metric": path, "old": before[path], "new": value, "change_pct": round(change, 1), "regressed": regressed})  # R36-5
+    return rows, worse  # R36-5
+
+
+def main() -> None:  # R36-5: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)  # R36-5
+    ap.add_argument("old", help="baseline result file")  # R36-5
+    ap.add_argument("new", help="result file to check")  # R36-5
+    ap.add_argument("--threshold", type=float, default=10.0, help="allowed change in the bad direction, in percent")  # R36-5
+    args = ap.parse_args()  # R36-5
+    old = json.loads(Path(args.old).read_text(encoding="utf-8"))  # R36-5
+    new = json.loads(Path(args.new).read_text(encoding="utf-8"))  # R36-5
+    rows, worse = compare(old, new, args.threshold)  # R36-5
+    for meta in ("old", "new"):  # R36-5: どの実行どうしか
+        m = (old if meta == "old" else new).get("meta", {})  # R36-5
+        print(f"{meta}: git {m.get('git')} python {m.get('python')} cpus {m.get('cpus')} at {m.get('started_at')}")  # R36-5
+    width = max((len(r["metric"]) for r in rows), default=10)  # R36-5
+    for r in rows:  # R36-5
+        mark = "  WORSE" if r["regressed"] else ""  # R36-5
+        print(f"{r['metric']:<{width}}  {r['old']:>14g} -> {r['new']:<14g} {r['change_pct']:+7.1f}%{mark}")  # R36-5
+    print(f"{worse} of {len(rows)} metrics worse by more than {args.threshold:g}%")  # R36-5
+    sys.exit(1 if worse else 0)  # R36-5
+
+
+if __name__ == "__main__":  # R36-5: python -m bench.compare
+    main()  # R36-5
@@ -0,0 +1,203 @@
+"""Several worker processes writing to one SQLite file: lost writes, errors and throughput.
+
+    python -m bench.concurrency [--workers 1,2,4,8] [--requests 200] [--batch 5] [--json out.json]
+
+Each worker is a fresh interpreter (python -m bench.concurrency --child MODE) with its own
+create_app, as under `gunicorn -w N`. All workers load first and then start together. Each
+one sends --requests requests through the Flask test client. Every 10th request is
+POST /issues/new. The others are POST /api/simulate with --batch observations and
+"persist": true. The modes are:
+- "direct": the defaults. Writes start with BEGIN IMMEDIATE, wait up to busy_timeout and are
+  retried with jittered backoff.
+- "single_writer": step writes go to one `flask steps writer` process, started here through
+  the real CLI. Issues are still written by the workers.
+- "no_busy_handling": busy_timeout 0 and DB_WRITE_RETRIES 1. This shows what the contention
+  does when nothing waits for the lock.
+
+After a run the database is checked against what the workers were told. Every step id
+returned with a 200 must exist exactly once. "lost" counts acknowledged writes that are not
+in the database. "unacknowledged" counts rows with no 200 behind them, for example a
+request that timed out after the writer had committed. Throughput is acknowledged requests
+per second of wall time. Latencies cover all requests, including failed ones.
+"""
+from __future__ import annotations  # R44-5: 前方参照を安定させる
+
+import argparse  # R44-5: 引数
+import json  # R44-5: 子プロセスの結果
+import os  # R44-5: 子の環境変数
+import secrets  # R44-6: 実行毎の書き込み役の鍵
+import sqlite3  # R44-5: 照合は素の接続で
+import subprocess  # R44-5: ワーカー/書き込み役のプロセス
+import sys  # R44-5
+import tempfile  # R44-5: 使い捨てDB
+import time  # R44-5: 経過時間
+from pathlib import Path  # R44-5
+from typing import Any, Dict, List, Optional  # R44-5: 最小型を明示する
+
+from bench._common import emit, temp_app  # R44-5: 共通ヘルパ
+
+MODES: Dict[str, Dict[str, Any]] = {  # R44-5: モード→create_app の上書き
+    "direct": {},  # R44-1: 既定（busy_timeout＋BEGIN IMMEDIATE＋再試行）
+    "single_writer": {},  # R44-3: STEPS_WRITER_ADDRESS は実行時に足す
+    "no_busy_handling": {"STEPS_DB_PRAGMAS": {"busy_timeout": 0}, "DB_WRITE_RETRIES": 1},  # R44-5: 比較用（待たない/再試行しない）
+}
+ISSUE_EVERY = 10  # R44-5: 10件に1件は /issues/new
+BENCH_AUTHKEY = os.environ.setdefault("BENCH_WRITER_AUTHKEY", secrets.token_hex(16))  # R44-6: 親が決めてワーカー（子プロセス）に環境変数で引き継ぐ
+
+
+def _percentile(values: List[float], q: float) -> float:  # R44-5
+    if not values:  # R44-5
+        return 0.0  # R44-5
+    s = sorted(values)  # R44-5
+    return round(s[min(len(s) - 1, int(q * len(s)))], 2)  # R44-5
+
+
+def child(mode: str, db_file: str, address: Optional[str], worker: int, requests: int, batch: int) -> Dict[str, Any]:  # R44-5: ワーカー1つ分
+    from app import create_app  # R44-5
+
+    overrides = {"DATABASE_URL": f"sqlite:///{db_file}", "SCHEMA_ON_STARTUP": False, **MODES[mode]}  # R41-1: スキーマは親が確保済み
+    if address:  # R44-3
+        overrides["STEPS_WRITER_ADDRESS"] = address  # R44-3
+        overrides["STEPS_WRITER_AUTHKEY"] = BENCH_AUTHKEY  # R44-6: 書き込み役と同じ鍵
+    client = create_app(overrides).test_client()  # R44-5: TESTING 無し（例外は 500 として数える）
+    print("ready", flush=True)  # R44-5: 全員の起動を待ってから一斉に始める
+    sys.stdin.readline()  # R44-5
+    ids: List[int] = []  # R44-5: 200 で返ってきた行ID
+    issues: List[str] = []  # R44-5: 302 で返ってきた Issue の題名
+    status: Dict[str, int] = {}  # R44-5
+    latencies: List[float] = []  # R44-5
+    for i in range(requests):  # R44-5
+        t0 = time.perf_counter()  # R44-5
+        if i % ISSUE_EVERY == ISSUE_EVERY - 1:  # R44-5
+            title = f"w{worker}-{i}"  # R44-5: 照合用に一意
+            resp = client.post("/issues/new", data={"title": title, "tags": "bench", "note": "", "intensity": "3"})  # R44-5
+            if resp.status_code == 302:  # R44-5
+                issues.append(title)  # R44-5
+        else:  # R44-5
+            obs = [{"threat": (i + k) % 4, "body_alarm": k % 4, "need_clarity": worker % 4, "energy": 2} for k in range(batch)]  # R44-5
+            resp = client.post("/api/simulate", json={"observations": obs, "persist": True})  # R40-2
+            if resp.status_code == 200:  # R44-5
+                ids.extend(r["id"] for r in resp.get_json()["results"])  # R40-2
+        latencies.append((time.perf_counter() - t0) * 1000)  # R44-5
+        status[str(resp.status_code)] = status.get(str(resp.status_code), 0) + 1  # R44-5
+    from app.storage.db import retry_stats  # R44-2
+    return {"ids": ids, "issues": issues, "status": status, "latencies_ms": latencies, "retries": retry_stats()}  # R44-5
+
+
+def _prepare(db_file: str) -> None:  # R44-5: スキーマを確保して版を記録する（flask schema upgrade と同じ）
+    with temp_app({}, db_file=db_file):  # R41-1: 既定の create_app が upgrade を流す
+        pass  # R44-5
+
+
+def _start_writer(db_file: str, address: str) -> subprocess.Popen:  # R44-3: flask steps writer を本物の CLI で起動する
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_file}", "SCHEMA_ON_STARTUP": "0", "STEPS_WRITER_ADDRESS": address, "STEPS_WRITER_AUTHKEY": BENCH_AUTHKEY}  # R44-3（R44-6: 鍵は必須）
+    proc = subprocess.Popen([sys.executable, "-m", "flask", "--app", "wsgi", "steps", "writer"], env=env, stderr=subprocess.PIPE, text=True)  # R44-3
+    assert proc.stderr is not None  # R44-5
+    line = proc.stderr.readline()  # R44-3: "steps writer listening on ..."
+    if "listening" not in line:  # R44-5
+        proc.kill()  # R44-5
+        raise RuntimeError(f"steps writer did not start: {line}{proc.stderr.read()}")  # R44-5
+    return proc  # R44-3
+
+
+def _stop_writer(proc: subprocess.Popen) -> None:  # R44-3: SIGTERM（積まれた分を書き切って止まる）
+    proc.terminate()  # R44-3
+    proc.wait(timeout=30)  # R44-3
+    if proc.stderr is not None:  # R44-5
+        proc.stderr.close()  # R44-5
+
+
+def _verify(db_file: str, outs: List[Dict[str, Any]]) -> Dict[str, Any]:  # R44-5: 返した結果とDBを突き合わせる
+    ids = [i for o in outs for i in o["ids"]]  # R44-5
+    titles = [t for o in outs for t in o["issues"]]  # R44-5
+    conn = sqlite3.connect(db_file)  # R44-5
+    try:  # R44-5
+        stored = {r[0] for r in conn.execute("SELECT id FROM steps")}  # R44-5
+        stored_titles = [r[0] for r in conn.execute("SELECT title FROM issues")]  # R44-5
+    finally:  # R44-5
+        conn.close()  # R44-5
+    return {  # R44-5
+        "steps_acknowledged": len(ids),  # R44-5
+        "steps_stored": len(stored),  # R44-5
+        "duplicate_ids": len(ids) - len(set(ids)),  # R44-5: 2つのリクエストに同じ行IDを返していない
+        "lost": len(set(ids) - stored) + len(set(titles) - set(stored_titles)),  # R44-5: 返したのにDBに無い
+        "unacknowledged": len(stored - set(ids)) + len(set(stored_titles) - set(titles)),  # R44-5: DBにあるのに 200/302 を返していない
+        "issues_acknowledged": len(titles),  # R44-5
+        "issues_stored": len(stored_titles),  # R44-5
+    }
+
+
+def run_once(mode: str, workers: int, requests: int, batch: int) -> Dict[str, Any]:  # R44-5: 1モード×1ワーカー数
+    with tempfile.TemporaryDirectory(prefix="uraha-bench-") as tmp:  # R44-5
+        db_file = str(Path(tmp) / "app.db")  # R44-5
+        _prepare(db_file)  # R44-5
+        address = str(Path(tmp) / "writer.sock") if mode == "single_writer" else None  # R44-3
+        writer = _start_writer(db_file, address) if address else None  # R44-3
+        try:  # R44-5
+            cmd = [sys.executable, "-m", "bench.concurrency", "--child", mode, "--db", db_file, "--requests", str(requests), "--batch", str(batch)]  # R44-5
+            if address:  # R44-3
+                cmd += ["--address", address]  # R44-3
+            procs = [subprocess.Popen(cmd + ["--worker", str(w)], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True) for w in range(workers)]  # R44-5
+            for p in procs:  # R44-5: 全員の create_app を待つ
+                assert p.stdout is not None and p.stdout.readline().strip() == "ready"  # R44-5
+            t0 = time.perf_counter()  # R44-5
+            for p in procs:  # R44-5
+                assert p.stdin is not None  # R44-5
+                p.stdin.write("go\n")  # R44-5
+                p.stdin.close()  # R44-5
+            outs = [json.loads(p.stdout.read().strip().splitlines()[-1]) for p in procs if p.stdout is not None]  # R44-5
+            for p in procs:  # R44-5
+                p.wait()  # R44-5
+            elapsed = time.perf_counter() - t0  # R44-5
+        finally:  # R44-5
+            if writer is not None:  # R44-3
+                _stop_writer(writer)  # R44-3
+        check = _verify(db_file, outs)  # R44-5
+    status: Dict[str, int] = {}  # R44-5
+    for o in outs:  # R44-5
+        for code, n in o["status"].items():  # R44-5
+            status[code] = status.get(code, 0) + n  # R44-5
+    ok = status.get("200", 0) + status.get("302", 0)  # R44-5
+    latencies = [v for o in outs for v in o["latencies_ms"]]  # R44-5
+    return {  # R44-5
+        "workers": workers,  # R44-5
+        "requests": workers * requests,  # R44-5
+        "status": dict(sorted(status.items())),  # R44-5
+        "ok_per_sec": round(ok / elapsed, 1),  # R44-5
+        "steps_per_sec": round(check["steps_acknowledged"] / elapsed, 1),  # R44-5
+        "p50_ms": _percentile(latencies, 0.50),  # R44-5
+        "p99_ms": _percentile(latencies, 0.99),  # R44-5
+        "retries": sum(o["retries"]["retries"] for o in outs),  # R44-2: 単一書き込み役の中の再試行は含まない
+        "gave_up": sum(o["retries"]["gave_up"] for o in outs),  # R44-2
+        **check,  # R44-5
+    }
+
+
+def run(workers: List[int], requests: int, batch: int, modes: List[str]) -> Dict[str, Any]:  # R44-5
+    results: Dict[str, Any] = {"requests_per_worker": requests, "batch": batch, "issue_every": ISSUE_EVERY}  # R44-5
+    for mode in modes:  # R44-5
+        results[mode] = [run_once(mode, n, requests, batch) for n in workers]  # R44-5: ワーカー数に対する曲線
+    return results  # R44-5
+
+
+def main() -> None:  # R44-5: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)  # R44-5
+    ap.add_argument("--workers", default="1,2,4,8", help="comma-separated worker counts")  # R44-5
+    ap.add_argument("--requests", type=int, default=200, help="requests per worker")  # R44-5
+    ap.add_argument("--batch", type=int, default=5, help="observations per /api/simulate request")  # R44-5
+    ap.add_argument("--modes", default=",".join(MODES), help="comma-separated modes")  # R44-5
+    ap.add_argument("--child", choices=tuple(MODES), default=None, help=argparse.SUPPRESS)  # R44-5: 内部用
+    ap.add_argument("--db", default=None, help=argparse.SUPPRESS)  # R44-5
+    ap.add_argument("--address", default=None, help=argparse.SUPPRESS)  # R44-5
+    ap.add_argument("--worker", type=int, default=0, help=argparse.SUPPRESS)  # R44-5
+    ap.add_argument("--json", default=None, help="write results to this file")  # R44-5
+    args = ap.parse_args()  # R44-5
+    if args.child:  # R44-5: 子プロセス（結果を1行のJSONで返す）
+        print(json.dumps(child(args.child, args.db, args.address, args.worker, args.requests, args.batch)))  # R44-5
+        return  # R44-5
+    workers = [int(w) for w in args.workers.split(",")]  # R44-5
+    emit("concurrency", run(workers, args.requests, args.batch, args.modes.split(",")), args.json)  # R44-5
+
+
+if __name__ == "__main__":  # R44-5: python -m bench.concurrency
+    main()  # R44-5
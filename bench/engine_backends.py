@@ -0,0 +1,66 @@
+"""Issue and steps throughput through the shared engine, per database URL.
+
+    python -m bench.engine_backends [-n 500] [--url postgresql+psycopg://localhost/uraha_bench] [--json out.json]
+
+SQLite always runs twice: with the steps log sharing the Issue engine (default) and with
+its own engine on the same file (STEPS_DATABASE_URL), i.e. the old two-stack layout.
+A --url that is not SQLite (e.g. a local PostgreSQL) is used for Issues; the steps log,
+whose SQL is SQLite-specific, then stays on a temporary SQLite file.
+"""
+from __future__ import annotations  # R30-4: 前方参照を安定させる
+
+import argparse  # R30-4: 回数/URLを引数で受け取る
+import tempfile  # R30-4: steps 用の一時DB
+from pathlib import Path  # R30-4
+from typing import Any, Dict, List  # R30-4: 最小型を明示する
+
+from bench._common import emit, rate, temp_app  # R30-4: 共通ヘルパ
+
+FORM = {"threat": "1", "body_alarm": "0", "need_clarity": "2", "energy": "2"}  # R20-6: assertになる入力
+ISSUE = {"title": "bench", "tags": "a,b", "intensity": "2", "note": "n"}  # R30-4: /issues/new の入力
+
+
+def _workload(app: Any, n: int) -> Dict[str, Any]:  # R30-4: 同じ手順で測る
+    client = app.test_client()  # R30-4
+    return {  # R30-4
+        "POST /issues/new": rate(lambda: client.post("/issues/new", data=ISSUE), n),  # R30-4: ORM の書き込み
+        "GET /issues": rate(lambda: client.get("/issues"), max(n // 10, 1)),  # R30-4: 件数が増えるので少なめ
+        "POST /boundary": rate(lambda: client.post("/boundary", data=FORM), n),  # R30-4: steps の書き込み
+        "GET /steps/1": rate(lambda: client.get("/steps/1"), n),  # R30-4: steps の読み取り
+    }
+
+
+def run(n: int, urls: List[str]) -> Dict[str, Any]:  # R30-4
+    results: Dict[str, Any] = {}  # R30-4
+    with temp_app() as app:  # R30-4: SQLite、エンジン共有
+        results["sqlite_shared_engine"] = _workload(app, n)  # R30-4
+    with tempfile.TemporaryDirectory(prefix="uraha-bench-") as tmp:  # R30-4: 同じファイルに別エンジン（従来の構成）
+        db_file = Path(tmp) / "app.db"  # R30-4
+        with temp_app({"DATABASE_URL": f"sqlite:///{db_file}", "STEPS_DATABASE_URL": f"sqlite:///{db_file}"}) as app:  # R30-4
+            results["sqlite_separate_engines"] = _workload(app, n)  # R30-4
+    for url in urls:  # R30-4: 追加のバックエンド（例: ローカルの PostgreSQL）
+        with tempfile.TemporaryDirectory(prefix="uraha-bench-") as tmp:  # R30-4
+            try:  # R30-4: ドライバが無い/接続できない場合は記録して続ける
+                with temp_app({"DATABASE_URL": url, "STEPS_DATABASE_URL": f"sqlite:///{Path(tmp) / 'steps.db'}"}) as app:  # R30-4
+                    from app.models import db  # R30-4: 前回の実行分を消す
+
+                    with app.app_context():  # R30-4
+                        db.drop_all()  # R30-4
+                        db.create_all()  # R30-4
+                    results[url] = _workload(app, n)  # R30-4
+            except Exception as e:  # R30-4
+                results[url] = {"skipped": f"{type(e).__name__}: {e}"}  # R30-4
+    return results  # R30-4
+
+
+def main() -> None:  # R30-4: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)  # R30-4
+    ap.add_argument("-n", type=int, default=500, help="requests per endpoint")  # R30-4
+    ap.add_argument("--url", action="append", default=[], help="extra DATABASE_URL for Issues (repeatable)")  # R30-4
+    ap.add_argument("--json", default=None, help="write results to this file")  # R30-4
+    args = ap.parse_args()  # R30-4
+    emit("engine_backends", run(args.n, args.url), args.json)  # R30-4
+
+
+if __name__ == "__main__":  # R30-4: python -m bench.engine_backends
+    main()  # R30-4
@@ -0,0 +1,48 @@
+"""Cost of app.instrument: POST /boundary and GET /steps/<id> with INSTRUMENT off vs on, plus stage() alone.
+
+    python -m bench.instrument [-n 2000] [--json out.json]
+"""
+from __future__ import annotations  # R35-6: 前方参照を安定させる
+
+import argparse  # R35-6: 回数を引数で受け取る
+import time  # R35-6: stage() 単体の計測
+from typing import Any, Dict  # R35-6: 最小型を明示する
+
+from bench._common import emit, rate, temp_app  # R35-6: 共通ヘルパ
+
+FORM = {"threat": "1", "body_alarm": "0", "need_clarity": "2", "energy": "2"}  # R20-6: 保存される入力
+
+
+def _stage_ns(n: int) -> float:  # R35-6: with stage(...) 1回あたりのナノ秒
+    from app.instrument import stage  # R35-6
+
+    t0 = time.perf_counter()  # R35-6
+    for _ in range(n):  # R35-6
+        with stage("bench"):  # R35-6
+            pass  # R35-6
+    return round((time.perf_counter() - t0) / n * 1e9, 1)  # R35-6
+
+
+def run(n: int) -> Dict[str, Any]:  # R35-6
+    results: Dict[str, Any] = {}  # R35-6
+    for name, on in (("off", False), ("on", True)):  # R35-6
+        with temp_app({"INSTRUMENT": on, "STEPS_CACHE_SIZE": 0}) as app:  # R35-6: キャッシュ無しで毎回 read_step を通す
+            client = app.test_client()  # R35-6
+            results[name] = {  # R35-6
+                "POST /boundary": rate(lambda: client.post("/boundary", data=FORM), n),  # R35-6
+                "GET /steps/1": rate(lambda: client.get("/steps/1"), n),  # R35-6
+                "stage_ns": _stage_ns(200_000),  # R35-6
+            }
+    return results  # R35-6
+
+
+def main() -> None:  # R35-6: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)  # R35-6
+    ap.add_argument("-n", type=int, default=2000, help="requests per endpoint")  # R35-6
+    ap.add_argument("--json", default=None, help="write results to this file")  # R35-6
+    args = ap.parse_args()  # R35-6
+    emit("instrument", run(args.n), args.json)  # R35-6
+
+
+if __name__ == "__main__":  # R35-6: python -m bench.instrument
+    main()  # R35-6
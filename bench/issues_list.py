@@ -0,0 +1,89 @@
+"""/issues at 1M issues: time to first byte, total time and peak Python memory per page.
+
+    python -m bench.issues_list [--db /tmp/uraha-bench.db] [--issues 1000000] [--legacy] [--json out.json]
+
+Without --db a temp DB is seeded with --issues rows (bench.seed). Each case is one request
+through the test client with buffered=False, so the first chunk is timed as it leaves the
+streamed template. --legacy also times the old handler (every Issue loaded with .all(),
+then one render_template) on the same rows. It needs several GB at 1M rows, so it is opt-in.
+Memory is the tracemalloc peak, i.e. Python objects only (SQLite's page cache is not counted).
+"""
+from __future__ import annotations  # R39-3: 前方参照を安定させる
+
+import argparse  # R39-3: 引数
+import tempfile  # R39-3: 使い捨てDB
+import time  # R39-3: 経過時間
+import tracemalloc  # R39-3: ピークメモリ
+from pathlib import Path  # R39-3
+from typing import Any, Callable, Dict, Iterator, Optional  # R39-3: 最小型を明示する
+
+from flask import render_template  # R39-3: 旧ハンドラの再現
+
+from app.models import Issue  # R39-3
+from bench._common import emit, temp_app  # R39-3: 共通ヘルパ
+from bench.seed import seed_db  # R36-3
+
+
+def _timed(chunks: Callable[[], Iterator[Any]]) -> Dict[str, Any]:  # R39-3: 最初の断片までと全体（秒）、送ったバイト数、ピーク
+    tracemalloc.start()  # R39-3
+    t0 = time.perf_counter()  # R39-3
+    first = None  # R39-3
+    size = 0  # R39-3
+    for chunk in chunks():  # R39-3
+        if first is None:  # R39-3
+            first = time.perf_counter() - t0  # R39-3
+        size += len(chunk)  # R39-3
+    total = time.perf_counter() - t0  # R39-3
+    peak = tracemalloc.get_traced_memory()[1]  # R39-3
+    tracemalloc.stop()  # R39-3
+    return {  # R39-3
+        "ttfb_ms": round((first or total) * 1000, 2),  # R39-3
+        "total_ms": round(total * 1000, 2),  # R39-3
+        "bytes": size,  # R39-3
+        "peak_mib": round(peak / 2**20, 1),  # R39-3
+    }
+
+
+def run(db: Optional[str], issues: int, legacy: bool) -> Dict[str, Any]:  # R39-3
+    with tempfile.TemporaryDirectory(prefix="uraha-bench-") as tmp:  # R39-3
+        db_file = db or str(Path(tmp) / "app.db")  # R39-3
+        if db is None:  # R39-3
+            seed_db(db_file, 0, issues)  # R36-3
+        with temp_app(db_file=db_file) as app:  # R39-3
+            client = app.test_client()  # R39-3
+            with app.app_context():  # R39-3
+                total = Issue.query.count()  # R39-3
+                mid = Issue.query.order_by(Issue.created_at.desc()).offset(total // 2).first()  # R39-3: 深いページの起点
+            cases = {  # R39-3: 名前→URL
+                "first_page_50": "/issues",  # R39-3
+                "first_page_1000": "/issues?limit=1000",  # R39-3
+                "deep_page_50": f"/issues?before_id={mid.id if mid else 1}",  # R39-3: 中ほどのキーセット
+                "tag_intensity_50": "/issues?tag=health&min_intensity=3&max_intensity=5",  # R39-3
+                "rare_filter_50": "/issues?tag=health&min_intensity=10&max_intensity=10",  # R39-3: 約1/33 の行だけ
+            }
+            results: Dict[str, Any] = {"issues": total}  # R39-3
+            for name, url in cases.items():  # R39-3
+                client.get(url).close()  # R39-3: 1回目（ページキャッシュを温める）は捨てる
+                results[name] = _timed(lambda url=url: iter(client.get(url, buffered=False).response))  # R39-3
+            if legacy:  # R39-3: 旧 issues_index（全件 .all() → render_template）
+                def old_handler() -> Iterator[str]:  # R39-3
+                    with app.test_request_context("/issues"):  # R39-3
+                        rows = Issue.query.order_by(Issue.created_at.desc()).all()  # R39-3
+                        yield render_template("issues/index.html", issues=rows, limit=len(rows) + 1)  # R39-3: 1回で全体を返す
+
+                results["legacy_all_rows"] = _timed(old_handler)  # R39-3
+    return results  # R39-3
+
+
+def main() -> None:  # R39-3: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)  # R39-3
+    ap.add_argument("--db", default=None, help="DB prepared by bench.seed (default: a seeded temp DB)")  # R39-3
+    ap.add_argument("--issues", type=int, default=1_000_000, help="issues in the temp DB")  # R39-3
+    ap.add_argument("--legacy", action="store_true", help="also time loading every row (needs several GB)")  # R39-3
+    ap.add_argument("--json", default=None, help="write results to this file")  # R39-3
+    args = ap.parse_args()  # R39-3
+    emit("issues_list", run(args.db, args.issues, args.legacy), args.json)  # R39-3
+
+
+if __name__ == "__main__":  # R39-3: python -m bench.issues_list
+    main()  # R39-3
@@ -0,0 +1,197 @@
+"""Load generator over /boundary, /steps, /steps/<id> and /issues: Flask test client and a real server.
+
+    python -m bench.load [--mode client|server|both] [--db /tmp/uraha-bench.db] [-c 16] [--seconds 10] [--json out.json]
+
+The request mix (MIX) is drawn from a seeded RNG per connection. Without --db a temp DB is
+seeded with --steps/--issues rows first (bench.seed). "client" drives the app in-process
+through the test client (no HTTP, one thread); "server" starts the threaded WSGI server
+(same as wsgi.py) in a subprocess and keeps -c keep-alive connections busy.
+Results are per endpoint: requests, errors, p50/p99 (ms), plus overall requests/s.
+"""
+from __future__ import annotations  # R36-4: 前方参照を安定させる
+
+import argparse  # R36-4: 引数
+import http.client  # R36-4: keep-alive の HTTP クライアント
+import logging  # R36-4: サーバのアクセスログを止める
+import random  # R36-4: リクエストの組み合わせ
+import subprocess  # R36-4: サーバを別プロセスで動かす
+import sys  # R36-4
+import tempfile  # R36-4: 使い捨てDB
+import threading  # R36-4: 並列接続
+import time  # R36-4: 経過時間/レイテンシ
+from pathlib import Path  # R36-4
+from typing import Any, Callable, Dict, List, Optional, Tuple  # R36-4: 最小型を明示する
+from urllib.parse import urlencode  # R36-4: フォーム本文
+
+from bench._common import emit, temp_app  # R36-4: 共通ヘルパ
+from bench.boundary_load import _free_port, _percentile, _wait_ready  # R31-6: 同じ起動待ち/集計
+from bench.seed import seed_db  # R36-3: 使い捨てDBの中身
+
+FORM = {"threat": "1", "body_alarm": "0", "need_clarity": "2", "energy": "2"}  # R20-6: /boundary の入力
+MIX: Tuple[Tuple[str, int], ...] = (  # R36-4: (エンドポイント, 重み)
+    ("GET /boundary", 1),  # R36-4
+    ("POST /boundary", 3),  # R36-4
+    ("GET /steps", 2),  # R36-4
+    ("GET /steps/<id>", 3),  # R36-4
+    ("GET /issues", 1),  # R36-4
+)
+MODES = ("client", "server")  # R36-4
+
+Request = Tuple[str, str, str, Optional[Dict[str, str]]]  # R36-4: (名前, メソッド, パス, フォーム)
+
+
+def _requests(rng: random.Random, max_step_id: int) -> Callable[[], Request]:  # R36-4: 次に投げるリクエスト
+    names = [n for n, _ in MIX]  # R36-4
+    weights = [w for _, w in MIX]  # R36-4
+
+    def nxt() -> Request:  # R36-4
+        name = rng.choices(names, weights)[0]  # R36-4
+        if name == "POST /boundary":  # R36-4
+            return name, "POST", "/boundary", FORM  # R36-4
+        if name == "GET /steps":  # R36-4
+            return name, "GET", "/steps?limit=50", None  # R36-4
+        if name == "GET /steps/<id>":  # R36-4: 既存の行を散らして読む
+            return name, "GET", f"/steps/{rng.randint(1, max(1, max_step_id))}", None  # R36-4
+        return name, "GET", name.split(" ", 1)[1], None  # R36-4: /boundary, /issues
+    return nxt  # R36-4
+
+
+class _Recorder:  # R36-4: エンドポイント毎のレイテンシ（スレッド間で共有）
+    def __init__(self) -> None:  # R36-4
+        self.latencies: Dict[str, List[float]] = {n: [] for n, _ in MIX}  # R36-4: list.append はスレッド間で安全
+        self.errors: Dict[str, int] = {n: 0 for n, _ in MIX}  # R36-4
+        self._lock = threading.Lock()  # R36-4
+
+    def record(self, name: str, seconds: float, ok: bool) -> None:  # R36-4
+        if ok:  # R36-4
+            self.latencies[name].append(seconds)  # R36-4
+        else:  # R36-4
+            with self._lock:  # R36-4
+                self.errors[name] += 1  # R36-4
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:  # R36-4
+        out: Dict[str, Any] = {}  # R36-4
+        total = 0  # R36-4
+        for name, values in self.latencies.items():  # R36-4
+            lat = sorted(values)  # R36-4
+            total += len(lat)  # R36-4
+            out[name] = {  # R36-4
+                "requests": len(lat),  # R36-4
+                "errors": self.errors[name],  # R36-4
+                "p50_ms": round(_percentile(lat, 0.50) * 1000, 2),  # R36-4
+                "p99_ms": round(_percentile(lat, 0.99) * 1000, 2),  # R36-4
+            }
+        out["total"] = {"requests": total, "errors": sum(self.errors.values()), "per_sec": round(total / elapsed, 1)}  # R36-4
+        return out  # R36-4
+
+
+def _max_step_id(db_file: str) -> int:  # R36-4
+    import sqlite3  # R36-4
+
+    with sqlite3.connect(db_file) as conn:  # R36-4: 読むだけ
+        return int(conn.execute("SELECT COALESCE(MAX(id), 0) FROM steps").fetchone()[0])  # R36-4
+
+
+def run_client(db_file: str, seconds: float, seed: int) -> Dict[str, Any]:  # R36-4: テストクライアント（HTTP無し、1スレッド）
+    rec = _Recorder()  # R36-4
+    nxt = _requests(random.Random(seed), _max_step_id(db_file))  # R36-4
+    with temp_app(db_file=db_file) as app:  # R36-4
+        client = app.test_client()  # R36-4
+        stop_at = time.monotonic() + seconds  # R36-4
+        t0 = time.perf_counter()  # R36-4
+        while time.monotonic() < stop_at:  # R36-4
+            name, method, path, form = nxt()  # R36-4
+            s = time.perf_counter()  # R36-4
+            resp = client.open(path, method=method, data=form)  # R36-4
+            rec.record(name, time.perf_counter() - s, resp.status_code == 200)  # R36-4
+        return rec.summary(time.perf_counter() - t0)  # R36-4
+
+
+def serve(port: int, db_file: str) -> None:  # R36-4: サーバ側（子プロセス、wsgi.py と同じ threaded サーバ）
+    from werkzeug.serving import make_server  # R36-4
+
+    from app import create_app  # R36-4
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # R36-4
+    make_server("127.0.0.1", port, create_app({"DATABASE_URL": f"sqlite:///{db_file}"}), threaded=True).serve_forever()  # R36-4
+
+
+def _http_client(port: int, stop_at: float, nxt: Callable[[], Request], rec: _Recorder) -> None:  # R36-4: 1接続分の負荷
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)  # R36-4: keep-alive
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}  # R36-4
+    while time.monotonic() < stop_at:  # R36-4
+        name, method, path, form = nxt()  # R36-4
+        t0 = time.perf_counter()  # R36-4
+        try:  # R36-4
+            if form is None:  # R36-4
+                conn.request(method, path)  # R36-4
+            else:  # R36-4
+                conn.request(method, path, urlencode(form), headers)  # R36-4
+            resp = conn.getresponse()  # R36-4
+            resp.read()  # R36-4
+            ok = resp.status == 200  # R36-4
+        except (OSError, http.client.HTTPException):  # R36-4: 切れたら張り直す
+            conn.close()  # R36-4
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)  # R36-4
+            ok = False  # R36-4
+        rec.record(name, time.perf_counter() - t0, ok)  # R36-4
+    conn.close()  # R36-4
+
+
+def run_server(db_file: str, concurrency: int, seconds: float, seed: int) -> Dict[str, Any]:  # R36-4: 実サーバ
+    port = _free_port()  # R31-6
+    proc = subprocess.Popen([sys.executable, "-m", "bench.load", "--serve", "--port", str(port), "--db", db_file])  # R36-4
+    try:  # R36-4
+        _wait_ready(port)  # R31-6
+        rec = _Recorder()  # R36-4
+        max_id = _max_step_id(db_file)  # R36-4
+        stop_at = time.monotonic() + seconds  # R36-4
+        threads = [  # R36-4: 接続毎に別の RNG（seed+i）
+            threading.Thread(target=_http_client, args=(port, stop_at, _requests(random.Random(seed + i), max_id), rec))
+            for i in range(concurrency)
+        ]
+        t0 = time.perf_counter()  # R36-4
+        for t in threads:  # R36-4
+            t.start()  # R36-4
+        for t in threads:  # R36-4
+            t.join()  # R36-4
+        return rec.summary(time.perf_counter() - t0)  # R36-4
+    finally:  # R36-4
+        proc.terminate()  # R36-4
+        proc.wait(10)  # R36-4
+
+
+def run(mode: str, db: Optional[str], steps: int, issues: int, concurrency: int, seconds: float, seed: int) -> Dict[str, Any]:  # R36-4
+    with tempfile.TemporaryDirectory(prefix="uraha-bench-") as tmp:  # R36-4
+        db_file = db or str(Path(tmp) / "app.db")  # R36-4
+        if db is None:  # R36-4: 使い捨てDBを seed する
+            seed_db(db_file, steps, issues, seed)  # R36-3
+        results: Dict[str, Any] = {"db": db or "temp", "seconds": seconds, "seed": seed, "mix": dict(MIX)}  # R36-4
+        if mode in ("client", "both"):  # R36-4
+            results["client"] = run_client(db_file, seconds, seed)  # R36-4
+        if mode in ("server", "both"):  # R36-4
+            results["server"] = {"concurrency": concurrency, **run_server(db_file, concurrency, seconds, seed)}  # R36-4
+        return results  # R36-4
+
+
+def main() -> None:  # R36-4: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)  # R36-4
+    ap.add_argument("--mode", choices=MODES + ("both",), default="both", help="test client, real server, or both")  # R36-4
+    ap.add_argument("--db", default=None, help="DB prepared by bench.seed (default: a seeded temp DB)")  # R36-4
+    ap.add_argument("--steps", type=int, default=100_000, help="steps in the temp DB")  # R36-4
+    ap.add_argument("--issues", type=int, default=1_000, help="issues in the temp DB")  # R36-4
+    ap.add_argument("-c", "--concurrency", type=int, default=16, help="keep-alive connections (server mode)")  # R36-4
+    ap.add_argument("--seconds", type=float, default=10.0, help="measured duration per mode")  # R36-4
+    ap.add_argument("--seed", type=int, default=0, help="random seed for data and request mix")  # R36-4
+    ap.add_argument("--json", default=None, help="write results to this file")  # R36-4
+    ap.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)  # R36-4: 子プロセス用
+    ap.add_argument("--port", type=int, help=argparse.SUPPRESS)  # R36-4
+    args = ap.parse_args()  # R36-4
+    if args.serve:  # R36-4: サーバとして動く
+        serve(args.port, args.db)  # R36-4
+        return  # R36-4
+    emit("load", run(args.mode, args.db, args.steps, args.issues, args.concurrency, args.seconds, args.seed), args.json)  # R36-4
+
+
+if __name__ == "__main__":  # R36-4: python -m bench.load
+    main()  # R36-4
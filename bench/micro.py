@@ -0,0 +1,82 @@
+"""Micro-benchmarks: simulator, validation, interventions and every steps repository function.
+
+    python -m bench.micro [--db /tmp/uraha-bench.db] [--only simulate_step,read_step] [--json out.json]
+
+Without --db the repository functions run on a fresh DB filled with --rows seeded steps;
+with --db they run on a file prepared by bench.seed (steps written by save_step are
+added to it). Each result is the median ns/op over --repeat loops.
+"""
+from __future__ import annotations  # R36-2: 前方参照を安定させる
+
+import argparse  # R36-2: 引数
+from typing import Any, Dict, Optional  # R36-2: 最小型を明示する
+
+from app.core.contracts import StepInput  # R36-2: simulate_step の入力
+from app.core.interventions import propose_interventions  # R36-2
+from app.core.policy_table import lookup_policy  # R36-2: /boundary が実際に使う経路
+from app.core.simulator import simulate_step  # R36-2
+from app.storage import repository  # R36-2: リポジトリ関数
+from app.storage.db import session  # R36-2: 件数
+from app.storage.export import iter_export  # R36-2
+from app.validators import validate_boundary_form  # R36-2
+from bench._common import emit, fill_steps, median_ns, temp_app  # R36-2: 共通ヘルパ
+
+FORM = {"threat": "1", "body_alarm": "0", "need_clarity": "2", "energy": "2"}  # R20-6: /boundary の入力
+VALUES = {"threat": 1, "body_alarm": 0, "need_clarity": 2, "energy": 2}  # R36-2: 検証済みの値
+STEP_IN = StepInput(s_t={"energy": 2}, o_t=VALUES, prefs={}, precision={})  # R36-2
+
+
+def _cases(total: int) -> Dict[str, tuple]:  # R36-2: 名前→(関数, 1ループの回数)
+    mid = max(1, total // 2)  # R36-2: 中ほどの id
+    pi_t = simulate_step(STEP_IN).pi_t  # R36-2
+    return {  # R36-2
+        "simulate_step": (lambda: simulate_step(STEP_IN), 20_000),  # R36-2
+        "lookup_policy": (lambda: lookup_policy(VALUES), 20_000),  # R36-2
+        "validate_boundary_form": (lambda: validate_boundary_form(FORM), 20_000),  # R36-2
+        "propose_interventions": (lambda: propose_interventions(VALUES, pi_t), 2_000),  # R36-2
+        "init_db": (repository.init_db, 2_000),  # R36-2: スキーマ確保済みなら接続の貸し借りだけ
+        "save_step": (lambda: repository.save_step("boundary", {"energy": 2}, VALUES, pi_t, {}, ["bench"]), 500),  # R36-2: 1行1コミット
+        "read_step": (lambda: repository.read_step(mid), 2_000),  # R36-2
+        "read_step_summary_columns": (lambda: repository.read_step(mid, columns=repository.STEP_SUMMARY_COLUMNS), 2_000),  # R36-2
+        "list_steps_50": (lambda: repository.list_steps(50), 500),  # R36-2
+        "list_steps_filtered_template_pi": (lambda: repository.list_steps_filtered(limit=50, template="boundary", pi_t="assert"), 500),  # R36-2
+        "list_steps_filtered_keyset": (lambda: repository.list_steps_filtered(limit=50, before_id=mid), 500),  # R36-2
+        "list_steps_filtered_date_range": (lambda: repository.list_steps_filtered(limit=50, since="2025-07-01", until="2025-07-02"), 500),  # R36-2
+        "normalize_created_at": (lambda: repository.normalize_created_at("2025-07-01T12:00:00"), 20_000),  # R36-2
+        "iter_export_ndjson_1000_rows": (lambda: _export_slice(mid), 20),  # R36-2
+    }
+
+
+def _export_slice(mid: int) -> None:  # R36-2: id > mid-1000 から1000行（1チャンク）だけ書き出す
+    for _ in iter_export("ndjson", chunk_size=1000, after_id=max(0, mid - 1000)):  # R36-2
+        break  # R36-2: 最初のチャンクで止める
+
+
+def run(db_file: Optional[str], rows: int, repeat: int, only: Optional[set]) -> Dict[str, Any]:  # R36-2
+    with temp_app({"STEPS_STORAGE_FORMAT": "json"}, db_file=db_file):  # R36-2: リポジトリ関数はアプリの設定で動く
+        with session() as conn:  # R36-2
+            if db_file is None:  # R36-2: 使い捨てDBには seed した行を入れる
+                fill_steps(conn, rows)  # R24-5
+            total = conn.execute("SELECT COUNT(*) FROM steps").fetchone()[0]  # R36-2
+        results: Dict[str, Any] = {"steps_rows": total, "unit": "ns/op (median)"}  # R36-2
+        for name, (fn, n) in _cases(total).items():  # R36-2
+            if only and name not in only:  # R36-2
+                continue  # R36-2
+            results[name] = median_ns(fn, n, repeat)  # R36-2
+    return results  # R36-2
+
+
+def main() -> None:  # R36-2: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)  # R36-2
+    ap.add_argument("--db", default=None, help="DB prepared by bench.seed (default: a fresh temp DB)")  # R36-2
+    ap.add_argument("--rows", type=int, default=100_000, help="seeded steps in the temp DB")  # R36-2
+    ap.add_argument("--repeat", type=int, default=5, help="loops per case (median)")  # R36-2
+    ap.add_argument("--only", default="", help="comma-separated case names")  # R36-2
+    ap.add_argument("--json", default=None, help="write results to this file")  # R36-2
+    args = ap.parse_args()  # R36-2
+    only = {s for s in args.only.split(",") if s} or None  # R36-2
+    emit("micro", run(args.db, args.rows, args.repeat, only), args.json)  # R36-2
+
+
+if __name__ == "__main__":  # R36-2: python -m bench.micro
+    main()  # R36-2
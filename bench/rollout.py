@@ -0,0 +1,74 @@
+"""Multi-step rollouts over the full boundary state space (horizons 5-20).
+
+    python -m bench.rollout [--horizons 5,10,15,20] [--samples 1000] [--workers 0] [--json out.json]
+"""
+from __future__ import annotations  # R34-6: 前方参照を安定させる
+
+import argparse  # R34-6: 引数
+import itertools  # R34-6: メモ無しの全列挙（比較用）
+import time  # R34-6: 経過時間を測る
+from typing import Any, Dict, List  # R34-6: 最小型を明示する
+
+from app.core.rollout import rollout_many, state_space, summarize  # R34-6: 計測対象
+from app.core.rules import get_compiled  # R34-6: メモ無し版の遷移
+from bench._common import emit  # R34-6: 結果出力
+
+NAIVE_MAX_HORIZON = 6  # R34-6: メモ無しの全列挙は 3^h×256 本なので短い horizon だけ
+
+
+def _naive(horizon: int) -> int:  # R34-6: 方策列を1本ずつ辿る（メモ無し）。辿った遷移数を返す
+    c = get_compiled("boundary")  # R34-6
+    policies = c.template.policies  # R34-6
+    steps = 0  # R34-6
+    for start in state_space():  # R34-6
+        for seq in itertools.product(policies, repeat=horizon):  # R34-6
+            o_t = start  # R34-6
+            for pi in seq:  # R34-6
+                o_t = c.next_observation(o_t, pi)  # R34-6
+            c.decide(o_t)  # R34-6
+            steps += horizon  # R34-6
+    return steps  # R34-6
+
+
+def _timed(fn: Any) -> Any:  # R34-6: (結果, 秒)
+    t0 = time.perf_counter()  # R34-6
+    out = fn()  # R34-6
+    return out, time.perf_counter() - t0  # R34-6
+
+
+def run(horizons: List[int], samples: int, workers: int) -> Dict[str, Any]:  # R34-6
+    rows: List[Dict[str, Any]] = []  # R34-6
+    for h in horizons:  # R34-6
+        row: Dict[str, Any] = {"horizon": h}  # R34-6
+        stats, s = _timed(lambda: rollout_many(None, h, "enumerate"))  # R34-6: 全方策列（メモあり）
+        row["enumerate_seconds"] = round(s, 4)  # R34-6
+        row["enumerate"] = summarize(stats)  # R34-6: sequences = 256×3^h
+        _, s = _timed(lambda: rollout_many(None, h, "greedy"))  # R34-6: 規則どおりの1本
+        row["greedy_seconds"] = round(s, 4)  # R34-6
+        stats, s = _timed(lambda: rollout_many(None, h, "sample", samples=samples))  # R34-6
+        row["sample_seconds"] = round(s, 4)  # R34-6
+        row["sample"] = summarize(stats)  # R34-6
+        if workers > 1:  # R34-6: 同じサンプリングを複数プロセスで
+            _, s = _timed(lambda: rollout_many(None, h, "sample", samples=samples, workers=workers))  # R34-6
+            row[f"sample_seconds_workers{workers}"] = round(s, 4)  # R34-6
+        if h <= NAIVE_MAX_HORIZON:  # R34-6
+            steps, s = _timed(lambda: _naive(h))  # R34-6
+            row["naive_enumerate_seconds"] = round(s, 4)  # R34-6
+            row["naive_transitions"] = steps  # R34-6
+        rows.append(row)  # R34-6
+    return {"states": len(state_space()), "samples_per_state": samples, "workers": workers, "horizons": rows}  # R34-6
+
+
+def main() -> None:  # R34-6: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__)  # R34-6
+    ap.add_argument("--horizons", default="5,10,15,20", help="comma-separated horizons")  # R34-6
+    ap.add_argument("--samples", type=int, default=1000, help="sampled policy sequences per start state")  # R34-6
+    ap.add_argument("--workers", type=int, default=0, help="also time sampling with this many processes")  # R34-6
+    ap.add_argument("--json", default=None, help="write results to this file")  # R34-6
+    args = ap.parse_args()  # R34-6
+    horizons = [int(h) for h in args.horizons.split(",") if h]  # R34-6
+    emit("rollout", run(horizons, args.samples, args.workers), args.json)  # R34-6
+
+
+if __name__ == "__main__":  # R34-6: python -m bench.rollout
+    main()  # R34-6
@@ -0,0 +1,106 @@
+"""/issues/search and /steps/search: FTS5 vs. the LIKE scans they replace.
+
+    python -m bench.search [--db /tmp/uraha-bench.db] [--issues 100000] [--steps 100000] [--json out.json]
+
+Without --db a temp DB is seeded (bench.seed). "like_*" is the substring scan over every
+issue (what a search without the index costs); "fts_*" is search_issues' first page,
+ranked by bm25. Step notes are searched through the note_sets dictionary, then the steps
+of each matching set newest first. "rare_page_ms" searches a note set held only by the
+RARE_ROWS oldest steps, the worst case for a newest-first walk without an index.
+"""
+from __future__ import annotations  # R38-6: 前方参照を安定させる
+
+import argparse  # R38-6: 引数
+import json  # R38-7: 稀な note set の保存形式
+import tempfile  # R38-6: 使い捨てDB
+import time  # R38-6: 経過時間
+from pathlib import Path  # R38-6
+from typing import Any, Callable, Dict, Optional  # R38-6: 最小型を明示する
+
+from app.issue_search import search_issues  # R38-6: 計測対象
+from app.storage.compact import migrate_steps  # R29-4
+from app.storage.db import session  # R38-6
+from app.storage.search import search_steps  # R38-6
+from bench._common import emit, temp_app  # R38-6: 共通ヘルパ
+from bench.seed import seed_db  # R36-3
+
+TERMS = {"common": "締め切り", "rare": "42424", "short": "夜"}  # R38-6: 本文の頻出語/タイトルの1件/trigram 未満
+RARE_NOTES = ["ベンチ用の稀な定型文（bench-rare-notes）"]  # R38-7: 古い数行だけが持つ note set
+RARE_ROWS = 5  # R38-7
+
+
+def _ms(fn: Callable[[], Any], repeat: int) -> float:  # R38-6: repeat回の最小（ミリ秒）
+    best = float("inf")  # R38-6
+    for _ in range(repeat):  # R38-6
+        t0 = time.perf_counter()  # R38-6
+        fn()  # R38-6
+        best = min(best, time.perf_counter() - t0)  # R38-6
+    return round(best * 1000, 3)  # R38-6
+
+
+def _like(term: str) -> Callable[[], Any]:  # R38-6: 索引無しの部分一致（新しい順の1ページ）
+    def run() -> Any:  # R38-6
+        with session() as conn:  # R20-2
+            return conn.execute(  # R38-6
+                "SELECT id FROM issues WHERE title LIKE ? OR note LIKE ? ORDER BY created_at DESC LIMIT 21",
+                (f"%{term}%", f"%{term}%"),  # R38-6
+            ).fetchall()
+    return run  # R38-6
+
+
+def _add_rare_note_set() -> None:  # R38-7: 最も古い RARE_ROWS 行の notes を稀な組にする（json レイアウト、migrate 前に呼ぶ）
+    text = json.dumps(RARE_NOTES, ensure_ascii=False)  # R4-1: save_step と同じJSON化
+    with session() as conn:  # R20-2
+        conn.execute("UPDATE steps SET notes_json = ? WHERE id IN (SELECT id FROM steps ORDER BY id LIMIT ?)", (text, RARE_ROWS))  # R38-7
+        conn.execute("INSERT OR IGNORE INTO note_sets (notes_json) VALUES (?)", (text,))  # R38-4: トリガで note_sets_fts にも入る
+        conn.commit()  # R38-7
+
+
+def run(db: Optional[str], issues: int, steps: int, repeat: int) -> Dict[str, Any]:  # R38-6
+    with tempfile.TemporaryDirectory(prefix="uraha-bench-") as tmp:  # R38-6
+        db_file = db or str(Path(tmp) / "app.db")  # R38-6
+        if db is None:  # R38-6
+            seed_db(db_file, steps, issues)  # R36-3
+            with temp_app(db_file=db_file):  # R38-6: compact レイアウトにも同じ行を写す（元は残す）
+                _add_rare_note_set()  # R38-7
+                migrate_steps(to="compact")  # R29-4
+        results: Dict[str, Any] = {}  # R38-6
+        for fmt in ("json", "compact"):  # R38-6: steps の notes 検索はレイアウト毎
+            with temp_app({"STEPS_STORAGE_FORMAT": fmt}, db_file=db_file) as app:  # R38-6
+                with app.app_context():  # R38-6: search_issues は ORM
+                    with session() as conn:  # R38-6
+                        table = "steps" if fmt == "json" else "steps_compact"  # R38-6
+                        rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]  # R38-6
+                        results["issues_rows"] = conn.execute("SELECT COUNT(*) FROM issues").fetchone()[0]  # R38-6
+                    if rows == 0:  # R38-6: migrate していないレイアウト
+                        continue  # R38-6
+                    if fmt == "json":  # R38-6: Issue 側はレイアウトに依らない
+                        results["issues_ms"] = {  # R38-6
+                            **{f"like_{k}": _ms(_like(t), repeat) for k, t in TERMS.items()},  # R38-6
+                            **{f"fts_{k}": _ms(lambda t=t: search_issues(t), repeat) for k, t in TERMS.items()},  # R38-6
+                            "tag_first_page": _ms(lambda: search_issues("", tag="health"), repeat),  # R38-6: issue_tags 索引
+                            "fts_common_with_tag": _ms(lambda: search_issues(TERMS["common"], tag="health"), repeat),  # R38-6
+                        }
+                    results[f"steps_{fmt}"] = {  # R38-6
+                        "rows": rows,  # R38-6
+                        "first_page_ms": _ms(lambda: search_steps("主張", limit=50), repeat),  # R38-6: 頻出の notes
+                        "deep_page_ms": _ms(lambda: search_steps("主張", limit=50, cursor=f"0:{rows // 2}"), repeat),  # R38-6
+                        "rare_page_ms": _ms(lambda: search_steps("bench-rare-notes", limit=50), repeat),  # R38-7: 古い数行しか持たない組
+                        "rare_rows_found": len(search_steps("bench-rare-notes", limit=50)["steps"]),  # R38-7: RARE_ROWS 件見つかること
+                    }
+    return results  # R38-6
+
+
+def main() -> None:  # R38-6: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)  # R38-6
+    ap.add_argument("--db", default=None, help="DB prepared by bench.seed (default: a seeded temp DB)")  # R38-6
+    ap.add_argument("--issues", type=int, default=100_000, help="issues in the temp DB")  # R38-6
+    ap.add_argument("--steps", type=int, default=100_000, help="steps in the temp DB")  # R38-6
+    ap.add_argument("--repeat", type=int, default=5, help="timed runs per query (best)")  # R38-6
+    ap.add_argument("--json", default=None, help="write results to this file")  # R38-6
+    args = ap.parse_args()  # R38-6
+    emit("search", run(args.db, args.issues, args.steps, args.repeat), args.json)  # R38-6
+
+
+if __name__ == "__main__":  # R38-6: python -m bench.search
+    main()  # R38-6
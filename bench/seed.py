@@ -0,0 +1,60 @@
+"""Fill a benchmark DB with seeded steps and issues (1M+ rows), reusing what is already there.
+
+    python -m bench.seed [--db /tmp/uraha-bench.db] [--steps 1000000] [--issues 10000] [--seed 0]
+
+Other benchmarks take the same file with --db. The rows depend only on the seed and the
+counts, so two machines seeded alike compare like for like.
+"""
+from __future__ import annotations  # R36-3: 前方参照を安定させる
+
+import argparse  # R36-3: 件数を引数で受け取る
+import time  # R36-3: 投入時間
+from typing import Any, Dict  # R36-3: 最小型を明示する
+
+from app.storage import db as steps_db  # R36-3: インデックスの作り直し
+from app.storage.rollup import compact_rollups  # R37-2: 集計表を追いつかせる
+from bench._common import emit, fill_issues, fill_steps, temp_app  # R36-3: 共通ヘルパ
+
+DEFAULT_DB = "/tmp/uraha-bench.db"  # R36-3: 他のベンチの --db と同じ既定
+STEP_INDEXES = ("idx_steps_template_pi_id", "idx_steps_created_at")  # R24-5: init_schema が作るインデックス
+
+
+def seed_db(db_file: str, steps: int, issues: int, seed: int = 0) -> Dict[str, Any]:  # R36-3: 足りない分だけ足す
+    with temp_app({"STEPS_STORAGE_FORMAT": "json"}, db_file=db_file):  # R36-3: create_app がスキーマ（issues/steps）を作る
+        with steps_db.session() as conn:  # R36-3: プール接続
+            have_steps = conn.execute("SELECT COUNT(*) FROM steps").fetchone()[0]  # R36-3
+            have_issues = conn.execute("SELECT COUNT(*) FROM issues").fetchone()[0]  # R36-3
+            t0 = time.perf_counter()  # R36-3
+            if have_steps < steps:  # R36-3
+                for name in STEP_INDEXES:  # R24-5: 投入中はインデックスを外す
+                    conn.execute(f"DROP INDEX IF EXISTS {name}")  # R24-5
+                fill_steps(conn, steps - have_steps, seed=seed + have_steps)  # R36-3: 続きの行は続きの seed で作る
+                steps_db.init_schema(conn)  # R24-5: 本番と同じDDLで作り直す
+            if have_issues < issues:  # R36-3
+                fill_issues(conn, issues - have_issues, seed=seed + have_issues)  # R36-3
+            conn.execute("ANALYZE")  # R24-5: 統計を取る
+            conn.commit()  # R36-3
+            compact_rollups()  # R37-2: fill_steps は集計表を通らない
+            return {  # R36-3
+                "db": db_file,  # R36-3
+                "steps": conn.execute("SELECT COUNT(*) FROM steps").fetchone()[0],  # R36-3
+                "issues": conn.execute("SELECT COUNT(*) FROM issues").fetchone()[0],  # R36-3
+                "added_steps": max(0, steps - have_steps),  # R36-3
+                "added_issues": max(0, issues - have_issues),  # R36-3
+                "seconds": round(time.perf_counter() - t0, 2),  # R36-3
+            }
+
+
+def main() -> None:  # R36-3: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)  # R36-3
+    ap.add_argument("--db", default=DEFAULT_DB, help="benchmark DB file (created or topped up)")  # R36-3
+    ap.add_argument("--steps", type=int, default=1_000_000, help="rows in steps")  # R36-3
+    ap.add_argument("--issues", type=int, default=10_000, help="rows in issues (/issues renders them all)")  # R36-3
+    ap.add_argument("--seed", type=int, default=0, help="random seed")  # R36-3
+    ap.add_argument("--json", default=None, help="write results to this file")  # R36-3
+    args = ap.parse_args()  # R36-3
+    emit("seed", seed_db(args.db, args.steps, args.issues, args.seed), args.json)  # R36-3
+
+
+if __name__ == "__main__":  # R36-3: python -m bench.seed
+    main()  # R36-3
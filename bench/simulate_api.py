@@ -0,0 +1,72 @@
+"""POST /api/simulate vs. the HTML form at POST /boundary: microseconds per case.
+
+    python -m bench.simulate_api [-n 20000] [--json out.json]
+
+Both go through the in-process test client on a fresh SQLite file. The form path validates,
+saves (one commit per case) and renders the result page for every case. The API path
+is measured at several batch sizes, without and with "persist" (one multi-row INSERT and
+one commit per request) and "proposals". Inputs cycle through every valid observation.
+"""
+from __future__ import annotations  # R40-4: 前方参照を安定させる
+
+import argparse  # R40-4: 引数
+import itertools  # R40-4: 入力の全組み合わせ
+import time  # R40-4: 経過時間
+from typing import Any, Dict, List  # R40-4: 最小型を明示する
+
+from app.templates_def.boundary import BOUNDARY_FIELDS  # R40-4
+from bench._common import emit, temp_app  # R40-4: 共通ヘルパ
+
+BATCH_SIZES = (1, 10, 100, 1000)  # R40-4: 1リクエストの件数
+
+
+def _cases(n: int) -> List[Dict[str, int]]:  # R40-4: 全入力（4^4通り）を繰り返して n 件
+    grid = [dict(zip((f.key for f in BOUNDARY_FIELDS), v)) for v in itertools.product(*(range(f.min, f.max + 1) for f in BOUNDARY_FIELDS))]  # R40-4
+    return [grid[i % len(grid)] for i in range(n)]  # R40-4
+
+
+def _per_case_us(fn: Any, cases: List[Dict[str, int]], batch: int) -> float:  # R40-4: batch 件ずつ送った1件あたり（マイクロ秒）
+    t0 = time.perf_counter()  # R40-4
+    for i in range(0, len(cases), batch):  # R40-4
+        fn(cases[i:i + batch])  # R40-4
+    return round((time.perf_counter() - t0) / len(cases) * 1e6, 1)  # R40-4
+
+
+def run(n: int) -> Dict[str, Any]:  # R40-4
+    cases = _cases(n)  # R40-4
+    results: Dict[str, Any] = {"cases": n}  # R40-4
+    with temp_app() as app:  # R40-4
+        client = app.test_client()  # R40-4
+
+        def form(chunk: List[Dict[str, int]]) -> None:  # R40-4: 1件1リクエスト（保存＋結果ページ）
+            for case in chunk:  # R40-4
+                assert client.post("/boundary", data={k: str(v) for k, v in case.items()}).status_code == 200  # R40-4
+
+        def api(**flags: bool) -> Any:  # R40-4
+            def send(chunk: List[Dict[str, int]]) -> None:  # R40-4
+                assert client.post("/api/simulate", json={"observations": chunk, **flags}).status_code == 200  # R40-4
+            return send  # R40-4
+
+        form(cases[:100])  # R40-4: 方策表/テンプレ/接続を温める
+        results["form_us"] = _per_case_us(form, cases[: min(n, 5000)], 1)  # R40-4: 遅いので上限を設ける
+        for batch in BATCH_SIZES:  # R40-4
+            results[f"api_{batch}"] = {  # R40-4
+                "us": _per_case_us(api(), cases, batch),  # R40-4: 評価だけ
+                "proposals_us": _per_case_us(api(proposals=True), cases, batch),  # R40-4: 介入候補付き
+                "persist_us": _per_case_us(api(persist=True), cases, batch),  # R40-4: 保存付き
+            }
+        best = results[f"api_{BATCH_SIZES[-1]}"]  # R40-4
+        results["speedup_vs_form"] = {k: round(results["form_us"] / v, 1) for k, v in best.items()}  # R40-4
+    return results  # R40-4
+
+
+def main() -> None:  # R40-4: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)  # R40-4
+    ap.add_argument("-n", type=int, default=20_000, help="cases per measurement")  # R40-4
+    ap.add_argument("--json", default=None, help="write results to this file")  # R40-4
+    args = ap.parse_args()  # R40-4
+    emit("simulate_api", run(args.n), args.json)  # R40-4
+
+
+if __name__ == "__main__":  # R40-4: python -m bench.simulate_api
+    main()  # R40-4
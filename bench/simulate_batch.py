@@ -0,0 +1,70 @@
+"""simulate_step loop vs vectorized simulate_steps, with an exactness check.
+
+    python -m bench.simulate_batch [-n 1000000] [--json out.json]
+"""
+from __future__ import annotations  # R21-4: 前方参照を安定させる
+
+import argparse  # R21-4: 件数を引数で受け取る
+import itertools  # R21-4: 境界値の全組み合わせを作る
+import time  # R21-4: 経過時間を測る
+from typing import Any, Dict  # R21-4: 最小型を明示する
+
+import numpy as np  # R21-4: 入力を乱数で作る
+
+from app.core.batch import FIELD_ORDER, simulate_steps  # R21-4: バッチ版
+from app.core.contracts import StepInput  # R21-4: 単発版の入力
+from app.core.simulator import simulate_step  # R21-4: 単発版
+from bench._common import emit  # R21-4: 結果出力
+
+EDGE_VALUES = (-5, -1, 0, 1, 2, 3, 4, 10**12)  # R21-4: 範囲外・大きい値も含めて比較する
+
+
+def _single(row: Any) -> Any:  # R21-4: 1行を単発版で評価する
+    o_t = {k: int(v) for k, v in zip(FIELD_ORDER, row)}  # R21-4: 観測辞書
+    return simulate_step(StepInput(s_t={}, o_t=o_t, prefs={}, precision={}))  # R21-4: 1-step
+
+
+def check_exact() -> int:  # R21-4: 全境界値の組み合わせで完全一致を確認する
+    rows = np.array(list(itertools.product(EDGE_VALUES, repeat=len(FIELD_ORDER))), dtype=np.int64)  # R21-4: 8^4通り
+    out = simulate_steps(rows)  # R21-4: バッチ評価
+    for i, row in enumerate(rows):  # R21-4: 1行ずつ比較する
+        if out.step_output(i) != _single(row):  # R21-4: pi_t/o_t1_pred/notes の全てを比べる
+            raise AssertionError(f"mismatch at {row.tolist()}")  # R21-4: 不一致は即失敗
+    return len(rows)  # R21-4: 比較件数
+
+
+def run(n: int) -> Dict[str, Any]:  # R21-4: 速度比較
+    rng = np.random.default_rng(0)  # R21-4: 再現可能な乱数
+    rows = rng.integers(-1, 5, size=(n, len(FIELD_ORDER)), dtype=np.int64)  # R21-4: 0-3を少しはみ出す入力
+
+    loop_n = min(n, 100_000)  # R21-4: 単発ループは時間がかかるので上限を設ける
+    t0 = time.perf_counter()  # R21-4: 単発版の開始
+    for row in rows[:loop_n].tolist():  # R21-4: Pythonループ
+        _single(row)  # R21-4: 1件ずつ評価する
+    loop_s = time.perf_counter() - t0  # R21-4: 単発版の経過秒
+
+    t0 = time.perf_counter()  # R21-4: バッチ版の開始
+    simulate_steps(rows)  # R21-4: 全件を一括評価する
+    batch_s = time.perf_counter() - t0  # R21-4: バッチ版の経過秒
+
+    loop_rate = loop_n / loop_s  # R21-4: 単発版の件/秒
+    batch_rate = n / batch_s  # R21-4: バッチ版の件/秒
+    return {  # R21-4: 集計
+        "exact_cases_checked": check_exact(),  # R21-4: 一致確認件数
+        "simulate_step_per_sec": round(loop_rate),  # R21-4: 単発版
+        "simulate_steps_per_sec": round(batch_rate),  # R21-4: バッチ版
+        "batch_rows": n,  # R21-4: バッチ件数
+        "speedup": round(batch_rate / loop_rate, 1),  # R21-4: 倍率
+    }
+
+
+def main() -> None:  # R21-4: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__)  # R21-4: 引数定義
+    ap.add_argument("-n", type=int, default=1_000_000, help="rows in the batch")  # R21-4: 件数
+    ap.add_argument("--json", default=None, help="write results to this file")  # R21-4: 保存先
+    args = ap.parse_args()  # R21-4: 解析
+    emit("simulate_batch", run(args.n), args.json)  # R21-4: 表示/保存
+
+
+if __name__ == "__main__":  # R21-4: python -m bench.simulate_batch
+    main()  # R21-4: 実行
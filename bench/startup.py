@@ -0,0 +1,155 @@
+"""Cold start: import time, create_app and the first requests, per startup mode.
+
+    python -m bench.startup [--db /tmp/uraha-bench.db] [--steps 100000] [--issues 10000] [--runs 5] [--json out.json]
+
+Each run is a fresh interpreter (python -m bench.startup --child MODE), so imports, the
+SQLite dialect, Jinja and the policy tables are cold. The modes are:
+- "schema_on": the default (SCHEMA_ON_STARTUP=1), so every start runs the DDL.
+- "schema_off": only the PRAGMA user_version check. The DB was upgraded beforehand.
+- "preload": schema_off plus PRELOAD=1, so Jinja templates are compiled at startup.
+
+"first_ms" is the first GET /boundary, GET /steps, GET /issues and POST /boundary of a
+process; "second_ms" is the same four again. The "fork_*" results load the app once,
+then fork --workers children one after another, as `gunicorn --preload` does but without
+the children competing for the CPU. Each child reports the cost of its first requests and
+its private (unshared) memory afterwards, from /proc/self/smaps_rollup on Linux. Medians
+are over --runs.
+"""
+from __future__ import annotations  # R41-5: 前方参照を安定させる
+
+import argparse  # R41-5: 引数
+import json  # R41-5: 子プロセスの結果
+import os  # R41-5: fork
+import statistics  # R41-5: 中央値
+import subprocess  # R41-5: 冷えたインタプリタ
+import sys  # R41-5
+import tempfile  # R41-5: 使い捨てDB
+import time  # R41-5: 経過時間
+from pathlib import Path  # R41-5
+from typing import Any, Dict, List, Optional  # R41-5: 最小型を明示する
+
+from bench._common import emit  # R41-5: 共通ヘルパ
+
+MODES: Dict[str, Dict[str, Any]] = {  # R41-5: モード→create_app の上書き
+    "schema_on": {"SCHEMA_ON_STARTUP": True},  # R41-5: 既定（起動毎に DDL）
+    "schema_off": {"SCHEMA_ON_STARTUP": False},  # R41-5: flask schema upgrade 済み
+    "preload": {"SCHEMA_ON_STARTUP": False, "PRELOAD": True},  # R41-5: Jinja も起動時にコンパイルし gc.freeze
+}
+REQUESTS = (("GET", "/boundary"), ("GET", "/steps"), ("GET", "/issues"), ("POST", "/boundary"))  # R41-5: 最初に来そうなもの
+FORM = {"threat": "1", "body_alarm": "0", "need_clarity": "2", "energy": "2"}  # R20-6
+
+
+def _ms(t0: float) -> float:  # R41-5
+    return round((time.perf_counter() - t0) * 1000, 2)  # R41-5
+
+
+def _private_kib() -> Optional[int]:  # R41-5: このプロセスだけのページ（Linux のみ）
+    try:  # R41-5
+        text = Path("/proc/self/smaps_rollup").read_text()  # R41-5
+    except OSError:  # R41-5
+        return None  # R41-5
+    return sum(int(line.split()[1]) for line in text.splitlines() if line.startswith(("Private_Clean:", "Private_Dirty:")))  # R41-5
+
+
+def _requests(app: Any) -> Dict[str, Any]:  # R41-5: 1回目/2回目（4リクエストの合計）と1回目の内訳
+    client = app.test_client()  # R41-5
+    out: Dict[str, Any] = {"first": {}}  # R41-5
+    for label in ("first_ms", "second_ms"):  # R41-5
+        t_all = time.perf_counter()  # R41-5
+        for method, url in REQUESTS:  # R41-5
+            t0 = time.perf_counter()  # R41-5
+            resp = client.post(url, data=FORM) if method == "POST" else client.get(url)  # R41-5
+            assert resp.status_code == 200, (method, url, resp.status_code)  # R41-5
+            if label == "first_ms":  # R41-5
+                out["first"][f"{method} {url}"] = _ms(t0)  # R41-5
+        out[label] = _ms(t_all)  # R41-5
+    return out  # R41-5
+
+
+def child(mode: str, db_file: str, workers: int) -> Dict[str, Any]:  # R41-5: 冷えたプロセスの中で測る
+    t0 = time.perf_counter()  # R41-5
+    from app import create_app  # R41-5: flask/sqlalchemy を含む
+    result: Dict[str, Any] = {"import_ms": _ms(t0)}  # R41-5
+    t0 = time.perf_counter()  # R41-5
+    app = create_app({"DATABASE_URL": f"sqlite:///{db_file}", **MODES[mode]})  # R41-5
+    result["create_app_ms"] = _ms(t0)  # R41-5
+    if workers <= 0:  # R41-5: このプロセスでそのまま受ける
+        result.update(_requests(app))  # R41-5
+        return result  # R41-5
+    workers_out = []  # R41-5: preload してから fork（gunicorn --preload と同じ順序）
+    for _ in range(workers):  # R41-5: 1つずつ（CPU の取り合いを測らない）
+        r, w = os.pipe()  # R41-5
+        pid = os.fork()  # R41-5
+        if pid == 0:  # R41-5: ワーカー
+            os.close(r)  # R41-5
+            out = _requests(app)  # R41-5
+            out["private_kib"] = _private_kib()  # R41-5
+            os.write(w, json.dumps(out).encode())  # R41-5
+            os._exit(0)  # R41-5
+        os.close(w)  # R41-5
+        with os.fdopen(r) as f:  # R41-5
+            workers_out.append(json.loads(f.read()))  # R41-5
+        os.waitpid(pid, 0)  # R41-5
+    result["workers"] = workers_out  # R41-5
+    return result  # R41-5
+
+
+def _run_child(mode: str, db_file: str, workers: int = 0) -> Dict[str, Any]:  # R41-5
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "0"}  # R41-5: .pyc は使う（本番と同じ）
+    out = subprocess.run(  # R41-5
+        [sys.executable, "-m", "bench.startup", "--child", mode, "--db", db_file, "--workers", str(workers)],
+        capture_output=True, text=True, check=True, env=env,  # R41-5
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])  # R41-5
+
+
+def _median(rows: List[Dict[str, Any]], key: str) -> float:  # R41-5
+    return round(statistics.median(r[key] for r in rows), 2)  # R41-5
+
+
+def run(db: Optional[str], steps: int, issues: int, runs: int, workers: int) -> Dict[str, Any]:  # R41-5
+    with tempfile.TemporaryDirectory(prefix="uraha-bench-") as tmp:  # R41-5
+        db_file = db or str(Path(tmp) / "app.db")  # R41-5
+        if db is None:  # R41-5
+            from bench.seed import seed_db  # R36-3
+            seed_db(db_file, steps, issues)  # R36-3: create_app 経由なのでスキーマも版も記録される
+        _run_child("schema_on", db_file)  # R41-5: 1回捨てる（OS のページキャッシュ/.pyc を温める）
+        results: Dict[str, Any] = {}  # R41-5
+        for mode in MODES:  # R41-5
+            rows = [_run_child(mode, db_file) for _ in range(runs)]  # R41-5
+            results[mode] = {  # R41-5
+                "import_ms": _median(rows, "import_ms"),  # R41-5
+                "create_app_ms": _median(rows, "create_app_ms"),  # R41-5
+                "first_ms": _median(rows, "first_ms"),  # R41-5
+                "second_ms": _median(rows, "second_ms"),  # R41-5
+                "first": {k: round(statistics.median(r["first"][k] for r in rows), 2) for k in rows[0]["first"]},  # R41-5
+            }
+        for mode in ("schema_off", "preload"):  # R41-5: fork 後のワーカー（preload 無しは gc.freeze もテンプレも無し）
+            ws = [w for _ in range(runs) for w in _run_child(mode, db_file, workers)["workers"]]  # R41-5
+            results[f"fork_{mode}"] = {  # R41-5
+                "workers": workers,  # R41-5
+                "first_ms": _median(ws, "first_ms"),  # R41-5
+                "second_ms": _median(ws, "second_ms"),  # R41-5
+                "private_kib": _median(ws, "private_kib") if ws[0]["private_kib"] is not None else None,  # R41-5
+            }
+    return results  # R41-5
+
+
+def main() -> None:  # R41-5: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)  # R41-5
+    ap.add_argument("--db", default=None, help="DB prepared by bench.seed (default: a seeded temp DB)")  # R41-5
+    ap.add_argument("--steps", type=int, default=100_000, help="steps in the temp DB")  # R41-5
+    ap.add_argument("--issues", type=int, default=10_000, help="issues in the temp DB")  # R41-5
+    ap.add_argument("--runs", type=int, default=5, help="fresh processes per mode (median)")  # R41-5
+    ap.add_argument("--workers", type=int, default=4, help="children forked per preload run")  # R41-5
+    ap.add_argument("--child", choices=tuple(MODES), default=None, help=argparse.SUPPRESS)  # R41-5: 内部用
+    ap.add_argument("--json", default=None, help="write results to this file")  # R41-5
+    args = ap.parse_args()  # R41-5
+    if args.child:  # R41-5: 子プロセス（結果を1行のJSONで返す）
+        print(json.dumps(child(args.child, args.db, args.workers)))  # R41-5
+        return  # R41-5
+    emit("startup", run(args.db, args.steps, args.issues, args.runs, args.workers), args.json)  # R41-5
+
+
+if __name__ == "__main__":  # R41-5: python -m bench.startup
+    main()  # R41-5
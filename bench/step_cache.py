@@ -0,0 +1,49 @@
+"""/steps/<id> and /boundary?step_id= with and without the step cache, plus 304 revalidation.
+
+    python -m bench.step_cache [-n 2000] [--json out.json]
+"""
+from __future__ import annotations  # R32-5: 前方参照を安定させる
+
+import argparse  # R32-5: 回数を引数で受け取る
+from typing import Any, Dict  # R32-5: 最小型を明示する
+
+from bench._common import emit, rate, temp_app  # R32-5: 共通ヘルパ
+
+FORM = {"threat": "1", "body_alarm": "0", "need_clarity": "2", "energy": "2"}  # R20-6: 保存される入力
+IDS = 100  # R32-5: 読み回す step 数（キャッシュに収まる）
+
+
+def _workload(app: Any, n: int) -> Dict[str, Any]:  # R32-5: 同じ手順で測る
+    client = app.test_client()  # R32-5
+    for _ in range(IDS):  # R32-5: 読む対象を保存する
+        client.post("/boundary", data=FORM)  # R32-5
+    i = iter(range(10**9))  # R32-5: id を順に回す
+    etag = client.get("/steps/1").headers.get("ETag")  # R32-5
+    return {  # R32-5
+        "GET /steps/<id>": rate(lambda: client.get(f"/steps/{1 + next(i) % IDS}"), n),  # R32-5
+        "GET /boundary?step_id=": rate(lambda: client.get(f"/boundary?step_id={1 + next(i) % IDS}"), n),  # R32-5
+        "GET /steps/1 If-None-Match": rate(lambda: client.get("/steps/1", headers={"If-None-Match": etag or ""}), n),  # R32-5: 304
+    }
+
+
+def run(n: int) -> Dict[str, Any]:  # R32-5
+    results: Dict[str, Any] = {}  # R32-5
+    for name, size in (("no_cache", 0), ("cache", 1024)):  # R32-5
+        with temp_app({"STEPS_CACHE_SIZE": size}) as app:  # R32-5
+            results[name] = _workload(app, n)  # R32-5
+            from app.storage.cache import get_step_cache  # R32-5
+
+            results[name]["stats"] = get_step_cache().stats()  # R32-4
+    return results  # R32-5
+
+
+def main() -> None:  # R32-5: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)  # R32-5
+    ap.add_argument("-n", type=int, default=2000, help="requests per endpoint")  # R32-5
+    ap.add_argument("--json", default=None, help="write results to this file")  # R32-5
+    args = ap.parse_args()  # R32-5
+    emit("step_cache", run(args.n), args.json)  # R32-5
+
+
+if __name__ == "__main__":  # R32-5: python -m bench.step_cache
+    main()  # R32-5
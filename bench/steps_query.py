@@ -0,0 +1,94 @@
+"""/steps query timings on a large steps table, with and without the secondary indexes.
+
+    python -m bench.steps_query [-n 10000000] [--db /tmp/steps-10m.db] [--json out.json]
+
+The DB file is reused when it already holds at least n rows.
+"""
+from __future__ import annotations  # R24-5: 前方参照を安定させる
+
+import argparse  # R24-5: 件数などを引数で受け取る
+import statistics  # R24-5: 中央値を取る
+import time  # R24-5: 経過時間を測る
+from typing import Any, Callable, Dict  # R24-5: 最小型を明示する
+
+from app.storage import db as steps_db  # R24-5: 接続先を差し替える
+from app.storage.repository import list_steps_filtered  # R24-5: 計測対象
+from bench._common import emit, fill_steps  # R24-5: 共通ヘルパ
+
+INDEXES = ("idx_steps_template_pi_id", "idx_steps_created_at")  # R24-5: init_schema が作るインデックス
+
+
+def _median_ms(fn: Callable[[], Any], repeat: int) -> float:  # R24-5: repeat回の中央値（ミリ秒）
+    samples = []  # R24-5: 計測値
+    for _ in range(repeat):  # R24-5: 繰り返す
+        t0 = time.perf_counter()  # R24-5: 開始
+        fn()  # R24-5: 計測対象
+        samples.append((time.perf_counter() - t0) * 1000)  # R24-5: ミリ秒
+    return round(statistics.median(samples), 3)  # R24-5: 中央値
+
+
+def _queries(n: int) -> Dict[str, Callable[[], Any]]:  # R24-5: 計測するクエリ一覧
+    mid = n // 2  # R24-5: 深いページの位置
+    return {  # R24-5: 名前→関数
+        "latest_page": lambda: list_steps_filtered(limit=50),  # R24-5: 既定の一覧
+        "template_pi_first_page": lambda: list_steps_filtered(limit=50, template="boundary", pi_t="assert"),  # R24-5: 複合条件
+        "template_pi_keyset_deep": lambda: list_steps_filtered(  # R24-5: 中ほどのページ（キーセット）
+            limit=50, template="boundary", pi_t="assert", before_id=mid  # R24-5
+        ),
+        "rare_template_pi_first_page": lambda: list_steps_filtered(limit=50, template="boundary_v2", pi_t="comply"),  # R24-5: 少数派
+        "date_range_one_day": lambda: list_steps_filtered(limit=50, since="2025-07-01", until="2025-07-02"),  # R24-5: 期間
+        "date_range_template_pi": lambda: list_steps_filtered(  # R24-5: 期間＋複合条件
+            limit=50, template="boundary", pi_t="withdraw", since="2025-07-01", until="2025-07-02"  # R24-5
+        ),
+    }
+
+
+def _offset_deep(conn: Any, n: int) -> None:  # R24-5: 比較用: OFFSETで同じ深さを読む
+    conn.execute(  # R24-5: 従来型のページング
+        "SELECT id FROM steps WHERE template_id = ? AND pi_t = ? ORDER BY id DESC LIMIT 50 OFFSET ?",
+        ("boundary", "assert", n // 4),  # R24-5: 中ほど
+    ).fetchall()  # R24-5: 読み切る
+
+
+def run(n: int, db_path: str, repeat: int) -> Dict[str, Any]:  # R24-5: インデックス無し/有りで測る
+    steps_db.configure(db_path=db_path, pool=True)  # R24-5: ベンチ用DB
+    with steps_db.session() as conn:  # R24-5: プール接続
+        have = conn.execute("SELECT COUNT(*) FROM steps").fetchone()[0]  # R24-5: 既存件数
+        if have < n:  # R24-5: 足りなければ
+            for name in INDEXES:  # R24-5: 投入中はインデックスを外す
+                conn.execute(f"DROP INDEX IF EXISTS {name}")  # R24-5
+            fill_steps(conn, n - have, seed=have)  # R24-5: 不足分を作る
+        total = conn.execute("SELECT COUNT(*) FROM steps").fetchone()[0]  # R24-5: 実件数
+
+        results: Dict[str, Any] = {"rows": total}  # R24-5: 集計
+        for label in ("no_index", "indexed"):  # R24-5: before/after
+            if label == "no_index":  # R24-5: before
+                for name in INDEXES:  # R24-5: インデックスを外す
+                    conn.execute(f"DROP INDEX IF EXISTS {name}")  # R24-5
+                conn.execute("DROP TABLE IF EXISTS sqlite_stat1")  # R24-5: 統計も消す
+                conn.commit()  # R24-5
+            else:  # R24-5: after
+                t0 = time.perf_counter()  # R24-5: インデックス作成時間
+                steps_db.init_schema(conn)  # R24-5: 本番と同じDDLで作る
+                conn.execute("ANALYZE")  # R24-5: 統計を取る（本番では close_all の PRAGMA optimize が担う）
+                conn.commit()  # R24-5
+                results["create_index_seconds"] = round(time.perf_counter() - t0, 2)  # R24-5
+            timings = {name: _median_ms(fn, repeat) for name, fn in _queries(total).items()}  # R24-5: 各クエリ
+            timings["template_pi_offset_deep"] = _median_ms(lambda: _offset_deep(conn, total), repeat)  # R24-5: OFFSET比較
+            results[label] = timings  # R24-5: ラベル別に保存する
+    steps_db.close_all()  # R24-5: 後始末
+    return results  # R24-5: 集計を返す
+
+
+def main() -> None:  # R24-5: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__)  # R24-5: 引数定義
+    ap.add_argument("-n", type=int, default=10_000_000, help="rows in the steps table")  # R24-5: 件数
+    ap.add_argument("--db", default="/tmp/uraha-steps-bench.db", help="benchmark DB file (reused)")  # R24-5: DBファイル
+    ap.add_argument("--repeat", type=int, default=5, help="runs per query (median)")  # R24-5: 繰り返し
+    ap.add_argument("--json", default=None, help="write results to this file")  # R24-5: 保存先
+    args = ap.parse_args()  # R24-5: 解析
+    emit("steps_query", run(args.n, args.db, args.repeat), args.json)  # R24-5: 表示/保存
+
+
+if __name__ == "__main__":  # R24-5: python -m bench.steps_query
+    main()  # R24-5: 実行
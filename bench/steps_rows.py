@@ -0,0 +1,72 @@
+"""Latency and peak memory of one 10k-row /steps page: eager dicts vs lazy StepRow vs projected summary.
+
+    python -m bench.steps_rows [-n 10000] [--json out.json]
+"""
+from __future__ import annotations  # R26-4: 前方参照を安定させる
+
+import argparse  # R26-4: 件数を引数で受け取る
+import statistics  # R26-4: 中央値を取る
+import tempfile  # R26-4: 使い捨てDB
+import time  # R26-4: 経過時間を測る
+import tracemalloc  # R26-4: ピークメモリを測る
+from pathlib import Path  # R26-4: DBパス
+from typing import Any, Callable, Dict  # R26-4: 最小型を明示する
+
+from app.storage import db as steps_db  # R26-4: 接続先を差し替える
+from app.storage.repository import STEP_SUMMARY_COLUMNS, list_steps_filtered  # R26-4: 計測対象
+from app.templates_def.boundary import BOUNDARY_FIELDS  # R26-4: 一覧で使う o_t キー
+from bench._common import emit, fill_steps  # R26-4: 共通ヘルパ
+
+O_T_KEYS = [f.key for f in BOUNDARY_FIELDS]  # R26-4: /steps と同じ要約キー
+
+
+def _summary(row: Any) -> tuple:  # R26-4: 一覧テンプレが読む値（id/created_at/template/pi_t/o_t要約）
+    o = row["o_t"]  # R26-4: o_t
+    return (row["id"], row["created_at"], row["template_id"], row["pi_t"], tuple(o.get(k) for k in O_T_KEYS))  # R26-4
+
+
+def _variants(n: int) -> Dict[str, Callable[[], Any]]:  # R26-4: 比較する読み方
+    return {  # R26-4
+        "eager_dict_full_decode": lambda: [_summary(r.to_dict()) for r in list_steps_filtered(limit=n)],  # R26-4: 従来（全列を辞書に復元）
+        "lazy_row_summary_access": lambda: [_summary(r) for r in list_steps_filtered(limit=n)],  # R26-4: 全列取得、o_t だけ復元
+        "projected_summary": lambda: [  # R26-4: /steps の現在の読み方（Python側のJSON復元なし）
+            _summary(r) for r in list_steps_filtered(limit=n, columns=STEP_SUMMARY_COLUMNS, o_t_keys=O_T_KEYS)  # R26-4
+        ],
+    }
+
+
+def _measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:  # R26-4: 中央値とピークメモリ
+    samples = []  # R26-4
+    for _ in range(repeat):  # R26-4
+        t0 = time.perf_counter()  # R26-4
+        fn()  # R26-4
+        samples.append((time.perf_counter() - t0) * 1000)  # R26-4
+    tracemalloc.start()  # R26-4: メモリは別の1回で測る（計測の重さを時間に混ぜない）
+    kept = fn()  # R26-4: 結果を保持した状態のピーク
+    _, peak = tracemalloc.get_traced_memory()  # R26-4
+    tracemalloc.stop()  # R26-4
+    del kept  # R26-4
+    return {"median_ms": round(statistics.median(samples), 2), "peak_kib": round(peak / 1024, 1)}  # R26-4
+
+
+def run(n: int, repeat: int) -> Dict[str, Any]:  # R26-4: 一時DBにn行入れて測る
+    with tempfile.TemporaryDirectory(prefix="uraha-bench-") as tmp:  # R26-4
+        steps_db.configure(db_path=Path(tmp) / "app.db", pool=True)  # R26-4
+        with steps_db.session() as conn:  # R26-4
+            fill_steps(conn, n)  # R26-4: n行
+        results = {name: _measure(fn, repeat) for name, fn in _variants(n).items()}  # R26-4
+        steps_db.close_all()  # R26-4
+    return {"rows_per_page": n, **results}  # R26-4
+
+
+def main() -> None:  # R26-4: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__)  # R26-4
+    ap.add_argument("-n", type=int, default=10_000, help="rows per page")  # R26-4
+    ap.add_argument("--repeat", type=int, default=5, help="runs per variant (median)")  # R26-4
+    ap.add_argument("--json", default=None, help="write results to this file")  # R26-4
+    args = ap.parse_args()  # R26-4
+    emit("steps_rows", run(args.n, args.repeat), args.json)  # R26-4
+
+
+if __name__ == "__main__":  # R26-4: python -m bench.steps_rows
+    main()  # R26-4
@@ -0,0 +1,89 @@
+"""/steps/stats from the rollups vs. the same counts aggregated over the steps table.
+
+    python -m bench.steps_stats [--db /tmp/uraha-bench.db] [--rows 1000000] [--json out.json]
+
+Without --db a temp DB is seeded with --rows steps (bench.seed, which also rolls them up).
+"scan_*" run the GROUP BY over every row (what /steps/stats would cost without rollups);
+"rollup_*" read only the rollup tables. Also timed: a full rebuild and save_step with the
+on-insert rollup switched on and off.
+"""
+from __future__ import annotations  # R37-6: 前方参照を安定させる
+
+import argparse  # R37-6: 引数
+import tempfile  # R37-6: 使い捨てDB
+import time  # R37-6: 経過時間
+from pathlib import Path  # R37-6
+from typing import Any, Callable, Dict, Optional  # R37-6: 最小型を明示する
+
+from app.storage import repository, rollup  # R37-6: 計測対象
+from app.storage.db import session  # R37-6
+from bench._common import emit, median_ns, temp_app  # R37-6: 共通ヘルパ
+from bench.seed import seed_db  # R36-3
+
+VALUES = {"threat": 1, "body_alarm": 0, "need_clarity": 2, "energy": 2}  # R36-2: 保存する入力
+
+
+def _ms(fn: Callable[[], Any], repeat: int) -> float:  # R37-6: repeat回の最小（ミリ秒）
+    best = float("inf")  # R37-6
+    for _ in range(repeat):  # R37-6
+        t0 = time.perf_counter()  # R37-6
+        fn()  # R37-6
+        best = min(best, time.perf_counter() - t0)  # R37-6
+    return round(best * 1000, 3)  # R37-6
+
+
+def _scan(sql: str) -> Callable[[], Any]:  # R37-6: 全行の集計
+    def run() -> Any:  # R37-6
+        with session() as conn:  # R20-2
+            return conn.execute(sql).fetchall()  # R37-6
+    return run  # R37-6
+
+
+def _save() -> None:  # R37-6: /boundary が書く1行
+    repository.save_step("boundary", {"energy": 2}, VALUES, "assert", {}, ["bench"])  # R36-2
+
+
+def run(db: Optional[str], rows: int, repeat: int) -> Dict[str, Any]:  # R37-6
+    with tempfile.TemporaryDirectory(prefix="uraha-bench-") as tmp:  # R37-6
+        db_file = db or str(Path(tmp) / "app.db")  # R37-6
+        if db is None:  # R37-6
+            seed_db(db_file, rows, 0)  # R36-3
+        with temp_app({"STEPS_STORAGE_FORMAT": "json"}, db_file=db_file):  # R37-6
+            t0 = time.perf_counter()  # R37-6
+            rollup.compact_rollups(rebuild=True)  # R37-6: 全行から作り直す
+            results: Dict[str, Any] = {"rebuild_seconds": round(time.perf_counter() - t0, 2)}  # R37-6
+            with session() as conn:  # R37-6
+                results["steps_rows"] = conn.execute("SELECT COUNT(*) FROM steps").fetchone()[0]  # R37-6
+                results["rollup_policy_rows"] = conn.execute("SELECT COUNT(*) FROM steps_rollup_policy").fetchone()[0]  # R37-6
+                results["rollup_input_rows"] = conn.execute("SELECT COUNT(*) FROM steps_rollup_input").fetchone()[0]  # R37-6
+            results["ms"] = {  # R37-6: 最良値
+                "scan_policy_by_day": _ms(_scan(  # R37-6: 日×テンプレ×方策
+                    "SELECT substr(created_at, 1, 10), template_id, pi_t, COUNT(*) FROM steps GROUP BY 1, 2, 3"), repeat),
+                "scan_input_histogram": _ms(_scan(  # R37-6: 入力値×方策（json_each）
+                    "SELECT j.key, j.value, s.pi_t, COUNT(*) FROM steps AS s, json_each(s.o_t_json) AS j "
+                    "WHERE j.type = 'integer' GROUP BY 1, 2, 3"), 1),
+                "rollup_step_stats": _ms(rollup.step_stats, repeat),  # R37-6: /steps/stats と同じ全部入り
+                "rollup_step_stats_one_month": _ms(  # R37-6
+                    lambda: rollup.step_stats(since="2025-07-01", until="2025-08-01", fields=["threat"]), repeat),
+            }
+            results["save_step_ns"] = {"rollup_on_insert": median_ns(_save, 500)}  # R37-6: 同じトランザクションで集計表へ
+            rollup._on_insert = False  # R37-6: 比較のため一時的に止める
+            try:  # R37-6
+                results["save_step_ns"]["rollup_off"] = median_ns(_save, 500)  # R37-6
+            finally:  # R37-6
+                rollup._on_insert = True  # R37-6
+    return results  # R37-6
+
+
+def main() -> None:  # R37-6: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)  # R37-6
+    ap.add_argument("--db", default=None, help="DB prepared by bench.seed (default: a seeded temp DB)")  # R37-6
+    ap.add_argument("--rows", type=int, default=1_000_000, help="steps in the temp DB")  # R37-6
+    ap.add_argument("--repeat", type=int, default=5, help="timed runs per query (best)")  # R37-6
+    ap.add_argument("--json", default=None, help="write results to this file")  # R37-6
+    args = ap.parse_args()  # R37-6
+    emit("steps_stats", run(args.db, args.rows, args.repeat), args.json)  # R37-6
+
+
+if __name__ == "__main__":  # R37-6: python -m bench.steps_stats
+    main()  # R37-6
@@ -0,0 +1,87 @@
+"""Bytes per row and read throughput of the steps log: JSON columns (steps) vs compact layout (steps_compact).
+
+    python -m bench.storage_format [-n 200000] [--page 1000] [--json out.json]
+"""
+from __future__ import annotations  # R29-5: 前方参照を安定させる
+
+import argparse  # R29-5: 件数を引数で受け取る
+import statistics  # R29-5: 中央値を取る
+import tempfile  # R29-5: 使い捨てDB
+import time  # R29-5: 経過時間を測る
+from pathlib import Path  # R29-5: DBパス
+from typing import Any, Callable, Dict  # R29-5: 最小型を明示する
+
+from app.storage import db as steps_db  # R29-5: 接続先/レイアウトを差し替える
+from app.storage.compact import migrate_steps  # R29-5: JSON→compact
+from app.storage.export import iter_export  # R29-5: 全件走査
+from app.storage.repository import STEP_SUMMARY_COLUMNS, list_steps_filtered  # R29-5: 計測対象
+from app.templates_def.boundary import BOUNDARY_FIELDS  # R29-5: 一覧で使う o_t キー
+from bench._common import emit, fill_steps  # R29-5: 共通ヘルパ
+
+O_T_KEYS = [f.key for f in BOUNDARY_FIELDS]  # R26-4: /steps と同じ要約キー
+
+
+def _median_ms(fn: Callable[[], Any], repeat: int) -> float:  # R29-5
+    samples = []  # R29-5
+    for _ in range(repeat):  # R29-5
+        t0 = time.perf_counter()  # R29-5
+        fn()  # R29-5
+        samples.append((time.perf_counter() - t0) * 1000)  # R29-5
+    return round(statistics.median(samples), 2)  # R29-5
+
+
+def _measure(db_file: Path, n: int, page: int, repeat: int) -> Dict[str, Any]:  # R29-5: 今のレイアウトで測る
+    size = db_file.stat().st_size  # R29-5: VACUUM 済みのファイルサイズ
+    full_ms = _median_ms(lambda: [r.to_dict() for r in list_steps_filtered(limit=page)], repeat)  # R29-5: 全列を復元
+    summary_ms = _median_ms(  # R29-5: /steps の読み方
+        lambda: [r["o_t"] for r in list_steps_filtered(limit=page, columns=STEP_SUMMARY_COLUMNS, o_t_keys=O_T_KEYS)], repeat
+    )
+    t0 = time.perf_counter()  # R29-5: エクスポート＝全件の読み出し＋JSON化
+    for _ in iter_export(chunk_size=5000):  # R29-5
+        pass  # R29-5
+    export_s = time.perf_counter() - t0  # R29-5
+    return {  # R29-5
+        "file_bytes": size,  # R29-5
+        "bytes_per_row": round(size / n, 1),  # R29-5
+        "page_full_decode_ms": full_ms,  # R29-5
+        "page_full_decode_rows_per_sec": round(page / full_ms * 1000),  # R29-5
+        "page_summary_ms": summary_ms,  # R29-5
+        "page_summary_rows_per_sec": round(page / summary_ms * 1000),  # R29-5
+        "export_rows_per_sec": round(n / export_s),  # R29-5
+    }
+
+
+def run(n: int, page: int, repeat: int) -> Dict[str, Any]:  # R29-5: 同じ n 行を2つのレイアウトで持つDBを比べる
+    results: Dict[str, Any] = {"rows": n, "page_rows": page}  # R29-5
+    for layout in ("json", "compact"):  # R29-5
+        with tempfile.TemporaryDirectory(prefix="uraha-bench-") as tmp:  # R29-5
+            db_file = Path(tmp) / "app.db"  # R29-5
+            steps_db.configure(db_path=db_file, pool=True, storage_format="json")  # R29-5: まずJSONで入れる
+            with steps_db.session() as conn:  # R29-5
+                fill_steps(conn, n)  # R29-5
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")  # R29-5: WAL をDB本体へ
+            if layout == "compact":  # R29-5: 移行ツールで写して元を消す（VACUUM込み）
+                migrate_steps(to="compact", chunk_size=20_000, drop_source=True)  # R29-5
+                steps_db.configure(storage_format="compact")  # R29-5
+            else:  # R29-5: 同じ条件で VACUUM する
+                with steps_db.session() as conn:  # R29-5
+                    conn.execute("VACUUM")  # R29-5
+            with steps_db.session() as conn:  # R29-5
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")  # R29-5
+            results[layout] = _measure(db_file, n, page, repeat)  # R29-5
+            steps_db.configure(storage_format="json")  # R29-5: 既定に戻す（接続も閉じる）
+    return results  # R29-5
+
+
+def main() -> None:  # R29-5: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__)  # R29-5
+    ap.add_argument("-n", type=int, default=200_000, help="rows in the steps log")  # R29-5
+    ap.add_argument("--page", type=int, default=1000, help="rows per page read")  # R29-5
+    ap.add_argument("--repeat", type=int, default=5, help="runs per page read (median)")  # R29-5
+    ap.add_argument("--json", default=None, help="write results to this file")  # R29-5
+    args = ap.parse_args()  # R29-5
+    emit("storage_format", run(args.n, args.page, args.repeat), args.json)  # R29-5
+
+
+if __name__ == "__main__":  # R29-5: python -m bench.storage_format
+    main()  # R29-5
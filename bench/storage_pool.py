@@ -0,0 +1,38 @@
+"""Requests/sec for /boundary and /steps with connect-per-call vs pooled storage.
+
+    python -m bench.storage_pool [-n 500] [--json out.json]
+"""
+from __future__ import annotations  # R20-6: 前方参照を安定させる
+
+import argparse  # R20-6: 回数などを引数で受け取る
+from typing import Any, Dict  # R20-6: 最小型を明示する
+
+from bench._common import emit, rate, temp_app  # R20-6: 共通ヘルパ
+
+FORM = {"threat": "1", "body_alarm": "0", "need_clarity": "2", "energy": "2"}  # R20-6: assertになる入力
+
+
+def run(n: int) -> Dict[str, Any]:  # R20-6: プール無し/有りを同条件で測る
+    results: Dict[str, Any] = {}  # R20-6: モード→結果
+    for mode, pool in (("connect_per_call", False), ("pooled_wal", True)):  # R20-6: before/after
+        pragmas = None if pool else {"journal_mode": "DELETE", "synchronous": "FULL"}  # R20-6: beforeは既定のジャーナル
+        with temp_app({"STEPS_DB_POOL": pool, "STEPS_DB_PRAGMAS": pragmas}) as app:  # R20-6: 一時DBのアプリ
+            client = app.test_client()  # R20-6: WSGIを直接叩く
+            results[mode] = {  # R20-6: エンドポイント別に測る
+                "POST /boundary": rate(lambda: client.post("/boundary", data=FORM), n),  # R20-6: 書き込み経路
+                "GET /steps": rate(lambda: client.get("/steps?limit=50"), n),  # R20-6: 一覧読み取り
+                "GET /steps/1": rate(lambda: client.get("/steps/1"), n),  # R20-6: 詳細読み取り
+            }
+    return results  # R20-6: 集計を返す
+
+
+def main() -> None:  # R20-6: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__)  # R20-6: 引数定義
+    ap.add_argument("-n", type=int, default=500, help="requests per endpoint")  # R20-6: 回数
+    ap.add_argument("--json", default=None, help="write results to this file")  # R20-6: 保存先
+    args = ap.parse_args()  # R20-6: 解析
+    emit("storage_pool", run(args.n), args.json)  # R20-6: 表示/保存
+
+
+if __name__ == "__main__":  # R20-6: python -m bench.storage_pool
+    main()  # R20-6: 実行
@@ -0,0 +1,125 @@
+"""Compiled validators vs. the per-request FieldDef loop: nanoseconds per record.
+
+    python -m bench.validate [-n 1000000] [--bad 0.01] [--json out.json]
+
+"loop_*" is the R15-6/R40-1 implementation (a loop over the FieldDef list with try/except per
+value), kept here as the baseline. "compiled_*" is what validate_boundary_form, validate_issue_form
+and validate_observations run now. "columns_*" validates n records given as columns (key -> list or
+array, as /api/simulate accepts with {"columns": ...}); --bad of the values are invalid and every
+error is collected with .errors(). Column inputs are built before timing.
+"""
+from __future__ import annotations  # R43-6: 前方参照を安定させる
+
+import argparse  # R43-6: 引数
+import random  # R43-6: 入力
+import time  # R43-6: 経過時間
+from typing import Any, Callable, Dict, List, Mapping, Sequence  # R43-6: 最小型を明示する
+
+import numpy as np  # R43-6: 列指向の入力（-E analysis）
+
+from app.templates_def.boundary import BOUNDARY_FIELDS, FieldDef  # R43-6
+from app.validators import _json_int, validate_boundary_form, validate_columns, validate_issue_form, validate_observations  # R43-6
+from bench._common import emit, median_ns  # R43-6: 共通ヘルパ
+
+FORM = {"threat": "1", "body_alarm": "0", "need_clarity": "2", "energy": "2"}  # R20-6: /boundary の入力
+ISSUE_FORM = {"title": "bench", "tags": "a, b", "note": "", "intensity": "3"}  # R43-6
+
+
+def _loop_form(form: Mapping[str, str], fields: Sequence[FieldDef]) -> tuple:  # R43-6: 旧 validate_template_form（R15-6）
+    cleaned: dict = {}  # R15-6
+    for f in fields:  # R15-6
+        raw = form.get(f.key, str(f.default))  # R15-6
+        try:
+            v = int(raw)  # R15-6
+        except ValueError:
+            return {}, f"{f.key} は整数で入力してください"  # R15-6
+        if v < f.min or v > f.max:
+            return {}, f"{f.key} は {f.min}〜{f.max} の範囲で入力してください"  # R15-6
+        cleaned[f.key] = v  # R15-6
+    return cleaned, None  # R15-6
+
+
+def _loop_observations(rows: Sequence[Any], fields: Sequence[FieldDef]) -> tuple:  # R43-6: 旧 validate_observations（R40-1）
+    cleaned: list = []  # R40-1
+    errors: list = []  # R40-1
+    for i, row in enumerate(rows):  # R40-1
+        if not isinstance(row, Mapping):  # R40-1
+            errors.append({"index": i, "field": None, "error": "観測はオブジェクトで指定してください"})  # R40-1
+            continue  # R40-1
+        values: dict = {}  # R40-1
+        for f in fields:  # R15-6
+            v = _json_int(row.get(f.key, f.default))  # R15-6
+            if v is None:  # R15-6
+                errors.append({"index": i, "field": f.key, "error": f"{f.key} は整数で入力してください"})  # R40-1
+            elif v < f.min or v > f.max:  # R15-6
+                errors.append({"index": i, "field": f.key, "error": f"{f.key} は {f.min}〜{f.max} の範囲で入力してください"})  # R40-1
+            else:  # R40-1
+                values[f.key] = v  # R15-6
+        cleaned.append(values)  # R40-1
+    return ([], errors) if errors else (cleaned, [])  # R40-1
+
+
+def _per_record_ns(fn: Callable[[], Any], n: int, repeat: int = 3) -> float:  # R43-6: fn（n件分）1回の中央値を1件あたりに
+    samples = []  # R43-6
+    for _ in range(repeat):  # R43-6
+        t0 = time.perf_counter()  # R43-6
+        fn()  # R43-6
+        samples.append((time.perf_counter() - t0) / n * 1e9)  # R43-6
+    return round(sorted(samples)[len(samples) // 2], 1)  # R43-6
+
+
+def _records(n: int, bad: float, rng: random.Random) -> List[Dict[str, Any]]:  # R43-6: JSON の観測（bad の割合の値が範囲外/bool/文字列）
+    junk = (9, -1, True, "x", 1.5)  # R43-6
+    return [  # R43-6
+        {f.key: rng.choice(junk) if rng.random() < bad else rng.randint(f.min, f.max) for f in BOUNDARY_FIELDS}  # R43-6
+        for _ in range(n)
+    ]
+
+
+def run(n: int, bad: float) -> Dict[str, Any]:  # R43-6
+    rng = random.Random(0)  # R43-6
+    results: Dict[str, Any] = {"records": n, "bad_fraction": bad}  # R43-6
+    results["form_ns"] = {  # R43-6: 1フォーム（/boundary, /issues/new）
+        "loop_boundary": median_ns(lambda: _loop_form(FORM, BOUNDARY_FIELDS), 50_000),  # R43-6
+        "compiled_boundary": median_ns(lambda: validate_boundary_form(FORM), 50_000),  # R43-6
+        "compiled_issue": median_ns(lambda: validate_issue_form(ISSUE_FORM), 50_000),  # R43-6
+    }
+    good = _records(n, 0.0, rng)  # R43-6
+    results["observations_ns_per_record"] = {  # R43-6: 行の並び（全件正しい）
+        "loop": _per_record_ns(lambda: _loop_observations(good, BOUNDARY_FIELDS), n),  # R43-6
+        "compiled": _per_record_ns(lambda: validate_observations(good, BOUNDARY_FIELDS), n),  # R43-6
+    }
+    mixed = _records(n, bad, rng)  # R43-6
+    results["observations_with_errors_ns_per_record"] = {  # R43-6: 全誤りを集める
+        "loop": _per_record_ns(lambda: _loop_observations(mixed, BOUNDARY_FIELDS), n),  # R43-6
+        "compiled": _per_record_ns(lambda: validate_observations(mixed, BOUNDARY_FIELDS), n),  # R43-6
+    }
+    keys = [f.key for f in BOUNDARY_FIELDS]  # R43-6
+    inputs = {  # R43-6: 列指向（同じ値）
+        "lists": {k: [r[k] for r in good] for k in keys},  # R43-6: JSON の配列
+        "arrays": {k: np.array([r[k] for r in good], dtype=np.int8) for k in keys},  # R43-6: 取り込み元が配列
+        "strings": {k: [str(r[k]) for r in good] for k in keys},  # R43-6: CSV など
+        "lists_with_errors": {k: [r[k] for r in mixed] for k in keys},  # R43-6: 1件ずつの経路に落ちる列を含む
+    }
+    cols: Dict[str, Any] = {}  # R43-6
+    for name, columns in inputs.items():  # R43-6
+        cols[name] = _per_record_ns(lambda: validate_columns(columns, BOUNDARY_FIELDS).errors(), n)  # R43-6
+    res = validate_columns(inputs["lists_with_errors"], BOUNDARY_FIELDS)  # R43-6
+    cols["errors_found"] = len(res.errors())  # R43-6: 照合用
+    cols["records_with_errors"] = int((~res.valid).sum())  # R43-6
+    cols["rows_ns_per_record"] = _per_record_ns(lambda: validate_columns(inputs["lists"], BOUNDARY_FIELDS).rows(), n)  # R43-6: dict の並びに戻す費用込み
+    results["columns_ns_per_record"] = cols  # R43-6
+    return results  # R43-6
+
+
+def main() -> None:  # R43-6: CLI入口
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)  # R43-6
+    ap.add_argument("-n", type=int, default=1_000_000, help="records per batch measurement")  # R43-6
+    ap.add_argument("--bad", type=float, default=0.01, help="fraction of invalid values in the error runs")  # R43-6
+    ap.add_argument("--json", default=None, help="write results to this file")  # R43-6
+    args = ap.parse_args()  # R43-6
+    emit("validate", run(args.n, args.bad), args.json)  # R43-6
+
+
+if __name__ == "__main__":  # R43-6: python -m bench.validate
+    main()  # R43-6
@@ -0,0 +1,13 @@
+from __future__ import annotations  # R44-4: 型注釈の前方参照を安定させる
+
+# R44-4: 1つの SQLite ファイルを複数ワーカーで使う構成（gunicorn は依存に入れていない: pip install gunicorn）
+# R44-4:   gunicorn -c gunicorn.conf.py wsgi:app
+# R44-4:   STEPS_WRITER_ADDRESS=writer.sock gunicorn -c gunicorn.conf.py wsgi:app   # 単一書き込み役（別に flask steps writer を起動）
+
+import os  # R44-4: 環境変数から読む
+
+os.environ.setdefault("PRELOAD", "1")  # R41-3: Config より先に読まれる（テンプレのコンパイルと gc.freeze をマスターで済ませる）
+
+bind = os.environ.get("BIND", "0.0.0.0:5001")  # R44-4: wsgi.py と同じポート
+workers = int(os.environ.get("WEB_CONCURRENCY", "4"))  # R44-4: ワーカープロセス数
+preload_app = True  # R44-4: create_app（スキーマの確保）はマスターで1回だけ。ワーカー同士で DDL を取り合わない
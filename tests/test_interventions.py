@@ -0,0 +1,38 @@
+from __future__ import annotations  # R23-4: 前方参照を安定させる
+
+from itertools import product  # R23-4: 全ての現在値
+from typing import Any, Dict, Mapping, Tuple  # R23-4: 最小型を明示する
+
+from app.core.interventions import _cached_policy, search_interventions  # R23-4
+from app.templates_def.boundary import BOUNDARY_FIELDS  # R23-4
+
+KEYS = [f.key for f in BOUNDARY_FIELDS]  # R23-4
+
+
+def _vector(proposal: Mapping[str, Any], base: Dict[str, int]) -> Tuple[int, ...]:  # R23-4: 候補→変更後のベクトル
+    values = dict(base)  # R23-4
+    values.update({c["key"]: c["to"] for c in proposal["changes"]})  # R23-2
+    return tuple(values[k] for k in KEYS)  # R23-4
+
+
+def _contains(inner: Tuple[int, ...], outer: Tuple[int, ...], base: Tuple[int, ...]) -> bool:  # R23-4: inner の変更が全て outer に含まれる（別の点）
+    return inner != outer and all(  # R23-4
+        i == b or ((i - b) * (o - b) > 0 and abs(i - b) <= abs(o - b)) for i, o, b in zip(inner, outer, base)  # R23-4
+    )
+
+
+def _assert_minimal(base: Dict[str, int], radius: int) -> None:  # R23-4: どの候補も他の候補を含まない
+    base_vec = tuple(base[k] for k in KEYS)  # R23-4
+    pi_t = _cached_policy(tuple(base.items()))  # R23-1
+    vectors = [_vector(p, base) for p in search_interventions(base, pi_t, radius=radius).proposals]  # R23-1
+    for v in vectors:  # R23-4
+        assert not any(_contains(u, v, base_vec) for u in vectors), (base, v)  # R23-4
+
+
+def test_proposals_are_minimal_from_zero() -> None:  # R23-4: 全て0の現在値（comply）、半径4
+    _assert_minimal({k: 0 for k in KEYS}, radius=4)  # R23-4
+
+
+def test_proposals_are_minimal_for_every_base() -> None:  # R23-4: 全256通りの現在値、半径6
+    for values in product(*[range(f.min, f.max + 1) for f in BOUNDARY_FIELDS]):  # R23-4
+        _assert_minimal(dict(zip(KEYS, values)), radius=6)  # R23-4
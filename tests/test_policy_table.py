@@ -0,0 +1,44 @@
+from __future__ import annotations  # R33-9: 前方参照を安定させる
+
+import dataclasses  # R33-9: 規則だけ差し替えた定義を作る
+from itertools import product  # R33-9: 全ての入力
+
+from app.core.interventions import _cached_policy, boundary_step_input  # R33-9
+from app.core.policy_table import lookup_policy  # R33-9
+from app.core.simulator import simulate_step  # R33-9
+from app.templates_def.boundary import BOUNDARY_FIELDS, BOUNDARY_TEMPLATE  # R33-9
+from app.templates_def.registry import register_template  # R33-9
+from app.templates_def.spec import Rule  # R33-9
+
+KEYS = [f.key for f in BOUNDARY_FIELDS]  # R33-9
+
+
+def _assert_table_matches_simulator() -> None:  # R33-9: 表・方策メモ・simulate_step が全入力で一致する
+    for values in product(*[range(f.min, f.max + 1) for f in BOUNDARY_FIELDS]):  # R33-9
+        cleaned = dict(zip(KEYS, values))  # R33-9
+        expected = simulate_step(boundary_step_input(cleaned)).pi_t  # R33-9
+        assert lookup_policy(cleaned).output.pi_t == expected, cleaned  # R33-9
+        assert _cached_policy(tuple(cleaned.items())) == expected, cleaned  # R33-9
+
+
+def test_reregistered_rules_replace_the_policy_table() -> None:  # R33-9: boundary を登録し直すと表もメモも作り直される
+    _assert_table_matches_simulator()  # R33-9: 組み込みの規則で表とメモを作っておく
+    always_withdraw = Rule("withdraw", any_of=((("threat", ">=", 0),),))  # R33-9: 全入力で withdraw
+    try:  # R33-9
+        register_template(dataclasses.replace(BOUNDARY_TEMPLATE, rules=(always_withdraw,) + BOUNDARY_TEMPLATE.rules))  # R33-9
+        assert lookup_policy({k: 0 for k in KEYS}).output.pi_t == "withdraw"  # R33-9: 以前は comply のまま
+        _assert_table_matches_simulator()  # R33-9
+    finally:  # R33-9: 他のテストのために戻す
+        register_template(BOUNDARY_TEMPLATE)  # R33-9
+    _assert_table_matches_simulator()  # R33-9
+
+
+def test_mutating_a_lookup_does_not_change_the_table() -> None:  # R22-5: 返した要素を書き換えても次のリクエストは元のまま
+    values = {k: 1 for k in KEYS}  # R22-5
+    before = lookup_policy(values)  # R22-5
+    entry = lookup_policy(values)  # R22-5
+    entry.output.notes.append("x")  # R22-5
+    entry.output.o_t1_pred["predicted_threat"] = 99  # R22-5
+    entry.x.o_t.update(threat=3)  # R22-5
+    entry.proposals[0]["changes"][0]["to"] = 99  # R22-5
+    assert lookup_policy(values) == before  # R22-5
@@ -0,0 +1,36 @@
+from __future__ import annotations  # R30-5: 前方参照を安定させる
+
+from bench._common import temp_app  # R30-5: 一時DBのアプリ（Issue と steps で同じファイル・同じエンジン）
+from app.models import Issue, db  # R30-5
+from app.storage.db import session  # R30-5
+from app.storage.repository import save_step  # R30-5
+
+
+def _step_exists(step_id: int) -> bool:  # R30-5
+    with session() as conn:  # R30-5
+        return conn.execute("SELECT 1 FROM steps WHERE id = ?", (step_id,)).fetchone() is not None  # R30-5
+
+
+def test_steps_writes_follow_the_orm_transaction() -> None:  # R30-5: Issue 側の未確定の変更は steps 側の commit/rollback で確定も破棄もされない
+    with temp_app() as app:  # R30-5
+        with app.app_context():  # R30-5: ORM が巻き戻せば steps の行も一緒に消える
+            db.session.add(Issue(title="rolled back"))  # R30-5
+            db.session.flush()  # R30-5
+            step_id = save_step("boundary", {}, {}, "comply", {}, [])  # R30-5
+            db.session.rollback()  # R30-5
+            assert Issue.query.count() == 0  # R30-5: 以前は save_step の commit で確定していた
+            assert not _step_exists(step_id)  # R30-5
+        with app.app_context():  # R30-5: steps 側の失敗は自分の書きかけだけ捨てる
+            db.session.add(Issue(title="kept"))  # R30-5
+            db.session.flush()  # R30-5
+            try:  # R30-5
+                save_step("boundary", {}, {}, "comply", {"bad": object()}, [])  # R30-5: JSON にできない
+            except TypeError:  # R30-5
+                pass  # R30-5
+            db.session.commit()  # R30-5
+            assert Issue.query.count() == 1  # R30-5: 以前は session() の rollback で消えていた
+        with app.app_context():  # R30-5: Issue 側が読んだだけなら steps は自分でコミットする
+            Issue.query.count()  # R30-5
+            step_id = save_step("boundary", {}, {}, "comply", {}, [])  # R30-5
+        with app.app_context():  # R30-5
+            assert _step_exists(step_id)  # R30-5